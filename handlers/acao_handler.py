@@ -568,6 +568,7 @@ async def tratar_mensagem_usuario(user_id, mensagem):
             # ✅ evento reservado (não confirmado ainda)
             evento = {
                 "descricao": f"{servico} com {profissional_escolhido}",
+                "data": data_hora_inicio.strftime("%Y-%m-%d"),
                 "hora_inicio": data_hora_inicio.isoformat(),
                 "hora_fim": data_hora_fim.isoformat(),
                 "duracao": duracao_min,
@@ -588,6 +589,10 @@ async def tratar_mensagem_usuario(user_id, mensagem):
             if evento_id not in existente:
                 await salvar_dado_em_path(f"Clientes/{user_id}/Eventos/{evento_id}", evento)
 
+                # 📇 reserva ocupa agenda: mantém o índice de ocupação do dia
+                from services.ocupacao_service import registrar_ocupacao
+                await registrar_ocupacao(user_id, evento_id, evento)
+
             # ✅ agenda “confirmação automática” em 2 minutos (usando sua infra de NotificacoesAgendadas)
             from services.notificacao_service import criar_notificacao_agendada
             await criar_notificacao_agendada(
@@ -3,6 +3,7 @@ import logging
 from datetime import datetime, timedelta
 
 from telegram import Update
+from telegram.helpers import escape_markdown
 from telegram.ext import (
     Application,
     CommandHandler,
@@ -682,10 +683,16 @@ async def meus_dados(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
 
 async def custos_api_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    from services.firestore_client import get_db
+    """
+    /custosapi                         → acumulado total
+    /custosapi 7                       → últimos 7 dias (até MAX_DIAS_RESUMO)
+    /custosapi 2026-10-01 2026-10-15   → intervalo (inclusivo, até MAX_DIAS_RESUMO dias)
+    Qualquer forma aceita um tenant_id no final para filtrar um tenant.
+    """
+    from datetime import datetime
+    from utils.custos_gpt import MAX_DIAS_RESUMO, interpretar_args_custos, resumo_custos
+
     user_id = str(update.message.from_user.id)
-    # [INFRA-03] Usar singleton de firestore_client em vez de criar cliente independente
-    db = get_db()
 
     ID_DONO = OWNER_ID  # usa o mesmo
 
@@ -694,36 +701,89 @@ async def custos_api_handler(update: Update, context: ContextTypes.DEFAULT_TYPE)
         return
 
     try:
-        docs = db.collection("custos_usuarios").stream()
+        data_inicio, data_fim, tenant = interpretar_args_custos(
+            getattr(context, "args", None) or [], datetime.now().date()
+        )
+    except (ValueError, OverflowError):
+        await update.message.reply_text(
+            f"⚠️ Use: /custosapi [dias (1-{MAX_DIAS_RESUMO}) | AAAA-MM-DD AAAA-MM-DD] [tenant_id]"
+        )
+        return
 
-        total_geral = 0.0
-        por_usuario = {}
+    try:
+        # contadores agregados: O(usuários × shards) docs, não a coleção inteira
+        resumo = await resumo_custos(data_inicio, data_fim, tenant_id=tenant)
 
-        for doc in docs:
-            data = doc.to_dict()
-            uid = data.get("user_id", "desconhecido")
-            custo = float(data.get("custo_usd", 0.0) or 0.0)
+        if not resumo["reqs"]:
+            await update.message.reply_text("🔍 Nenhum uso registrado da API ainda.")
+            return
 
-            if uid not in por_usuario:
-                por_usuario[uid] = {"custo": 0.0, "reqs": 0}
+        def _linhas(grupo, icone):
+            itens = sorted(resumo[grupo].items(), key=lambda kv: kv[1]["custo_usd"], reverse=True)
+            # ids de usuário/tenant e nomes de modelo vêm do Firestore ("sem_tenant"...): `_` abre itálico no Markdown
+            return "\n".join(
+                f"{icone} {escape_markdown(str(chave))}: {info['reqs']} reqs – ${info['custo_usd']:.4f}" for chave, info in itens
+            )
 
-            por_usuario[uid]["custo"] += custo
-            por_usuario[uid]["reqs"] += 1
-            total_geral += custo
+        # janela realmente somada (resumo_custos corta em MAX_DIAS_RESUMO dias)
+        periodo = f"{resumo['data_inicio']} a {resumo['data_fim']}" if resumo["data_inicio"] else "todo o período"
+        if resumo["truncado"]:
+            periodo += f", limitado a {MAX_DIAS_RESUMO} dias"
+        # tenant vai fora do negrito: no Markdown v1 não dá para escapar dentro de uma entidade
+        cabecalho = f"📊 *Resumo de uso da API ({periodo})*"
+        if tenant:
+            cabecalho += f" — tenant {escape_markdown(tenant)}"
+
+        partes = [
+            cabecalho,
+            f"*Por usuário*\n{_linhas('por_usuario', '👤')}",
+            f"*Por tenant*\n{_linhas('por_tenant', '🏢')}",
+            f"*Por modelo*\n{_linhas('por_modelo', '🤖')}",
+        ]
+        if resumo["por_dia"]:
+            dias_ordenados = "\n".join(
+                f"📅 {dia}: {info['reqs']} reqs – ${info['custo_usd']:.4f}" for dia, info in sorted(resumo["por_dia"].items())
+            )
+            partes.append(f"*Por dia*\n{dias_ordenados}")
+        partes.append(f"💰 *Total geral:* ${resumo['total_usd']:.4f} ({resumo['reqs']} reqs)")
+        if resumo["tokens_cache"]:
+            partes.append(
+                f"🧊 *Cache de prompt:* {resumo['tokens_cache'] / max(resumo['tokens_input'], 1):.0%} dos tokens de entrada "
+                f"({resumo['tokens_cache']}/{resumo['tokens_input']}), ~${resumo['economia_cache_usd']:.4f} economizados"
+            )
 
-        if not por_usuario:
-            await update.message.reply_text("🔍 Nenhum uso registrado da API ainda.")
-            return
+        from services.cache_respostas_p1 import metricas_cache_respostas
+        cache_p1 = metricas_cache_respostas()
+        if cache_p1["hits"] or cache_p1["misses"]:
+            partes.append(
+                f"♻️ *Cache de respostas P1 (processo):* {cache_p1['taxa_hit']:.0%} hit "
+                f"({cache_p1['hits']}/{cache_p1['hits'] + cache_p1['misses']}), "
+                f"{cache_p1['fallbacks']} templates, ~{cache_p1['tokens_economizados']} tokens economizados"
+            )
 
-        linhas = [f"👤 {uid}: {info['reqs']} reqs – ${info['custo']:.4f}" for uid, info in por_usuario.items()]
-        texto = "\n".join(linhas)
+        from services.llm_gateway import metricas_llm
+        llm = metricas_llm()
+        if llm["chamadas"]:
+            lat = llm["latencia_ms"]
+            partes.append(
+                f"🛰️ *Gateway LLM (processo):* {llm['sucessos']}/{llm['chamadas']} ok, "
+                f"{llm['retries']} retries, {llm['timeouts']} timeouts, "
+                f"{llm['rejeitadas_circuito']} barradas pelo circuito ({escape_markdown(llm['circuito'])}); "
+                f"latência p50 ≤{lat['p50'] or 0:.0f}ms p95 ≤{lat['p95'] or 0:.0f}ms"
+            )
+            com_cache, sem_cache = llm["latencia_ms_com_cache"], llm["latencia_ms_sem_cache"]
+            if com_cache["total"]:
+                partes.append(
+                    f"🧊 *Cache de prompt (processo):* {llm['taxa_cache_prompt']:.0%} dos tokens de entrada; "
+                    f"latência média {com_cache['media']:.0f}ms com cache vs {sem_cache['media']:.0f}ms sem"
+                )
 
-        resposta = (
-            f"📊 *Resumo total de uso da API (todos os usuários)*\n\n"
-            f"{texto}\n\n"
-            f"💰 *Total geral:* ${total_geral:.4f}"
+        from services.roteamento_modelos import ROTAS_MODELO
+        partes.append(
+            "🧭 *Modelos por rota (padrão):* " + ", ".join(f"`{rota}`={escape_markdown(modelo)}" for rota, modelo in ROTAS_MODELO.items())
         )
-        await update.message.reply_text(resposta, parse_mode="Markdown")
+
+        await update.message.reply_text("\n\n".join(partes), parse_mode="Markdown")
     except Exception as e:
         logger.exception("❌ Erro ao consultar custos da API")
         await update.message.reply_text("❌ Ocorreu um erro ao consultar os dados.")
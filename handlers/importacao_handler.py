@@ -1,56 +1,34 @@
 from telegram import Update
 from telegram.ext import ContextTypes
 import os
-import pandas as pd
-from services.firebase_service_async import salvar_dado_em_path
+from services.importacao_profissionais_service import importar_profissionais
 from utils.permissao_utils import verificar_dono
 
-# 🔍 Detecta colunas por alternativas possíveis
-def detectar_coluna(colunas, alternativas):
-    for alt in alternativas:
-        for col in colunas:
-            if alt.lower() in col.lower():
-                return col
-    return None
+MAX_ERROS_NO_CHAT = 15
+
+
+# 📊 Lê a planilha (streaming) e grava os profissionais em lotes
+async def importar_profissionais_de_planilha(file_path, user_id, ao_progresso=None) -> dict:
+    return await importar_profissionais(file_path, user_id, ao_progresso=ao_progresso)
 
-# 📊 Lê a planilha e salva os profissionais no Firebase
-async def importar_profissionais_de_planilha(file_path, user_id):
-    try:
-        df = pd.read_excel(file_path) if file_path.endswith(".xlsx") else pd.read_csv(file_path)
-        colunas = df.columns
-
-        col_nome = detectar_coluna(colunas, ["nome", "profissional", "nome profissional", "nome do profissional"])
-        col_servicos = detectar_coluna(colunas, ["serviços", "servicos", "funções", "atividades", "especialidades"])
-        col_precos = detectar_coluna(colunas, ["preços", "valores", "preco", "preço", "valor"])
-
-        if not col_nome or not col_servicos:
-            print("❌ Cabeçalhos obrigatórios não encontrados.")
-            return False
-
-        for _, row in df.iterrows():
-            nome = str(row[col_nome]).strip()
-            if not nome: continue
-
-            servicos = [s.strip() for s in str(row[col_servicos]).split(",")]
-            dados = {
-                "nome": nome,
-                "servicos": servicos
-            }
-
-            if col_precos and str(row[col_precos]).strip().lower() != "nan":
-                try:
-                    precos = [float(p.strip()) for p in str(row[col_precos]).split(",")]
-                    dados["precos"] = dict(zip(servicos, precos))
-                except Exception:
-                    pass  # Ignora erros de preço
-
-            path = f"Clientes/{user_id}/Profissionais/{nome}"
-            await salvar_dado_em_path(path, dados)
-
-        return True
-    except Exception as e:
-        print(f"❌ Erro ao importar planilha: {e}")
-        return False
+
+def formatar_relatorio_importacao(relatorio: dict) -> str:
+    if relatorio["status"] == "cabecalho_invalido":
+        return "❌ Cabeçalhos obrigatórios não encontrados (colunas de nome e serviços)."
+    if relatorio["status"] == "erro" and not relatorio["importados"]:
+        return "❌ Erro ao importar profissionais."
+
+    texto = f"✅ {relatorio['importados']} profissional(is) importado(s) de {relatorio['linhas']} linha(s)."
+    problemas = relatorio["erros"] + relatorio["avisos"]
+    if problemas:
+        itens = [
+            f"• linha {linha}: {motivo}" if linha else f"• {motivo}"
+            for linha, motivo in sorted(problemas, key=lambda p: p[0] or 0)[:MAX_ERROS_NO_CHAT]
+        ]
+        if len(problemas) > MAX_ERROS_NO_CHAT:
+            itens.append(f"• ... e mais {len(problemas) - MAX_ERROS_NO_CHAT}")
+        texto += "\n\n⚠️ Linhas com problema:\n" + "\n".join(itens)
+    return texto
 
 # 🚀 Handler para receber e processar a planilha
 async def importar_profissionais_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -74,15 +52,22 @@ async def importar_profissionais_handler(update: Update, context: ContextTypes.D
     file_path = f"/tmp/{update.message.document.file_name}"
     await file.download_to_drive(file_path)
 
-    await update.message.reply_text(f"📅 Arquivo recebido! Processando...")
+    status = await update.message.reply_text("📅 Arquivo recebido! Processando...")
 
-    sucesso = await importar_profissionais_de_planilha(file_path, user_id)
+    async def _progresso(relatorio):
+        try:
+            await status.edit_text(
+                f"⏳ Importando... {relatorio['importados']} profissional(is) gravado(s) "
+                f"({relatorio['linhas']} linha(s) lida(s))"
+            )
+        except Exception:
+            pass  # progresso é cosmético
 
-    if sucesso:
-        context.user_data["ultima_importacao_profissionais"] = "sucesso"
-        await update.message.reply_text("✅ Profissionais importados com sucesso!")
-    else:
-        context.user_data["ultima_importacao_profissionais"] = "erro"
-        await update.message.reply_text("❌ Erro ao importar profissionais.")
+    try:
+        relatorio = await importar_profissionais_de_planilha(file_path, user_id, ao_progresso=_progresso)
+    finally:
+        os.remove(file_path)
 
-    os.remove(file_path)
+    sucesso = relatorio["status"] == "ok"
+    context.user_data["ultima_importacao_profissionais"] = "sucesso" if sucesso else "erro"
+    await update.message.reply_text(formatar_relatorio_importacao(relatorio))
@@ -221,6 +221,7 @@ async def confirmar_encaixe_apos_notificacao(
             hora_inicio=hora_inicio,
             hora_fim=_calcular_hora_fim(hora_inicio, duracao),
             excluir_evento_id=None,
+            data=data,
         )
 
         if conflito_agora:
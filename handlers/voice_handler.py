@@ -1,23 +1,20 @@
 # handlers/voice_handler.py
-import os
 from telegram import Update
 from telegram.ext import ContextTypes
-from utils.audio_utils import converter_audio_para_wav, transcrever_audio
+from utils.audio_utils import transcrever_audio_async
 from handlers.voice_command_handler import processar_comando_voz  # 👈 IMPORTA AQUI
 
 async def handle_voice(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    ogg_path = "temp_audio.ogg"
-    wav_path = "temp_audio.wav"
-
     try:
+        # 🎧 áudio só em memória: cada update tem seu buffer (sem temp_audio.* compartilhado)
         voice_file = await update.message.voice.get_file()
-        await voice_file.download_to_drive(ogg_path)
+        dados_audio = await voice_file.download_as_bytearray()
 
-        if not converter_audio_para_wav(ogg_path, wav_path):
+        convertido, texto = await transcrever_audio_async(dados_audio)
+        if not convertido:
             await update.message.reply_text("❌ Erro ao converter o áudio.")
             return
 
-        texto = transcrever_audio(wav_path)
         if not texto:
             await update.message.reply_text("Ficou abafado. Pode tentar falar de novo ou é mais fácil digitar?")
             return
@@ -29,9 +26,3 @@ async def handle_voice(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
     except Exception as e:
         await update.message.reply_text(f"❌ Ocorreu um erro ao processar o áudio:\n{e}")
-    finally:
-        # Limpa arquivos temporários
-        if os.path.exists(ogg_path):
-            os.remove(ogg_path)
-        if os.path.exists(wav_path):
-            os.remove(wav_path)
\ No newline at end of file
@@ -23,7 +23,6 @@ from pytz import timezone
 # ✅ Importações de agendadores
 from scheduler.notificacoes_scheduler import start_notificacao_scheduler
 #from scheduler.followup_scheduler import start_followup_scheduler
-from scheduler.daily_summary import start_daily_summary
 #from scheduler.email_to_event_loop import loop_verificacao_emails
 from handlers import register_handlers
 
@@ -53,6 +52,10 @@ WEBHOOK_URL = f"https://{RENDER_SERVICE_NAME}.onrender.com/webhook"
 # 🔐 token do cron externo
 CRON_TOKEN = os.environ.get("CRON_TOKEN", "supersecreto123")
 
+# 🌐 Modo do webhook: "flask" (padrão, thread + loop do bot) ou "aiohttp"
+# (servidor_webhook.py: ACK imediato + fila com ordem por chat no loop do bot)
+WEBHOOK_MODO = os.getenv("WEBHOOK_MODO", "flask").strip().lower()
+
 # 🌐 App Flask
 app = Flask(__name__)
 application = Application.builder().token(TOKEN).build()
@@ -68,9 +71,10 @@ logger.info("✅ Handlers registrados!")
 
 # ⏰ Agendadores que você já tinha
 #start_followup_scheduler()
-# PATCH: daily_summary movido para dentro de run_bot() após event loop ser criado
-#start_daily_summary(application)
-start_notificacao_scheduler()
+# resumo diário: job "resumo_diario_08h" do start_notificacao_scheduler
+# no modo aiohttp o scheduler sobe dentro do loop do servidor (executar_servidor)
+if WEBHOOK_MODO != "aiohttp":
+    start_notificacao_scheduler()
 
 # ⏰ Inicia verificação automática de e-mails a cada X minutos
 #def iniciar_email_loop():
@@ -83,7 +87,11 @@ start_notificacao_scheduler()
 
 # 🔄 Webhook endpoint
 async def webhook_process(update: Update):
-    await application.process_update(update)
+    from utils.leituras_update import leituras_do_update, origem_do_update
+
+    # leituras idênticas do Firestore dentro do update acontecem uma vez
+    async with leituras_do_update(origem_do_update(update)):
+        await application.process_update(update)
 
 @app.route("/webhook", methods=["POST"])
 def webhook():
@@ -157,8 +165,9 @@ def run_bot():
         bot_loop = asyncio.new_event_loop()
         asyncio.set_event_loop(bot_loop)
 
-        # ✅ PATCH: daily_summary inicializado após event loop existir
-        start_daily_summary(application)
+        # 🐢 LOOP_DEBUG_BLOQUEIO=1: reporta chamadas que travam o loop do bot
+        from utils.monitor_loop import ativar_se_configurado
+        ativar_se_configurado(bot_loop)
 
         bot_loop.run_until_complete(application.initialize())
         bot_loop.run_until_complete(setup_webhook())
@@ -172,8 +181,29 @@ def run_bot():
         bot_loop.run_until_complete(application.stop())
         bot_loop.close()
 
+# ⚡ Webhook nativo assíncrono (WEBHOOK_MODO=aiohttp)
+def run_bot_aiohttp():
+    from servidor_webhook import executar_servidor
+
+    asyncio.run(executar_servidor(
+        application,
+        porta=PORT,
+        webhook_url=WEBHOOK_URL,
+        cron_token=CRON_TOKEN,
+        processar_notificacoes=processar_notificacoes_agendadas,
+        ao_iniciar=(start_notificacao_scheduler,),
+    ))
+
 # 🧵 Inicia Flask + Bot em paralelo
 if __name__ == "__main__":
+    # `from main import application` (schedulers) deve reaproveitar este módulo,
+    # não reimportar main.py e criar outra Application
+    sys.modules.setdefault("main", sys.modules[__name__])
+
+    if WEBHOOK_MODO == "aiohttp":
+        run_bot_aiohttp()
+        sys.exit(0)
+
     threading.Thread(
         target=app.run,
         kwargs={"host": "0.0.0.0", "port": PORT, "use_reloader": False},
@@ -3,11 +3,12 @@
 
 from services.session_service import pegar_sessao
 from services.gpt_service import tratar_mensagem_usuario as tratar_mensagem_gpt
-from utils.contexto_temporario import salvar_contexto_temporario, carregar_contexto_temporario, salvar_contexto_temporario_v2, carregar_contexto_temporario_v2
+from utils.contexto_temporario import salvar_contexto_temporario, carregar_contexto_temporario, salvar_contexto_temporario_v2, carregar_contexto_temporario_v2, unidade_de_sessao
 from utils.context_manager import atualizar_contexto, limpar_contexto_agendamento
 from handlers.confirmacao_pendente_handler import resolver_confirmacao_pendente
 from services.gpt_executor import executar_acao_gpt, executar_acao_gpt_resultado
 from services.firebase_service_async import obter_id_dono, buscar_subcolecao
+from services.catalogo_service import obter_catalogo
 from services.event_service_async import verificar_conflito_e_sugestoes_profissional
 from services.onboarding_service import processar_onboarding_endereco_dono, processar_resposta_onboarding_dono
 from services.gpt_service import (
@@ -1093,28 +1094,13 @@ async def validar_profissional_para_servico(dono_id: str, profissional: str | No
     if not profissional or not servico:
         return {"ok": False, "validos": []}
 
-    profs_dict = await buscar_subcolecao(f"Clientes/{dono_id}/Profissionais") or {}
+    catalogo = await obter_catalogo(dono_id)
 
-    # serviços do profissional escolhido
-    servicos_prof = []
-    for p in profs_dict.values():
-        nomep = (p.get("nome") or "").strip()
-        if normalizar(nomep) == normalizar(profissional):
-            servicos_prof = [str(s).strip() for s in (p.get("servicos") or []) if str(s).strip()]
-            break
-
-    if any(normalizar(servico) == normalizar(s) for s in servicos_prof):
+    if catalogo.atende(profissional, servico):
         return {"ok": True, "validos": []}
 
     # lista de profissionais válidos para o serviço
-    validos = []
-    for p in profs_dict.values():
-        nomep = (p.get("nome") or "").strip()
-        servs = [str(s).strip() for s in (p.get("servicos") or []) if str(s).strip()]
-        if nomep and any(normalizar(servico) == normalizar(s) for s in servs):
-            validos.append(nomep)
-
-    return {"ok": False, "validos": validos}
+    return {"ok": False, "validos": catalogo.quem_faz(servico)}
 
 # ----------------------------
 # auditoria
@@ -1188,12 +1174,11 @@ async def extrair_slots_e_mesclar(ctx: dict, texto_usuario: str, dono_id: str) -
     draft = ctx.get("draft_agendamento") or {}
 
     # ---------------- profissionais ----------------
-    profs_dict = await buscar_subcolecao(f"Clientes/{dono_id}/Profissionais") or {}
-    nomes_profs = [str(p.get("nome", "")).strip() for p in profs_dict.values() if p.get("nome")]
+    catalogo = await obter_catalogo(dono_id)
 
     prof_detectado = None
-    for nome in nomes_profs:
-        if normalizar(nome) in tnorm:
+    for nome_norm, nome in catalogo.nomes_norm.items():
+        if nome_norm in tnorm:
             prof_detectado = nome
             break
 
@@ -1211,24 +1196,11 @@ async def extrair_slots_e_mesclar(ctx: dict, texto_usuario: str, dono_id: str) -
 
     # 1) serviços do profissional detectado
     if prof_detectado:
-        for p in profs_dict.values():
-            if normalizar(p.get("nome", "")) == normalizar(prof_detectado):
-                _match_servico(p.get("servicos") or [])
-                break
+        _match_servico(catalogo.servicos_de(prof_detectado))
 
     # 2) catálogo global
     if not servico_detectado:
-        todos = []
-        for p in profs_dict.values():
-            todos.extend(p.get("servicos") or [])
-        vistos = set()
-        uniq = []
-        for s in todos:
-            s2 = str(s).strip()
-            if s2 and s2 not in vistos:
-                vistos.add(s2)
-                uniq.append(s2)
-        _match_servico(uniq)
+        _match_servico(catalogo.servicos)
 
     # 🛡️ BLOQUEIO P0: Detectar rejeição de profissional alternativo
     eh_rejeicao_alternativa = False
@@ -1298,12 +1270,7 @@ async def extrair_slots_e_mesclar(ctx: dict, texto_usuario: str, dono_id: str) -
             # 🔥 PATCH: DETECTAR MÚLTIPLOS SERVIÇOS
             # "quero corte e escova" deve perguntar, não escolher um
             # =========================================================
-            profs_multiplos = await buscar_subcolecao(f"Clientes/{dono_id}/Profissionais") or {}
-            servicos_catalogo_multiplos = set()
-
-            for _, prof_data in profs_multiplos.items():
-                for s in (prof_data.get("servicos") or []):
-                    servicos_catalogo_multiplos.add(normalizar(str(s)))
+            servicos_catalogo_multiplos = catalogo.servicos_norm
 
             texto_norm_multiplos = normalizar(texto)
             servicos_mencionados = []
@@ -3158,66 +3125,35 @@ async def buscar_horario_ajuste_no_dia(
     servico: str,
     direcao: str
 ):
-    janela = await obter_janela_funcionamento(
-        user_id=user_id,
-        data_str=data,
-        profissional=profissional
-    )
-
-    if not janela or not janela.get("aberto"):
-        return None
+    """
+    Horário mais cedo/mais tarde no mesmo dia (grade de 10 min).
+    O dia é carregado uma vez (expediente + eventos) e a busca é feita nos
+    intervalos livres do profissional, sem ler o Firestore por candidato.
+    """
+    from services.disponibilidade_engine import DisponibilidadeEngine, hora_para_minutos
 
-    inicio = janela.get("inicio")
-    fim = janela.get("fim")
+    engine = await DisponibilidadeEngine.carregar(
+        user_id, data, [profissional], sem_profissional_bloqueia=False
+    )
+    janela = engine.janela(profissional)
+    ref_min = hora_para_minutos(hora_referencia)
 
-    if not inicio or not fim:
+    if not janela or ref_min is None:
         return None
 
-    def para_min(h: str) -> int:
-        hh, mm = h.split(":")
-        return int(hh) * 60 + int(mm)
-
-    def para_hora(m: int) -> str:
-        return f"{m // 60:02d}:{m % 60:02d}"
-
-    inicio_min = para_min(inicio)
-    fim_min = para_min(fim)
-    ref_min = para_min(hora_referencia)
-
     grade = 10
 
     if direcao == "mais_cedo":
-        candidatos = range(inicio_min, ref_min, grade)
-    else:
-        candidatos = range(ref_min + grade, fim_min - duracao_min + 1, grade)
-
-    for minuto in candidatos:
-        hora = para_hora(minuto)
-
-        permitido = await validar_horario_funcionamento(
-            user_id=user_id,
-            data_iso=data,
-            hora_inicio=hora,
-            duracao_min=duracao_min,
-            profissional=profissional
+        slots = engine.primeiros_slots(
+            profissional, duracao_min, grade, n=1, ate=ref_min, ancora=janela[0]
         )
-
-        if not permitido or not permitido.get("permitido"):
-            continue
-
-        conflito = await verificar_conflito_e_sugestoes_profissional(
-            user_id=user_id,
-            data=data,
-            hora_inicio=hora,
-            duracao_min=duracao_min,
-            profissional=profissional,
-            servico=servico
+    else:
+        slots = engine.primeiros_slots(
+            profissional, duracao_min, grade, n=1, a_partir_de=ref_min + grade, ancora=ref_min
         )
 
-        if not conflito.get("conflito"):
-            return {"hora": hora}
-
-    return None
+    horas = slots.get(profissional) or []
+    return {"hora": horas[0]} if horas else None
 
 def eh_aceite_de_acao_pendente(txt: str, ctx: dict) -> bool:
     """
@@ -3341,6 +3277,16 @@ def eh_continuacao_de_agendamento(txt: str, ctx: dict) -> bool:
 # ----------------------------
 
 async def roteador_principal(user_id: str, mensagem: str, update=None, context=None):
+    from services.roteamento_modelos import escopo_tenant_llm
+
+    # 📦 Sessão V2 lida uma vez e gravada uma vez por mensagem (write-behind)
+    # 🧭 tenant da mensagem para o roteamento de modelos do LLM (definido abaixo)
+    async with unidade_de_sessao(origem=f"roteador:{user_id}"):
+        with escopo_tenant_llm():
+            return await _roteador_principal(user_id, mensagem, update, context)
+
+
+async def _roteador_principal(user_id: str, mensagem: str, update=None, context=None):
     print(" [principal_router] Arquivo carregado")
 
     # 🧹 Limpeza multilinha: remover quebras de linha e normalizar espaços
@@ -3357,6 +3303,9 @@ async def roteador_principal(user_id: str, mensagem: str, update=None, context=N
         dono_id = str(user_id)
         print(f"[TENANT_FALLBACK] obter_id_dono retornou None, usando user_id como fallback | user_id={user_id}")
 
+    from services.roteamento_modelos import definir_tenant_llm
+    definir_tenant_llm(dono_id)
+
     # P0 FIX (2026-06-28): Sessão V2 não deve ser sobrescrita por legado
     # 1. Se context.user_data já tem contexto (carregado pelo handler), usar esse
     # 2. Se não, carregar V2 (não legado que pode estar vazio/divergente)
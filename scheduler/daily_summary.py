@@ -1,60 +1,145 @@
-from apscheduler.schedulers.asyncio import AsyncIOScheduler
-from services.firebase_service_async import buscar_todos_clientes, buscar_subcolecao, buscar_dados
-from telegram import Bot
-from datetime import datetime
+# scheduler/daily_summary.py
+"""
+Resumo diário das 08:00 — um pipeline só.
+
+Antes havia dois jobs no mesmo horário: este módulo lia a coleção global
+Tarefas inteira e todos os Eventos do tenant para cada usuário pagante, e
+notificacoes_scheduler.enviar_resumo_diario listava Clientes e lia o perfil de
+cada um. Agora (job "resumo_diario_08h" do notificacoes_scheduler):
+
+- uma query em Clientes (tipo_usuario == "dono", com projeção) lista os tenants;
+- por tenant, só queries filtradas: eventos do dia, tarefas e follow-ups
+  pendentes, em paralelo;
+- tenants processados com concorrência limitada (RESUMO_CONCORRENCIA);
+- cada execução registra duração, leituras do Firestore e contagens em
+  ultimo_resumo_diario.
+"""
+
+import asyncio
 import logging
+import os
+import time
+from datetime import datetime
+
 from pytz import timezone
 
+from services.firebase_service_async import buscar_eventos_filtrados, consultar_subcolecao
+from services.fila_envio_service import FilaEnvio
+from utils.leituras_update import leituras_do_update
+
 logger = logging.getLogger(__name__)
 
-# 🔄 Agendador principal com fuso horário de Brasília
-def start_daily_summary(application):
-    scheduler = AsyncIOScheduler(timezone=timezone("America/Sao_Paulo"))
+FUSO_BR = timezone("America/Sao_Paulo")
+
+CONCORRENCIA_RESUMO = int(os.getenv("RESUMO_CONCORRENCIA", "10"))
+CAMPOS_EVENTO_RESUMO = ["descricao", "hora_inicio", "hora_fim", "profissional", "status"]
+
+# métricas da última execução (debug/monitoramento)
+ultimo_resumo_diario: dict = {}
+
 
-    @scheduler.scheduled_job('cron', hour=8, minute=0)
-    async def enviar_resumo_diario():
-        logger.info("⏰ Executando rotina de resumo diário...")
+async def listar_tenants_dono() -> dict:
+    """{dono_id: {"nome", "tipo_usuario"}} — uma query, sem ler perfil por perfil."""
+    return await consultar_subcolecao(
+        "Clientes",
+        filtros=[("tipo_usuario", "==", "dono")],
+        campos=["nome", "tipo_usuario"],
+    ) or {}
 
-        try:
-            clientes = await buscar_todos_clientes()
-        except Exception as e:
-            logger.error(f"❌ Erro ao buscar clientes: {e}")
-            return
 
-        for user_id, dados in clientes.items():
-            if dados.get("pagamentoAtivo"):
-                try:
-                    await enviar_resumo_para_usuario(application.bot, user_id, dados)
-                except Exception as e:
-                    logger.error(f"🔥 Erro no resumo do usuário {user_id}: {e}")
+async def montar_resumo_tenant(dono_id: str, dados_dono: dict, hoje_str: str) -> str:
+    """Texto do resumo do dia de um tenant (eventos, tarefas, follow-ups)."""
+    from services.event_service_async import evento_deve_ser_ignorado
 
-    scheduler.start()
-    logger.info("✅ Scheduler de resumo diário iniciado com sucesso!")
+    eventos_dia, tarefas_dict, followups_dict = await asyncio.gather(
+        buscar_eventos_filtrados(dono_id, data_inicio=hoje_str, data_fim=hoje_str, campos=CAMPOS_EVENTO_RESUMO),
+        consultar_subcolecao(f"Clientes/{dono_id}/Tarefas", campos=["descricao"]),
+        consultar_subcolecao(
+            f"Clientes/{dono_id}/FollowUps",
+            filtros=[("status", "==", "pendente")],
+            campos=["nome_cliente", "data", "hora"],
+        ),
+    )
+
+    nome = (dados_dono or {}).get("nome") or "Empreendedor"
+    partes_resumo = [f"☀️ Bom dia, *{nome}*! Aqui está o seu resumo de hoje:"]
+
+    eventos = [
+        f"{ev.get('hora_inicio', '??:??')} — {ev.get('descricao') or 'Compromisso'}"
+        for eid, ev in sorted((eventos_dia or {}).items(), key=lambda i: str(i[1].get("hora_inicio") or ""))
+        if isinstance(ev, dict) and not evento_deve_ser_ignorado(ev, eid)
+    ]
+    if eventos:
+        partes_resumo.append("📅 *Eventos de hoje:*\n" + "\n".join(f"• {e}" for e in eventos))
+    else:
+        partes_resumo.append("📅 Nenhum evento agendado.")
+
+    tarefas = [t["descricao"] for t in (tarefas_dict or {}).values() if isinstance(t, dict) and t.get("descricao")]
+    if tarefas:
+        partes_resumo.append("📝 *Tarefas pendentes:*\n" + "\n".join(f"• {t}" for t in tarefas))
+    else:
+        partes_resumo.append("📝 Nenhuma tarefa registrada.")
+
+    # follow-up sem data conta como de hoje (o /followup não grava data)
+    pendentes = [
+        f"{f.get('nome_cliente', 'Sem nome')} às {f.get('hora', '08:00')}"
+        for f in (followups_dict or {}).values()
+        if isinstance(f, dict) and (f.get("data") or hoje_str) == hoje_str
+    ]
+    if pendentes:
+        partes_resumo.append("📌 *Follow-ups de hoje:*\n" + "\n".join(f"• {p}" for p in pendentes))
+    else:
+        partes_resumo.append("📌 Nenhum follow-up para hoje.")
+
+    return "\n\n".join(partes_resumo)
+
+
+async def executar_resumo_diario(bot) -> dict:
+    """Monta e enfileira o resumo de todos os tenants dono; devolve as métricas."""
+    logger.info("📋 Resumo diário iniciado...")
+    inicio = time.perf_counter()
+    metricas = {"tenants": 0, "enfileirados": 0, "erros": 0}
 
-# 📬 Função para enviar resumo individual
-async def enviar_resumo_para_usuario(bot: Bot, user_id: str, dados_usuario: dict):
     try:
-        hoje = datetime.now(timezone("America/Sao_Paulo")).date().isoformat()
-        nome = dados_usuario.get("nome", "Empreendedor")
+        hoje_str = datetime.now(FUSO_BR).date().isoformat()
+        semaforo = asyncio.Semaphore(CONCORRENCIA_RESUMO)
+
+        async with leituras_do_update("resumo_diario") as leituras:
+            tenants = await listar_tenants_dono()
+            metricas["tenants"] = len(tenants)
 
-        # Busca tarefas do próprio usuário (se estiver salvando com user_id dentro de "Tarefas")
-        todas_tarefas = await buscar_dados("Tarefas") or []
-        tarefas_hoje = [t for t in todas_tarefas if t.get("user_id") == user_id and hoje in t.get("data", "")]
+            # a fila é concluída (e as mensagens saem) mesmo se um tenant falhar no meio
+            async with FilaEnvio(bot) as fila:
 
-        # Busca eventos desse usuário
-        eventos = await buscar_subcolecao(f"Clientes/{user_id}/Eventos") or {}
-        eventos_hoje = [e for e in eventos.values() if e.get("data") == hoje]
+                async def _um(dono_id: str, dados: dict) -> str:
+                    async with semaforo:
+                        try:
+                            texto = await montar_resumo_tenant(dono_id, dados, hoje_str)
+                        except Exception as e:
+                            logger.error(f"🔥 Erro no resumo do tenant {dono_id}: {e}")
+                            return "erros"
+                    # 📤 envio pela fila compartilhada (limite de taxa + retry)
+                    fila.enviar("telegram", dono_id, texto, parse_mode="Markdown")
+                    return "enfileirados"
 
-        mensagem = (
-            f"☀️ Bom dia, *{nome}*!\n\n"
-            f"Aqui está o seu resumo de hoje:\n"
-            f"📝 Tarefas: *{len(tarefas_hoje)}*\n"
-            f"📅 Reuniões/Eventos: *{len(eventos_hoje)}*\n\n"
-            f"Tenha um dia incrível! 💪🚀"
-        )
+                for desfecho in await asyncio.gather(*(_um(d, v) for d, v in tenants.items())):
+                    metricas[desfecho] += 1
 
-        await bot.send_message(chat_id=int(user_id), text=mensagem, parse_mode="Markdown")
-        logger.info(f"✅ Resumo diário enviado para {user_id}")
+            rel = leituras.relatorio()
+            metricas.update({
+                "enviados": fila.metricas["enviadas"],
+                "falhas_envio": fila.metricas["falhas"],
+                "leituras_firestore": rel["leituras_firestore"],
+                "docs_lidos": rel["docs_lidos"],
+            })
 
     except Exception as e:
-        logger.error(f"❌ Erro ao enviar resumo para {user_id}: {e}")
+        logger.error(f"❌ Erro ao gerar/enviar resumo diário: {e}")
+
+    finally:
+        metricas["duracao_ms"] = round((time.perf_counter() - inicio) * 1000, 1)
+        ultimo_resumo_diario.clear()
+        ultimo_resumo_diario.update(metricas)
+        logger.info(f"[RESUMO_METRICAS] {metricas}")
+
+    return metricas
@@ -7,11 +7,16 @@ from services.firebase_service_async import (
     buscar_subcolecao,
     atualizar_dado_em_path,
     buscar_dado_em_path,
-    buscar_notificacoes_pendentes,
+    buscar_notificacoes_vencidas,
 )
 from services.recorrencia_service import checar_e_propor_recorrencias_todos
+from services.agenda_lock_service import limpar_locks_expirados
+from services.fila_envio_service import FilaEnvio
+from scheduler.daily_summary import executar_resumo_diario
+import asyncio
 import logging
 import os
+import time
 
 logger = logging.getLogger(__name__)
 
@@ -20,6 +25,14 @@ FUSO_BR = timezone("America/Sao_Paulo")
 # 🕐 Atraso máximo permitido antes de marcar notificação como expirada
 ATRASO_MAXIMO_NOTIFICACAO_MINUTOS = 15
 
+# 📬 Disparo de notificações vencidas (por ciclo de 1 min)
+MAX_NOTIFICACOES_POR_CICLO = 500
+LOTE_NOTIFICACOES = 50
+CONCORRENCIA_NOTIFICACOES = 10
+
+# métricas do último ciclo (debug/monitoramento)
+ultimo_ciclo_notificacoes: dict = {}
+
 
 def _parse_iso_br(dt_str: str):
     """
@@ -88,246 +101,271 @@ async def _verificar_expiracao_notificacao(notif_id: str, path: str, dt: datetim
     return False
 
 
+async def _processar_notificacao(fila: FilaEnvio, user_id: str, notif_id: str, notif: dict, agora: datetime) -> str:
+    """
+    Processa UMA notificação vencida de Clientes/{user_id}/NotificacoesAgendadas.
+    Retorna o desfecho para as métricas do ciclo:
+    "enfileirada" | "confirmacao" | "expirada" | "pulada" | "erro".
+    """
+    path = f"Clientes/{user_id}/NotificacoesAgendadas"
+
+    avisado = bool(notif.get("avisado"))
+    status = (notif.get("status") or "").lower()
+    if avisado:
+        return "pulada"
+    if status == "enviado":
+        # enviado sem a flag: marca avisado para sair da query de vencidas (avisado == False)
+        await atualizar_dado_em_path(f"{path}/{notif_id}", {
+            "avisado": True,
+            "atualizado_em": agora.isoformat()
+        })
+        return "pulada"
+
+    dt = _parse_iso_br(notif.get("data_hora", ""))
+    if not dt:
+        # estado terminal: sem avisado=True seria relida a cada ciclo e tomaria vaga do limite
+        await atualizar_dado_em_path(f"{path}/{notif_id}", {
+            "avisado": True,
+            "processada": True,
+            "status": "erro",
+            "erro": "data_hora inválida",
+            "atualizado_em": agora.isoformat()
+        })
+        return "erro"
+    if dt > agora:
+        return "pulada"
+
+    # 🕐 Verificar se notificação expirou (muito antiga)
+    if await _verificar_expiracao_notificacao(notif_id, path, dt, agora):
+        return "expirada"
+
+    canal = (notif.get("canal") or "telegram").lower()
+
+    # 🔑 se o evento foi criado pelo dono, mas era para avisar o cliente,
+    # vamos usar o destinatário salvo no documento
+    destinatario_id = str(
+        notif.get("destinatario_user_id") or user_id
+    )
+
+    # =========================================================
+    # ✅ PATCH: confirmação automática de reserva (fechamento)
+    # descricao = "CONFIRMAR_RESERVA::<evento_id>"
+    # Proteções: validação, reload antes de confirmar, rastreio
+    # =========================================================
+    try:
+        desc = (notif.get("descricao") or "").strip()
+        if desc.startswith("CONFIRMAR_RESERVA::"):
+            # 🔑 Validar evento_id antes de usar
+            evento_id = desc.split("::", 1)[1].strip() if "::" in desc else ""
+            if not evento_id:
+                # evento_id vazio → erro, não confirmar
+                await atualizar_dado_em_path(f"{path}/{notif_id}", {
+                    "avisado": True,
+                    "processada": True,
+                    "status": "erro",
+                    "erro": "CONFIRMAR_RESERVA: evento_id vazio ou inválido",
+                    "atualizado_em": agora.isoformat()
+                })
+                logger.warning(f"⚠️ CONFIRMAR_RESERVA sem evento_id: notif_id={notif_id}")
+                return "erro"
+
+            # Evento padrão salvo no "Clientes/{user_id}/Eventos/{evento_id}"
+            evento_path = f"Clientes/{user_id}/Eventos/{evento_id}"
+
+            # 🔒 RELOAD: recarregar evento imediatamente antes de confirmar
+            # Detecta race condition (outro scheduler ou operação concorrente)
+            evento = await buscar_dado_em_path(evento_path)
+            evento_status = evento.get("status") if isinstance(evento, dict) else None
+
+            # 🎯 Confirmar SOMENTE se ainda estiver "reservado"
+            # Preserva estado se já confirmado/cancelado/pendente
+            confirmou = False
+            if isinstance(evento, dict) and evento_status == "reservado":
+                # ✅ Confirmar: reload detectou que ainda está reservado
+                await atualizar_dado_em_path(evento_path, {
+                    "status": "confirmado",
+                    "confirmado": True,
+                    "confirmado_em": agora.isoformat(),
+                })
+                confirmou = True
+                logger.info(f"✅ Reserva confirmada automaticamente: user={user_id} evento={evento_id}")
+
+            # 📋 Marca notificação com rastreio completo
+            # Sempre finalizar notificação com campos obrigatórios
+            await atualizar_dado_em_path(f"{path}/{notif_id}", {
+                "avisado": True,
+                "processada": True,
+                "status": "enviado",
+                "enviado_em": agora.isoformat(),
+                "tipo_processamento": "confirmacao_reserva",
+                "evento_status_observado": evento_status,
+                "atualizado_em": agora.isoformat()
+            })
+
+            # IMPORTANTE: não envia mensagem para este tipo de notificação
+            return "confirmacao"
+
+    except Exception as e:
+        logger.error(f"❌ Erro ao processar CONFIRMAR_RESERVA para {destinatario_id}: {e}")
+        await atualizar_dado_em_path(f"{path}/{notif_id}", {
+            "avisado": True,
+            "processada": True,
+            "status": "erro",
+            "erro": f"CONFIRMAR_RESERVA: {str(e)}",
+            "atualizado_em": agora.isoformat()
+        })
+        return "erro"
+
+    # =========================================================
+    # ✅ Fluxo normal de lembrete/notificação
+    # =========================================================
+    mensagem = notif.get("mensagem")
+    if not mensagem:
+        desc = (notif.get("descricao") or "compromisso").strip()
+        alvo = notif.get("alvo_evento") or {}
+        data_ev = (alvo.get("data") or "")
+        hora_ev = (alvo.get("hora_inicio") or "")
+        min_antes = int(notif.get("minutos_antes") or 30)
+
+        desc_lower = desc.lower()
+        tipo_legivel = "reunião" if "reuni" in desc_lower else desc_lower
+
+        hoje_str = datetime.now(FUSO_BR).strftime("%Y-%m-%d")
+        if data_ev and hora_ev:
+            quando = f" — hoje às {hora_ev}" if data_ev == hoje_str else f" — {data_ev} às {hora_ev}"
+        else:
+            quando = ""
+
+        sufixo_min = "minuto" if min_antes == 1 else "minutos"
+        mensagem = f"🔔 Não esqueça: sua {tipo_legivel} começa em {min_antes} {sufixo_min}{quando}."
+
+    # 📤 envio pela fila (limite de taxa + retry); status gravado em lote no fim do ciclo
+    fila.enviar(
+        canal,
+        destinatario_id,
+        mensagem,
+        ao_enviar=(f"{path}/{notif_id}", {
+            "avisado": True,
+            "status": "enviado",
+            "enviado_em": agora.isoformat()
+        }),
+        ao_falhar=(f"{path}/{notif_id}", {
+            "status": "erro",
+            "atualizado_em": agora.isoformat()
+        }),
+    )
+    return "enfileirada"
+
+
+async def _eh_tenant_dono(user_id: str, cache_ciclo: dict) -> bool:
+    """tipo_usuario do dono do path (perfil em cache), memoizado por ciclo."""
+    if user_id not in cache_ciclo:
+        try:
+            doc_cli = await buscar_dado_em_path(f"Clientes/{user_id}") or {}
+            tipo_usuario = (doc_cli.get("tipo_usuario") or "").strip().lower()
+            cache_ciclo[user_id] = tipo_usuario == "dono"
+            if not cache_ciclo[user_id]:
+                logger.info(f"[NOTIF] pulando user_id não-dono: {user_id} tipo_usuario={tipo_usuario}")
+        except Exception as e:
+            logger.warning(f"[NOTIF] erro ao validar tenant {user_id}: {e}")
+            cache_ciclo[user_id] = False
+    return cache_ciclo[user_id]
+
+
 async def processar_notificacoes_agendadas():
+    """
+    Dispara as notificações vencidas de todos os tenants.
+
+    Uma query collection group (avisado == False, data_hora <= agora) traz só o
+    que está vencido — o custo acompanha as notificações devidas, não o total
+    de usuários. Os documentos são processados em lotes com concorrência
+    limitada e cada ciclo registra métricas de tempo/contagem.
+    """
     logger.info("⏰ processar_notificacoes_agendadas() iniciado...")
+    inicio = time.perf_counter()
+    metricas = {"lidas": 0, "enfileirada": 0, "confirmacao": 0, "expirada": 0, "pulada": 0, "erro": 0}
 
     try:
         bot = await _get_bot()
         if bot is None:
             return
 
-        # aqui vêm TODOS os documentos de Clientes (dono + clientes)
-        clientes = await buscar_subcolecao("Clientes") or {}
         agora = datetime.now(FUSO_BR)
-
-        for user_id in clientes.keys():
-            # 🔐 VALIDAÇÃO DE TENANT: processar apenas donos
-            try:
-                doc_cli = await buscar_dado_em_path(f"Clientes/{user_id}") or {}
-                tipo_usuario = (doc_cli.get("tipo_usuario") or "").strip().lower()
-
-                if tipo_usuario != "dono":
-                    logger.info(f"[NOTIF] pulando user_id não-dono: {user_id} tipo_usuario={tipo_usuario}")
-                    continue
-            except Exception as e:
-                logger.warning(f"[NOTIF] erro ao validar tenant {user_id}: {e}")
-                continue
-
-            path = f"Clientes/{user_id}/NotificacoesAgendadas"
-            notificacoes = await buscar_notificacoes_pendentes(user_id)
-
-            for notif_id, notif in notificacoes.items():
-                if not isinstance(notif, dict):
-                    continue
-
-                avisado = bool(notif.get("avisado"))
-                status = (notif.get("status") or "").lower()
-                if avisado or status == "enviado":
-                    continue
-
-                dt = _parse_iso_br(notif.get("data_hora", ""))
-                if not dt:
-                    await atualizar_dado_em_path(f"{path}/{notif_id}", {
-                        "status": "erro",
-                        "erro": "data_hora inválida",
-                        "atualizado_em": agora.isoformat()
-                    })
-                    continue
-                if dt > agora:
-                    continue
-
-                # 🕐 Verificar se notificação expirou (muito antiga)
-                if await _verificar_expiracao_notificacao(notif_id, path, dt, agora):
-                    continue
-
-                canal = (notif.get("canal") or "telegram").lower()
-
-                # 🔑 se o evento foi criado pelo dono, mas era para avisar o cliente,
-                # vamos usar o destinatário salvo no documento
-                destinatario_id = str(
-                    notif.get("destinatario_user_id") or user_id
-                )
-
-                # =========================================================
-                # ✅ PATCH: confirmação automática de reserva (fechamento)
-                # descricao = "CONFIRMAR_RESERVA::<evento_id>"
-                # Proteções: validação, reload antes de confirmar, rastreio
-                # =========================================================
+        t_query = time.perf_counter()
+        vencidas = await buscar_notificacoes_vencidas(
+            agora.strftime("%Y-%m-%dT%H:%M:%S"),
+            limite=MAX_NOTIFICACOES_POR_CICLO,
+        )
+        metricas["query_ms"] = round((time.perf_counter() - t_query) * 1000, 1)
+        metricas["lidas"] = len(vencidas)
+
+        fila = FilaEnvio(bot)
+        tenants_dono: dict = {}
+        semaforo = asyncio.Semaphore(CONCORRENCIA_NOTIFICACOES)
+
+        async def _uma(doc_path: str, notif):
+            partes = doc_path.split("/")
+            if len(partes) != 4 or partes[0] != "Clientes" or not isinstance(notif, dict):
+                return "pulada"
+            user_id, notif_id = partes[1], partes[3]
+
+            async with semaforo:
+                # 🔐 VALIDAÇÃO DE TENANT: enviar apenas de donos; as demais
+                # só saem do índice quando expiram
+                if not await _eh_tenant_dono(user_id, tenants_dono):
+                    dt = _parse_iso_br(notif.get("data_hora", ""))
+                    path = f"Clientes/{user_id}/NotificacoesAgendadas"
+                    if await _verificar_expiracao_notificacao(notif_id, path, dt, agora):
+                        return "expirada"
+                    return "pulada"
                 try:
-                    desc = (notif.get("descricao") or "").strip()
-                    if desc.startswith("CONFIRMAR_RESERVA::"):
-                        # 🔑 Validar evento_id antes de usar
-                        evento_id = desc.split("::", 1)[1].strip() if "::" in desc else ""
-                        if not evento_id:
-                            # evento_id vazio → erro, não confirmar
-                            await atualizar_dado_em_path(f"{path}/{notif_id}", {
-                                "avisado": True,
-                                "processada": True,
-                                "status": "erro",
-                                "erro": "CONFIRMAR_RESERVA: evento_id vazio ou inválido",
-                                "atualizado_em": agora.isoformat()
-                            })
-                            logger.warning(f"⚠️ CONFIRMAR_RESERVA sem evento_id: notif_id={notif_id}")
-                            continue
-
-                        # Evento padrão salvo no "Clientes/{user_id}/Eventos/{evento_id}"
-                        evento_path = f"Clientes/{user_id}/Eventos/{evento_id}"
-
-                        # 🔒 RELOAD: recarregar evento imediatamente antes de confirmar
-                        # Detecta race condition (outro scheduler ou operação concorrente)
-                        evento = await buscar_dado_em_path(evento_path)
-                        evento_status = evento.get("status") if isinstance(evento, dict) else None
-
-                        # 🎯 Confirmar SOMENTE se ainda estiver "reservado"
-                        # Preserva estado se já confirmado/cancelado/pendente
-                        confirmou = False
-                        if isinstance(evento, dict) and evento_status == "reservado":
-                            # ✅ Confirmar: reload detectou que ainda está reservado
-                            await atualizar_dado_em_path(evento_path, {
-                                "status": "confirmado",
-                                "confirmado": True,
-                                "confirmado_em": agora.isoformat(),
-                            })
-                            confirmou = True
-                            logger.info(f"✅ Reserva confirmada automaticamente: user={user_id} evento={evento_id}")
-
-                        # 📋 Marca notificação com rastreio completo
-                        # Sempre finalizar notificação com campos obrigatórios
-                        await atualizar_dado_em_path(f"{path}/{notif_id}", {
-                            "avisado": True,
-                            "processada": True,
-                            "status": "enviado",
-                            "enviado_em": agora.isoformat(),
-                            "tipo_processamento": "confirmacao_reserva",
-                            "evento_status_observado": evento_status,
-                            "atualizado_em": agora.isoformat()
-                        })
-
-                        # IMPORTANTE: não envia mensagem para este tipo de notificação
-                        continue
-
+                    return await _processar_notificacao(fila, user_id, notif_id, notif, agora)
                 except Exception as e:
-                    logger.error(f"❌ Erro ao processar CONFIRMAR_RESERVA para {destinatario_id}: {e}")
-                    await atualizar_dado_em_path(f"{path}/{notif_id}", {
-                        "avisado": True,
-                        "processada": True,
-                        "status": "erro",
-                        "erro": f"CONFIRMAR_RESERVA: {str(e)}",
-                        "atualizado_em": agora.isoformat()
-                    })
-                    continue
-
-                # =========================================================
-                # ✅ Fluxo normal de lembrete/notificação
-                # =========================================================
-                mensagem = notif.get("mensagem")
-                if not mensagem:
-                    desc = (notif.get("descricao") or "compromisso").strip()
-                    alvo = notif.get("alvo_evento") or {}
-                    data_ev = (alvo.get("data") or "")
-                    hora_ev = (alvo.get("hora_inicio") or "")
-                    min_antes = int(notif.get("minutos_antes") or 30)
-
-                    desc_lower = desc.lower()
-                    tipo_legivel = "reunião" if "reuni" in desc_lower else desc_lower
-
-                    hoje_str = datetime.now(FUSO_BR).strftime("%Y-%m-%d")
-                    if data_ev and hora_ev:
-                        quando = f" — hoje às {hora_ev}" if data_ev == hoje_str else f" — {data_ev} às {hora_ev}"
-                    else:
-                        quando = ""
-
-                    sufixo_min = "minuto" if min_antes == 1 else "minutos"
-                    mensagem = f"🔔 Não esqueça: sua {tipo_legivel} começa em {min_antes} {sufixo_min}{quando}."
-
-                try:
-                    if canal == "telegram":
-                        await bot.send_message(chat_id=int(destinatario_id), text=mensagem)
-                    elif canal == "whatsapp":
-                        from services.whatsapp_service import enviar_mensagem_whatsapp
-                        await enviar_mensagem_whatsapp(destinatario_id, mensagem)
-                    else:
-                        await bot.send_message(chat_id=int(destinatario_id), text=mensagem)
-
-                    await atualizar_dado_em_path(f"{path}/{notif_id}", {
-                        "avisado": True,
-                        "status": "enviado",
-                        "enviado_em": agora.isoformat()
-                    })
-                    logger.info(f"✅ Notificação enviada para {destinatario_id} via {canal}: {mensagem}")
+                    logger.error(f"❌ Erro ao processar notificação {doc_path}: {e}")
+                    return "erro"
+
+        # a fila termina os envios e grava os status em lote ao sair do bloco
+        async with fila:
+            itens = list(vencidas.items())
+            for i in range(0, len(itens), LOTE_NOTIFICACOES):
+                lote = itens[i:i + LOTE_NOTIFICACOES]
+                for desfecho in await asyncio.gather(*(_uma(p, n) for p, n in lote)):
+                    metricas[desfecho] = metricas.get(desfecho, 0) + 1
+
+        metricas.update({
+            "enviadas": fila.metricas["enviadas"],
+            "falhas_envio": fila.metricas["falhas"],
+            "retries_envio": fila.metricas["retries"],
+        })
 
-                except Exception as e:
-                    logger.error(f"Erro ao enviar notificação para {destinatario_id} via {canal}: {e}")
-                    await atualizar_dado_em_path(f"{path}/{notif_id}", {
-                        "status": "erro",
-                        "erro": str(e),
-                        "atualizado_em": agora.isoformat()
-                    })
+        if metricas["lidas"] >= MAX_NOTIFICACOES_POR_CICLO:
+            logger.warning(f"[NOTIF] limite de {MAX_NOTIFICACOES_POR_CICLO} por ciclo atingido; restante fica para o próximo")
 
     except Exception as e:
         logger.error(f"❌ Erro na rotina de notificações: {e}")
 
+    finally:
+        metricas["duracao_ms"] = round((time.perf_counter() - inicio) * 1000, 1)
+        ultimo_ciclo_notificacoes.clear()
+        ultimo_ciclo_notificacoes.update(metricas)
+        logger.info(f"[NOTIF_METRICAS] {metricas}")
+
 
 async def enviar_resumo_diario():
-    logger.info("📋 enviar_resumo_diario() iniciado...")
-    try:
-        bot = await _get_bot()
-        if bot is None:
-            return
+    """Job das 08:00: resumo diário consolidado (scheduler/daily_summary)."""
+    bot = await _get_bot()
+    if bot is None:
+        return
+    await executar_resumo_diario(bot)
 
-        from services.event_service_async import buscar_eventos_por_intervalo
-
-        clientes = await buscar_subcolecao("Clientes") or {}
-        hoje = datetime.now(FUSO_BR).date()
-        hoje_str = hoje.strftime("%Y-%m-%d")
-
-        for user_id in clientes.keys():
-            # 👇 checa se esse documento é mesmo de DONO
-            doc_cli = await buscar_dado_em_path(f"Clientes/{user_id}")
-            tipo_usuario = (doc_cli or {}).get("tipo_usuario") or "cliente"
-            if tipo_usuario != "dono":
-                continue  # não manda resumo diário para cliente
-
-            partes_resumo = []
-
-            eventos = await buscar_eventos_por_intervalo(user_id, dia_especifico=hoje)
-            if eventos:
-                partes_resumo.append("📅 *Eventos de hoje:*\n" + "\n".join(f"• {e}" for e in eventos))
-            else:
-                partes_resumo.append("📅 Nenhum evento agendado.")
-
-            tarefas_dict = await buscar_subcolecao(f"Clientes/{user_id}/Tarefas") or {}
-            tarefas = [t["descricao"] for t in tarefas_dict.values() if isinstance(t, dict) and t.get("descricao")]
-            if tarefas:
-                partes_resumo.append("📝 *Tarefas pendentes:*\n" + "\n".join(f"• {t}" for t in tarefas))
-            else:
-                partes_resumo.append("📝 Nenhuma tarefa registrada.")
-
-            followups_dict = await buscar_subcolecao(f"Usuarios/{user_id}/FollowUps") or {}
-            pendentes = []
-            for f in followups_dict.values():
-                if f.get("status") == "pendente":
-                    nome = f.get("nome_cliente", "Sem nome")
-                    data = f.get("data", hoje_str)
-                    if data == hoje_str:
-                        hora = f.get("hora", "08:00")
-                        pendentes.append(f"{nome} às {hora}")
-
-            if pendentes:
-                partes_resumo.append("📌 *Follow-ups de hoje:*\n" + "\n".join(f"• {p}" for p in pendentes))
-            else:
-                partes_resumo.append("📌 Nenhum follow-up para hoje.")
-
-            texto = "\n\n".join(partes_resumo)
-
-            try:
-                await bot.send_message(chat_id=int(user_id), text=texto, parse_mode="Markdown")
-                logger.info(f"✅ Resumo diário enviado para {user_id}")
-            except Exception as e:
-                logger.error(f"Erro ao enviar resumo diário para {user_id}: {e}")
 
+async def varrer_locks_agenda():
+    """Remove AgendaLocks vencidos de todos os tenants (fora do caminho de reserva)."""
+    try:
+        removidos = await limpar_locks_expirados()
+        logger.info(f"🧹 Varredura de locks de agenda: {removidos} removidos")
     except Exception as e:
-        logger.error(f"❌ Erro ao gerar/enviar resumo diário: {e}")
+        logger.error(f"❌ Erro na varredura de locks de agenda: {e}")
 
 
 def start_notificacao_scheduler():
@@ -364,6 +402,17 @@ def start_notificacao_scheduler():
         replace_existing=True,
     )
 
+    # 🧹 Locks de agenda vencidos a cada 30 minutos
+    scheduler.add_job(
+        varrer_locks_agenda,
+        "interval",
+        minutes=30,
+        coalesce=True,
+        max_instances=1,
+        id="locks_agenda_30min",
+        replace_existing=True,
+    )
+
     scheduler.start()
-    print("✅ Scheduler de notificações iniciado (loop a cada 1 min, resumo 08:00, recorrência 08:00).")
-    logger.info("✅ Scheduler de notificações iniciado (loop a cada 1 min, resumo 08:00, recorrência 08:00).")
\ No newline at end of file
+    print("✅ Scheduler de notificações iniciado (loop a cada 1 min, resumo 08:00, recorrência 08:00, locks a cada 30 min).")
+    logger.info("✅ Scheduler de notificações iniciado (loop a cada 1 min, resumo 08:00, recorrência 08:00, locks a cada 30 min).")
\ No newline at end of file
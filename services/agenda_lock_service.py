@@ -16,12 +16,20 @@ import logging
 from datetime import datetime, timedelta
 from typing import Dict, Any, Optional
 
+from google.cloud.firestore_v1.async_transaction import async_transactional
+
 from services.firebase_service_async import (
-    salvar_dado_em_path,
-    buscar_dado_em_path,
-    buscar_subcolecao,
-    atualizar_dado_em_path,
-    deletar_dado_em_path,
+    client,
+    get_ref_from_path,
+    deletar_por_query,
+    notificar_escrita,
+)
+from services.ocupacao_service import (
+    buscar_intervalos_ocupados,
+    chave_intervalo,
+    montar_intervalo,
+    normalizar_profissional,
+    ocupacao_path,
 )
 
 logger = logging.getLogger(__name__)
@@ -69,48 +77,6 @@ def lock_esta_expirado(timestamp_lock_str: str, horas_validade: int = 24) -> boo
         return False
 
 
-async def limpar_locks_orfaos(dono_id: str, horas_validade: int = 24) -> int:
-    """
-    Remove locks órfãos (sem evento_id) que expiraram.
-    Executado antes de criar novo lock.
-
-    Args:
-        dono_id: ID do dono/salão
-        horas_validade: Considerar expirado após N horas
-
-    Returns:
-        Quantidade de locks removidos
-    """
-    try:
-        locks = await buscar_subcolecao(f"Clientes/{dono_id}/AgendaLocks") or []
-        removidos = 0
-
-        for lock_item in locks:
-            # Parse lock
-            if isinstance(lock_item, dict):
-                lock_data = lock_item.get("data", lock_item)
-                lock_id = lock_item.get("id")
-            else:
-                continue
-
-            # Verificar se é órfão (sem evento_id)
-            if not lock_data.get("evento_id"):
-                # Verificar expiração
-                if lock_esta_expirado(lock_data.get("timestamp_lock"), horas_validade):
-                    try:
-                        lock_path = f"Clientes/{dono_id}/AgendaLocks/{lock_id}"
-                        await deletar_dado_em_path(lock_path)
-                        removidos += 1
-                        logger.info(f"Lock órfão removido: {lock_id}")
-                    except Exception as e:
-                        logger.warning(f"Erro ao remover lock órfão {lock_id}: {e}")
-
-        return removidos
-    except Exception as e:
-        logger.error(f"Erro ao limpar locks órfãos: {e}")
-        return 0
-
-
 def gerar_buckets_tempo(hora_inicio: str, hora_fim: str, intervalo_minutos: int = 10) -> list:
     """
     Gera buckets de tempo para proteger contra sobreposição parcial.
@@ -155,12 +121,14 @@ async def tem_conflito_real(
     profissional: str,
     hora_inicio: str,
     hora_fim: str,
-    excluir_evento_id: Optional[str] = None
+    excluir_evento_id: Optional[str] = None,
+    data: Optional[str] = None,
 ) -> bool:
     """
-    Verifica se existe evento confirmado sobreposto para o mesmo profissional.
+    Verifica se existe evento ativo sobreposto para o mesmo profissional.
 
-    CRÍTICO: Esta função é chamada DENTRO do lock, para evitar race condition.
+    Lê o índice de ocupação do profissional no dia (ocupacao_service),
+    não a subcoleção inteira de Eventos.
 
     Args:
         dono_id: ID do dono/salão
@@ -168,48 +136,30 @@ async def tem_conflito_real(
         hora_inicio: Hora inicial (formato HH:MM)
         hora_fim: Hora final (formato HH:MM)
         excluir_evento_id: Se fornecido, ignora este evento (para updates)
+        data: Data do slot (YYYY-MM-DD). Sem data não há como checar:
+            assume conflito, como no erro de leitura.
 
     Returns:
-        True se há conflito, False se está livre
+        True se há conflito (ou não foi possível verificar), False se está livre
     """
 
+    if not data:
+        logger.warning(f"tem_conflito_real sem data (assumindo conflito): {profissional} {hora_inicio}-{hora_fim}")
+        return True
+
     try:
-        eventos = await buscar_subcolecao(f"Clientes/{dono_id}/Eventos") or []
-
-        for evento_item in eventos:
-            # Parse evento conforme o formato retornado por buscar_subcolecao
-            if isinstance(evento_item, dict):
-                # Pode vir como {"id": "...", "data": {...}} ou direto como evento
-                evento_data = evento_item.get("data", {})
-                if isinstance(evento_data, dict):
-                    evento = evento_data
-                else:
-                    evento = evento_item
-            else:
-                continue
-
-            # Ignorar se for o evento que estamos atualizando
-            if evento.get("id") == excluir_evento_id:
-                continue
-
-            # Ignorar cancelados
-            status = str(evento.get("status") or "").strip().lower()
-            if status in ["cancelado", "cancelada", "removido", "removida"]:
-                continue
-
-            # Comparar profissional
-            if evento.get("profissional", "").lower() != profissional.lower():
-                continue
-
-            # Verificar sobreposição de horário
-            e_inicio = normalizar_hora(evento.get("hora_inicio", ""))
-            e_fim = normalizar_hora(evento.get("hora_fim", ""))
+        intervalos = await buscar_intervalos_ocupados(
+            dono_id, data, profissional, excluir_event_id=excluir_evento_id
+        )
+        hora_inicio = normalizar_hora(hora_inicio)
+        hora_fim = normalizar_hora(hora_fim)
 
+        for item in intervalos:
             # Sobreposição: inicio_novo < fim_existente AND fim_novo > inicio_existente
-            if hora_inicio < e_fim and hora_fim > e_inicio:
+            if hora_inicio < item["hora_fim"] and hora_fim > item["hora_inicio"]:
                 logger.warning(
                     f"Conflito detectado: {profissional} "
-                    f"{hora_inicio}-{hora_fim} conflita com {e_inicio}-{e_fim}"
+                    f"{hora_inicio}-{hora_fim} conflita com {item['hora_inicio']}-{item['hora_fim']}"
                 )
                 return True
 
@@ -220,6 +170,150 @@ async def tem_conflito_real(
         return True  # Falha aberta: assume conflito se não conseguir verificar
 
 
+def avaliar_reserva(
+    locks: Dict[str, Optional[dict]],
+    evento_existente: Optional[dict],
+    ocupacao: Optional[dict],
+    event_id: str,
+    profissional: str,
+    hora_inicio: str,
+    hora_fim: str,
+    excluir_evento_id: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Decide a reserva a partir do que foi lido DENTRO da transação.
+
+    Args:
+        locks: {lock_key: doc do lock ou None}
+        evento_existente: doc do evento (idempotência) ou None
+        ocupacao: doc de ocupação do profissional no dia ou None
+        event_id / excluir_evento_id: eventos que não contam como conflito
+
+    Returns:
+        {"ok": bool, "duplicado": bool, "motivo": str, "tipo_erro": str}
+
+    Lock de um evento que não está mais no índice de ocupação (cancelado ou
+    deletado) é tratado como liberado — só vale quando o índice está completo.
+    """
+    if evento_existente:
+        return {"ok": True, "duplicado": True, "motivo": "Evento já existe (idempotente)"}
+
+    vigentes = None
+    if ocupacao and ocupacao.get("completo"):
+        vigentes = ocupacao.get("intervalos") or {}
+
+    proprios = {chave_intervalo(e) for e in (event_id, excluir_evento_id) if e}
+
+    for lock_key, lock_existente in locks.items():
+        if not lock_existente:
+            continue
+
+        # 🔍 PATCH RO-04: lock expirado não bloqueia
+        if lock_esta_expirado(lock_existente.get("timestamp_lock")):
+            logger.warning(f"Lock expirado, ignorando: {lock_key}")
+            continue
+
+        evento_do_lock = lock_existente.get("evento_id")
+        if not evento_do_lock:
+            # Lock ativo sem evento = erro técnico controlado
+            logger.warning(f"Lock órfão ativo encontrado: {lock_key}")
+            return {
+                "ok": False,
+                "motivo": f"Lock técnico em {profissional} {hora_inicio}-{hora_fim}",
+                "tipo_erro": "lock_orfo_ativo"
+            }
+
+        if chave_intervalo(evento_do_lock) in proprios:
+            continue
+
+        if vigentes is not None and chave_intervalo(evento_do_lock) not in vigentes:
+            logger.info(f"Lock de evento liberado (fora da ocupação), reaproveitando: {lock_key}")
+            continue
+
+        # Lock válido com evento: slot realmente ocupado
+        logger.warning(f"Bucket já ocupado: {lock_key}")
+        return {
+            "ok": False,
+            "motivo": f"Slot ocupado: {profissional} {hora_inicio}-{hora_fim}",
+            "tipo_erro": "lock_existente"
+        }
+
+    # DEFESA EM PROFUNDIDADE: sobreposição com o índice de ocupação do dia
+    for eid, item in (vigentes or {}).items():
+        if eid in proprios or not isinstance(item, dict):
+            continue
+        if hora_inicio < item.get("hora_fim", "") and hora_fim > item.get("hora_inicio", ""):
+            logger.warning(
+                f"Conflito detectado: {profissional} {hora_inicio}-{hora_fim} "
+                f"conflita com {item.get('hora_inicio')}-{item.get('hora_fim')}"
+            )
+            return {
+                "ok": False,
+                "motivo": f"Profissional {profissional} já tem evento nesse horário",
+                "tipo_erro": "conflito"
+            }
+
+    return {"ok": True, "duplicado": False, "motivo": "Evento criado com sucesso"}
+
+
+@async_transactional
+async def _reservar_em_transacao(
+    transaction,
+    dono_id: str,
+    evento: dict,
+    event_id: str,
+    lock_paths: Dict[str, str],
+    lock_base: dict,
+    excluir_evento_id: Optional[str],
+) -> Dict[str, Any]:
+    """
+    Uma transação: 1 leitura em lote (locks + evento + ocupação) e 1 commit
+    com todos os locks já confirmados, o evento e o intervalo no índice.
+    O Firestore reexecuta a função se outra transação tocar nesses docs.
+    """
+    profissional = evento["profissional"]
+    evento_path = f"Clientes/{dono_id}/Eventos/{event_id}"
+    ocup_path = ocupacao_path(dono_id, evento["data"], profissional)
+
+    refs = {path: get_ref_from_path(path) for path in [*lock_paths.values(), evento_path, ocup_path]}
+
+    lidos = {}
+    # client.get_all(transaction=...) e não transaction.get_all: no SDK 2.20 este
+    # faz `await` no async generator do client e levanta TypeError
+    async for snap in client.get_all(list(refs.values()), transaction=transaction):
+        lidos[snap.reference.path] = snap.to_dict() if snap.exists else None
+
+    decisao = avaliar_reserva(
+        locks={key: lidos.get(path) for key, path in lock_paths.items()},
+        evento_existente=lidos.get(evento_path),
+        ocupacao=lidos.get(ocup_path),
+        event_id=event_id,
+        profissional=profissional,
+        hora_inicio=evento["hora_inicio"],
+        hora_fim=evento["hora_fim"],
+        excluir_evento_id=excluir_evento_id,
+    )
+
+    if not decisao.get("ok") or decisao.get("duplicado"):
+        return decisao
+
+    for key, path in lock_paths.items():
+        transaction.set(refs[path], {**lock_base, "bucket": key.rsplit("_", 1)[-1]})
+
+    transaction.set(refs[evento_path], evento)
+
+    item = montar_intervalo(evento)
+    if item:
+        transaction.set(refs[ocup_path], {
+            "data": evento["data"],
+            "profissional": normalizar_profissional(profissional),
+            "intervalos": {chave_intervalo(event_id): item},
+            "atualizado_em": lock_base["timestamp_confirmacao"],
+        }, merge=True)
+
+    return decisao
+
+
 async def criar_evento_com_lock(
     dono_id: str,
     evento: dict,
@@ -229,13 +323,15 @@ async def criar_evento_com_lock(
     """
     Cria evento com proteção contra race condition e sobreposição parcial.
 
-    Implementação com buckets:
+    Implementação com buckets, numa única transação Firestore:
     1. Gera buckets de tempo para o intervalo do evento
-    2. Tenta criar locks para cada bucket (protege sobreposição)
-    3. Se qualquer bucket já existe, falha
-    4. Dentro dos locks, reconsulta conflito (defesa em profundidade)
-    5. Se conflito, rejeita
-    6. Se OK, salva evento
+    2. Garante o índice de ocupação do dia (1 leitura; reconstrói se faltar)
+    3. Transação: lê em lote todos os locks + evento + ocupação
+    4. Se algum bucket está ocupado, ou há sobreposição no índice, rejeita
+    5. Se OK, no MESMO commit: locks confirmados + evento + índice
+
+    ~4 RPCs por agendamento, independente da duração do serviço
+    (antes: 2 por bucket + varredura de Eventos + 1 por bucket de novo).
 
     Args:
         dono_id: ID do dono/salão
@@ -252,8 +348,6 @@ async def criar_evento_com_lock(
         }
     """
 
-    locks_criados = []  # Para rollback se necessário
-
     try:
         # 1️⃣ VALIDAR PRÉ-REQUISITOS
         if not evento.get("confirmado"):
@@ -266,11 +360,12 @@ async def criar_evento_com_lock(
         profissional = evento.get("profissional", "").strip()
         hora_inicio = normalizar_hora(evento.get("hora_inicio", ""))
         hora_fim = normalizar_hora(evento.get("hora_fim", ""))
+        data = str(evento.get("data") or "").strip()
 
-        if not profissional or not hora_inicio or not hora_fim:
+        if not profissional or not hora_inicio or not hora_fim or not data:
             return {
                 "ok": False,
-                "motivo": "Dados incompletos (profissional, hora_inicio, hora_fim)",
+                "motivo": "Dados incompletos (profissional, data, hora_inicio, hora_fim)",
                 "tipo_erro": "validacao"
             }
 
@@ -284,145 +379,82 @@ async def criar_evento_com_lock(
             }
 
         prof_norm = profissional.lower().replace(" ", "_")
-        data_evento = evento.get("data", "").replace("-", "")[:8]  # YYYYMMDD
+        data_evento = data.replace("-", "")[:8]  # YYYYMMDD
 
-        logger.info(f"Criando {len(buckets)} locks para {prof_norm}: {buckets}")
+        logger.info(f"Reservando {len(buckets)} buckets para {prof_norm}: {buckets}")
 
-        # 🧹 PATCH RO-04: Limpar locks órfãos antes de criar novos
-        removidos = await limpar_locks_orfaos(dono_id)
-        if removidos > 0:
-            logger.info(f"🧹 Removidos {removidos} locks órfãos expirados")
+        # 3️⃣ ÍNDICE DE OCUPAÇÃO DO DIA (fora da transação: pode reconstruir)
+        await buscar_intervalos_ocupados(dono_id, data, profissional)
 
-        # 3️⃣ TENTAR ADQUIRIR LOCKS PARA CADA BUCKET
-        try:
-            for bucket in buckets:
-                lock_key = f"{prof_norm}_{data_evento}_{bucket}"
-                lock_path = f"Clientes/{dono_id}/AgendaLocks/{lock_key}"
-
-                # Verificar se já existe
-                lock_existente = await buscar_dado_em_path(lock_path)
-                if lock_existente:
-                    # 🔍 PATCH RO-04: Verificar se lock está expirado
-                    if lock_esta_expirado(lock_existente.get("timestamp_lock")):
-                        # Lock expirado: ignorar e criar novo
-                        logger.warning(f"Lock expirado, ignorando: {lock_key}")
-                        # Prosseguir para criar novo lock
-                    elif not lock_existente.get("evento_id"):
-                        # Lock ativo sem evento = erro técnico controlado
-                        logger.warning(f"Lock órfão ativo encontrado: {lock_key}")
-                        return {
-                            "ok": False,
-                            "motivo": f"Lock técnico em {profissional} {hora_inicio}-{hora_fim}",
-                            "tipo_erro": "lock_orfo_ativo"
-                        }
-                    else:
-                        # Lock válido com evento: slot realmente ocupado
-                        logger.warning(f"Bucket já ocupado: {lock_key}")
-                        return {
-                            "ok": False,
-                            "motivo": f"Slot ocupado: {profissional} {hora_inicio}-{hora_fim}",
-                            "tipo_erro": "lock_existente"
-                        }
-
-                # Criar lock para este bucket
-                lock_doc = {
-                    "bucket": bucket,
-                    "profissional": profissional,
-                    "timestamp_lock": datetime.now().isoformat(),
-                    "expira_em": (datetime.now() + timedelta(hours=24)).isoformat(),
-                    "status": "reservado",
-                    "evento_id": None  # Será preenchido quando evento for criado
-                }
-
-                await salvar_dado_em_path(lock_path, lock_doc)
-                locks_criados.append(lock_path)
-                logger.info(f"Lock adquirido: {lock_key}")
-
-        except Exception as lock_error:
-            logger.error(f"Erro ao adquirir locks: {lock_error}")
-            return {
-                "ok": False,
-                "motivo": f"Erro ao adquirir locks: {str(lock_error)}",
-                "tipo_erro": "erro"
-            }
+        agora = datetime.now()
+        lock_paths = {
+            f"{prof_norm}_{data_evento}_{bucket}": f"Clientes/{dono_id}/AgendaLocks/{prof_norm}_{data_evento}_{bucket}"
+            for bucket in buckets
+        }
+        lock_base = {
+            "profissional": profissional,
+            "data": data,
+            "timestamp_lock": agora.isoformat(),
+            "expira_em": (agora + timedelta(hours=24)).isoformat(),
+            "status": "confirmado",
+            "evento_id": event_id,
+            "timestamp_confirmacao": agora.isoformat(),
+        }
+
+        evento_final = {
+            **evento,
+            "hora_inicio": hora_inicio,
+            "hora_fim": hora_fim,
+            "data": data,
+            "criado_em": agora.isoformat(),
+        }
 
-        # 4️⃣ DENTRO DOS LOCKS: RECONSULTAR CONFLITO (DEFESA EM PROFUNDIDADE)
+        # 4️⃣ + 5️⃣ TRANSAÇÃO: reivindicar buckets, gravar evento e índice
         try:
-            conflita = await tem_conflito_real(
+            decisao = await _reservar_em_transacao(
+                client.transaction(),
                 dono_id,
-                profissional,
-                hora_inicio,
-                hora_fim,
-                excluir_evento_id
+                evento_final,
+                event_id,
+                lock_paths,
+                lock_base,
+                excluir_evento_id,
             )
-
-            if conflita:
-                logger.warning(f"Conflito detectado: {profissional} {hora_inicio}-{hora_fim}")
-                return {
-                    "ok": False,
-                    "motivo": f"Profissional {profissional} já tem evento nesse horário",
-                    "tipo_erro": "conflito"
-                }
-
-        except Exception as check_error:
-            logger.error(f"Erro ao verificar conflito: {check_error}")
+        except Exception as tx_error:
+            logger.error(f"Erro na transação de reserva: {tx_error}")
             return {
                 "ok": False,
-                "motivo": f"Erro ao validar: {str(check_error)}",
+                "motivo": f"Erro ao adquirir locks: {str(tx_error)}",
                 "tipo_erro": "erro"
             }
 
-        # 5️⃣ SEM CONFLITO: SALVAR EVENTO
-        try:
-            evento["criado_em"] = datetime.now().isoformat()
-            evento_path = f"Clientes/{dono_id}/Eventos/{event_id}"
-
-            # Verificar idempotência
-            evento_existente = await buscar_dado_em_path(evento_path)
-            if evento_existente:
-                logger.warning(f"Evento já existe (idempotente): {event_id}")
-                # Marcar locks como confirmados
-                for lock_path in locks_criados:
-                    lock_doc = {
-                        "status": "confirmado_idempotente",
-                        "evento_id": event_id,
-                        "timestamp_confirmacao": datetime.now().isoformat()
-                    }
-                    await atualizar_dado_em_path(lock_path, lock_doc)
-
-                return {
-                    "ok": True,
-                    "evento_id": event_id,
-                    "duplicado": True,
-                    "motivo": "Evento já existe (idempotente)"
-                }
-
-            # Criar evento
-            await salvar_dado_em_path(evento_path, evento)
-            logger.info(f"Evento criado: {event_id}")
-
-            # 6️⃣ MARCAR LOCKS COMO CONFIRMADOS
-            for lock_path in locks_criados:
-                lock_doc = {
-                    "status": "confirmado",
-                    "evento_id": event_id,
-                    "timestamp_confirmacao": datetime.now().isoformat()
-                }
-                await atualizar_dado_em_path(lock_path, lock_doc)
+        if not decisao.get("ok"):
+            return decisao
 
+        if decisao.get("duplicado"):
+            logger.warning(f"Evento já existe (idempotente): {event_id}")
             return {
                 "ok": True,
                 "evento_id": event_id,
-                "motivo": "Evento criado com sucesso"
+                "duplicado": True,
+                "motivo": decisao.get("motivo")
             }
 
-        except Exception as save_error:
-            logger.error(f"Erro ao salvar evento: {save_error}")
-            return {
-                "ok": False,
-                "motivo": f"Erro ao salvar evento: {str(save_error)}",
-                "tipo_erro": "erro"
-            }
+        # commit feito: leituras coalescidas do update (locks, evento, ocupação) ficam velhas
+        for path in [
+            *lock_paths.values(),
+            f"Clientes/{dono_id}/Eventos/{event_id}",
+            ocupacao_path(dono_id, data, profissional),
+        ]:
+            notificar_escrita(path)
+
+        evento.update(evento_final)
+        logger.info(f"Evento criado: {event_id} ({len(lock_paths)} locks confirmados)")
+        return {
+            "ok": True,
+            "evento_id": event_id,
+            "motivo": "Evento criado com sucesso"
+        }
 
     except Exception as e:
         logger.error(f"Erro geral em criar_evento_com_lock: {e}")
@@ -433,52 +465,31 @@ async def criar_evento_com_lock(
         }
 
 
-async def limpar_locks_expirados(dono_id: str, horas_expiracao: int = 24) -> int:
+async def limpar_locks_expirados(dono_id: Optional[str] = None, agora: Optional[datetime] = None) -> int:
     """
-    Limpa locks expirados (status=rejeitado ou erro_validacao, etc).
+    Remove locks vencidos (expira_em no passado) com range query + delete em lote.
 
-    Útil para manutenção, evita acumular locks antigos.
+    Executado pela varredura periódica do scheduler — NÃO no caminho de
+    criação de evento. Lock vencido já não bloqueia reserva
+    (lock_esta_expirado), então a remoção é só manutenção.
 
     Args:
-        dono_id: ID do dono
-        horas_expiracao: Locks mais antigos que isso são removidos
+        dono_id: Se fornecido, limpa apenas Clientes/{dono_id}/AgendaLocks.
+                 Sem dono_id, limpa todos os tenants (collection group).
+        agora: Referência de tempo (padrão: agora)
 
     Returns:
         Quantidade de locks removidos
     """
 
+    agora_iso = (agora or datetime.now()).isoformat()
+    filtros = [("expira_em", "<", agora_iso)]
+
     try:
-        locks = await buscar_subcolecao(f"Clientes/{dono_id}/AgendaLocks") or []
-
-        limite_tempo = datetime.now().timestamp() - (horas_expiracao * 3600)
-        removidos = 0
-
-        for lock_item in locks:
-            # Parse lock
-            if isinstance(lock_item, dict):
-                lock_data = lock_item.get("data", lock_item)
-            else:
-                continue
-
-            # Verificar status e timestamp
-            status = lock_data.get("status", "")
-            if status not in ["rejeitado", "erro_validacao", "erro_save"]:
-                continue
-
-            timestamp_str = lock_data.get("timestamp_lock", "")
-            if not timestamp_str:
-                continue
-
-            try:
-                timestamp = datetime.fromisoformat(timestamp_str).timestamp()
-                if timestamp < limite_tempo:
-                    slot_key = lock_data.get("slot_key")
-                    lock_path = f"Clientes/{dono_id}/AgendaLocks/{slot_key}"
-                    # Implementar delete se houver função
-                    # await deletar_dado_em_path(lock_path)
-                    removidos += 1
-            except:
-                pass
+        if dono_id:
+            removidos = await deletar_por_query(f"Clientes/{dono_id}/AgendaLocks", filtros)
+        else:
+            removidos = await deletar_por_query("AgendaLocks", filtros, grupo=True)
 
         logger.info(f"Locks expirados removidos: {removidos}")
         return removidos
@@ -7,6 +7,13 @@ from typing import Any
 from services.event_service_async import verificar_conflito_e_sugestoes_profissional, _parse_event_interval
 
 from services.firebase_service_async import buscar_dado_em_path, atualizar_dado_em_path, salvar_dado_em_path, buscar_subcolecao
+from services.config_agenda_service import (
+    ConfigAgenda,
+    obter_config_agenda_tenant,
+    obter_excecoes_profissional,
+    invalidar_config_agenda,
+    invalidar_excecoes_profissional,
+)
 
 def _normalizar_data_iso(data_iso: str) -> str:
     """
@@ -93,23 +100,11 @@ def intervalo_dentro_do_expediente(
 
 async def obter_config_agenda(user_id: str) -> dict[str, Any]:
     """
-    Busca configuração de agenda do tenant no caminho real do Firestore:
-    Clientes/{user_id}/configuracao/agenda_funcionamento
+    Configuração de agenda do tenant (Clientes/{user_id}/configuracao/agenda_funcionamento),
+    via cache por tenant (config_agenda_service).
     """
-    path = f"Clientes/{user_id}/configuracao/agenda_funcionamento"
-    doc = await buscar_dado_em_path(path) or {}
-
-    agenda_padrao = doc.get("agenda_padrao") or {}
-    excecoes_data = doc.get("excecoes_data") or {}
-
-    print("🧪 CONFIG RAW:", doc, flush=True)
-    print("🧪 CONFIG agenda_padrao:", agenda_padrao, flush=True)
-    print("🧪 CONFIG excecoes_data:", excecoes_data, flush=True)
-
-    return {
-        "agenda_padrao": agenda_padrao,
-        "excecoes_data": excecoes_data,
-    }
+    config = await obter_config_agenda_tenant(user_id)
+    return config.como_dict()
 
 async def obter_regra_agenda_da_data(user_id: str, data_iso: str) -> dict[str, Any]:
     """
@@ -208,78 +203,42 @@ async def validar_data_funcionamento(user_id: str, data_iso: str) -> dict[str, A
     }
 
 
-async def obter_janela_funcionamento(
-    user_id: str,
-    data_str: str,
-    profissional: str | None = None
-) -> dict[str, Any]:
-    """
-    Retorna a janela real de funcionamento considerando:
+def _janela_fechada(origem, tipo=None, motivo=None) -> dict[str, Any]:
+    return {
+        "aberto": False,
+        "inicio": None,
+        "fim": None,
+        "origem": origem,
+        "tipo": tipo,
+        "motivo": motivo
+    }
 
-    1) agenda do salão
-    2) exceções do salão
-    3) agenda do profissional (se existir)
-    4) exceções do profissional (se existir)
-    5) fallback automático do profissional para o salão
 
-    Regras:
-    - Se o salão estiver fechado, nada abaixo importa.
-    - Se houver exceção do salão para a data, ela tem prioridade sobre o padrão do salão.
-    - Se houver profissional e ele tiver agenda própria, ela é aplicada.
-    - Se o profissional não tiver agenda própria, herda do salão.
-    - Se houver exceção do profissional para a data, ela tem prioridade sobre a agenda base dele.
+def regra_salao_na_data(cfg_salao: dict, data_str: str) -> dict[str, Any]:
     """
+    Regra do salão para a data: exceção da data tem prioridade sobre o
+    padrão semanal (chave str(weekday()), segunda=0).
+    """
+    if isinstance(cfg_salao, ConfigAgenda):
+        return cfg_salao.regra_na_data(data_str)
 
-    from datetime import datetime
-    from services.firebase_service_async import buscar_dado_em_path, buscar_subcolecao
-
-    # =========================================================
-    # 1) LER AGENDA DO SALÃO
-    # =========================================================
-    path_salao = f"Clientes/{user_id}/configuracao/agenda_funcionamento"
-    cfg_salao = await buscar_dado_em_path(path_salao) or {}
-
+    cfg_salao = cfg_salao or {}
     agenda_padrao_salao = cfg_salao.get("agenda_padrao") or {}
     excecoes_salao = cfg_salao.get("excecoes_data") or {}
 
-    print(f"🧪 [JANELA] cfg_salao keys={list(cfg_salao.keys())}", flush=True)
-    print(f"🧪 [JANELA] agenda_padrao_salao={agenda_padrao_salao}", flush=True)
-    print(f"🧪 [JANELA] excecoes_salao={excecoes_salao}", flush=True)
-
-    # =========================================================
-    # 2) DESCOBRIR DIA DA SEMANA DA DATA
-    # =========================================================
-    # Python weekday(): segunda=0 ... domingo=6
-    # Seu Firebase aparentemente usa:
-    # 0..5 abertos e 6 fechado
-    # Então precisamos respeitar como seu sistema já opera hoje.
-    # Se sua agenda atual já funciona, manteremos a mesma convenção abaixo.
-    dt = datetime.fromisoformat(data_str)
-    weekday_str = str(dt.weekday())
-
-    # =========================================================
-    # 3) MONTAR REGRA BASE DO SALÃO
-    # =========================================================
+    weekday_str = str(datetime.fromisoformat(data_str).weekday())
     reg_salao = agenda_padrao_salao.get(weekday_str) or {}
 
-    aberto_salao = reg_salao.get("aberto", False)
-    inicio_salao = reg_salao.get("inicio")
-    fim_salao = reg_salao.get("fim")
-
-    regra_salao_final = {
-        "aberto": aberto_salao,
-        "inicio": inicio_salao,
-        "fim": fim_salao,
+    regra = {
+        "aberto": reg_salao.get("aberto", False),
+        "inicio": reg_salao.get("inicio"),
+        "fim": reg_salao.get("fim"),
         "origem": "agenda_padrao_salao"
     }
 
-    # =========================================================
-    # 4) EXCEÇÃO DO SALÃO TEM PRIORIDADE SOBRE O PADRÃO
-    # =========================================================
     if data_str in excecoes_salao:
         exc_salao = excecoes_salao.get(data_str) or {}
-
-        regra_salao_final = {
+        regra = {
             "aberto": exc_salao.get("aberto", False),
             "inicio": exc_salao.get("inicio"),
             "fim": exc_salao.get("fim"),
@@ -288,95 +247,36 @@ async def obter_janela_funcionamento(
             "motivo": exc_salao.get("motivo")
         }
 
-    print(f"🧪 [JANELA] regra_salao_final={regra_salao_final}", flush=True)
-
-    # =========================================================
-    # 5) SE O SALÃO ESTIVER FECHADO, PARA TUDO
-    # =========================================================
-    if not regra_salao_final.get("aberto"):
-        return {
-            "aberto": False,
-            "inicio": None,
-            "fim": None,
-            "origem": regra_salao_final.get("origem"),
-            "tipo": regra_salao_final.get("tipo"),
-            "motivo": regra_salao_final.get("motivo")
-        }
-
-    # =========================================================
-    # 6) SE NÃO HOUVER PROFISSIONAL, RETORNA REGRA DO SALÃO
-    # =========================================================
-    if not profissional:
-        return {
-            "aberto": True,
-            "inicio": regra_salao_final.get("inicio"),
-            "fim": regra_salao_final.get("fim"),
-            "origem": regra_salao_final.get("origem"),
-            "tipo": regra_salao_final.get("tipo"),
-            "motivo": regra_salao_final.get("motivo")
-        }
+    return regra
 
-    # =========================================================
-    # 7) LER PROFISSIONAIS
-    # =========================================================
-    profissionais = await buscar_subcolecao(f"Clientes/{user_id}/Profissionais") or {}
-
-    # tenta chave direta
-    dados_prof = profissionais.get(profissional)
-
-    # fallback case-insensitive
-    if not dados_prof:
-        prof_norm = (profissional or "").strip().lower()
-        for nome_prof, dados in profissionais.items():
-            if (nome_prof or "").strip().lower() == prof_norm:
-                dados_prof = dados
-                break
-
-    # se não encontrou profissional, não assume disponibilidade
-    if not dados_prof:
-        print(f"⚠️ [JANELA] profissional '{profissional}' não encontrado.", flush=True)
-        return {
-            "aberto": False,
-            "inicio": None,
-            "fim": None,
-            "origem": "profissional_nao_encontrado",
-            "tipo": "cadastro_invalido",
-            "motivo": "profissional_nao_encontrado"
-        }
 
-    # =========================================================
-    # 8) AGENDA DO PROFISSIONAL
-    # =========================================================
-    agenda_prof = dados_prof.get("agenda_funcionamento") or {}
+def janela_profissional_na_data(
+    regra_salao: dict,
+    data_str: str,
+    dados_prof: dict,
+    excecoes_prof: dict | None = None
+) -> dict[str, Any]:
+    """
+    Janela final do profissional com o salão aberto: agenda própria (ou a do
+    salão, se não tiver), exceção da data por cima e interseção com o salão.
+    """
+    weekday_str = str(datetime.fromisoformat(data_str).weekday())
+    agenda_prof = (dados_prof or {}).get("agenda_funcionamento") or {}
     agenda_padrao_prof = agenda_prof.get("agenda_padrao") or {}
+    excecoes_prof = excecoes_prof or {}
 
-    excecoes_prof = await buscar_subcolecao(
-        f"Clientes/{user_id}/Profissionais/{profissional}/AgendaExcecoes"
-    ) or {}
-
-    print(f"🧪 [JANELA] profissional={profissional}", flush=True)
-    print(f"🧪 [JANELA] agenda_padrao_prof={agenda_padrao_prof}", flush=True)
-    print(f"🧪 [JANELA] excecoes_prof={excecoes_prof}", flush=True)
-
-    # =========================================================
-    # PROFISSIONAL SEM AGENDA PRÓPRIA → herda salão
-    # MAS ainda precisa respeitar exceções_prof
-    # =========================================================
+    # PROFISSIONAL SEM AGENDA PRÓPRIA → herda salão (mas respeita exceções_prof)
     if not agenda_padrao_prof:
-
         regra_prof_final = {
-            "aberto": regra_salao_final.get("aberto", False),
-            "inicio": regra_salao_final.get("inicio"),
-            "fim": regra_salao_final.get("fim"),
+            "aberto": regra_salao.get("aberto", False),
+            "inicio": regra_salao.get("inicio"),
+            "fim": regra_salao.get("fim"),
             "origem": "fallback_salao_sem_agenda_profissional",
-            "tipo": regra_salao_final.get("tipo"),
-            "motivo": regra_salao_final.get("motivo")
+            "tipo": regra_salao.get("tipo"),
+            "motivo": regra_salao.get("motivo")
         }
-
     else:
-
         reg_prof = agenda_padrao_prof.get(weekday_str) or {}
-
         regra_prof_final = {
             "aberto": reg_prof.get("aberto", False),
             "inicio": reg_prof.get("inicio"),
@@ -386,75 +286,39 @@ async def obter_janela_funcionamento(
             "motivo": reg_prof.get("motivo")
         }
 
-    # =========================================================
-    # 9) EXCEÇÃO DO PROFISSIONAL SOBRESCREVE A BASE DELE
-    # =========================================================
+    # EXCEÇÃO DO PROFISSIONAL SOBRESCREVE A BASE DELE
     if data_str in excecoes_prof:
         exc_prof = excecoes_prof.get(data_str) or {}
 
         if exc_prof.get("tipo") == "bloqueado" and exc_prof.get("ativo") is True:
-            return {
-                "aberto": False,
-                "inicio": None,
-                "fim": None,
-                "origem": "excecao_profissional",
-                "tipo": exc_prof.get("tipo"),
-                "motivo": exc_prof.get("motivo"),
-            }
-        else:
-            regra_prof_final = {
-                "aberto": exc_prof.get("aberto", True),
-                "inicio": exc_prof.get("inicio"),
-                "fim": exc_prof.get("fim"),
-                "origem": "excecao_profissional",
-                "tipo": exc_prof.get("tipo"),
-                "motivo": exc_prof.get("motivo"),
-            }
+            return _janela_fechada("excecao_profissional", exc_prof.get("tipo"), exc_prof.get("motivo"))
 
-    print(f"🧪 [JANELA] regra_prof_final={regra_prof_final}", flush=True)
+        regra_prof_final = {
+            "aberto": exc_prof.get("aberto", True),
+            "inicio": exc_prof.get("inicio"),
+            "fim": exc_prof.get("fim"),
+            "origem": "excecao_profissional",
+            "tipo": exc_prof.get("tipo"),
+            "motivo": exc_prof.get("motivo"),
+        }
 
-    # =========================================================
-    # 10) PROFISSIONAL FECHADO
-    # =========================================================
     if not regra_prof_final.get("aberto"):
-        return {
-            "aberto": False,
-            "inicio": None,
-            "fim": None,
-            "origem": regra_prof_final.get("origem"),
-            "tipo": regra_prof_final.get("tipo"),
-            "motivo": regra_prof_final.get("motivo")
-        }
+        return _janela_fechada(
+            regra_prof_final.get("origem"), regra_prof_final.get("tipo"), regra_prof_final.get("motivo")
+        )
 
-    # =========================================================
-    # 11) INTERSEÇÃO SALÃO x PROFISSIONAL
-    # O horário real deve caber nos dois.
-    # =========================================================
-    inicio_salao = regra_salao_final.get("inicio")
-    fim_salao = regra_salao_final.get("fim")
+    # INTERSEÇÃO SALÃO x PROFISSIONAL — o horário real deve caber nos dois.
+    inicio_salao = regra_salao.get("inicio")
+    fim_salao = regra_salao.get("fim")
     inicio_prof = regra_prof_final.get("inicio")
     fim_prof = regra_prof_final.get("fim")
 
     # 🔒 protege contra agenda inválida/incompleta
     if not inicio_salao or not fim_salao:
-        return {
-            "aberto": False,
-            "inicio": None,
-            "fim": None,
-            "origem": "agenda_salao_invalida",
-            "tipo": "sem_janela_valida",
-            "motivo": "agenda_salao_incompleta"
-        }
+        return _janela_fechada("agenda_salao_invalida", "sem_janela_valida", "agenda_salao_incompleta")
 
     if not inicio_prof or not fim_prof:
-        return {
-            "aberto": False,
-            "inicio": None,
-            "fim": None,
-            "origem": "agenda_profissional_invalida",
-            "tipo": "sem_janela_valida",
-            "motivo": "agenda_profissional_incompleta"
-        }
+        return _janela_fechada("agenda_profissional_invalida", "sem_janela_valida", "agenda_profissional_incompleta")
 
     ini_salao_min = _hora_para_minutos(inicio_salao)
     fim_salao_min = _hora_para_minutos(fim_salao)
@@ -462,28 +326,14 @@ async def obter_janela_funcionamento(
     fim_prof_min = _hora_para_minutos(fim_prof)
 
     if None in (ini_salao_min, fim_salao_min, ini_prof_min, fim_prof_min):
-        return {
-            "aberto": False,
-            "inicio": None,
-            "fim": None,
-            "origem": "horario_invalido",
-            "tipo": "sem_janela_valida",
-            "motivo": "erro_conversao_horario"
-        }
+        return _janela_fechada("horario_invalido", "sem_janela_valida", "erro_conversao_horario")
 
     inicio_final_min = max(ini_salao_min, ini_prof_min)
     fim_final_min = min(fim_salao_min, fim_prof_min)
 
     # se a interseção ficar inválida, trata como fechado
     if inicio_final_min >= fim_final_min:
-        return {
-            "aberto": False,
-            "inicio": None,
-            "fim": None,
-            "origem": "intersecao_salao_profissional_vazia",
-            "tipo": "sem_janela_valida",
-            "motivo": "sem_sobreposicao"
-        }
+        return _janela_fechada("intersecao_salao_profissional_vazia", "sem_janela_valida", "sem_sobreposicao")
 
     return {
         "aberto": True,
@@ -494,6 +344,199 @@ async def obter_janela_funcionamento(
         "motivo": None
     }
 
+
+async def obter_janela_funcionamento(
+    user_id: str,
+    data_str: str,
+    profissional: str | None = None
+) -> dict[str, Any]:
+    """
+    Retorna a janela real de funcionamento considerando:
+
+    1) agenda do salão
+    2) exceções do salão
+    3) agenda do profissional (se existir)
+    4) exceções do profissional (se existir)
+    5) fallback automático do profissional para o salão
+
+    Regras:
+    - Se o salão estiver fechado, nada abaixo importa.
+    - Se houver exceção do salão para a data, ela tem prioridade sobre o padrão do salão.
+    - Se houver profissional e ele tiver agenda própria, ela é aplicada.
+    - Se o profissional não tiver agenda própria, herda do salão.
+    - Se houver exceção do profissional para a data, ela tem prioridade sobre a agenda base dele.
+
+    Config do salão e exceções dos profissionais vêm dos caches por tenant
+    (config_agenda_service); as regras puras ficam em janela_na_data.
+    """
+
+    config = await carregar_config_agenda(user_id, [profissional] if profissional else [])
+    janela = janela_na_data(config, data_str, profissional)
+    print(f"🧪 [JANELA] data={data_str} profissional={profissional} janela={janela}", flush=True)
+    return janela
+
+
+# =========================================================
+# 📅 VÁRIOS DIAS: config lida uma vez, janelas calculadas em memória
+# =========================================================
+def _doc_id_profissional(profissionais: dict, profissional: str) -> str | None:
+    """doc_id do profissional: chave exata, chave case-insensitive ou campo nome."""
+    from unidecode import unidecode
+
+    def _norm(txt) -> str:
+        return unidecode(str(txt or "").strip().lower())
+
+    if profissional in profissionais:
+        return profissional
+    alvo = _norm(profissional)
+    for doc_id in profissionais:
+        if _norm(doc_id) == alvo:
+            return doc_id
+    for doc_id, dados in profissionais.items():
+        if isinstance(dados, dict) and _norm(dados.get("nome")) == alvo:
+            return doc_id
+    return None
+
+
+async def carregar_config_agenda(user_id: str, profissionais: list | None = None) -> dict[str, Any]:
+    """
+    Tudo que as janelas de funcionamento precisam: ConfigAgenda do salão,
+    cadastro dos profissionais (catálogo) e as AgendaExcecoes de cada
+    profissional pedido — todos de cache por tenant.
+
+    profissionais=None carrega todos do catálogo.
+
+    Retorno (para janela_na_data):
+    {
+      "cfg_salao": ConfigAgenda,
+      "profissionais": {doc_id: dados},
+      "doc_ids": {nome_pedido: doc_id | None},
+      "excecoes": {doc_id: {data: excecao}},
+    }
+    """
+    import asyncio
+    from services.catalogo_service import obter_catalogo
+
+    cfg_salao, catalogo = await asyncio.gather(
+        obter_config_agenda_tenant(user_id),
+        obter_catalogo(user_id),
+    )
+    docs = catalogo.como_dict()
+    pedidos = [p for p in (profissionais if profissionais is not None else catalogo.nomes) if p]
+
+    doc_ids = {p: _doc_id_profissional(docs, p) for p in pedidos}
+    alvos = sorted({d for d in doc_ids.values() if d})
+    excecoes = await asyncio.gather(*[obter_excecoes_profissional(user_id, doc_id) for doc_id in alvos])
+
+    return {
+        "cfg_salao": cfg_salao,
+        "profissionais": docs,
+        "doc_ids": doc_ids,
+        "excecoes": {doc_id: exc or {} for doc_id, exc in zip(alvos, excecoes)},
+    }
+
+
+def janela_na_data(config: dict, data_str: str, profissional: str | None = None) -> dict[str, Any]:
+    """Mesmo resultado de obter_janela_funcionamento, sem I/O (config de carregar_config_agenda)."""
+    regra_salao = regra_salao_na_data(config.get("cfg_salao"), data_str)
+
+    if not regra_salao.get("aberto"):
+        return _janela_fechada(regra_salao.get("origem"), regra_salao.get("tipo"), regra_salao.get("motivo"))
+
+    if not profissional:
+        return {
+            "aberto": True,
+            "inicio": regra_salao.get("inicio"),
+            "fim": regra_salao.get("fim"),
+            "origem": regra_salao.get("origem"),
+            "tipo": regra_salao.get("tipo"),
+            "motivo": regra_salao.get("motivo")
+        }
+
+    doc_id = (config.get("doc_ids") or {}).get(profissional)
+    if doc_id is None:
+        doc_id = _doc_id_profissional(config.get("profissionais") or {}, profissional)
+    if doc_id is None:
+        return _janela_fechada("profissional_nao_encontrado", "cadastro_invalido", "profissional_nao_encontrado")
+
+    return janela_profissional_na_data(
+        regra_salao,
+        data_str,
+        config["profissionais"][doc_id],
+        (config.get("excecoes") or {}).get(doc_id) or {},
+    )
+
+
+def datas_do_intervalo(data_inicio: str, data_fim: str | None = None, dias: int | None = None) -> list[str]:
+    """Datas ISO de data_inicio até data_fim (inclusive) ou `dias` datas a partir do início."""
+    base = _to_date(_normalizar_data_iso(data_inicio))
+    if dias is None:
+        fim = _to_date(_normalizar_data_iso(data_fim or data_inicio))
+        dias = (fim - base).days + 1
+    return [(base + timedelta(days=i)).strftime("%Y-%m-%d") for i in range(max(dias, 0))]
+
+
+async def obter_janelas_intervalo(
+    user_id: str,
+    data_inicio: str,
+    data_fim: str | None = None,
+    profissional: str | None = None,
+    dias: int | None = None,
+    config: dict | None = None
+) -> dict[str, dict[str, Any]]:
+    """
+    Janelas de funcionamento de um intervalo de datas: {data: janela}.
+    Uma leitura da configuração para o intervalo inteiro (não uma por dia).
+    """
+    if config is None:
+        config = await carregar_config_agenda(user_id, [profissional] if profissional else [])
+    return {
+        data_str: janela_na_data(config, data_str, profissional)
+        for data_str in datas_do_intervalo(data_inicio, data_fim, dias)
+    }
+
+
+async def obter_disponibilidade_intervalo(
+    user_id: str,
+    data_inicio: str,
+    data_fim: str | None = None,
+    profissional: str | None = None,
+    duracao_min: int | None = None,
+    grade_minutos: int = 10,
+    max_slots: int = 3,
+    dias: int | None = None
+) -> dict[str, dict[str, Any]]:
+    """
+    Janelas do intervalo e, com duracao_min, os primeiros horários livres de
+    cada dia ({data: {**janela, "slots": ["HH:MM", ...]}}).
+    Eventos do intervalo inteiro vêm numa query só (DisponibilidadeEngine).
+    """
+    from services.disponibilidade_engine import DisponibilidadeEngine
+
+    datas = datas_do_intervalo(data_inicio, data_fim, dias)
+    if not datas:
+        return {}
+
+    profissionais = [profissional] if profissional else []
+    config = await carregar_config_agenda(user_id, profissionais)
+    janelas = await obter_janelas_intervalo(user_id, datas[0], datas[-1], profissional, config=config)
+    if not duracao_min:
+        return janelas
+
+    engines = await DisponibilidadeEngine.carregar_intervalo(
+        user_id, datas[0], datas[-1], profissionais, config=config
+    )
+    for data_str, janela in janelas.items():
+        if not janela.get("aberto"):
+            janela["slots"] = []
+            continue
+        janela["slots"] = engines[data_str].primeiros_slots(
+            profissional, duracao_min, grade_minutos, max_slots,
+            ancora=_hora_para_minutos(janela.get("inicio")) or 0
+        )[profissional]
+    return janelas
+
+
 async def validar_horario_funcionamento(
     user_id: str,
     data_iso: str,
@@ -548,23 +591,14 @@ async def proxima_data_permitida(
 ) -> str | None:
     """
     Retorna a próxima data aberta, respeitando exceções e agenda semanal.
+    A configuração é lida uma vez para os `limite_dias` dias.
     """
     try:
-        base = _to_date(data_iso)
-
-        for i in range(1, limite_dias + 1):
-            candidato = base + timedelta(days=i)
-            data_str = candidato.strftime("%Y-%m-%d")
-
-            janela = await obter_janela_funcionamento(
-                user_id=user_id,
-                data_str=data_str,
-                profissional=profissional
-            )
-            if janela.get("aberto"):
-                return data_str
-
-        return None
+        inicio = (_to_date(data_iso) + timedelta(days=1)).strftime("%Y-%m-%d")
+        janelas = await obter_janelas_intervalo(
+            user_id, inicio, profissional=profissional, dias=limite_dias
+        )
+        return next((data_str for data_str, janela in janelas.items() if janela.get("aberto")), None)
 
     except Exception as e:
         print(f"❌ [agenda_service] erro em proxima_data_permitida: {e}", flush=True)
@@ -600,18 +634,10 @@ async def proximo_horario_valido_no_dia(
         if min_ini is None or min_fim is None:
             return None
 
-        atual = min_ini
-        while atual + duracao_min <= min_fim:
-            hh = atual // 60
-            mm = atual % 60
-            hora = f"{hh:02d}:{mm:02d}"
+        from services.disponibilidade_engine import slots_em_livres
 
-            if intervalo_dentro_do_expediente(hora, duracao_min, inicio, fim):
-                return hora
-
-            atual += grade_minutos
-
-        return None
+        inicios = slots_em_livres([(min_ini, min_fim)], duracao_min, grade_minutos, n=1, ancora=min_ini)
+        return _minutos_para_hora(inicios[0]) if inicios else None
 
     except Exception as e:
         print(f"❌ [agenda_service] erro em proximo_horario_valido_no_dia: {e}", flush=True)
@@ -894,6 +920,7 @@ async def bloquear_datas_agenda_salao(
         }
 
     await atualizar_dado_em_path(path, {"excecoes_data": excecoes})
+    invalidar_config_agenda(user_id)
 
     return True
 
@@ -920,6 +947,7 @@ async def definir_janela_especial_agenda_salao(
         }
 
     await atualizar_dado_em_path(path, {"excecoes_data": excecoes})
+    invalidar_config_agenda(user_id)
     return True
 
 async def bloquear_agenda_profissional(
@@ -946,6 +974,7 @@ async def bloquear_agenda_profissional(
             }
             await salvar_dado_em_path(path, payload)
 
+        invalidar_excecoes_profissional(user_id, profissional)
         return True
 
     except Exception as e:
@@ -982,6 +1011,7 @@ async def definir_janela_especial_profissional(
             }
             await salvar_dado_em_path(path, payload)
 
+        invalidar_excecoes_profissional(user_id, profissional)
         return True
 
     except Exception as e:
@@ -0,0 +1,282 @@
+# services/cache_respostas_p1.py
+"""
+Cache de respostas da camada P1 (gerar_resposta_p1 / gerar_resposta_humana_agendamento).
+
+A decisão já vem pronta do principal_router; o GPT só redige. A mesma
+decisão (tipo + slots) volta muitas vezes, então a redação é reaproveitada:
+
+    texto = await responder_com_cache("p1", contexto_decisao, gerar, estilo="casual")
+
+- chave = função + estilo do tenant + modelo roteado + payload normalizado
+  (sem campos de rastreio como "origem"); sha1 do JSON ordenado — trocar o
+  modelo da rota (roteamento_modelos) não serve redação do modelo anterior;
+- até VARIANTES_POR_CHAVE redações por chave, sorteadas no hit para manter
+  a variação natural; enquanto a chave não está cheia, um hit dispara (com
+  probabilidade PROB_NOVA_VARIANTE) uma geração extra em background;
+- estilo_do_tenant(): estilo lido de Clientes/{dono}/configuracao/dados,
+  cacheado por TTL e invalidado nas escritas do documento;
+- memória LRU+TTL por processo; com P1_CACHE_FIRESTORE=1 as variantes
+  também ficam em CacheRespostasP1/{chave} e sobrevivem a restart;
+- cache frio: espera o GPT até P1_ORCAMENTO_MS; estourou, devolve o
+  template determinístico do tipo (a geração continua e aquece a chave);
+  GPT indisponível (erro / circuito aberto no llm_gateway) também cai no template;
+- metricas_cache_respostas(): hits, misses, fallbacks, taxa de hit e
+  tokens economizados (tokens da chamada que gerou a variante servida).
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import random
+import time
+
+from services.firebase_service_async import registrar_ouvinte_escrita
+from utils.cache_ttl import CacheLRUTTL
+
+VARIANTES_POR_CHAVE = int(os.getenv("P1_CACHE_VARIANTES", "3"))
+PROB_NOVA_VARIANTE = float(os.getenv("P1_CACHE_PROB_NOVA_VARIANTE", "0.25"))
+ORCAMENTO_MS = float(os.getenv("P1_ORCAMENTO_MS", "3000"))
+PERSISTIR_FIRESTORE = os.getenv("P1_CACHE_FIRESTORE", "").strip().lower() in ("1", "true", "sim")
+COLECAO_CACHE = "CacheRespostasP1"
+
+# campos de rastreio/depuração: não mudam a redação
+CAMPOS_IGNORADOS = {"origem", "debug", "timestamp", "user_id", "cliente_id"}
+
+cache_respostas_p1 = CacheLRUTTL("respostas_p1", max_itens=5000, ttl_segundos=6 * 3600)
+cache_estilo_tenant = CacheLRUTTL("estilo_tenant", max_itens=2000, ttl_segundos=600, ttl_negativo_segundos=60)
+
+_metricas = {"hits": 0, "misses": 0, "fallbacks": 0, "tokens_economizados": 0, "variantes_geradas": 0}
+_tarefas: set = set()
+
+
+# =========================================================
+# Chave
+# =========================================================
+def _normalizar(valor):
+    if isinstance(valor, str):
+        return " ".join(valor.split())
+    if isinstance(valor, dict):
+        return {str(k): _normalizar(v) for k, v in valor.items() if k not in CAMPOS_IGNORADOS and v not in (None, "", [], {})}
+    if isinstance(valor, (list, tuple)):
+        return [_normalizar(v) for v in valor]
+    return valor
+
+
+def chave_resposta(funcao: str, contexto: dict, estilo: str | None = None, modelo: str | None = None) -> str:
+    payload = {
+        "funcao": funcao,
+        "estilo": (estilo or "").strip().lower(),
+        "modelo": modelo or "",
+        "contexto": _normalizar(contexto or {}),
+    }
+    bruto = json.dumps(payload, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha1(bruto.encode("utf-8")).hexdigest()
+
+
+# =========================================================
+# Estilo do tenant
+# =========================================================
+def path_estilo_tenant(dono_id: str) -> str:
+    return f"Clientes/{dono_id}/configuracao/dados"
+
+
+async def estilo_do_tenant(tenant_id: str | None = None) -> str | None:
+    """
+    Estilo de atendimento do tenant (formal/casual, salvo no cadastro inicial).
+    Sem parâmetro usa o tenant do escopo atual (roteamento_modelos.tenant_llm_atual);
+    None sem tenant, sem configuração ou em erro de leitura.
+    """
+    if not tenant_id:
+        from services.roteamento_modelos import tenant_llm_atual
+        tenant_id = tenant_llm_atual()
+    if not tenant_id:
+        return None
+    tenant_id = str(tenant_id)
+
+    async def _carregar():
+        from services.firebase_service_async import buscar_dado_em_path
+
+        doc = await buscar_dado_em_path(path_estilo_tenant(tenant_id)) or {}
+        return str(doc.get("estilo") or "").strip().lower() or None
+
+    try:
+        return await cache_estilo_tenant.obter(tenant_id, _carregar)
+    except Exception as e:
+        print(f"⚠️ [CACHE_P1] estilo indisponível tenant={tenant_id}: {e}", flush=True)
+        return None
+
+
+def _ao_escrever(path: str) -> None:
+    partes = str(path).strip("/").split("/")
+    if len(partes) == 4 and partes[0] == "Clientes" and partes[2:] == ["configuracao", "dados"]:
+        cache_estilo_tenant.invalidar(partes[1])
+
+
+registrar_ouvinte_escrita(_ao_escrever)
+
+
+# =========================================================
+# Templates determinísticos (cache frio + GPT lento)
+# =========================================================
+def _lista(nomes) -> str:
+    nomes = [str(n) for n in (nomes or []) if n]
+    if len(nomes) <= 1:
+        return "".join(nomes)
+    return ", ".join(nomes[:-1]) + " ou " + nomes[-1]
+
+
+def _quando(ctx: dict) -> str:
+    return ctx.get("data_hora_legivel") or ctx.get("data_hora") or ""
+
+
+def _template_confirmar(ctx: dict) -> str:
+    partes = [p for p in (
+        ctx.get("servico"),
+        f"com {ctx['profissional']}" if ctx.get("profissional") else "",
+        _quando(ctx),
+    ) if p]
+    return f"Posso confirmar {' '.join(partes)}? 😊" if partes else ""
+
+
+def _template_pedir_profissional(ctx: dict) -> str:
+    opcoes = _lista(ctx.get("profissionais_permitidos"))
+    if opcoes:
+        return f"Com qual profissional você prefere: {opcoes}?"
+    return "Com qual profissional você prefere?"
+
+
+TEMPLATES = {
+    "pedir_servico": lambda ctx: "Qual serviço você gostaria de agendar? 😊",
+    "pedir_profissional": _template_pedir_profissional,
+    "pedir_data": lambda ctx: f"Para qual dia você quer agendar{' ' + ctx['servico'] if ctx.get('servico') else ''}?",
+    "pedir_horario": lambda ctx: "Qual horário fica melhor pra você?",
+    "listar_opcoes_profissionais": _template_pedir_profissional,
+    "listar_opcoes_servicos": lambda ctx: (
+        f"Temos {_lista(ctx.get('servicos') or ctx.get('opcoes'))}. Qual você prefere?"
+        if (ctx.get("servicos") or ctx.get("opcoes")) else "Qual serviço você gostaria?"
+    ),
+    "fallback_clareza": lambda ctx: "Não entendi muito bem 😅 Pode me dizer de outro jeito?",
+    "confirmar_agendamento": _template_confirmar,
+    "confirmacao_profissional_escolhido": _template_confirmar,
+    "cancelamento_confirmacao": lambda ctx: "Sem problema, não vou marcar então.",
+    "conflito_agenda": lambda ctx: "Entendi 😊 Qual horário seria melhor pra você?",
+    "opcoes_profissionais_disponiveis": _template_pedir_profissional,
+}
+
+
+def resposta_template(contexto: dict) -> str:
+    """Redação fixa do tipo (vazia quando o tipo não tem template)."""
+    ctx = contexto or {}
+    template = TEMPLATES.get(ctx.get("tipo"))
+    try:
+        return template(ctx) if template else ""
+    except Exception:
+        return ""
+
+
+# =========================================================
+# Persistência opcional
+# =========================================================
+def _agendar(coro):
+    tarefa = asyncio.get_running_loop().create_task(coro)
+    _tarefas.add(tarefa)
+    tarefa.add_done_callback(_tarefas.discard)
+    return tarefa
+
+
+async def aguardar_tarefas_pendentes(timeout: float = 10) -> None:
+    """Espera gerações/gravações em background (shutdown/testes)."""
+    if _tarefas:
+        await asyncio.wait(list(_tarefas), timeout=timeout)
+
+
+async def _carregar_persistido(chave: str) -> list:
+    if not PERSISTIR_FIRESTORE:
+        return []
+    from services.firebase_service_async import buscar_dado_em_path
+
+    doc = await buscar_dado_em_path(f"{COLECAO_CACHE}/{chave}") or {}
+    return [v for v in doc.get("variantes") or [] if isinstance(v, dict) and v.get("texto")]
+
+
+async def _persistir(chave: str, funcao: str, tipo: str, variantes: list) -> None:
+    from services.firebase_service_async import salvar_dado_em_path
+
+    await salvar_dado_em_path(f"{COLECAO_CACHE}/{chave}", {
+        "funcao": funcao,
+        "tipo": tipo,
+        "variantes": list(variantes),
+        "atualizado_em": time.time(),
+    })
+
+
+# =========================================================
+# Fluxo principal
+# =========================================================
+async def _gerar_variante(chave: str, funcao: str, contexto: dict, variantes: list, gerar) -> str:
+    texto, tokens = await gerar()
+    if not texto:
+        return ""
+    if texto not in (v["texto"] for v in variantes) and len(variantes) < VARIANTES_POR_CHAVE:
+        variantes.append({"texto": texto, "tokens": int(tokens or 0)})
+        _metricas["variantes_geradas"] += 1
+        if PERSISTIR_FIRESTORE:
+            _agendar(_persistir(chave, funcao, (contexto or {}).get("tipo"), variantes))
+    return texto
+
+
+async def responder_com_cache(
+    funcao: str, contexto: dict, gerar, estilo: str | None = None, modelo: str | None = None
+) -> str:
+    """
+    Redação da decisão `contexto` via cache.
+
+    gerar: coroutine function sem argumentos que chama o GPT e devolve
+    (texto, tokens_usados); texto vazio = falha (não vai para o cache).
+    """
+    chave = chave_resposta(funcao, contexto, estilo, modelo)
+    variantes = await cache_respostas_p1.obter(chave, lambda: _carregar_persistido(chave))
+
+    if variantes:
+        escolhida = random.choice(variantes)
+        _metricas["hits"] += 1
+        _metricas["tokens_economizados"] += escolhida["tokens"]
+        if len(variantes) < VARIANTES_POR_CHAVE and random.random() < PROB_NOVA_VARIANTE:
+            _agendar(_gerar_variante(chave, funcao, contexto, variantes, gerar))
+        return escolhida["texto"]
+
+    _metricas["misses"] += 1
+    tarefa = _agendar(_gerar_variante(chave, funcao, contexto, variantes, gerar))
+
+    template = resposta_template(contexto)
+    if not template:
+        return await tarefa
+
+    try:
+        texto = await asyncio.wait_for(asyncio.shield(tarefa), timeout=ORCAMENTO_MS / 1000)
+    except asyncio.TimeoutError:
+        # a geração segue em background e aquece a chave para a próxima vez
+        _metricas["fallbacks"] += 1
+        print(f"⏱️ [P1_CACHE] GPT acima de {ORCAMENTO_MS:.0f}ms tipo={(contexto or {}).get('tipo')} → template", flush=True)
+        return template
+
+    if not texto:
+        # GPT falhou (erro, prazo do gateway ou circuito aberto)
+        _metricas["fallbacks"] += 1
+        return template
+    return texto
+
+
+def metricas_cache_respostas() -> dict:
+    total = _metricas["hits"] + _metricas["misses"]
+    return {
+        **_metricas,
+        "taxa_hit": round(_metricas["hits"] / total, 3) if total else 0.0,
+        "chaves": cache_respostas_p1.metricas()["itens"],
+    }
+
+
+def zerar_metricas_cache_respostas() -> None:
+    for chave in _metricas:
+        _metricas[chave] = 0
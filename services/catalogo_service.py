@@ -0,0 +1,158 @@
+# services/catalogo_service.py
+"""
+Catálogo de profissionais/serviços por tenant, em memória.
+
+Substitui a leitura de Clientes/{dono_id}/Profissionais + normalização com
+unidecode a cada mensagem por um objeto pré-indexado:
+
+    catalogo = await obter_catalogo(dono_id)
+    catalogo.atende("Bruna", "escova")        # bool
+    catalogo.quem_faz("escova")               # ["Bruna", "Carla"]
+    catalogo.duracao("escova", "Bruna")       # 30 | None
+    catalogo.como_dict()                      # {doc_id: dados} (cópia)
+
+Invalidação: qualquer escrita em Clientes/{dono}/Profissionais/{p} pelos
+helpers de firebase_service_async chama invalidar_catalogo(dono), que
+descarta o catálogo do tenant em cache.
+"""
+
+import copy
+import re
+
+from unidecode import unidecode
+
+from services.firebase_service_async import buscar_subcolecao, registrar_ouvinte_escrita
+from utils.cache_ttl import CacheLRUTTL
+
+_CHAVES_DURACAO = ("duracoes", "duracao_servicos", "duracao_por_servico")
+
+cache_catalogos = CacheLRUTTL("catalogo_tenant", max_itens=500, ttl_segundos=600, ttl_negativo_segundos=30)
+
+
+def normalizar_termo(texto) -> str:
+    """Nome de profissional/serviço no formato usado nas comparações."""
+    return unidecode(str(texto or "").strip().lower())
+
+
+def normalizar_termo_sem_pontuacao(texto) -> str:
+    """Como normalizar_termo, trocando pontuação por espaço (busca de serviço em texto livre)."""
+    return re.sub(r"\s+", " ", unidecode(re.sub(r"[^\w\s]", " ", str(texto or "").lower()))).strip()
+
+
+class CatalogoTenant:
+    """Profissionais de um tenant com índices por nome e por serviço."""
+
+    def __init__(self, dono_id: str, profissionais: dict):
+        self.dono_id = dono_id
+        self._profissionais = profissionais or {}
+
+        self.nomes = []                        # nomes exibidos, na ordem do Firestore
+        self.nomes_norm = {}                   # nome_norm -> nome exibido
+        self.por_nome = {}                     # nome_norm -> dados
+        self.servicos_por_profissional = {}    # nome_norm -> [serviço original]
+        self.servicos_norm_por_profissional = {}  # nome_norm -> {serviço_norm}
+        self.profissionais_por_servico = {}    # serviço_norm -> [nome]
+        self.servicos = []                     # serviços originais únicos
+        self.servicos_norm = set()
+        self.servicos_busca = []               # serviços sem acento/pontuação (texto livre)
+        self.duracoes = {}                     # (nome_norm, serviço_norm) -> minutos
+
+        for dados in self._profissionais.values():
+            if not isinstance(dados, dict):
+                continue
+            nome = str(dados.get("nome") or "").strip()
+            if not nome:
+                continue
+            nome_norm = normalizar_termo(nome)
+            if nome_norm in self.por_nome:
+                continue
+
+            self.nomes.append(nome)
+            self.nomes_norm[nome_norm] = nome
+            self.por_nome[nome_norm] = dados
+
+            servicos = [str(s).strip() for s in (dados.get("servicos") or []) if str(s).strip()]
+            self.servicos_por_profissional[nome_norm] = servicos
+            self.servicos_norm_por_profissional[nome_norm] = set()
+            for servico in servicos:
+                serv_norm = normalizar_termo(servico)
+                self.servicos_norm_por_profissional[nome_norm].add(serv_norm)
+                quem = self.profissionais_por_servico.setdefault(serv_norm, [])
+                if nome not in quem:
+                    quem.append(nome)
+                if serv_norm not in self.servicos_norm:
+                    self.servicos_norm.add(serv_norm)
+                    self.servicos.append(servico)
+                    busca = normalizar_termo_sem_pontuacao(servico)
+                    if busca and busca not in self.servicos_busca:
+                        self.servicos_busca.append(busca)
+
+            for chave in _CHAVES_DURACAO:
+                dmap = dados.get(chave)
+                if not isinstance(dmap, dict):
+                    continue
+                for serv, minutos in dmap.items():
+                    try:
+                        self.duracoes.setdefault((nome_norm, normalizar_termo(serv)), int(minutos))
+                    except (TypeError, ValueError):
+                        continue
+
+    def __len__(self):
+        return len(self.nomes)
+
+    def profissional(self, nome: str) -> dict | None:
+        return self.por_nome.get(normalizar_termo(nome))
+
+    def servicos_de(self, nome: str) -> list:
+        return list(self.servicos_por_profissional.get(normalizar_termo(nome), []))
+
+    def atende(self, nome: str, servico: str) -> bool:
+        return normalizar_termo(servico) in self.servicos_norm_por_profissional.get(normalizar_termo(nome), ())
+
+    def quem_faz(self, servico: str) -> list:
+        return list(self.profissionais_por_servico.get(normalizar_termo(servico), []))
+
+    def duracao(self, servico: str, profissional: str | None = None) -> int | None:
+        serv_norm = normalizar_termo(servico)
+        if profissional:
+            return self.duracoes.get((normalizar_termo(profissional), serv_norm))
+        for (_, s), minutos in self.duracoes.items():
+            if s == serv_norm:
+                return minutos
+        return None
+
+    def como_dict(self) -> dict:
+        """Cópia de {doc_id: dados}, no formato de buscar_subcolecao."""
+        return copy.deepcopy(self._profissionais)
+
+
+def invalidar_catalogo(dono_id: str) -> None:
+    """Hook de invalidação: chamar após gravar profissionais do tenant."""
+    cache_catalogos.invalidar(str(dono_id))
+
+
+async def obter_catalogo(dono_id: str) -> CatalogoTenant:
+    """Catálogo do tenant (uma leitura da subcoleção por TTL ou invalidação)."""
+    dono_id = str(dono_id)
+
+    async def _carregar():
+        profissionais = await buscar_subcolecao(f"Clientes/{dono_id}/Profissionais") or {}
+        # vazio (ou erro de leitura engolido) fica só pelo TTL negativo
+        return CatalogoTenant(dono_id, profissionais) if profissionais else None
+
+    catalogo = await cache_catalogos.obter(dono_id, _carregar)
+    return catalogo if catalogo is not None else CatalogoTenant(dono_id, {})
+
+
+async def buscar_profissionais_tenant(dono_id: str) -> dict:
+    """Substituto direto de buscar_subcolecao(f"Clientes/{dono_id}/Profissionais")."""
+    return (await obter_catalogo(dono_id)).como_dict()
+
+
+def _ao_escrever(path: str) -> None:
+    partes = str(path).strip("/").split("/")
+    if len(partes) in (3, 4) and partes[0] == "Clientes" and partes[2] == "Profissionais":
+        invalidar_catalogo(partes[1])
+
+
+registrar_ouvinte_escrita(_ao_escrever)
@@ -0,0 +1,234 @@
+# services/config_agenda_service.py
+"""
+Configuração de agenda por tenant, em memória e imutável.
+
+Substitui a leitura de Clientes/{dono_id}/configuracao/agenda_funcionamento
+(e das AgendaExcecoes de cada profissional) a cada validação de horário por
+objetos prontos para consulta:
+
+    config = await obter_config_agenda_tenant(dono_id)
+    config.regra_na_data("2026-10-20")      # {"aberto", "inicio", "fim", "origem", ...}
+    config.janela_minutos("2026-10-20")     # (540, 1080) | None
+    config.como_dict()                      # {"agenda_padrao", "excecoes_data"} (cópia)
+
+    excecoes = await obter_excecoes_profissional(dono_id, "Bruna")   # {data: excecao}
+
+Tabelas dia-da-semana → regra/janela são montadas uma vez na carga.
+
+Invalidação: qualquer escrita em .../configuracao/agenda_funcionamento ou em
+.../Profissionais/{p}/AgendaExcecoes/... pelos helpers de
+firebase_service_async chama invalidar_config_agenda / invalidar_excecoes_profissional.
+Com AGENDA_CONFIG_OUVINTE=1, um snapshot listener do Firestore também
+invalida quando a configuração muda por fora (painel, outro processo).
+"""
+
+import asyncio
+import copy
+import os
+from datetime import datetime
+from types import MappingProxyType
+
+from services.firebase_service_async import registrar_ouvinte_escrita
+from utils.cache_ttl import CacheLRUTTL
+
+cache_config_agenda = CacheLRUTTL("config_agenda", max_itens=2000, ttl_segundos=600, ttl_negativo_segundos=60)
+cache_excecoes_prof = CacheLRUTTL("excecoes_profissional", max_itens=5000, ttl_segundos=600, ttl_negativo_segundos=60)
+
+OUVINTE_ATIVO = os.getenv("AGENDA_CONFIG_OUVINTE", "").strip().lower() in ("1", "true", "sim")
+_ouvintes: dict = {}   # dono_id -> watch do Firestore
+
+
+def path_config_agenda(dono_id: str) -> str:
+    return f"Clientes/{dono_id}/configuracao/agenda_funcionamento"
+
+
+def _hora_para_minutos(hora) -> int | None:
+    try:
+        hh, mm = map(int, str(hora).split(":"))
+        return hh * 60 + mm if 0 <= hh < 24 and 0 <= mm < 60 else None
+    except (TypeError, ValueError):
+        return None
+
+
+def _congelar(regra: dict) -> MappingProxyType:
+    return MappingProxyType(dict(regra))
+
+
+def _janela(regra) -> tuple | None:
+    if not regra.get("aberto"):
+        return None
+    ini, fim = _hora_para_minutos(regra.get("inicio")), _hora_para_minutos(regra.get("fim"))
+    return (ini, fim) if ini is not None and fim is not None and ini < fim else None
+
+
+class ConfigAgenda:
+    """agenda_funcionamento do salão com lookup por dia da semana e por data."""
+
+    __slots__ = ("dono_id", "_bruto", "_padrao", "_excecoes", "_janelas_padrao", "_janelas_excecao")
+
+    def __init__(self, dono_id: str, doc: dict | None):
+        doc = doc or {}
+        agenda_padrao = doc.get("agenda_padrao") or {}
+        excecoes = doc.get("excecoes_data") or {}
+
+        object.__setattr__(self, "dono_id", dono_id)
+        object.__setattr__(self, "_bruto", copy.deepcopy({"agenda_padrao": agenda_padrao, "excecoes_data": excecoes}))
+
+        # chave do Firestore (str(weekday()): segunda=0) -> regra/janela
+        padrao = {}
+        for chave, reg in agenda_padrao.items():
+            reg = reg or {}
+            padrao[str(chave)] = _congelar({
+                "aberto": reg.get("aberto", False),
+                "inicio": reg.get("inicio"),
+                "fim": reg.get("fim"),
+                "origem": "agenda_padrao_salao",
+            })
+        excecoes_salao = {}
+        for data, exc in excecoes.items():
+            exc = exc or {}
+            excecoes_salao[str(data)] = _congelar({
+                "aberto": exc.get("aberto", False),
+                "inicio": exc.get("inicio"),
+                "fim": exc.get("fim"),
+                "origem": "excecao_salao",
+                "tipo": exc.get("tipo"),
+                "motivo": exc.get("motivo"),
+            })
+        object.__setattr__(self, "_padrao", MappingProxyType(padrao))
+        object.__setattr__(self, "_excecoes", MappingProxyType(excecoes_salao))
+        object.__setattr__(self, "_janelas_padrao", tuple(
+            _janela(padrao.get(str(d)) or {}) for d in range(7)
+        ))
+        object.__setattr__(self, "_janelas_excecao", MappingProxyType({
+            data: _janela(regra) for data, regra in excecoes_salao.items()
+        }))
+
+    def __setattr__(self, nome, valor):
+        raise AttributeError("ConfigAgenda é imutável")
+
+    # ------------------------------------------------------------------
+    def regra_padrao(self, chave) -> dict:
+        """Regra semanal pela chave gravada no Firestore ("0".."6")."""
+        return dict(self._padrao.get(str(chave)) or {})
+
+    def regra_na_data(self, data_str: str) -> dict:
+        """Exceção da data > padrão semanal (chave str(weekday()), segunda=0)."""
+        if data_str in self._excecoes:
+            return dict(self._excecoes[data_str])
+        regra = self._padrao.get(str(datetime.fromisoformat(data_str).weekday()))
+        if regra is None:
+            return {"aberto": False, "inicio": None, "fim": None, "origem": "agenda_padrao_salao"}
+        return dict(regra)
+
+    def janela_minutos(self, data_str: str) -> tuple | None:
+        """(ini, fim) em minutos do salão na data; None = fechado."""
+        if data_str in self._janelas_excecao:
+            return self._janelas_excecao[data_str]
+        return self._janelas_padrao[datetime.fromisoformat(data_str).weekday()]
+
+    def tem_excecao(self, data_str: str) -> bool:
+        return data_str in self._excecoes
+
+    def como_dict(self) -> dict:
+        """Cópia de {"agenda_padrao", "excecoes_data"}, como gravado."""
+        return copy.deepcopy(self._bruto)
+
+
+# =========================================================
+# Cache / invalidação
+# =========================================================
+def invalidar_config_agenda(dono_id: str) -> None:
+    cache_config_agenda.invalidar(str(dono_id))
+
+
+def _chave_excecoes(dono_id: str, profissional: str) -> str:
+    return f"{dono_id}/{profissional}"
+
+
+def invalidar_excecoes_profissional(dono_id: str, profissional: str) -> None:
+    cache_excecoes_prof.invalidar(_chave_excecoes(str(dono_id), str(profissional)))
+
+
+async def obter_config_agenda_tenant(dono_id: str) -> ConfigAgenda:
+    """ConfigAgenda do tenant (uma leitura do documento por TTL ou invalidação)."""
+    dono_id = str(dono_id)
+
+    async def _carregar():
+        from services.firebase_service_async import buscar_dado_em_path
+
+        doc = await buscar_dado_em_path(path_config_agenda(dono_id))
+        print(f"🗓️ [CONFIG_AGENDA] carregada dono={dono_id} existe={bool(doc)}", flush=True)
+        return ConfigAgenda(dono_id, doc) if doc else None
+
+    if OUVINTE_ATIVO:
+        await iniciar_ouvinte_config_agenda(dono_id)
+
+    config = await cache_config_agenda.obter(dono_id, _carregar)
+    return config if config is not None else ConfigAgenda(dono_id, {})
+
+
+async def obter_excecoes_profissional(dono_id: str, profissional: str) -> dict:
+    """AgendaExcecoes do profissional ({data: excecao}, cópia), via cache."""
+    dono_id, profissional = str(dono_id), str(profissional)
+
+    async def _carregar():
+        from services.firebase_service_async import buscar_subcolecao
+
+        return await buscar_subcolecao(f"Clientes/{dono_id}/Profissionais/{profissional}/AgendaExcecoes") or None
+
+    return copy.deepcopy(await cache_excecoes_prof.obter(_chave_excecoes(dono_id, profissional), _carregar) or {})
+
+
+def _ao_escrever(path: str) -> None:
+    partes = str(path).strip("/").split("/")
+    if len(partes) < 4 or partes[0] != "Clientes":
+        return
+    if partes[2] == "configuracao" and partes[3] == "agenda_funcionamento":
+        invalidar_config_agenda(partes[1])
+    elif len(partes) >= 5 and partes[2] == "Profissionais" and partes[4] == "AgendaExcecoes":
+        invalidar_excecoes_profissional(partes[1], partes[3])
+
+
+registrar_ouvinte_escrita(_ao_escrever)
+
+
+# =========================================================
+# Snapshot listener (opcional)
+# =========================================================
+async def iniciar_ouvinte_config_agenda(dono_id: str) -> bool:
+    """
+    Registra (uma vez por tenant) um on_snapshot no documento de config.
+    O callback roda na thread do Firestore e só agenda a invalidação no loop.
+    """
+    dono_id = str(dono_id)
+    if dono_id in _ouvintes:
+        return True
+
+    loop = asyncio.get_running_loop()
+    _ouvintes[dono_id] = None  # reserva: evita dois registros concorrentes
+
+    def _ao_mudar(_snapshots, _mudancas, _lido_em):
+        loop.call_soon_threadsafe(invalidar_config_agenda, dono_id)
+
+    def _registrar():
+        from services.firestore_client import get_db
+        return get_db().document(path_config_agenda(dono_id)).on_snapshot(_ao_mudar)
+
+    try:
+        _ouvintes[dono_id] = await asyncio.to_thread(_registrar)
+        return True
+    except Exception as e:
+        _ouvintes.pop(dono_id, None)
+        print(f"⚠️ [CONFIG_AGENDA] ouvinte não registrado dono={dono_id}: {e}", flush=True)
+        return False
+
+
+def parar_ouvintes_config_agenda() -> None:
+    for watch in list(_ouvintes.values()):
+        try:
+            if watch is not None:
+                watch.unsubscribe()
+        except Exception:
+            pass
+    _ouvintes.clear()
@@ -0,0 +1,396 @@
+# services/disponibilidade_engine.py
+"""
+Motor de disponibilidade de UM dia (aritmética de intervalos).
+
+Carrega uma vez só os eventos do dia (uma query em Eventos), a agenda do
+salão, o catálogo de profissionais e as AgendaExcecoes de quem for pedido.
+Depois tudo é memória: livres = janela − ocupados (subtração de listas
+ordenadas, em minutos desde 00:00) e "primeiros N horários de D minutos na
+grade G" para um ou vários profissionais numa passada só.
+
+    engine = await DisponibilidadeEngine.carregar(dono_id, "2026-10-20", ["Bruna", "Carla"])
+    engine.livres("Bruna")                          # [(540, 600), (660, 1080)]
+    engine.cabe("Bruna", "14:00", 60)               # bool
+    engine.primeiros_slots(["Bruna", "Carla"], 60)  # {"Bruna": ["09:00", ...], "Carla": [...]}
+
+Vários dias: DisponibilidadeEngine.carregar_intervalo(dono_id, inicio, fim)
+devolve {data: engine} com UMA query de Eventos e a config lida uma vez.
+
+Regras de expediente: as mesmas de agenda_service.obter_janela_funcionamento
+(carregar_config_agenda + janela_na_data).
+Eventos sem profissional bloqueiam todos (sem_profissional_bloqueia=True),
+como na agenda geral; o índice de ocupação por profissional os ignora.
+"""
+
+from __future__ import annotations
+
+from datetime import date, datetime
+from typing import Iterable
+
+from services.ocupacao_service import normalizar_profissional
+
+MINUTOS_DIA = 24 * 60
+
+
+# =========================================================
+# Aritmética de intervalos (minutos, [ini, fim))
+# =========================================================
+def hora_para_minutos(hora) -> int | None:
+    try:
+        hh, mm = str(hora).strip()[:5].split(":")
+        return int(hh) * 60 + int(mm)
+    except (ValueError, AttributeError):
+        return None
+
+
+def minutos_para_hora(minutos: int) -> str:
+    return f"{minutos // 60:02d}:{minutos % 60:02d}"
+
+
+def mesclar_intervalos(intervalos: Iterable) -> list:
+    """Ordena e funde sobrepostos/encostados; descarta vazios."""
+    saida = []
+    for ini, fim in sorted((i, f) for i, f in intervalos if f > i):
+        if saida and ini <= saida[-1][1]:
+            if fim > saida[-1][1]:
+                saida[-1] = (saida[-1][0], fim)
+        else:
+            saida.append((ini, fim))
+    return saida
+
+
+def subtrair_intervalos(base: Iterable, ocupados: Iterable) -> list:
+    """base − ocupados, as duas listas percorridas uma vez (O(n + m))."""
+    base = mesclar_intervalos(base)
+    ocupados = mesclar_intervalos(ocupados)
+    livres = []
+    j = 0
+    for ini, fim in base:
+        cursor = ini
+        while j < len(ocupados) and ocupados[j][1] <= cursor:
+            j += 1
+        k = j
+        while k < len(ocupados) and ocupados[k][0] < fim:
+            oc_ini, oc_fim = ocupados[k]
+            if oc_ini > cursor:
+                livres.append((cursor, oc_ini))
+            cursor = max(cursor, oc_fim)
+            if cursor >= fim:
+                break
+            k += 1
+        if cursor < fim:
+            livres.append((cursor, fim))
+    return livres
+
+
+def slots_em_livres(
+    livres: Iterable,
+    duracao: int,
+    grade: int = 10,
+    n: int = 3,
+    a_partir_de: int | None = None,
+    ate: int | None = None,
+    ancora: int = 0,
+) -> list:
+    """
+    Primeiros `n` inícios (minutos) em que `duracao` cabe inteira num
+    intervalo livre, alinhados à grade (ancora + k*grade).
+    a_partir_de/ate limitam o INÍCIO do slot: a_partir_de <= início < ate.
+    """
+    grade = max(int(grade or 1), 1)
+    duracao = int(duracao or 0)
+    saida = []
+    if n <= 0:
+        return saida
+
+    for ini, fim in livres:
+        inicio = ini if a_partir_de is None else max(ini, a_partir_de)
+        # primeiro ponto da grade >= inicio
+        inicio += (ancora - inicio) % grade
+        while inicio + duracao <= fim:
+            if ate is not None and inicio >= ate:
+                return saida
+            saida.append(inicio)
+            if len(saida) >= n:
+                return saida
+            inicio += grade
+    return saida
+
+
+def _data_iso(data) -> str:
+    return data.strftime("%Y-%m-%d") if isinstance(data, date) else str(data)[:10]
+
+
+def _datas_do_evento(ev: dict, datas) -> list:
+    """Datas (dentre `datas`) que o evento toca: a do campo data e a do início/fim ISO."""
+    from services.event_service_async import _parse_event_interval
+
+    if not isinstance(ev, dict):
+        return []
+    tocadas = {str(ev.get("data") or "")[:10]}
+    ini, fim = _parse_event_interval(ev)
+    if ini and fim:
+        tocadas.update({ini.strftime("%Y-%m-%d"), fim.strftime("%Y-%m-%d")})
+    return [d for d in tocadas if d in datas]
+
+
+def _intervalo_do_evento(ev: dict, data: str) -> tuple | None:
+    """Evento -> (ini, fim) em minutos recortado ao dia; None se não ocupa."""
+    from services.event_service_async import _parse_event_interval, evento_deve_ser_ignorado
+
+    if not isinstance(ev, dict) or evento_deve_ser_ignorado(ev):
+        return None
+    ini, fim = _parse_event_interval(ev)
+    if not ini or not fim or fim <= ini:
+        return None
+
+    dia = datetime.fromisoformat(data).date()
+    ini_min = (ini.date() - dia).days * MINUTOS_DIA + ini.hour * 60 + ini.minute
+    fim_min = (fim.date() - dia).days * MINUTOS_DIA + fim.hour * 60 + fim.minute
+    ini_min, fim_min = max(ini_min, 0), min(fim_min, MINUTOS_DIA)
+    return (ini_min, fim_min) if fim_min > ini_min else None
+
+
+# =========================================================
+# Motor
+# =========================================================
+class DisponibilidadeEngine:
+    """Disponibilidade de um dono numa data, já carregada em memória."""
+
+    def __init__(
+        self,
+        dono_id: str,
+        data: str,
+        ocupados_por_prof: dict | None = None,
+        ocupados_sem_prof: list | None = None,
+        janelas: dict | None = None,
+        janela_salao: tuple | None = (0, MINUTOS_DIA),
+        nomes: dict | None = None,
+        sem_profissional_bloqueia: bool = True,
+    ):
+        self.dono_id = dono_id
+        self.data = data
+        self.janela_salao = janela_salao                  # (ini, fim) | None = fechado
+        self.janelas = dict(janelas or {})                # prof_norm -> (ini, fim) | None
+        self.expediente = janelas is not None              # False: só janela_salao
+        self.nomes = dict(nomes or {})                    # prof_norm -> nome exibido
+        self.sem_profissional_bloqueia = sem_profissional_bloqueia
+        self._ocupados_sem_prof = mesclar_intervalos(ocupados_sem_prof or [])
+        self._ocupados = {
+            prof: mesclar_intervalos(lista) for prof, lista in (ocupados_por_prof or {}).items()
+        }
+        self._livres: dict = {}
+
+    # ------------------------------------------------------------------
+    @classmethod
+    async def carregar(
+        cls,
+        dono_id: str,
+        data,
+        profissionais: list | None = None,
+        expediente: bool = True,
+        excluir_event_id: str | None = None,
+        sem_profissional_bloqueia: bool = True,
+    ) -> "DisponibilidadeEngine":
+        """
+        Lê o dia uma vez. expediente=False usa o dia inteiro como janela
+        (quem chama recorta com janela=...). profissionais=None carrega o
+        expediente de todos do catálogo.
+        """
+        data = _data_iso(data)
+        engines = await cls.carregar_intervalo(
+            dono_id, data, data, profissionais,
+            expediente=expediente,
+            excluir_event_id=excluir_event_id,
+            sem_profissional_bloqueia=sem_profissional_bloqueia,
+        )
+        return engines[data]
+
+    @classmethod
+    async def carregar_intervalo(
+        cls,
+        dono_id: str,
+        data_inicio,
+        data_fim,
+        profissionais: list | None = None,
+        expediente: bool = True,
+        excluir_event_id: str | None = None,
+        sem_profissional_bloqueia: bool = True,
+        config: dict | None = None,
+    ) -> dict:
+        """
+        {data: engine} para cada dia do intervalo (inclusivo): UMA query de
+        Eventos para o intervalo e a config de agenda lida uma vez
+        (ou a `config` já carregada por agenda_service.carregar_config_agenda).
+        """
+        from services.firebase_service_async import buscar_eventos_filtrados
+        from services.agenda_service import carregar_config_agenda, datas_do_intervalo, janela_na_data
+
+        data_inicio, data_fim = _data_iso(data_inicio), _data_iso(data_fim)
+        datas = datas_do_intervalo(data_inicio, data_fim)
+        dono_id = await _dono_efetivo(dono_id)
+
+        eventos = await buscar_eventos_filtrados(dono_id, data_inicio=data_inicio, data_fim=data_fim) or {}
+        if expediente and config is None:
+            config = await carregar_config_agenda(dono_id, profissionais)
+
+        if profissionais is None:
+            profissionais = list((config or {}).get("doc_ids") or {})
+        profissionais = [p for p in profissionais if p]
+
+        por_dia: dict = {data: ({}, [], {}) for data in datas}   # ocupados_por_prof, sem_prof, nomes
+        for event_id, ev in eventos.items():
+            if excluir_event_id and event_id == excluir_event_id:
+                continue
+            for data in _datas_do_evento(ev, por_dia):
+                intervalo = _intervalo_do_evento(ev, data)
+                if not intervalo:
+                    continue
+                ocupados_por_prof, ocupados_sem_prof, nomes = por_dia[data]
+                prof = normalizar_profissional(ev.get("profissional"))
+                if prof:
+                    ocupados_por_prof.setdefault(prof, []).append(intervalo)
+                    nomes.setdefault(prof, str(ev.get("profissional")).strip())
+                else:
+                    ocupados_sem_prof.append(intervalo)
+
+        engines = {}
+        for data, (ocupados_por_prof, ocupados_sem_prof, nomes) in por_dia.items():
+            for p in profissionais:
+                nomes[normalizar_profissional(p)] = str(p).strip()
+
+            janelas = None
+            janela_salao = (0, MINUTOS_DIA)
+            if expediente:
+                janela_salao = _janela_em_minutos(janela_na_data(config, data))
+                janelas = {
+                    normalizar_profissional(p): (
+                        _janela_em_minutos(janela_na_data(config, data, p)) if janela_salao else None
+                    )
+                    for p in profissionais
+                }
+
+            engines[data] = cls(
+                dono_id, data,
+                ocupados_por_prof=ocupados_por_prof,
+                ocupados_sem_prof=ocupados_sem_prof,
+                janelas=janelas,
+                janela_salao=janela_salao,
+                nomes=nomes,
+                sem_profissional_bloqueia=sem_profissional_bloqueia,
+            )
+
+        print(
+            f"[DISPONIBILIDADE] dono={dono_id} datas={data_inicio}..{data_fim} eventos={len(eventos)} "
+            f"profissionais={len(profissionais)} expediente={expediente}",
+            flush=True
+        )
+        return engines
+
+    # ------------------------------------------------------------------
+    def janela(self, profissional: str | None = None) -> tuple | None:
+        """(ini, fim) em minutos do expediente; None = fechado."""
+        if self.janela_salao is None:
+            return None
+        if not profissional or not self.expediente:
+            return self.janela_salao
+        return self.janelas.get(normalizar_profissional(profissional))
+
+    def ocupados(self, profissional: str | None = None) -> list:
+        """Ocupação mesclada. Sem profissional: a agenda inteira do dia."""
+        if not profissional:
+            todos = [i for lista in self._ocupados.values() for i in lista]
+            return mesclar_intervalos(todos + self._ocupados_sem_prof)
+        proprios = self._ocupados.get(normalizar_profissional(profissional), [])
+        if self.sem_profissional_bloqueia and self._ocupados_sem_prof:
+            return mesclar_intervalos(proprios + self._ocupados_sem_prof)
+        return proprios
+
+    def bloquear(self, inicio: int, fim: int, profissional: str | None = None) -> None:
+        """Marca um intervalo extra como ocupado (ex.: o horário do encaixe)."""
+        if profissional:
+            prof = normalizar_profissional(profissional)
+            self._ocupados[prof] = mesclar_intervalos(self._ocupados.get(prof, []) + [(inicio, fim)])
+        else:
+            self._ocupados_sem_prof = mesclar_intervalos(self._ocupados_sem_prof + [(inicio, fim)])
+        self._livres.clear()
+
+    def livres(self, profissional: str | None = None, janela: tuple | None = None) -> list:
+        """
+        Intervalos livres (minutos). `janela` recorta o expediente
+        (ex.: (540, 1080) = 09:00–18:00).
+        """
+        chave = (normalizar_profissional(profissional) if profissional else None, janela)
+        if chave not in self._livres:
+            base = self.janela(profissional)
+            if base is not None and janela is not None:
+                base = (max(base[0], janela[0]), min(base[1], janela[1]))
+            if base is None or base[1] <= base[0]:
+                self._livres[chave] = []
+            else:
+                self._livres[chave] = subtrair_intervalos([base], self.ocupados(profissional))
+        return list(self._livres[chave])
+
+    def cabe(self, profissional: str | None, hora, duracao: int, janela: tuple | None = None) -> bool:
+        inicio = hora_para_minutos(hora) if isinstance(hora, str) else hora
+        if inicio is None:
+            return False
+        fim = inicio + int(duracao or 0)
+        return any(ini <= inicio and fim <= f for ini, f in self.livres(profissional, janela))
+
+    def primeiros_slots(
+        self,
+        profissionais,
+        duracao: int,
+        grade: int = 10,
+        n: int = 3,
+        a_partir_de=None,
+        ate=None,
+        janela: tuple | None = None,
+        ancora: int = 0,
+    ) -> dict:
+        """
+        {profissional: ["HH:MM", ...]} — até `n` inícios por profissional.
+        `profissionais` pode ser um nome, uma lista ou None (agenda geral).
+        """
+        if profissionais is None or isinstance(profissionais, str):
+            profissionais = [profissionais]
+        if isinstance(a_partir_de, str):
+            a_partir_de = hora_para_minutos(a_partir_de)
+        if isinstance(ate, str):
+            ate = hora_para_minutos(ate)
+
+        return {
+            prof: [
+                minutos_para_hora(m)
+                for m in slots_em_livres(
+                    self.livres(prof, janela), duracao, grade, n,
+                    a_partir_de=a_partir_de, ate=ate, ancora=ancora,
+                )
+            ]
+            for prof in profissionais
+        }
+
+
+# =========================================================
+# Carga
+# =========================================================
+def _janela_em_minutos(regra: dict) -> tuple | None:
+    if not regra or not regra.get("aberto"):
+        return None
+    ini, fim = hora_para_minutos(regra.get("inicio")), hora_para_minutos(regra.get("fim"))
+    if ini is None or fim is None or fim <= ini:
+        return None
+    return (ini, fim)
+
+
+async def _dono_efetivo(user_id: str) -> str:
+    """Cliente/atendimento_cliente → agenda do dono (mesma regra de buscar_eventos_por_intervalo)."""
+    from services.firebase_service_async import buscar_dado_em_path, obter_id_dono
+
+    dados_usuario = await buscar_dado_em_path(f"Clientes/{user_id}") or {}
+    tipo = (dados_usuario.get("tipo_usuario") or "cliente").strip().lower()
+    modo = (dados_usuario.get("modo_uso") or "").strip().lower()
+    if dados_usuario and (tipo == "cliente" or modo == "atendimento_cliente"):
+        return await obter_id_dono(user_id)
+    return user_id
@@ -11,6 +11,7 @@ from pytz import timezone
 
 from services.firebase_service_async import (
     buscar_subcolecao,
+    buscar_dado_em_path,
     salvar_dado_em_path,
     atualizar_dado_em_path,
     obter_id_dono,              # 👈 acrescentado
@@ -20,9 +21,12 @@ from services.event_service_async import (
     salvar_evento,
 )
 from services.notificacao_service import criar_notificacao_agendada
+from services.disponibilidade_engine import DisponibilidadeEngine, slots_em_livres, subtrair_intervalos
 
 logger = logging.getLogger(__name__)
 FUSO_BR = timezone("America/Sao_Paulo")
+_JANELA_ENCAIXE = (time(9, 0), time(18, 0))
+_PASSO_ENCAIXE_MIN = 15
 
 
 # ---------------------------
@@ -58,17 +62,46 @@ def _janela_livre(
     Gera até 'max_opcoes' janelas livres no dia informado, respeitando 'ocupados' e a duração.
     Retorna pares (ini,fim).
     """
-    base = FUSO_BR.localize(datetime.combine(dia, inicio_dia))
-    limite = FUSO_BR.localize(datetime.combine(dia, fim_dia))
-    passo = timedelta(minutes=15)
+    base = FUSO_BR.localize(datetime.combine(dia, time(0, 0)))
+    ini_dia = inicio_dia.hour * 60 + inicio_dia.minute
+    fim_dia_min = fim_dia.hour * 60 + fim_dia.minute
+
+    def _min(dt: datetime) -> int:
+        return int((dt - base).total_seconds() // 60)
+
+    livres = subtrair_intervalos([(ini_dia, fim_dia_min)], [(_min(i), _min(f)) for i, f in ocupados])
+    inicios = slots_em_livres(livres, duracao_min, _PASSO_ENCAIXE_MIN, max_opcoes, ancora=ini_dia)
     dur = timedelta(minutes=duracao_min)
+    return [(base + timedelta(minutes=m), base + timedelta(minutes=m) + dur) for m in inicios]
+
 
+def _opcoes_realocacao(
+    engine: DisponibilidadeEngine,
+    dia: datetime.date,
+    ev: Dict[str, Any],
+    profissional: Optional[str],
+    max_opcoes: int = 3,
+) -> List[Dict[str, str]]:
+    """3 horários livres no dia (09:00–18:00, passo 15) para mover o evento do candidato."""
+    try:
+        duracao = int(ev.get("duracao") or 0) or (
+            _dt(ev["data"], ev["hora_fim"]) - _dt(ev["data"], ev["hora_inicio"])
+        ).seconds // 60
+    except Exception:
+        duracao = 30
+
+    data_str = dia.strftime("%Y-%m-%d")
+    inicio_janela = _JANELA_ENCAIXE[0].hour * 60 + _JANELA_ENCAIXE[0].minute
+    fim_janela = _JANELA_ENCAIXE[1].hour * 60 + _JANELA_ENCAIXE[1].minute
+    horas = engine.primeiros_slots(
+        ev.get("profissional") or profissional, duracao,
+        grade=_PASSO_ENCAIXE_MIN, n=max_opcoes,
+        janela=(inicio_janela, fim_janela), ancora=inicio_janela,
+    )
     opcoes = []
-    cursor = base
-    while cursor + dur <= limite and len(opcoes) < max_opcoes:
-        if not _tem_conflito(cursor, cursor + dur, ocupados):
-            opcoes.append((cursor, cursor + dur))
-        cursor += passo
+    for hora in next(iter(horas.values()), []):
+        fim = _dt(data_str, hora) + timedelta(minutes=duracao)
+        opcoes.append({"data": data_str, "hora_inicio": hora, "hora_fim": fim.strftime("%H:%M")})
     return opcoes
 
 
@@ -154,9 +187,12 @@ async def solicitar_encaixe(
     inicio = dt_desejado
     fim = dt_desejado + timedelta(minutes=duracao_min)
 
-    # ocupação sempre do dono
-    ocupados = await _carregar_ocupados(dono_id, dia, profissional)
-    if not _tem_conflito(inicio, fim, ocupados):
+    # ocupação sempre do dono: o dia é lido uma vez para o teste direto e as opções
+    engine = await DisponibilidadeEngine.carregar(
+        dono_id, dia, [profissional] if profissional else [], expediente=False
+    )
+    inicio_min = inicio.hour * 60 + inicio.minute
+    if engine.cabe(profissional, inicio_min, duracao_min):
         # Livre → cria evento direto no dono
         ev = {
             "descricao": descricao or "Encaixe",
@@ -228,6 +264,13 @@ async def solicitar_encaixe(
 
     candidatos = candidatos[:2]  # máximo 2 convites por tentativa
 
+    # o buraco desejado fica reservado para o encaixe
+    engine.bloquear(inicio_min, inicio_min + duracao_min, profissional)
+    opcoes_por_cliente: Dict[str, List[Dict[str, str]]] = {
+        str(ev.get("cliente_id")): _opcoes_realocacao(engine, dia, ev, profissional)
+        for _, ev in candidatos
+    }
+
     if not candidatos:
         return {
             "status": "sem_candidato",
@@ -7,6 +7,7 @@ from google.cloud.firestore_v1 import SERVER_TIMESTAMP
 from services.firebase_service_async import (
     salvar_dado_em_path,
     buscar_subcolecao,
+    buscar_eventos_filtrados,
     deletar_dado_em_path,
     obter_id_dono,
     buscar_dado_em_path,
@@ -14,6 +15,13 @@ from services.firebase_service_async import (
 )
 from services.notificacao_service import criar_notificacao_agendada
 from services.agenda_lock_service import criar_evento_com_lock  # 🔒 PATCH P0
+from services.ocupacao_service import (
+    registrar_ocupacao,
+    remover_ocupacao,
+    buscar_intervalos_ocupados,
+    buscar_intervalos_ocupados_varios,
+    intervalos_para_datetimes,
+)
 from utils.formatters import gerar_sugestoes_de_horario
 
 logger = logging.getLogger(__name__)
@@ -135,6 +143,8 @@ async def salvar_evento(user_id: str, evento: dict, event_id: str = None) -> boo
                 return f"conflito_{tipo_erro}"
 
             if resultado_lock.get("duplicado"):
+                # 📇 índice de ocupação (a criação nova já grava na transação)
+                await registrar_ocupacao(user_id_efetivo, event_id, evento)
                 print("♻️ Evento já existe (idempotente). Não criando duplicado.")
                 return "duplicado"
 
@@ -204,7 +214,6 @@ async def buscar_eventos_por_intervalo(
             if tipo == "cliente" or modo == "atendimento_cliente":
                 user_id_efetivo = await obter_id_dono(user_id)
 
-        eventos = await buscar_subcolecao(f"Clientes/{user_id_efetivo}/Eventos") or {}
         hoje = datetime.now().date()
 
         # 📆 Define intervalo de busca
@@ -218,6 +227,13 @@ async def buscar_eventos_por_intervalo(
             data_inicio = hoje + timedelta(days=dias)
             data_fim = data_inicio
 
+        # 🔎 query por janela de datas (não carrega o histórico inteiro)
+        eventos = await buscar_eventos_filtrados(
+            user_id_efetivo,
+            data_inicio=data_inicio.strftime("%Y-%m-%d"),
+            data_fim=data_fim.strftime("%Y-%m-%d"),
+        ) or {}
+
         resultado = []
 
         # ✅ Preserva o event_id no retorno (essencial para updates/idempotência)
@@ -325,6 +341,9 @@ async def cancelar_evento(
 
         await atualizar_dado_em_path(path, payload)
 
+        # 📇 libera o intervalo no índice de ocupação
+        await remover_ocupacao(user_id_efetivo, event_id, ev)
+
         # Log de sucesso
         logger.info(
             f"[CANCELAMENTO] evento_id={event_id} | "
@@ -386,7 +405,15 @@ async def processar_cancelamento_e_notificar_espera(
         profissional = evento_cancelado.get("profissional", "")
         data = evento_cancelado.get("data", "")
         hora_inicio = evento_cancelado.get("hora_inicio", "")
-        duracao = evento_cancelado.get("duracao", 30)
+        duracao = evento_cancelado.get("duracao")
+        if not duracao and hora_inicio and evento_cancelado.get("hora_fim"):
+            try:
+                ini = datetime.strptime(hora_inicio, "%H:%M")
+                fim = datetime.strptime(evento_cancelado["hora_fim"], "%H:%M")
+                duracao = int((fim - ini).total_seconds() // 60)
+            except ValueError:
+                duracao = None
+        duracao = duracao or 30
 
         if not all([servico, profissional, data, hora_inicio]):
             logger.warning(
@@ -413,6 +440,10 @@ async def processar_cancelamento_e_notificar_espera(
             return False
 
         waitlist_id = waitlist_doc.get("waitlist_id", "")
+        # a entrada pode caber num trecho da vaga: oferece o horário que ela pediu
+        servico_des = waitlist_doc.get("servico_desejado") or {}
+        hora_oferta = servico_des.get("hora_desejada") or hora_inicio
+        duracao_oferta = servico_des.get("duracao_minutos") or duracao
         cliente_doc = waitlist_doc.get("cliente") or {}
         cliente_id = cliente_doc.get("cliente_id", "")
         cliente_nome = cliente_doc.get("cliente_nome", "Cliente")
@@ -428,15 +459,15 @@ async def processar_cancelamento_e_notificar_espera(
             return False
 
         # 3. Salvar contexto do cliente para confirmação
-        await salvar_contexto_temporario_v2(cliente_id, {
+        await salvar_contexto_temporario_v2(tenant_id, cliente_id, {
             "estado_fluxo": "aguardando_confirmacao_encaixe",
             "waitlist_id": waitlist_id,
             "encaixe_pendente": {
                 "servico": servico,
                 "profissional": profissional,
                 "data": data,
-                "hora_inicio": hora_inicio,
-                "duracao_minutos": duracao,
+                "hora_inicio": hora_oferta,
+                "duracao_minutos": duracao_oferta,
                 "tenant_id": tenant_id,
             },
             "cliente_nome": cliente_nome,
@@ -446,7 +477,7 @@ async def processar_cancelamento_e_notificar_espera(
         # Aqui apenas logamos a intenção
         msg = (
             f"🎉 Boa notícia! Vagou o horário de {servico} com {profissional} "
-            f"em {data} às {hora_inicio}. Quer confirmar esse agendamento?"
+            f"em {data} às {hora_oferta}. Quer confirmar esse agendamento?"
         )
 
         logger.info(
@@ -484,9 +515,6 @@ async def cancelar_evento_por_texto(user_id: str, termo: str, tenant_id: str | N
     if not tenant_id:
         tenant_id = await obter_id_dono(user_id)
 
-    # Busca TODOS os eventos do tenant
-    eventos = await buscar_subcolecao(f"Clientes/{tenant_id}/Eventos") or {}
-
     # Extrai filtros do termo
     termo_lower = (termo or "").strip().lower()
 
@@ -494,7 +522,6 @@ async def cancelar_evento_por_texto(user_id: str, termo: str, tenant_id: str | N
     print(f"[P0-DIAG-ETAPA1] termo_original='{termo}'", flush=True)
     print(f"[P0-DIAG-ETAPA1] termo_lower='{termo_lower}'", flush=True)
     print(f"[P0-DIAG-ETAPA1] user_id={user_id} tenant_id={tenant_id}", flush=True)
-    print(f"[P0-DIAG-ETAPA1] total_eventos_carregados={len(eventos or {})}", flush=True)
 
     # PASSO 1: Extrair DATA usando interpretador já existente
     # Isso evita contaminar profissional com data
@@ -552,6 +579,18 @@ async def cancelar_evento_por_texto(user_id: str, termo: str, tenant_id: str | N
     else:
         print(f"[P0-DIAG-ETAPA4] profissional_filtro=None prof_raw_nao_encontrado=true", flush=True)
 
+    # 🔎 Query por data no servidor: o dia pedido, ou de hoje em diante
+    # (evento passado não é cancelável). Não carrega o histórico inteiro.
+    if data_filtro:
+        eventos = await buscar_eventos_filtrados(
+            tenant_id, data_inicio=data_filtro, data_fim=data_filtro
+        ) or {}
+    else:
+        eventos = await buscar_eventos_filtrados(
+            tenant_id, data_inicio=datetime.now().strftime("%Y-%m-%d")
+        ) or {}
+
+    print(f"[P0-DIAG-ETAPA4] total_eventos_carregados={len(eventos or {})}", flush=True)
 
     # Busca eventos que matcham
     candidatos = []
@@ -670,66 +709,40 @@ async def verificar_conflito(
         if tipo == "cliente" or modo == "atendimento_cliente":
             user_id_efetivo = await obter_id_dono(user_id)
 
-        eventos = await buscar_subcolecao(f"Clientes/{user_id_efetivo}/Eventos") or {}
         inicio_novo = datetime.fromisoformat(f"{data}T{hora_inicio}")
         fim_novo = inicio_novo + timedelta(minutes=duracao_min)
 
+        # 📇 lê só o índice do profissional no dia (não a agenda inteira)
+        ocupados = await buscar_intervalos_ocupados(
+            user_id_efetivo, data, profissional, excluir_event_id=event_id
+        )
+
         conflitos = []
 
         cliente_novo = (str(cliente_id or "")).strip()
-        prof_novo = unidecode((profissional or "").strip().lower())
 
-        for eid, ev in (eventos or {}).items():
-
-            # 🔥 filtro estrutural único da agenda
-            if not evento_deve_entrar_na_agenda(
-                evento_id=eid,
-                evento=ev,
-                data_consulta=data
-            ):
-                print(
-                    f"🧹 [EVENTO_IGNORADO_SALVAR] id={eid}",
-                    flush=True
-                )
-                continue
-
-            # ✅ ignorar o próprio evento (quando event_id conhecido)
-            if event_id and eid == event_id:
-                continue
+        for item in ocupados:
 
             # ✅ idempotência: mesmo cliente + mesmo slot não é conflito
             if (
                 cliente_novo
-                and str(ev.get("cliente_id") or "").strip() == cliente_novo
-                and unidecode((ev.get("profissional") or "").strip().lower()) == prof_novo
-                and ev.get("data") == data
-                and ev.get("hora_inicio") == hora_inicio
+                and str(item.get("cliente_id") or "").strip() == cliente_novo
+                and item.get("hora_inicio") == hora_inicio
             ):
                 continue
 
             try:
-                data_evento = datetime.strptime(ev.get("data", ""), "%Y-%m-%d").date()
-            except:
-                continue
-
-            if data_evento != inicio_novo.date():
-                continue
-            if not ev.get("profissional"):
-                continue
-            if unidecode(ev.get("profissional", "").lower()) != unidecode(profissional.lower()):
-                continue
-            try:
-                ev_inicio = datetime.strptime(f"{ev['data']} {ev['hora_inicio']}", "%Y-%m-%d %H:%M")
-                ev_fim = datetime.strptime(f"{ev['data']} {ev['hora_fim']}", "%Y-%m-%d %H:%M")
+                ev_inicio = datetime.strptime(f"{data} {item['hora_inicio']}", "%Y-%m-%d %H:%M")
+                ev_fim = datetime.strptime(f"{data} {item['hora_fim']}", "%Y-%m-%d %H:%M")
                 if inicio_novo < ev_fim and fim_novo > ev_inicio:
 
-                    print(f"⛔ Conflito detectado com evento existente: {ev}")
+                    print(f"⛔ Conflito detectado com evento existente: {item}")
                     print(f"📅 Horário novo: {inicio_novo} até {fim_novo}")
                     print(f"📅 Evento conflitante: {ev_inicio} até {ev_fim}")
 
                     conflitos.append((ev_inicio, ev_fim))
             except Exception as e:
-                print(f"⚠️ Erro ao interpretar evento existente: {ev} — {e}")
+                print(f"⚠️ Erro ao interpretar intervalo existente: {item} — {e}")
                 continue
 
         return conflitos
@@ -749,7 +762,14 @@ async def deletar_evento(user_id: str, event_id: str) -> bool:
             if tipo == "cliente" or modo == "atendimento_cliente":
                 user_id = await obter_id_dono(user_id)
 
-        await deletar_dado_em_path(f"Clientes/{user_id}/Eventos/{event_id}")
+        path = f"Clientes/{user_id}/Eventos/{event_id}"
+        ev = await buscar_dado_em_path(path) or {}
+
+        await deletar_dado_em_path(path)
+
+        # 📇 libera o intervalo no índice de ocupação
+        if ev:
+            await remover_ocupacao(user_id, event_id, ev)
         return True
     except Exception as e:
         print(f"❌ Erro ao deletar evento: {e}")
@@ -820,7 +840,6 @@ async def buscar_eventos_por_termo_avancado(user_id: str, termo: str):
         if tipo == "cliente" or modo == "atendimento_cliente":
             user_id_efetivo = await obter_id_dono(user_id)
 
-    eventos = await buscar_subcolecao(f"Clientes/{user_id_efetivo}/Eventos") or {}
     hoje = datetime.now().date()
 
     # datas
@@ -829,6 +848,18 @@ async def buscar_eventos_por_termo_avancado(user_id: str, termo: str):
     if data_exp:
         d1 = d2 = data_exp
 
+    # 🔎 query por janela de datas: a pedida, ou de hoje em diante
+    if d1 and d2:
+        eventos = await buscar_eventos_filtrados(
+            user_id_efetivo,
+            data_inicio=d1.strftime("%Y-%m-%d"),
+            data_fim=d2.strftime("%Y-%m-%d"),
+        ) or {}
+    else:
+        eventos = await buscar_eventos_filtrados(
+            user_id_efetivo, data_inicio=hoje.strftime("%Y-%m-%d")
+        ) or {}
+
     # stopwords + verbos de intenção + palavras de data que NÃO devem pesar no match textual
     STOP = {"o","a","os","as","um","uma","de","do","da","dos","das","com","no","na","nos","nas","para","pro","pra"}
     INTENCOES = {"cancelar","cancela","cancele","remover","excluir","apagar","tirar","tira"}
@@ -946,15 +977,9 @@ async def tentar_split_simples(
         # 1) tenta buscar no doc do profissional se existir
         # Ex.: {"duracoes": {"corte": 60, "hidratação": 45}} (você pode padronizar isso depois)
         serv_norm = unidecode(servico_nome.strip().lower())
-        for key in ("duracoes", "duracao_servicos", "duracao_por_servico"):
-            dmap = prof_data.get(key)
-            if isinstance(dmap, dict):
-                for k, v in dmap.items():
-                    if unidecode(str(k).strip().lower()) == serv_norm:
-                        try:
-                            return int(v)
-                        except Exception:
-                            pass
+        minutos = catalogo.duracao(servico_nome, prof_data.get("nome"))
+        if minutos is not None:
+            return minutos
 
         # 2) fallback padrão (AJUSTE depois com seus dados reais)
         base = {
@@ -977,61 +1002,31 @@ async def tentar_split_simples(
     user_id_efetivo = await obter_id_dono(user_id) if dados_usuario else user_id
 
     # --- carregar dados ---
-    eventos = await buscar_subcolecao(f"Clientes/{user_id_efetivo}/Eventos") or {}
-    profissionais = await buscar_subcolecao(f"Clientes/{user_id_efetivo}/Profissionais") or {}
-
-    # --- parser de intervalos (reusa o padrão robusto) ---
-    from datetime import datetime as _dt, timedelta as _td
+    from services.catalogo_service import obter_catalogo
 
-    # --- construir ocupados por profissional (somente do dia) ---
-    dia_dt = datetime.fromisoformat(f"{data}T00:00:00").date()
-    ocupados_por_prof = {}
-
-    for eid, ev in eventos.items():
-
-        if event_id and eid == event_id:
-            continue
-
-        # 🔥 filtro estrutural único da agenda
-        if evento_deve_ser_ignorado(ev, eid):
-            print(
-                f"🧹 [EVENTO_IGNORADO_DISPONIBILIDADE] id={eid}",
-                flush=True
-            )
-            continue
-
-        ev_prof = unidecode(str(ev.get("profissional", "")).strip().lower())
-
-        if not ev_prof:
-            continue
-
-        ev_ini, ev_fim = _parse_event_interval(ev)
-        if not ev_ini or not ev_fim:
-            continue
-        if ev_ini.date() != dia_dt:
-            continue
-
-        ocupados_por_prof.setdefault(ev_prof, []).append((ev_ini, ev_fim))
+    catalogo = await obter_catalogo(user_id_efetivo)
 
     # --- candidatos por serviço ---
     def profs_que_fazem(servico_nome: str) -> list[dict]:
-        sn = unidecode(servico_nome.strip().lower())
-        out = []
-        for p in profissionais.values():
-            nome = (p.get("nome") or "").strip()
-            if not nome:
-                continue
-            servs = p.get("servicos") or []
-            servs_norm = [unidecode(str(s).strip().lower()) for s in servs]
-            if sn in servs_norm:
-                out.append(p)
-        return out
+        return [catalogo.profissional(nome) for nome in catalogo.quem_faz(servico_nome)]
 
     cand1 = profs_que_fazem(s1)
     cand2 = profs_que_fazem(s2)
     if not cand1 or not cand2:
         return None
 
+    # --- ocupados do dia: só dos candidatos, via índice de ocupação ---
+    ocupados_idx = await buscar_intervalos_ocupados_varios(
+        user_id_efetivo,
+        data,
+        [p.get("nome") for p in cand1 + cand2],
+        excluir_event_id=event_id,
+    )
+    ocupados_por_prof = {
+        prof: intervalos_para_datetimes(data, itens)
+        for prof, itens in ocupados_idx.items()
+    }
+
     pref_norm = unidecode((profissional_preferido or "").strip().lower())
 
     # ordena candidatos do serviço 1: preferido primeiro, depois demais
@@ -1173,7 +1168,6 @@ async def verificar_conflito_e_sugestoes_profissional(
 ) -> dict:
     from datetime import datetime, timedelta
     from unidecode import unidecode
-    import json
 
     # -------------------------
     # helpers (aceita HH:MM + ISO)
@@ -1209,49 +1203,25 @@ async def verificar_conflito_e_sugestoes_profissional(
     if tipo == "cliente" or modo == "atendimento_cliente":
         user_id_efetivo = await obter_id_dono(user_id)
 
-    # 3) Busca eventos e profissionais
-    eventos = await buscar_subcolecao(f"Clientes/{user_id_efetivo}/Eventos") or {}
-    profissionais = await buscar_subcolecao(f"Clientes/{user_id_efetivo}/Profissionais") or {}
+    # 3) Catálogo de profissionais + ocupação do dia (índice, não a agenda inteira)
+    from services.catalogo_service import obter_catalogo
+
+    catalogo = await obter_catalogo(user_id_efetivo)
 
     print(
         f"[DIAG] Dados recebidos: user_id={user_id}, data={data}, hora_inicio={hora_inicio}, "
         f"duracao_min={duracao_min}, profissional={profissional}, servico={servico}",
         flush=True
     )
-    print(f"[EVENTOS] Eventos existentes:\n{json.dumps(eventos, indent=2, default=str)}", flush=True)
 
     prof_norm = unidecode((profissional or "").strip().lower())
 
     # 4) Ocupados do profissional (do dia todo)
-    ocupados = []
-    for eid, ev in eventos.items():
-
-        if not evento_deve_entrar_na_agenda(
-            evento_id=eid,
-            evento=ev,
-            data_consulta=data
-        ):
-            print(
-                f"🧹 [EVENTO_IGNORADO_CONFLITO] id={eid}",
-                flush=True
-            )
-            continue
-
-        if event_id and eid == event_id:
-            continue
-
-        ev_prof = unidecode(str(ev.get("profissional", "")).strip().lower())
-        if not ev_prof or ev_prof != prof_norm:
-            continue
-
-        ev_ini, ev_fim = _parse_event_interval(ev)
-        if not ev_ini or not ev_fim:
-            continue
-
-        if ev_ini.date() != inicio_novo.date():
-            continue
-
-        ocupados.append((ev_ini, ev_fim))
+    itens_ocupados = await buscar_intervalos_ocupados(
+        user_id_efetivo, data, prof_norm, excluir_event_id=event_id
+    )
+    ocupados = intervalos_para_datetimes(data, itens_ocupados)
+    print(f"[OCUPACAO] prof={prof_norm} data={data} ocupados={len(ocupados)}", flush=True)
 
     cabe = verificar_encaixe_exato(inicio_novo, ocupados, duracao_min)
     conflito = not cabe
@@ -1294,55 +1264,26 @@ async def verificar_conflito_e_sugestoes_profissional(
     if isinstance(servico, str) and servico.strip():
         servico_norm = unidecode((servico or "").strip().lower())
 
-        for p in profissionais.values():
-            nome_alt = p.get("nome", "")
-            nome_alt_norm = unidecode(str(nome_alt).strip().lower())
-
-            if not nome_alt_norm or nome_alt_norm == prof_norm:
-                continue
-
-            servs_alt = [
-                unidecode(str(s).strip().lower())
-                for s in (p.get("servicos") or [])
-            ]
-
-            if servico_norm and servico_norm not in servs_alt:
-                continue
-
-            conflitos_alt = False
-
-            for eid, ev in eventos.items():
-
-                if not evento_deve_entrar_na_agenda(
-                    evento_id=eid,
-                    evento=ev,
-                    data_consulta=data
-                ):
-                    print(
-                        f"🧹 [EVENTO_IGNORADO_ALT] id={eid}",
-                        flush=True
-                    )
-                    continue
-
-                if event_id and eid == event_id:
-                    continue
-
-                ev_prof = unidecode(str(ev.get("profissional", "")).strip().lower())
-
-                if ev_prof != nome_alt_norm:
-                    continue
-
-                ev_ini, ev_fim = _parse_event_interval(ev)
-
-                if not ev_ini or not ev_fim:
-                    continue
-
-                if ev_ini.date() != inicio_novo.date():
-                    continue
+        candidatos_alt = [
+            (nome_alt, nome_alt_norm)
+            for nome_alt_norm, nome_alt in catalogo.nomes_norm.items()
+            if nome_alt_norm != prof_norm
+            and servico_norm in catalogo.servicos_norm_por_profissional.get(nome_alt_norm, ())
+        ]
+
+        ocupados_alt = await buscar_intervalos_ocupados_varios(
+            user_id_efetivo,
+            data,
+            [norm for _, norm in candidatos_alt],
+            excluir_event_id=event_id,
+        )
 
-                if inicio_novo < ev_fim and fim_novo > ev_ini:
-                    conflitos_alt = True
-                    break
+        for nome_alt, nome_alt_norm in candidatos_alt:
+            intervalos_alt = intervalos_para_datetimes(data, ocupados_alt.get(nome_alt_norm) or [])
+            conflitos_alt = any(
+                inicio_novo < ev_fim and fim_novo > ev_ini
+                for ev_ini, ev_fim in intervalos_alt
+            )
 
             if not conflitos_alt:
                 alternativos.append(nome_alt)
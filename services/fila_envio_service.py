@@ -0,0 +1,200 @@
+# services/fila_envio_service.py
+"""
+Fila de envio de mensagens (lembretes, resumos, propostas) com:
+
+- pool de workers configurável (ENVIO_WORKERS);
+- limite global e por chat compartilhado por todas as filas do processo
+  (Telegram: ~30 msg/s no bot e ~1 msg/s por chat);
+- retry com backoff: 429 (RetryAfter) espera o tempo pedido pelo Telegram,
+  falhas de rede usam backoff exponencial; erros definitivos não repetem;
+- gravação dos status em lote (WriteBatch) no fim, em vez de um update
+  aguardado depois de cada mensagem.
+
+Uso:
+
+    async with FilaEnvio(bot) as fila:
+        fila.enviar("telegram", chat_id, texto,
+                    ao_enviar=(path_notif, {"status": "enviado"}),
+                    ao_falhar=(path_notif, {"status": "erro"}))
+    print(fila.metricas)
+"""
+
+import asyncio
+import logging
+import os
+import time
+from datetime import timedelta
+
+from telegram.error import BadRequest, NetworkError, RetryAfter
+
+from services.firebase_service_async import atualizar_em_lote
+
+logger = logging.getLogger(__name__)
+
+ENVIO_WORKERS = int(os.getenv("ENVIO_WORKERS", "8"))
+ENVIO_MSGS_POR_SEGUNDO = float(os.getenv("ENVIO_MSGS_POR_SEGUNDO", "30"))
+ENVIO_INTERVALO_CHAT_SEGUNDOS = float(os.getenv("ENVIO_INTERVALO_CHAT_SEGUNDOS", "1.0"))
+ENVIO_MAX_TENTATIVAS = int(os.getenv("ENVIO_MAX_TENTATIVAS", "4"))
+ENVIO_BACKOFF_BASE_SEGUNDOS = 1.0
+LOTE_ESCRITA_STATUS = 400
+
+
+class ControleTaxa:
+    """
+    Reserva de horário de envio: cada mensagem reserva o próximo slot livre
+    global (1/msgs_por_segundo) e do chat (intervalo_chat) antes de dormir.
+    A reserva acontece sem await no meio, então workers concorrentes nunca
+    pegam o mesmo slot.
+    """
+
+    def __init__(self, msgs_por_segundo: float = ENVIO_MSGS_POR_SEGUNDO, intervalo_chat: float = ENVIO_INTERVALO_CHAT_SEGUNDOS):
+        self.intervalo_global = 1.0 / msgs_por_segundo if msgs_por_segundo > 0 else 0.0
+        self.intervalo_chat = intervalo_chat
+        self._proximo_global = 0.0
+        self._proximo_chat: dict = {}
+
+    def reservar(self, chat_id) -> float:
+        """Segundos até o slot reservado para este chat."""
+        agora = time.monotonic()
+        chave = str(chat_id)
+        slot = max(agora, self._proximo_global, self._proximo_chat.get(chave, 0.0))
+        self._proximo_global = slot + self.intervalo_global
+        self._proximo_chat[chave] = slot + self.intervalo_chat
+        if len(self._proximo_chat) > 10000:
+            self._proximo_chat = {c: t for c, t in self._proximo_chat.items() if t > agora}
+        return slot - agora
+
+    async def aguardar(self, chat_id) -> None:
+        espera = self.reservar(chat_id)
+        if espera > 0:
+            await asyncio.sleep(espera)
+
+    def pausar(self, segundos: float) -> None:
+        """429 do Telegram: ninguém envia antes de `segundos`."""
+        self._proximo_global = max(self._proximo_global, time.monotonic() + segundos)
+
+
+# compartilhado: várias filas (notificações, resumo, recorrência) rodam juntas às 08:00
+controle_taxa = ControleTaxa()
+
+
+def _segundos_retry_after(e: RetryAfter) -> float:
+    valor = getattr(e, "retry_after", 1)
+    if isinstance(valor, timedelta):
+        return valor.total_seconds()
+    return float(valor or 1)
+
+
+class FilaEnvio:
+    def __init__(self, bot, workers: int = ENVIO_WORKERS, controle: ControleTaxa | None = None, max_tentativas: int = ENVIO_MAX_TENTATIVAS):
+        self.bot = bot
+        self.n_workers = max(1, int(workers))
+        self.controle = controle or controle_taxa
+        self.max_tentativas = max(1, int(max_tentativas))
+        self._fila: asyncio.Queue = asyncio.Queue()
+        self._workers: list = []
+        self._escritas: list = []
+        self._gravacoes: list = []
+        self.metricas = {"enfileiradas": 0, "enviadas": 0, "falhas": 0, "retries": 0, "status_gravados": 0}
+
+    # ------------------------------------------------------------------
+    def enviar(self, canal: str, chat_id, texto: str, parse_mode: str | None = None, ao_enviar: tuple | None = None, ao_falhar: tuple | None = None) -> None:
+        """
+        Enfileira uma mensagem (não bloqueia).
+
+        ao_enviar / ao_falhar: (path, dados) gravados com merge no fim; em
+        falha, dados recebe também "erro" com a mensagem da exceção.
+        """
+        if not self._workers:
+            self._workers = [asyncio.create_task(self._worker()) for _ in range(self.n_workers)]
+        self._fila.put_nowait({
+            "canal": (canal or "telegram").lower(),
+            "chat_id": str(chat_id),
+            "texto": texto,
+            "parse_mode": parse_mode,
+            "ao_enviar": ao_enviar,
+            "ao_falhar": ao_falhar,
+        })
+        self.metricas["enfileiradas"] += 1
+
+    async def concluir(self) -> dict:
+        """Espera a fila esvaziar, encerra os workers e grava os status."""
+        if self._workers:
+            await self._fila.join()
+            for w in self._workers:
+                w.cancel()
+            await asyncio.gather(*self._workers, return_exceptions=True)
+            self._workers = []
+        await asyncio.gather(*self._gravacoes)
+        self._gravacoes = []
+        await self._gravar_status()
+        return self.metricas
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.concluir()
+        return False
+
+    # ------------------------------------------------------------------
+    async def _entregar(self, item: dict) -> None:
+        if item["canal"] == "whatsapp":
+            from services.whatsapp_service import enviar_mensagem_whatsapp
+            await enviar_mensagem_whatsapp(item["chat_id"], item["texto"])
+            return
+
+        kwargs = {"chat_id": int(item["chat_id"]), "text": item["texto"]}
+        if item["parse_mode"]:
+            kwargs["parse_mode"] = item["parse_mode"]
+        await self.bot.send_message(**kwargs)
+
+    async def _enviar_com_retry(self, item: dict) -> None:
+        for tentativa in range(1, self.max_tentativas + 1):
+            await self.controle.aguardar(item["chat_id"])
+            try:
+                await self._entregar(item)
+                return
+            except RetryAfter as e:
+                if tentativa == self.max_tentativas:
+                    raise
+                espera = _segundos_retry_after(e)
+                self.controle.pausar(espera)
+                logger.warning(f"[ENVIO] 429 chat={item['chat_id']} aguardando {espera}s (tentativa {tentativa})")
+            except BadRequest:
+                raise  # chat inválido, texto malformado: repetir não resolve
+            except NetworkError as e:
+                if tentativa == self.max_tentativas:
+                    raise
+                espera = ENVIO_BACKOFF_BASE_SEGUNDOS * (2 ** (tentativa - 1))
+                logger.warning(f"[ENVIO] falha de rede chat={item['chat_id']}: {e} | retry em {espera}s")
+                await asyncio.sleep(espera)
+            self.metricas["retries"] += 1
+
+    async def _worker(self) -> None:
+        while True:
+            item = await self._fila.get()
+            try:
+                await self._enviar_com_retry(item)
+                self.metricas["enviadas"] += 1
+                logger.info(f"✅ Mensagem enviada para {item['chat_id']} via {item['canal']}")
+                if item["ao_enviar"]:
+                    self._registrar_status(item["ao_enviar"])
+            except Exception as e:
+                self.metricas["falhas"] += 1
+                logger.error(f"Erro ao enviar mensagem para {item['chat_id']} via {item['canal']}: {e}")
+                if item["ao_falhar"]:
+                    path, dados = item["ao_falhar"]
+                    self._registrar_status((path, {**dados, "erro": str(e)}))
+            finally:
+                self._fila.task_done()
+
+    def _registrar_status(self, atualizacao: tuple) -> None:
+        self._escritas.append(atualizacao)
+        if len(self._escritas) >= LOTE_ESCRITA_STATUS:
+            self._gravacoes.append(asyncio.create_task(self._gravar_status()))
+
+    async def _gravar_status(self) -> None:
+        pendentes, self._escritas = self._escritas, []
+        if pendentes:
+            self.metricas["status_gravados"] += await atualizar_em_lote(pendentes, lote=LOTE_ESCRITA_STATUS)
@@ -6,6 +6,10 @@ import firebase_admin
 from firebase_admin import credentials, firestore
 import os
 import json
+import copy
+
+from utils.cache_ttl import CacheLRUTTL
+from utils.leituras_update import ler_coalescido, registrar_leitura_firestore, invalidar_leituras_update
 
 # ============================================================================
 # [INIT] Inicializar cliente Firestore com credenciais (padrão backup)
@@ -86,9 +90,17 @@ except ValueError:
 
 # [FIX-ASYNC] Usar AsyncClient em vez de firestore.client() (sync)
 # AsyncClient() usa GOOGLE_APPLICATION_CREDENTIALS que acabamos de definir
+# [REPO] ÚNICO cliente do processo: todas as coroutines usam este (um canal
+# gRPC/HTTP2 multiplexado). services/firestore_client.get_db() (sync) fica só
+# para scripts e código que roda fora do event loop.
 client = AsyncClient()
 print(f"[OK] Firestore inicializado com sucesso!", flush=True)
 
+
+def obter_client() -> AsyncClient:
+    """AsyncClient compartilhado (para queries que os helpers abaixo não cobrem)."""
+    return client
+
 # [LOOP] Utilitário para navegar até o path
 def get_ref_from_path(path: str):
     partes = path.split("/")
@@ -100,6 +112,92 @@ def get_ref_from_path(path: str):
             ref = ref.document(partes[i])
     return ref
 
+# ============================================================================
+# [REPO] Primitivas assíncronas que PROPAGAM erros
+# Os helpers antigos (salvar_dado_em_path, consultar_subcolecao...) engolem
+# exceção e devolvem False/{}; estas são para quem precisa decidir o que
+# fazer com a falha (ex: identidade_service re-lança).
+# ============================================================================
+async def _ler_doc_firestore(path: str) -> dict | None:
+    """Leitura REAL de um documento (conta no relatório do update)."""
+    doc = await get_ref_from_path(path).get()
+    registrar_leitura_firestore(path)
+    return doc.to_dict() if doc.exists else None
+
+
+async def _ler_doc_coalescido(path: str) -> dict | None:
+    path = str(path).strip("/")
+    return await ler_coalescido(("doc", path), path, lambda: _ler_doc_firestore(path))
+
+
+async def ler_documento(path: str) -> dict | None:
+    """Documento em `path` (None se não existe). Perfis passam pelo cache."""
+    if eh_path_perfil(path):
+        return await buscar_perfil_em_cache(path)
+    return await _ler_doc_coalescido(path)
+
+
+async def gravar_documento(path: str, dados: dict, merge: bool = False) -> None:
+    """set() no documento; merge=False substitui o documento inteiro."""
+    await get_ref_from_path(path).set(dados, merge=merge)
+    notificar_escrita(path)
+
+
+async def atualizar_documento(path: str, dados: dict) -> None:
+    """update() — falha (NotFound) se o documento não existe."""
+    await get_ref_from_path(path).update(dados)
+    notificar_escrita(path)
+
+
+async def adicionar_documento(path_colecao: str, dados: dict) -> str:
+    """add() com ID automático; retorna o ID criado."""
+    _, ref = await get_ref_from_path(path_colecao).add(dados)
+    notificar_escrita(f"{path_colecao}/{ref.id}")
+    return ref.id
+
+
+async def consultar(
+    path: str,
+    filtros: list | None = None,
+    campos: list | None = None,
+    ordenar_por: str | None = None,
+    limite: int | None = None,
+) -> dict:
+    """
+    Query na coleção/subcoleção `path` → {doc_id: dados}.
+    ordenar_por com prefixo "-" ordena decrescente (ex: "-timestamp").
+    Queries idênticas no mesmo update são lidas uma vez (leituras_do_update).
+    """
+    path = str(path).strip("/")
+    chave = ("query", path, repr(filtros or []), None if campos is None else tuple(campos), ordenar_por, limite)
+    return await ler_coalescido(chave, path, lambda: _executar_query(path, filtros, campos, ordenar_por, limite))
+
+
+async def _executar_query(path, filtros, campos, ordenar_por, limite) -> dict:
+    query = get_ref_from_path(path)
+
+    for campo, operador, valor in (filtros or []):
+        query = query.where(campo, operador, valor)
+
+    if campos is not None:
+        query = query.select(list(campos))
+
+    if ordenar_por:
+        if ordenar_por.startswith("-"):
+            query = query.order_by(ordenar_por[1:], direction=fs.Query.DESCENDING)
+        else:
+            query = query.order_by(ordenar_por)
+
+    if limite:
+        query = query.limit(int(limite))
+
+    resultados = {}
+    async for doc in query.stream():
+        resultados[doc.id] = doc.to_dict()
+    registrar_leitura_firestore(path, len(resultados))
+    return resultados
+
+
 async def buscar_notificacoes_pendentes(user_id: str):
     """
     Busca apenas notificações ainda não avisadas.
@@ -126,6 +224,41 @@ async def buscar_notificacoes_pendentes(user_id: str):
         print(f"[ERRO] buscar_notificacoes_pendentes erro: {e}", flush=True)
         return {}
 
+async def buscar_notificacoes_vencidas(ate: str, limite: int = 500):
+    """
+    Notificações ainda não avisadas com data_hora <= `ate`, de TODOS os tenants
+    (collection group NotificacoesAgendadas), das mais antigas para as mais novas.
+
+    Args:
+        ate: limite superior em ISO naive ("YYYY-MM-DDTHH:MM:SS"), mesmo formato
+             gravado em data_hora pelos criadores de notificação
+        limite: máximo de documentos por chamada
+
+    Returns:
+        {path_do_documento: dados} — o path identifica o tenant (Clientes/{id}/...)
+
+    [AVISO] Exige índice composto (avisado ASC, data_hora ASC) com escopo
+    "collection group" em NotificacoesAgendadas.
+    """
+    try:
+        query = (
+            client.collection_group("NotificacoesAgendadas")
+            .where("avisado", "==", False)
+            .where("data_hora", "<=", ate)
+            .order_by("data_hora")
+            .limit(int(limite))
+        )
+
+        resultado = {}
+        async for doc in query.stream():
+            resultado[doc.reference.path] = doc.to_dict()
+
+        return resultado
+
+    except Exception as e:
+        print(f"[ERRO] buscar_notificacoes_vencidas erro: {e}", flush=True)
+        return {}
+
 async def verificar_firebase():
     try:
         dados = await buscar_dados("Usuarios")  # ou outro caminho válido
@@ -138,38 +271,309 @@ async def verificar_firebase():
 # [OK] Buscar cliente (documento)
 async def buscar_cliente(user_id):
     try:
-        doc_ref = client.collection("Clientes").document(str(user_id))
-        doc = await doc_ref.get()
-        if doc.exists:
-            return doc.to_dict()
-        return None
+        return await buscar_perfil_em_cache(f"Clientes/{user_id}")
     except Exception as e:
         print(f"[ERRO] Erro ao buscar cliente: {e}")
         return None
 
+# ============================================================================
+# [CACHE] Perfis (Clientes/{id} e Clientes/{tenant}/Atores/{actor})
+# ============================================================================
+# Lidos várias vezes por mensagem (obter_id_dono, tipo_usuario, ator).
+# LRU + TTL por processo; toda escrita por estes helpers invalida a chave.
+# Escritas feitas por fora (SDK síncrono, outro processo) dependem do TTL
+# ou de invalidar_cache_perfil() explícito.
+
+cache_perfis = CacheLRUTTL("perfis", max_itens=5000, ttl_segundos=300, ttl_negativo_segundos=30)
+
+
+def eh_path_perfil(path: str) -> bool:
+    partes = str(path).strip("/").split("/")
+    if not partes or partes[0] != "Clientes":
+        return False
+    return len(partes) == 2 or (len(partes) == 4 and partes[2] == "Atores")
+
+
+def invalidar_cache_perfil(path: str) -> None:
+    """Hook de invalidação: chamar após escrever num documento de perfil."""
+    path = str(path).strip("/")
+    if eh_path_perfil(path):
+        cache_perfis.invalidar(path)
+
+
+# Outros caches em memória (ex: catalogo_service) se registram aqui para
+# serem avisados de toda escrita feita pelos helpers deste módulo.
+_ouvintes_escrita: list = []
+
+
+def registrar_ouvinte_escrita(funcao) -> None:
+    if funcao not in _ouvintes_escrita:
+        _ouvintes_escrita.append(funcao)
+
+
+def notificar_escrita(path: str) -> None:
+    invalidar_cache_perfil(path)
+    for funcao in _ouvintes_escrita:
+        try:
+            funcao(path)
+        except Exception as e:
+            print(f"[WARN] ouvinte de escrita falhou path={path}: {e}", flush=True)
+
+
+# leituras coalescidas do update em andamento também esquecem o que foi escrito
+registrar_ouvinte_escrita(invalidar_leituras_update)
+
+
+async def buscar_perfil_em_cache(path: str, carregar=None):
+    """
+    Documento de perfil via cache (cópia; None se não existe).
+    Erros de leitura propagam e não são guardados.
+    """
+    path = str(path).strip("/")
+
+    async def _ler_documento():
+        return await _ler_doc_firestore(path)
+
+    async def _obter():
+        return await cache_perfis.obter(path, carregar or _ler_documento)
+
+    dados = await ler_coalescido(("doc", path), path, _obter)
+    return copy.deepcopy(dados)
+
 # [OK] Buscar subcoleção (ex: Clientes/{id}/Tarefas)
+async def _ler_subcolecao(path: str):
+    ref = get_ref_from_path(path)
+    partes = path.split("/")
+    resultados = {}
+
+    if len(partes) % 2 == 1:  # subcoleção
+        docs = ref.stream()
+        async for doc in docs:
+            data = doc.to_dict()
+            print(f"[DOC] Documento encontrado em {path}/{doc.id}: {data}")
+            resultados[doc.id] = data
+        registrar_leitura_firestore(path, len(resultados))
+    else:
+        doc = await ref.get()
+        registrar_leitura_firestore(path)
+        if doc.exists:
+            print(f"[DOC] Documento único em {path}: {doc.to_dict()}")
+            resultados = doc.to_dict()
+    return resultados
+
+
 async def buscar_subcolecao(path: str):
     try:
-        ref = get_ref_from_path(path)
-        partes = path.split("/")
-        resultados = {}
-
-        if len(partes) % 2 == 1:  # subcoleção
-            docs = ref.stream()
-            async for doc in docs:
-                data = doc.to_dict()
-                print(f"[DOC] Documento encontrado em {path}/{doc.id}: {data}")
-                resultados[doc.id] = data
-        else:
-            doc = await ref.get()
-            if doc.exists:
-                print(f"[DOC] Documento único em {path}: {doc.to_dict()}")
-                resultados = doc.to_dict()
-        return resultados
+        return await ler_coalescido(("sub", path), path, lambda: _ler_subcolecao(path))
     except Exception as e:
         print(f"[ERRO] Erro ao buscar subcoleção '{path}': {e}")
         return {}
 
+# [OK] Consultar subcoleção com filtros no servidor (where/range + projeção)
+async def consultar_subcolecao(
+    path: str,
+    filtros: list | None = None,
+    campos: list | None = None,
+    ordenar_por: str | None = None,
+    limite: int | None = None,
+):
+    """
+    Lê apenas os documentos que atendem aos filtros, direto no Firestore.
+
+    Args:
+        path: caminho da subcoleção (ex: Clientes/{id}/Eventos)
+        filtros: lista de tuplas (campo, operador, valor),
+                 ex: [("data", ">=", "2026-06-01"), ("data", "<=", "2026-06-07")]
+        campos: projeção (select) — só esses campos voltam no documento
+        ordenar_por: campo para order_by ("-campo" = decrescente)
+        limite: máximo de documentos
+
+    Returns:
+        {doc_id: dados}
+
+    [AVISO] Igualdade/in num campo + range em OUTRO campo exige índice
+    composto no Firestore. Range + igualdade no MESMO campo não exige.
+    """
+    try:
+        resultados = await consultar(path, filtros, campos or None, ordenar_por, limite)
+
+        print(f"[QUERY] {path} filtros={filtros} campos={campos} docs={len(resultados)}", flush=True)
+        return resultados
+    except Exception as e:
+        print(f"[ERRO] Erro ao consultar subcoleção '{path}' filtros={filtros}: {e}")
+        return {}
+
+# [OK] Deletar em lote os documentos que atendem a uma query
+async def deletar_por_query(
+    path: str,
+    filtros: list,
+    grupo: bool = False,
+    lote: int = 400,
+):
+    """
+    Apaga os documentos filtrados usando WriteBatch (até `lote` por commit).
+
+    Args:
+        path: caminho da subcoleção, ou ID da coleção se grupo=True
+        filtros: lista de tuplas (campo, operador, valor)
+        grupo: usa collection_group(path) — todas as subcoleções com esse ID
+        lote: documentos por página/commit (limite do Firestore: 500)
+
+    Returns:
+        Quantidade de documentos removidos
+
+    [AVISO] Range em collection group exige o índice de campo único com
+    escopo "collection group" habilitado no Firestore.
+    """
+    removidos = 0
+    try:
+        while True:
+            query = client.collection_group(path) if grupo else get_ref_from_path(path)
+            for campo, operador, valor in filtros:
+                query = query.where(campo, operador, valor)
+            query = query.select([]).limit(lote)
+
+            batch = client.batch()
+            refs = []
+            async for doc in query.stream():
+                batch.delete(doc.reference)
+                refs.append(doc.reference)
+
+            qtd = len(refs)
+            if not qtd:
+                break
+
+            await batch.commit()
+            for ref in refs:
+                notificar_escrita(ref.path)
+            removidos += qtd
+            if qtd < lote:
+                break
+
+        print(f"[DELETE_QUERY] {path} grupo={grupo} filtros={filtros} removidos={removidos}", flush=True)
+        return removidos
+    except Exception as e:
+        print(f"[ERRO] Erro ao deletar por query '{path}' filtros={filtros}: {e}")
+        return removidos
+
+# [OK] Campo "data" dos eventos (backfill para a query por janela)
+# Eventos antigos sem "data" (ou com "DD/MM/YYYY") não entram no range da
+# query. A primeira busca de cada tenant grava "data" derivado de hora_inicio
+# / data_hora e um marcador, para não varrer de novo (nem em outro processo).
+VERSAO_INDICE_EVENTOS = 1
+_tenants_eventos_indexados: set = set()
+
+
+def path_marcador_indice_eventos(dono_id: str) -> str:
+    return f"Clientes/{dono_id}/Configuracao/eventos"
+
+
+def data_do_evento(evento: dict) -> str | None:
+    """Data "YYYY-MM-DD" do evento: campo data ou o dia de hora_inicio/data_hora ISO."""
+    data = str(evento.get("data") or "").strip()
+    for formato in ("%Y-%m-%d", "%d/%m/%Y"):
+        try:
+            return datetime.strptime(data, formato).strftime("%Y-%m-%d")
+        except ValueError:
+            pass
+    for campo in ("hora_inicio", "data_hora", "inicio"):
+        valor = str(evento.get(campo) or "").strip()
+        try:
+            return datetime.strptime(valor[:10], "%Y-%m-%d").strftime("%Y-%m-%d")
+        except ValueError:
+            continue
+    return None
+
+
+async def reindexar_data_eventos(dono_id: str) -> int:
+    """
+    Varredura única de Clientes/{dono_id}/Eventos gravando "data" onde falta
+    (ou está fora do formato ISO). Levanta erro se algum lote falhar.
+    """
+    eventos = await buscar_subcolecao(f"Clientes/{dono_id}/Eventos") or {}
+    atualizacoes = []
+    for event_id, evento in eventos.items():
+        data = data_do_evento(evento or {})
+        if data and evento.get("data") != data:
+            atualizacoes.append((f"Clientes/{dono_id}/Eventos/{event_id}", {"data": data}))
+
+    gravados = await atualizar_em_lote(atualizacoes) if atualizacoes else 0
+    print(f"[EVENTOS_REINDEXADOS] dono={dono_id} docs={gravados}/{len(atualizacoes)}", flush=True)
+    if gravados < len(atualizacoes):
+        raise RuntimeError(f"reindexação parcial: {gravados}/{len(atualizacoes)} eventos")
+    return gravados
+
+
+async def garantir_data_eventos(dono_id: str) -> None:
+    """Backfill preguiçoso do campo data; falha não bloqueia a busca (tenta de novo na próxima)."""
+    dono_id = str(dono_id)
+    if dono_id in _tenants_eventos_indexados:
+        return
+
+    try:
+        path = path_marcador_indice_eventos(dono_id)
+        marcador = await buscar_dado_em_path(path) or {}
+        if (marcador.get("versao_indice") or 0) < VERSAO_INDICE_EVENTOS:
+            await reindexar_data_eventos(dono_id)
+            await salvar_dado_em_path(path, {
+                "versao_indice": VERSAO_INDICE_EVENTOS,
+                "reindexado_em": datetime.now().isoformat(),
+            })
+        _tenants_eventos_indexados.add(dono_id)
+    except Exception as e:
+        print(f"[AVISO] Backfill do campo data falhou dono={dono_id}: {e}", flush=True)
+
+
+# [OK] Buscar eventos do tenant por janela de datas (query, não varredura)
+async def buscar_eventos_filtrados(
+    dono_id: str,
+    data_inicio: str | None = None,
+    data_fim: str | None = None,
+    profissional: str | None = None,
+    status: str | list | None = None,
+    campos: list | None = None,
+):
+    """
+    Eventos de Clientes/{dono_id}/Eventos filtrados no servidor.
+
+    - data_inicio/data_fim: "YYYY-MM-DD" (inclusivos). Iguais = um dia só.
+    - profissional: igualdade exata com o valor salvo no evento.
+    - status: valor único (==) ou lista (in, até 30 valores).
+    - campos: projeção; None = documento inteiro.
+
+    Leituras escalam com o tamanho da janela, não com o histórico (eventos
+    antigos sem "data" são corrigidos uma vez por garantir_data_eventos).
+
+    Returns:
+        {event_id: evento}
+    """
+    if data_inicio or data_fim:
+        await garantir_data_eventos(dono_id)
+
+    filtros = []
+
+    if data_inicio and data_fim and data_inicio == data_fim:
+        filtros.append(("data", "==", data_inicio))
+    else:
+        if data_inicio:
+            filtros.append(("data", ">=", data_inicio))
+        if data_fim:
+            filtros.append(("data", "<=", data_fim))
+
+    if profissional:
+        filtros.append(("profissional", "==", profissional))
+
+    if isinstance(status, (list, tuple, set)):
+        filtros.append(("status", "in", list(status)))
+    elif status:
+        filtros.append(("status", "==", status))
+
+    return await consultar_subcolecao(
+        f"Clientes/{dono_id}/Eventos",
+        filtros=filtros,
+        campos=campos,
+    )
+
 # [OK] Buscar tarefas do usuário
 async def buscar_tarefas_do_usuario(user_id: str):
     try:
@@ -200,6 +604,7 @@ async def salvar_dado_em_path(path: str, dados: dict):
             print(f"   - {k}: {v} (tipo: {type(v)})")
         ref = get_ref_from_path(path)
         await ref.set(dados, merge=True)  # [OK] ALTERAÇÃO AQUI
+        notificar_escrita(path)
         print(f"[OK] Dados salvos (merge) em: {path}")
         return True
     except Exception as e:
@@ -211,12 +616,41 @@ async def atualizar_dado_em_path(path: str, dados: dict):
     try:
         ref = get_ref_from_path(path)
         await ref.set(dados, merge=True)
+        notificar_escrita(path)
         print(f"[OK] Dados atualizados (merge) em: {path}")
         return True
     except Exception as e:
         print(f"[ERRO] Erro ao atualizar (merge) no caminho '{path}': {e}")
         return False
 
+# [OK] Atualizar vários documentos (merge) em WriteBatch
+async def atualizar_em_lote(atualizacoes: list, lote: int = 400) -> int:
+    """
+    Aplica set(merge=True) em vários documentos com poucos commits.
+
+    Args:
+        atualizacoes: lista de tuplas (path, dados)
+        lote: documentos por commit (limite do Firestore: 500)
+
+    Returns:
+        Quantidade de documentos gravados (commits que falharam não contam)
+    """
+    gravados = 0
+    for i in range(0, len(atualizacoes), lote):
+        parte = atualizacoes[i:i + lote]
+        try:
+            batch = client.batch()
+            for path, dados in parte:
+                batch.set(get_ref_from_path(path), dados, merge=True)
+            await batch.commit()
+            for path, _ in parte:
+                notificar_escrita(path)
+            gravados += len(parte)
+        except Exception as e:
+            print(f"[ERRO] Erro ao atualizar em lote ({len(parte)} docs): {e}")
+    print(f"[OK] Atualização em lote: {gravados}/{len(atualizacoes)} documentos", flush=True)
+    return gravados
+
 # [OK] Wrappers opcionais (nomes mais claros)
 # patch = merge
 async def patch_dado_em_path(path: str, dados: dict):
@@ -231,6 +665,7 @@ async def set_dado_em_path(path: str, dados: dict):
             print(f"   - {k}: {v} (tipo: {type(v)})")
         ref = get_ref_from_path(path)
         await ref.set(dados, merge=True)
+        notificar_escrita(path)
         print(f"[OK] Dados sobrescritos (set) em: {path}")
         return True
     except Exception as e:
@@ -242,6 +677,7 @@ async def deletar_dado_em_path(path: str):
     try:
         ref = get_ref_from_path(path)
         await ref.delete()
+        notificar_escrita(path)
         print(f"[DELETE] Dado deletado de: {path}")
         return True
     except Exception as e:
@@ -275,6 +711,7 @@ async def salvar_cliente(user_id: str, dados: dict):
     try:
         ref = client.collection("Clientes").document(user_id)
         await ref.set(dados, merge=True)
+        notificar_escrita(f"Clientes/{user_id}")
         print(f"[OK] Cliente {user_id} salvo com sucesso.")
         return True
     except Exception as e:
@@ -294,9 +731,9 @@ async def salvar_dados(colecao: str, dados: dict):
 # [OK] Buscar dado em path (documento)
 async def buscar_dado_em_path(path: str):
     try:
-        ref = get_ref_from_path(path)
-        doc = await ref.get()
-        return doc.to_dict() if doc.exists else None
+        if eh_path_perfil(path):
+            return await buscar_perfil_em_cache(path)
+        return await _ler_doc_coalescido(path)
     except Exception as e:
         print(f"[ERRO] Erro ao buscar dado em '{path}': {e}")
         return None
@@ -344,6 +781,7 @@ async def atualizar_com_operacoes_atomicas(path: str, dados: dict):
         from google.cloud import firestore
         ref = get_ref_from_path(path)
         await ref.update(dados)
+        notificar_escrita(path)
         print(f"[OK] Dados atualizados (operações atômicas) em: {path}")
         return True
     except Exception as e:
@@ -355,6 +793,7 @@ async def buscar_documento(path: str):
     return await buscar_dado_em_path(path)
 
 # [OK] Retorna o ID do dono, mesmo se for um cliente
+# (Clientes/{user_id} vem do cache de perfis — ver cache_perfis)
 async def obter_id_dono(user_id: str) -> str:
     cliente = await buscar_cliente(user_id)
     return cliente.get("id_negocio", user_id) if cliente else user_id
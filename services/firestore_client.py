@@ -29,6 +29,11 @@ def get_db():
     """
     global _firestore_client
 
+    # [REPO] Em coroutine use services.firebase_service_async (AsyncClient);
+    # com LOOP_DEBUG_BLOQUEIO=1 o uso deste cliente dentro do loop é reportado
+    from utils.monitor_loop import avisar_se_no_loop
+    avisar_se_no_loop("firestore_client.get_db")
+
     try:
         # Verificar se app já está inicializado
         firebase_admin.get_app()
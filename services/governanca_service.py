@@ -13,7 +13,7 @@ As decisões de bloqueio são implementadas em Sprint 2+.
 import asyncio
 from datetime import datetime, timezone
 from typing import Optional, Dict, Any
-from services.firestore_client import get_db
+from services.firebase_service_async import ler_documento, gravar_documento, consultar
 
 
 async def carregar_governanca(actor_id: str, tenant_id: str) -> Dict[str, Any]:
@@ -36,18 +36,15 @@ async def carregar_governanca(actor_id: str, tenant_id: str) -> Dict[str, Any]:
         #   "_tenant_id_guard": "tenant_abc"
         # }
     """
-    db = get_db()
-
     # Validar tenant_id_guard
     if not tenant_id:
         raise ValueError("tenant_id obrigatório para isolamento multi-tenant")
 
     try:
         path = f"Clientes/{tenant_id}/Governanca/{actor_id}"
-        doc = db.collection("Clientes").document(tenant_id).collection("Governanca").document(actor_id).get()
+        data = await ler_documento(path)
 
-        if doc.exists:
-            data = doc.to_dict()
+        if data is not None:
             # Validar tenant_id_guard
             if data.get("_tenant_id_guard") != tenant_id:
                 raise ValueError(f"Tenant mismatch: esperado {tenant_id}, encontrado {data.get('_tenant_id_guard')}")
@@ -85,8 +82,6 @@ async def salvar_governanca(
     Returns:
         True se sucesso, False se erro
     """
-    db = get_db()
-
     if not tenant_id:
         raise ValueError("tenant_id obrigatório")
 
@@ -128,7 +123,7 @@ async def salvar_governanca(
 
         # Salvar em Firestore
         path = f"Clientes/{tenant_id}/Governanca/{actor_id}"
-        db.collection("Clientes").document(tenant_id).collection("Governanca").document(actor_id).set(novo_documento)
+        await gravar_documento(path, novo_documento)
 
         # Registrar auditoria se houve mudança
         if responder_automaticamente is not None:
@@ -190,8 +185,6 @@ async def registrar_auditoria(
     Returns:
         True se sucesso, False se erro
     """
-    db = get_db()
-
     if not tenant_id:
         raise ValueError("tenant_id obrigatório")
 
@@ -222,7 +215,7 @@ async def registrar_auditoria(
 
         # Salvar em AuditoriaGovernanca
         path = f"Clientes/{tenant_id}/AuditoriaGovernanca/{evento_id}"
-        db.collection("Clientes").document(tenant_id).collection("AuditoriaGovernanca").document(evento_id).set(documento)
+        await gravar_documento(path, documento)
 
         return True
 
@@ -243,24 +236,19 @@ async def obter_auditoria_ator(actor_id: str, tenant_id: str, limit: int = 10) -
     Returns:
         Lista de documentos de auditoria
     """
-    db = get_db()
-
     if not tenant_id:
         return []
 
     try:
         path = f"Clientes/{tenant_id}/AuditoriaGovernanca"
-        docs = db.collection("Clientes").document(tenant_id).collection("AuditoriaGovernanca")\
-            .where("actor_id_afetado", "==", actor_id)\
-            .order_by("timestamp", direction="DESCENDING")\
-            .limit(limit)\
-            .stream()
-
-        auditoria = []
-        for doc in docs:
-            auditoria.append(doc.to_dict())
-
-        return auditoria
+        docs = await consultar(
+            path,
+            filtros=[("actor_id_afetado", "==", actor_id)],
+            ordenar_por="-timestamp",
+            limite=limit,
+        )
+
+        return list(docs.values())
 
     except Exception as e:
         print(f"Erro ao obter auditoria de {actor_id} em {tenant_id}: {e}")
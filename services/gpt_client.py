@@ -2,5 +2,11 @@
 import os
 from openai import AsyncOpenAI
 
-# Reusable OpenAI client for GPT interactions
-client = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+# Reusable OpenAI client for GPT interactions.
+# Retries/timeouts ficam no services/llm_gateway (max_retries=0 aqui para não repetir em dobro);
+# LLM_BASE_URL aponta para outro servidor compatível com a API da OpenAI.
+client = AsyncOpenAI(
+    api_key=os.getenv("OPENAI_API_KEY"),
+    base_url=os.getenv("LLM_BASE_URL") or None,
+    max_retries=0,
+)
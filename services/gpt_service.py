@@ -8,6 +8,12 @@ import inspect
 import unidecode  # se preferir, troque por: from unidecode import unidecode
 from datetime import datetime, timedelta
 from prompts.manual_secretaria import INSTRUCAO_SECRETARIA
+from prompts.instrucoes_p1 import (
+    INSTRUCAO_INTERPRETACAO_OPERACIONAL,
+    INSTRUCAO_RESPOSTA_P1,
+    INSTRUCOES_HUMANA_AGENDAMENTO,
+    TIPOS_RESPOSTA_P1,
+)
 from utils.contexto_temporario import (
     carregar_contexto_temporario,
     salvar_contexto_temporario,
@@ -28,7 +34,9 @@ from services.profissional_service import (
     encontrar_servico_mais_proximo,
     consultar_todos_precos,
 )
-from services.gpt_client import client
+from services.llm_gateway import chamar_llm
+from services.roteamento_modelos import modelo_para, tenant_llm_atual
+from utils.projecao_contexto import contar_tokens_mensagens, json_contexto, nome_tokenizador
 from utils.gpt_utils import (
     montar_prompt_com_contexto,
     formatar_descricao_evento,
@@ -130,21 +138,21 @@ async def processar_com_gpt_com_acao(
         # Se contexto não tem profissionais, carregar do Firestore
         if not (contexto.get("profissionais") and len(contexto.get("profissionais", [])) > 0):
             try:
-                from services.firebase_service_async import obter_id_dono, buscar_subcolecao
+                from services.firebase_service_async import obter_id_dono
+                from services.catalogo_service import obter_catalogo
 
                 tenant_id = await obter_id_dono(user_id)
                 print(f"[GPT_CONTEXT_PROF_FIX] actor_id={user_id}", flush=True)
                 print(f"[GPT_CONTEXT_PROF_FIX] tenant_id={tenant_id}", flush=True)
 
-                # Buscar profissionais do tenant
-                profs_dict = await buscar_subcolecao(f"Clientes/{tenant_id}/Profissionais") or {}
+                # Profissionais do tenant (catálogo em cache)
+                catalogo = await obter_catalogo(tenant_id)
                 profissionais = [
                     {
-                        "nome": p.get("nome"),
-                        "servicos": p.get("servicos", [])
+                        "nome": nome,
+                        "servicos": catalogo.servicos_de(nome)
                     }
-                    for p in profs_dict.values()
-                    if p.get("nome")
+                    for nome in catalogo.nomes
                 ]
                 contexto["profissionais"] = profissionais
 
@@ -1094,30 +1102,28 @@ async def processar_com_gpt_com_acao(
 
             import json
             payload_size = len(json.dumps(messages, ensure_ascii=False))
-            tokens_estimados = payload_size / 4
             print(
                 f"🧪 [PROMPT_SIZE] chars={payload_size} msgs={len(messages)}",
                 flush=True
             )
             print(
-                f"🧪 [PROMPT_TOKENS_EST] {int(tokens_estimados)}",
+                f"🧪 [PROMPT_TOKENS] {contar_tokens_mensagens(messages)} ({nome_tokenizador()})",
                 flush=True
             )
 
-            resposta = await client.chat.completions.create(
-                model="gpt-4o",
+            modelo = await modelo_para("gpt_com_acao", uid)
+            resposta = await chamar_llm(
+                messages,
+                model=modelo,
                 temperature=0.4,
-                messages=messages,
+                tenant_id=uid,
+                origem="processar_com_gpt_com_acao",
             )
 
             print("🧪 [GPT_ROUTE] CALL_1_END", flush=True)
 
-            # custo (somente se resposta existe)
-            # [INFRA-03] Usar singleton de firestore_client em vez de criar cliente independente
-            from services.firestore_client import get_db
-            firestore_client = get_db()
-
-            await registrar_custo_gpt(resposta, "gpt-4o", uid, firestore_client)
+            # custo (somente se resposta existe) — gravado pelo AsyncClient, sem bloquear o loop
+            await registrar_custo_gpt(resposta, modelo, uid)
 
         except Exception as e:
             print(f"❌ Erro ao chamar OpenAI: {type(e).__name__}: {e}", flush=True)
@@ -2577,26 +2583,27 @@ async def processar_com_gpt_com_acao(
 
             import json
             payload_size = len(json.dumps(messages, ensure_ascii=False))
-            tokens_estimados = payload_size / 4
             print(
                 f"🧪 [PROMPT_SIZE] chars={payload_size} msgs={len(messages)}",
                 flush=True
             )
             print(
-                f"🧪 [PROMPT_TOKENS_EST] {int(tokens_estimados)}",
+                f"🧪 [PROMPT_TOKENS] {contar_tokens_mensagens(messages)} ({nome_tokenizador()})",
                 flush=True
             )
 
-            resposta = await client.chat.completions.create(
-                model="gpt-4o", temperature=0.4, messages=messages
+            modelo = await modelo_para("gpt_com_acao", user_id)
+            resposta = await chamar_llm(
+                messages,
+                model=modelo,
+                temperature=0.4,
+                tenant_id=user_id,
+                origem="processar_com_gpt_com_acao",
             )
 
             print("🧪 [GPT_ROUTE] CALL_2_END", flush=True)
 
-            # [INFRA-03] Usar singleton de firestore_client em vez de criar cliente independente
-            from services.firestore_client import get_db
-            firestore_client = get_db()
-            await registrar_custo_gpt(resposta, "gpt-4o", user_id, firestore_client)
+            await registrar_custo_gpt(resposta, modelo, user_id)
 
             try:
                 conteudo = resposta.choices[0].message.content
@@ -3358,56 +3365,30 @@ Responda apenas com o plano formatado.
         print(f"[GPT] Erro ao organizar semana: {e}", flush=True)
         return "❌ Houve um erro ao tentar planejar sua semana."
 
+def _prompt_interpretacao_operacional(texto: str, ctx: dict) -> list:
+    """
+    Mensagens da interpretação: instrução fixa primeiro (prefixo idêntico em
+    toda chamada → cache de prompt do provedor), mensagem e contexto projetado
+    (perfil "interpretacao_operacional") no fim.
+    """
+    return [
+        {"role": "system", "content": INSTRUCAO_INTERPRETACAO_OPERACIONAL},
+        {
+            "role": "user",
+            "content": f'Mensagem:\n"{texto}"\n\nContexto atual:\n{json_contexto(ctx, "interpretacao_operacional")}',
+        },
+    ]
+
+
 async def interpretar_linguagem_operacional_gpt(texto: str, ctx: dict) -> dict:
     try:
 
-        prompt = f"""
-Você é um interpretador de linguagem para uma secretária de salão.
-
-Sua função é transformar a fala do cliente em intenção estruturada.
-
-REGRAS ABSOLUTAS:
-- NÃO sugerir horário
-- NÃO confirmar agendamento
-- NÃO tomar decisão
-- NÃO inventar dados
-- NÃO responder texto humano
-- Apenas interpretar
-
-Retorne JSON com:
-
-{{
-  "intencao": "...",
-  "tipo_ajuste": "...",
-  "entidades": {{}},
-  "confianca": 0-100
-}}
-
-Possíveis intenções:
-- agendamento_direto
-- ajuste_incremental
-- cancelamento
-- consulta
-- indefinida
-
-Tipos de ajuste:
-- data
-- horario
-- profissional
-- servico
-- periodo
-
-Mensagem:
-\"{texto}\"
-
-Contexto atual:
-{json.dumps(ctx, ensure_ascii=False)}
-"""
-
-        resposta = await client.chat.completions.create(
-            model="gpt-4o",
+        resposta = await chamar_llm(
+            _prompt_interpretacao_operacional(texto, ctx),
+            model=await modelo_para("interpretacao_operacional"),
             temperature=0.2,
-            messages=[{"role": "system", "content": prompt}]
+            tenant_id=tenant_llm_atual(),
+            origem="interpretar_linguagem_operacional_gpt",
         )
 
         conteudo = resposta.choices[0].message.content.strip()
@@ -3424,247 +3405,109 @@ Contexto atual:
             "motivo": "erro_gpt_interpretacao",
         }
 
-async def gerar_resposta_humana_agendamento(contexto_decisao: dict) -> str:
-
-    try:
-        tipo = (contexto_decisao or {}).get("tipo")
-
-        if tipo == "cancelamento_confirmacao":
-            prompt = f"""
-Você é uma secretária profissional de salão respondendo pelo WhatsApp.
-
-O cliente desistiu de um agendamento que ainda NÃO foi confirmado.
-
-Sua função é apenas responder de forma curta, natural e profissional.
-
-REGRAS ABSOLUTAS:
-- Não confirme agendamento.
-- Não diga que cancelou evento, porque o evento ainda não foi criado.
-- Não ofereça horário.
-- Não tente convencer o cliente.
-- Não invente informação.
-- Responda no máximo em 1 frase.
-- Seja humana, simples e objetiva.
-
-Contexto:
-{json.dumps(contexto_decisao, ensure_ascii=False)}
-
-Exemplos de estilo:
-
-"Sem problema, não vou marcar então."
-"Combinado, deixei sem agendar."
-"Beleza, então não vou agendar 😊"
-"Perfeito, deixei sem marcar 👍"
-"Tranquilo, não segui com o agendamento"
-"Ok, parei por aqui então"
-"Sem problema, não reservei esse horário"
-
-Retorne SOMENTE JSON:
-{{
-  "resposta": "texto"
-}}
-"""
-        elif tipo == "conflito_agenda":
-            prompt = f"""
-Você é uma atendente de salão respondendo pelo WhatsApp.
-
-Sua função é acolher uma dúvida, insistência ou objeção do cliente durante um conflito de agenda.
+def _mensagens_redacao(instrucao: str, contexto_json: str) -> list:
+    """Instrução fixa do tipo primeiro; a decisão da vez vai por último."""
+    return [
+        {"role": "system", "content": instrucao},
+        {"role": "user", "content": f"Contexto:\n{contexto_json}"},
+    ]
 
-REGRAS ABSOLUTAS:
 
-- Não invente horário.
-- Não invente profissional.
-- Não confirme agendamento.
-- Não diga que agendou.
-- Não escolha pelo cliente.
-- Use somente os dados do contexto.
-- Seja natural, curta e objetiva.
-- Não use linguagem genérica de suporte.
+def _prompt_resposta_humana_agendamento(contexto_decisao: dict) -> list:
 
-COMPORTAMENTO:
-
-- Na primeira sugestão:
-  - Cite horários disponíveis com a profissional original.
-  - Cite profissionais alternativos, se existirem.
-  - Termine com pergunta entre opções.
-
- Se o cliente rejeitar os horários:
-  - NÃO repita as opções.
-  - Pergunte qual horário seria melhor para ele.
-
-- Se o cliente perguntar por um horário específico e ele não estiver disponível:
-  - Informe que não há esse horário com a profissional original.
-  - Cite apenas o horário mais próximo disponível.
-  - Se houver profissionais alternativos:
-    - NÃO use frases vagas como "posso verificar".
-    - Diga diretamente quais profissionais estão disponíveis.
-    - Use estrutura clara:
-
-      "Se quiser manter esse horário, tenho estas profissionais disponíveis: {lista}"
-
-      OU
-
-      "Se quiser manter próximo desse horário, tenho estas profissionais: {lista}"
-
-- Se o cliente pedir "mais cedo":
-  - Direcione para horários anteriores.
-
-- Se o cliente pedir "outro dia":
-  - Pergunte qual dia ele prefere.
-
-Contexto:
-{json.dumps(contexto_decisao, ensure_ascii=False)}
-
-Estilo desejado:
-"Entendi 😊 Qual horário seria melhor pra você?"
-
-"Claro. Você prefere tentar mais cedo, mais tarde ou outro dia?"
-
-"Sem problema. Me diga um horário melhor e eu verifico pra você."
-
-Retorne SOMENTE JSON:
-{{
-  "resposta": "texto"
-}}
-"""
-
-        elif tipo == "duvida_confianca_profissional":
-            prompt = f"""
-Você é uma atendente de salão respondendo pelo WhatsApp.
-
-O cliente está inseguro sobre uma profissional sugerida pelo sistema.
-
-Sua função é responder de forma humana, comercial e curta, sem sair do trilho do agendamento.
-
-REGRAS ABSOLUTAS:
-
-- Use somente os dados do contexto.
-- Não invente avaliações, reputação, experiência, certificados ou histórico da profissional.
-- Não diga que uma profissional é melhor que a outra.
-- Não diminua nenhuma profissional.
-- Sempre transmita segurança equivalente entre as profissionais.
-- Explique que a sugestão aconteceu por disponibilidade de agenda, quando essa informação estiver no contexto.
-- Não invente horário.
-- Não invente disponibilidade.
-- Não confirme agendamento.
-- Não diga que agendou.
-- Não escolha pelo cliente.
-- Termine conduzindo para confirmação do horário sugerido.
-- Responda em até 3 frases.
-- Seja natural, acolhedora e objetiva.
-- Não use linguagem genérica de suporte.
-- Nunca diga que existem profissionais disponíveis
-  se profissionais_permitidos não vier preenchido.
-
-ESTRUTURA IDEAL:
-
-1. Acolha a insegurança do cliente.
-2. Explique o motivo operacional da sugestão.
-3. Reforce equivalência profissional sem inventar fatos.
-4. Conduza para confirmação.
-
-Contexto:
-{json.dumps(contexto_decisao, ensure_ascii=False)}
+    try:
+        instrucao = INSTRUCOES_HUMANA_AGENDAMENTO.get((contexto_decisao or {}).get("tipo"))
+        if not instrucao:
+            return []
 
-Exemplos de estilo:
+        return _mensagens_redacao(
+            instrucao, json_contexto(contexto_decisao, "resposta_humana_agendamento")
+        )
 
-"Entendo 😊 A diferença aqui foi mais pela disponibilidade mesmo: nesse horário, {contexto_decisao.get("profissional_indisponivel", "a outra profissional")} não apareceu disponível, e {contexto_decisao.get("profissional_disponivel", "a profissional sugerida")} está livre. Ela também consegue te atender muito bem para {contexto_decisao.get("servico", "esse serviço")}; posso manter esse horário com ela?"
+    except Exception as e:
+        print(f"❌ erro gerar_resposta_humana_agendamento: {e}")
+        return []
 
-"Super entendo sua dúvida 😊 Para esse horário, quem apareceu disponível foi {contexto_decisao.get("profissional_disponivel", "a profissional sugerida")}. Ela também atende {contexto_decisao.get("servico", "esse serviço")} muito bem; quer que eu deixe reservado com ela?"
 
-"Claro, entendo 😊 Foi uma questão de disponibilidade nesse horário. {contexto_decisao.get("profissional_disponivel", "A profissional sugerida")} também consegue te atender muito bem para {contexto_decisao.get("servico", "esse serviço")}; posso confirmar com ela?"
+async def _redigir_resposta(
+    mensagens: list, temperatura: float, estilo: str | None, origem: str, rota: str = "resposta_p1",
+    modelo: str | None = None,
+) -> tuple:
+    """Uma chamada de redação P1 (`modelo` ou o da `rota`) → (resposta, tokens usados); ("", 0) em erro."""
+    try:
+        messages = list(mensagens)
+        if estilo:
+            # logo depois da instrução fixa: o prefixo continua igual entre tenants do mesmo estilo
+            messages.insert(1, {
+                "role": "system",
+                "content": f"Estilo de atendimento do salão: {estilo} (formal = sem gírias; casual = leve e próximo).",
+            })
+
+        resposta = await chamar_llm(
+            messages,
+            model=modelo or await modelo_para(rota),
+            temperature=temperatura,
+            tenant_id=tenant_llm_atual(),
+            origem=origem,
+        )
 
-Retorne SOMENTE JSON:
-{{
-  "resposta": "texto"
-}}
-"""
-        elif tipo == "opcoes_profissionais_disponiveis":
-            prompt = f"""
-Você é uma atendente de salão respondendo pelo WhatsApp.
-
-Sua função é informar ao cliente quais profissionais estão disponíveis para o horário solicitado.
-
-REGRAS ABSOLUTAS:
-- Use somente os dados do contexto.
-- Não invente profissional.
-- Não invente horário.
-- Não invente serviço.
-- Não confirme agendamento.
-- Não escolha pelo cliente.
-- Se houver várias profissionais, pergunte qual o cliente prefere.
-- Se houver uma única profissional, pergunte se pode seguir com ela.
-- Responda em até 3 frases.
-- Seja natural, comercial e objetiva.
-
-Contexto:
-{json.dumps(contexto_decisao, ensure_ascii=False)}
-
-Retorne SOMENTE JSON:
-{{
-  "resposta": "texto"
-}}
-"""
+        conteudo = resposta.choices[0].message.content.strip()
+        data = json.loads(conteudo)
 
-        elif tipo == "confirmacao_profissional_escolhido":
-            prompt = f"""
-Você é uma atendente de salão respondendo pelo WhatsApp.
+        usage = getattr(resposta, "usage", None)
+        return data.get("resposta", ""), getattr(usage, "total_tokens", 0) or 0
 
-O cliente acabou de escolher uma profissional entre opções disponíveis.
+    except Exception as e:
+        print(f"❌ erro {origem}: {e}")
+        return "", 0
 
-Sua função é confirmar a escolha de forma humana e conduzir para a confirmação final do agendamento.
 
-REGRAS ABSOLUTAS:
-- Use somente os dados do contexto.
-- Não invente profissional.
-- Não invente horário.
-- Não invente serviço.
-- Não diga que já agendou.
-- Não diga que confirmou.
-- Não escolha pelo cliente, pois ele já escolheu.
-- Não use a frase "está disponível", porque isso já foi informado antes.
-- Use linguagem de continuidade, como "consegue te atender", "deixo com ela" ou "seguimos com ela".
-- Termine perguntando se pode seguir com o agendamento.
-- Responda em até 2 frases.
-- Seja natural, comercial e objetiva.
+async def gerar_resposta_humana_agendamento(contexto_decisao: dict, estilo: str | None = None) -> str:
+    """
+    Redação humana de decisões de agendamento (cancelamento, conflito,
+    profissionais). Passa pelo cache de respostas P1 (services/cache_respostas_p1).
+    """
+    from services.cache_respostas_p1 import estilo_do_tenant, responder_com_cache
 
-Contexto:
-{json.dumps(contexto_decisao, ensure_ascii=False)}
+    mensagens = _prompt_resposta_humana_agendamento(contexto_decisao)
+    if not mensagens:
+        return ""
 
-Exemplos de estilo:
+    try:
+        estilo = estilo or (contexto_decisao or {}).get("estilo") or await estilo_do_tenant()
+        modelo = await modelo_para("resposta_humana_agendamento")
+        return await responder_com_cache(
+            "humana_agendamento",
+            contexto_decisao,
+            lambda: _redigir_resposta(
+                mensagens, 0.6, estilo, "gerar_resposta_humana_agendamento",
+                rota="resposta_humana_agendamento", modelo=modelo,
+            ),
+            estilo=estilo,
+            modelo=modelo,
+        )
+    except Exception as e:
+        print(f"❌ erro gerar_resposta_humana_agendamento: {e}")
+        return ""
 
-"Perfeito 😊 A Carla consegue te atender às 14h para escova. Posso confirmar o agendamento?"
 
-"Combinado 😊 Então seguimos com a Carla às 14h para escova. Posso confirmar?"
+def _prompt_resposta_p1(contexto_decisao: dict) -> list:
 
-"Ótimo 😊 Deixo com a Carla às 14h para escova?"
+    try:
+        tipo = (contexto_decisao or {}).get("tipo")
 
-Retorne SOMENTE JSON:
-{{
-  "resposta": "texto"
-}}
-"""
-        else:
-            return ""
+        if tipo not in TIPOS_RESPOSTA_P1:
+            return []
 
-        resposta = await client.chat.completions.create(
-            model="gpt-4o",
-            temperature=0.6,
-            messages=[
-                {"role": "system", "content": prompt}
-            ]
+        return _mensagens_redacao(
+            INSTRUCAO_RESPOSTA_P1, json_contexto(contexto_decisao, "resposta_p1")
         )
 
-        conteudo = resposta.choices[0].message.content.strip()
-        data = json.loads(conteudo)
-
-        return data.get("resposta", "")
-
     except Exception as e:
-        print(f"❌ erro gerar_resposta_humana_agendamento: {e}")
-        return ""
+        print(f"❌ erro gerar_resposta_p1: {e}")
+        return []
 
-async def gerar_resposta_p1(contexto_decisao: dict) -> str:
+async def gerar_resposta_p1(contexto_decisao: dict, estilo: str | None = None) -> str:
     """
     Camada P1 oficial:
     - recebe decisão P0 já pronta
@@ -3672,82 +3515,25 @@ async def gerar_resposta_p1(contexto_decisao: dict) -> str:
     - não verifica conflito
     - não cria evento
     - apenas transforma contexto em resposta humana
+    - redações reaproveitadas pelo cache de respostas P1 (services/cache_respostas_p1)
     """
+    from services.cache_respostas_p1 import estilo_do_tenant, responder_com_cache
 
-    try:
-        tipo = (contexto_decisao or {}).get("tipo")
-
-        if tipo not in [
-            "pedir_servico",
-            "pedir_profissional",
-            "pedir_data",
-            "pedir_horario",
-            "listar_opcoes_profissionais",
-            "listar_opcoes_servicos",
-            "fallback_clareza",
-            "confirmar_agendamento",
-        ]:
-            return ""
-
-        prompt = f"""
-Você é uma atendente profissional de salão respondendo pelo WhatsApp.
-
-Sua função é transformar uma decisão operacional já tomada pelo sistema em uma resposta humana, curta e comercial.
-
-REGRAS ABSOLUTAS:
-- Use somente os dados do contexto.
-- Não invente serviço.
-- Não invente horário.
-- Não invente profissional.
-- Não calcule disponibilidade.
-- Não verifique agenda.
-- Não diga que agendou.
-- Não diga que confirmou.
-- Não escolha pelo cliente.
-- Nunca diga que existem profissionais disponíveis se profissionais_permitidos estiver vazio.
-- Nunca diga "todos os profissionais", "temos profissionais disponíveis" ou similar sem lista explícita no contexto.
-- Se profissionais_permitidos vier vazio, apenas pergunte qual profissional o cliente prefere.
-- Se tipo for confirmar_agendamento, a resposta deve deixar claro que é uma confirmação pendente.
-- Se tipo for confirmar_agendamento, nunca diga que já está agendado.
-- Se tipo for confirmar_agendamento, sempre peça uma confirmação final do cliente.
-- Se tipo for listar_profissionais_aptos, diga apenas que esses profissionais atendem o serviço; não diga que estão disponíveis no horário.
-- Não explique regra interna.
-- Responda em até 3 frases.
-- Seja natural, objetiva e comercial.
-
-TIPOS POSSÍVEIS:
-- pedir_servico
-- pedir_profissional
-- pedir_data
-- pedir_horario
-- listar_opcoes_profissionais
-- listar_opcoes_servicos
-- fallback_clareza
-- confirmar_agendamento
-- listar_profissionais_aptos
-
-Contexto:
-{json.dumps(contexto_decisao, ensure_ascii=False)}
-
-Retorne SOMENTE JSON:
-{{
-  "resposta": "texto"
-}}
-"""
+    mensagens = _prompt_resposta_p1(contexto_decisao)
+    if not mensagens:
+        return ""
 
-        resposta = await client.chat.completions.create(
-            model="gpt-4o",
-            temperature=0.5,
-            messages=[
-                {"role": "system", "content": prompt}
-            ]
+    try:
+        # estilo explícito > da decisão > do tenant da mensagem (configuracao/dados)
+        estilo = estilo or (contexto_decisao or {}).get("estilo") or await estilo_do_tenant()
+        modelo = await modelo_para("resposta_p1")
+        return await responder_com_cache(
+            "p1",
+            contexto_decisao,
+            lambda: _redigir_resposta(mensagens, 0.5, estilo, "gerar_resposta_p1", modelo=modelo),
+            estilo=estilo,
+            modelo=modelo,
         )
-
-        conteudo = resposta.choices[0].message.content.strip()
-        data = json.loads(conteudo)
-
-        return data.get("resposta", "")
-
     except Exception as e:
         print(f"❌ erro gerar_resposta_p1: {e}")
-        return ""
\ No newline at end of file
+        return ""
@@ -2,10 +2,14 @@
 # Responsabilidade: Resolver e gerenciar identidades (dono, profissional, cliente)
 # Canal → actor_id → tenant_id → tipo_usuario → permissões
 
-import asyncio
 from datetime import datetime
 import pytz
-from services.firestore_client import get_db
+from services.firebase_service_async import (
+    buscar_perfil_em_cache,
+    gravar_documento,
+    atualizar_documento,
+    consultar,
+)
 
 # Normalização de canal e identificador
 CANAIS_VALIDOS = ["whatsapp", "sms", "voz", "email", "web"]
@@ -44,6 +48,15 @@ def normalizar_actor_id(canal: str, identificador: str) -> str:
     return actor_id
 
 
+def _ator_path(tenant_id: str, actor_id: str) -> str:
+    return f"Clientes/{tenant_id}/Atores/{actor_id}"
+
+
+async def _buscar_ator(tenant_id: str, actor_id: str) -> dict | None:
+    """Documento do ator via cache de perfis (AsyncClient no miss)."""
+    return await buscar_perfil_em_cache(_ator_path(tenant_id, actor_id))
+
+
 async def resolver_ator_por_canal(tenant_id: str, canal: str, identificador: str) -> dict | None:
     """
     Resolve um ator existente pelo canal e identificador.
@@ -63,14 +76,7 @@ async def resolver_ator_por_canal(tenant_id: str, canal: str, identificador: str
 
     try:
         actor_id = normalizar_actor_id(canal, identificador)
-
-        doc = await asyncio.to_thread(
-            lambda: get_db().collection("Clientes").document(tenant_id).collection("Atores").document(actor_id).get()
-        )
-
-        if doc.exists:
-            return doc.to_dict()
-        return None
+        return await _buscar_ator(tenant_id, actor_id)
     except Exception as e:
         print(f"[ERRO] Resolver ator: {e}")
         return None
@@ -114,9 +120,7 @@ async def criar_ator_dono(tenant_id: str, canal: str, identificador: str, nome:
             "permissoes": ["admin", "ler", "escrever", "deletar"]
         }
 
-        await asyncio.to_thread(
-            lambda: get_db().collection("Clientes").document(tenant_id).collection("Atores").document(actor_id).set(ator_data)
-        )
+        await gravar_documento(_ator_path(tenant_id, actor_id), ator_data)
 
         print(f"[OK] Ator DONO criado: {actor_id} (tenant: {tenant_id})")
         return ator_data
@@ -161,9 +165,7 @@ async def criar_ator_cliente_automatico(tenant_id: str, canal: str, identificado
             "permissoes": ["ler", "agendamento"]
         }
 
-        await asyncio.to_thread(
-            lambda: get_db().collection("Clientes").document(tenant_id).collection("Atores").document(actor_id).set(ator_data)
-        )
+        await gravar_documento(_ator_path(tenant_id, actor_id), ator_data)
 
         # Registrar também na coleção Clientes para histórico
         cliente_data = {
@@ -187,9 +189,7 @@ async def criar_ator_cliente_automatico(tenant_id: str, canal: str, identificado
             "total_agendamentos": 0
         }
 
-        await asyncio.to_thread(
-            lambda: get_db().collection("Clientes").document(tenant_id).collection("Clientes").document(actor_id).set(cliente_data)
-        )
+        await gravar_documento(f"Clientes/{tenant_id}/Clientes/{actor_id}", cliente_data)
 
         print(f"[OK] Ator CLIENTE criado automaticamente: {actor_id} (tenant: {tenant_id})")
         return ator_data
@@ -235,9 +235,7 @@ async def criar_ator_profissional(tenant_id: str, canal: str, identificador: str
             "permissoes": ["ler", "operacional"]
         }
 
-        await asyncio.to_thread(
-            lambda: get_db().collection("Clientes").document(tenant_id).collection("Atores").document(actor_id).set(ator_data)
-        )
+        await gravar_documento(_ator_path(tenant_id, actor_id), ator_data)
 
         print(f"[OK] Ator PROFISSIONAL criado: {actor_id} (tenant: {tenant_id})")
         return ator_data
@@ -264,14 +262,10 @@ async def roteador_por_tipo_usuario(tenant_id: str, actor_id: str) -> dict | Non
         return None
 
     try:
-        doc = await asyncio.to_thread(
-            lambda: get_db().collection("Clientes").document(tenant_id).collection("Atores").document(actor_id).get()
-        )
-
-        if not doc.exists:
+        ator = await _buscar_ator(tenant_id, actor_id)
+        if not ator:
             return None
 
-        ator = doc.to_dict()
         return {
             "tipo_usuario": ator.get("tipo_usuario"),
             "ator": ator
@@ -298,12 +292,10 @@ async def atualizar_ultimo_contato(tenant_id: str, actor_id: str) -> bool:
     try:
         now = datetime.now(pytz.UTC).isoformat()
 
-        await asyncio.to_thread(
-            lambda: get_db().collection("Clientes").document(tenant_id).collection("Clientes").document(actor_id).update({
-                "ultimo_contato_em": now,
-                "atualizado_em": now
-            })
-        )
+        await atualizar_documento(f"Clientes/{tenant_id}/Clientes/{actor_id}", {
+            "ultimo_contato_em": now,
+            "atualizado_em": now
+        })
         return True
     except Exception as e:
         print(f"[AVISO] Atualizar último contato: {e}")
@@ -325,17 +317,13 @@ async def buscar_profissional_por_nome(tenant_id: str, nome: str) -> dict | None
         return None
 
     try:
-        docs = await asyncio.to_thread(
-            lambda: list(get_db().collection("Clientes").document(tenant_id).collection("Atores")
-                    .where("tipo_usuario", "==", "profissional")
-                    .where("nome", "==", nome)
-                    .limit(1)
-                    .stream())
+        docs = await consultar(
+            f"Clientes/{tenant_id}/Atores",
+            filtros=[("tipo_usuario", "==", "profissional"), ("nome", "==", nome)],
+            limite=1,
         )
 
-        if docs:
-            return docs[0].to_dict()
-        return None
+        return next(iter(docs.values()), None)
     except Exception as e:
         print(f"[ERRO] Buscar profissional: {e}")
         return None
@@ -355,14 +343,12 @@ async def listar_profissionais(tenant_id: str) -> list:
         return []
 
     try:
-        docs = await asyncio.to_thread(
-            lambda: list(get_db().collection("Clientes").document(tenant_id).collection("Atores")
-                    .where("tipo_usuario", "==", "profissional")
-                    .where("ativo", "==", True)
-                    .stream())
+        docs = await consultar(
+            f"Clientes/{tenant_id}/Atores",
+            filtros=[("tipo_usuario", "==", "profissional"), ("ativo", "==", True)],
         )
 
-        return [doc.to_dict() for doc in docs]
+        return list(docs.values())
     except Exception as e:
         print(f"[ERRO] Listar profissionais: {e}")
         return []
@@ -388,12 +374,11 @@ async def tenant_tem_dono(tenant_id: str) -> bool:
         return False
 
     try:
-        docs = await asyncio.to_thread(
-            lambda: list(get_db().collection("Clientes").document(tenant_id).collection("Atores")
-                    .where("tipo_usuario", "==", "dono")
-                    .where("ativo", "==", True)
-                    .limit(1)
-                    .stream())
+        docs = await consultar(
+            f"Clientes/{tenant_id}/Atores",
+            filtros=[("tipo_usuario", "==", "dono"), ("ativo", "==", True)],
+            campos=[],
+            limite=1,
         )
 
         tem_dono = len(docs) > 0
@@ -0,0 +1,227 @@
+# services/importacao_profissionais_service.py
+"""
+Importação de profissionais por planilha (.xlsx ou .csv), em streaming.
+
+- lê a planilha linha a linha (openpyxl read_only / csv.reader) numa thread,
+  sem carregar o arquivo inteiro em memória;
+- valida cada linha e descarta nomes repetidos (normalizados: sem acento,
+  sem diferença de maiúsculas); nome que já existe no catálogo regrava o
+  mesmo documento em vez de criar outro;
+- grava em WriteBatch de até LOTE_IMPORTACAO documentos (merge);
+- chama ao_progresso(relatorio) a cada lote gravado;
+- atualiza o catálogo do tenant uma vez no fim.
+
+    relatorio = await importar_profissionais(path, dono_id, ao_progresso=callback)
+    # {"status", "linhas", "importados", "duplicados", "lotes", "erros": [(linha, motivo)], "avisos": [...]}
+"""
+
+import asyncio
+import csv
+import logging
+
+from services.catalogo_service import invalidar_catalogo, normalizar_termo, obter_catalogo
+from services.firebase_service_async import atualizar_em_lote
+
+logger = logging.getLogger(__name__)
+
+LOTE_IMPORTACAO = 500           # limite do Firestore por commit
+LINHAS_POR_LEITURA = 200        # linhas lidas por ida à thread
+
+COLUNAS_NOME = ["nome", "profissional", "nome profissional", "nome do profissional"]
+COLUNAS_SERVICOS = ["serviços", "servicos", "funções", "atividades", "especialidades"]
+COLUNAS_PRECOS = ["preços", "valores", "preco", "preço", "valor"]
+
+
+# 🔍 Detecta colunas por alternativas possíveis
+def detectar_coluna(colunas, alternativas):
+    for alt in alternativas:
+        for col in colunas:
+            if alt.lower() in str(col or "").lower():
+                return col
+    return None
+
+
+def _texto(valor) -> str:
+    if valor is None:
+        return ""
+    texto = str(valor).strip()
+    return "" if texto.lower() == "nan" else texto
+
+
+# =========================================================
+# Leitura em streaming
+# =========================================================
+class LeitorPlanilha:
+    """Itera as linhas (tuplas) de um .xlsx ou .csv; a primeira é o cabeçalho."""
+
+    def __init__(self, file_path: str):
+        self.file_path = file_path
+        self._arquivo = None
+        self._workbook = None
+        self._linhas = None
+
+    def abrir(self):
+        if self.file_path.lower().endswith(".xlsx"):
+            from openpyxl import load_workbook
+
+            self._workbook = load_workbook(self.file_path, read_only=True, data_only=True)
+            self._linhas = self._workbook.active.iter_rows(values_only=True)
+        else:
+            self._arquivo = open(self.file_path, newline="", encoding="utf-8-sig")
+            amostra = self._arquivo.read(4096)
+            self._arquivo.seek(0)
+            try:
+                dialeto = csv.Sniffer().sniff(amostra, delimiters=",;\t")
+            except csv.Error:
+                dialeto = csv.excel
+            self._linhas = csv.reader(self._arquivo, dialeto)
+        return self
+
+    def proximas(self, n: int) -> list:
+        linhas = []
+        for linha in self._linhas:
+            linhas.append(tuple(linha))
+            if len(linhas) >= n:
+                break
+        return linhas
+
+    def fechar(self):
+        if self._workbook is not None:
+            self._workbook.close()
+        if self._arquivo is not None:
+            self._arquivo.close()
+
+
+# =========================================================
+# Validação de linha
+# =========================================================
+def validar_linha(valores: dict, colunas: dict) -> tuple:
+    """
+    Converte uma linha em dados de profissional.
+
+    Returns:
+        (dados, aviso, erro) — dados None quando a linha é descartada
+    """
+    nome = " ".join(_texto(valores.get(colunas["nome"])).split())
+    if not nome:
+        return None, None, "nome vazio"
+    if "/" in nome:
+        return None, None, f"nome inválido: {nome}"
+
+    servicos = []
+    for servico in _texto(valores.get(colunas["servicos"])).split(","):
+        servico = servico.strip()
+        if servico and servico.lower() not in (s.lower() for s in servicos):
+            servicos.append(servico)
+    if not servicos:
+        return None, None, f"{nome}: nenhum serviço informado"
+
+    dados = {"nome": nome, "servicos": servicos}
+
+    aviso = None
+    bruto_precos = _texto(valores.get(colunas["precos"])) if colunas.get("precos") else ""
+    if bruto_precos:
+        try:
+            precos = [float(p.strip()) for p in bruto_precos.split(",")]
+            dados["precos"] = dict(zip(servicos, precos))
+        except ValueError:
+            aviso = f"{nome}: preços ignorados ({bruto_precos})"
+
+    return dados, aviso, None
+
+
+# =========================================================
+# Importação
+# =========================================================
+async def importar_profissionais(file_path: str, dono_id: str, ao_progresso=None) -> dict:
+    """Importa a planilha para Clientes/{dono_id}/Profissionais (ver docstring do módulo)."""
+    relatorio = {
+        "status": "ok", "linhas": 0, "importados": 0, "duplicados": 0, "lotes": 0,
+        "erros": [], "avisos": [],
+    }
+    leitor = LeitorPlanilha(file_path)
+
+    try:
+        await asyncio.to_thread(leitor.abrir)
+        cabecalho = (await asyncio.to_thread(leitor.proximas, 1) or [()])[0]
+        colunas = {
+            "nome": detectar_coluna(cabecalho, COLUNAS_NOME),
+            "servicos": detectar_coluna(cabecalho, COLUNAS_SERVICOS),
+            "precos": detectar_coluna(cabecalho, COLUNAS_PRECOS),
+        }
+        if not colunas["nome"] or not colunas["servicos"]:
+            relatorio["status"] = "cabecalho_invalido"
+            return relatorio
+
+        # nome normalizado -> doc_id já cadastrado (regrava em vez de duplicar)
+        existentes = {
+            normalizar_termo(dados.get("nome") or doc_id): doc_id
+            for doc_id, dados in (await obter_catalogo(dono_id)).como_dict().items()
+            if isinstance(dados, dict)
+        }
+        vistos = set()
+        pendentes = []
+
+        async def _gravar():
+            if not pendentes:
+                return
+            gravados = await atualizar_em_lote(list(pendentes), lote=LOTE_IMPORTACAO)
+            if gravados < len(pendentes):
+                relatorio["erros"].append((None, f"{len(pendentes) - gravados} profissionais não gravados (falha no lote)"))
+            relatorio["importados"] += gravados
+            relatorio["lotes"] += 1
+            pendentes.clear()
+            if ao_progresso:
+                await ao_progresso(relatorio)
+
+        numero_linha = 1
+        while True:
+            linhas = await asyncio.to_thread(leitor.proximas, LINHAS_POR_LEITURA)
+            if not linhas:
+                break
+
+            for linha in linhas:
+                numero_linha += 1
+                if not any(_texto(v) for v in linha):
+                    continue
+                relatorio["linhas"] += 1
+
+                dados, aviso, erro = validar_linha(dict(zip(cabecalho, linha)), colunas)
+                if erro:
+                    relatorio["erros"].append((numero_linha, erro))
+                    continue
+                if aviso:
+                    relatorio["avisos"].append((numero_linha, aviso))
+
+                nome_norm = normalizar_termo(dados["nome"])
+                if nome_norm in vistos:
+                    relatorio["duplicados"] += 1
+                    relatorio["erros"].append((numero_linha, f"{dados['nome']}: repetido na planilha"))
+                    continue
+                vistos.add(nome_norm)
+
+                doc_id = existentes.get(nome_norm, dados["nome"])
+                pendentes.append((f"Clientes/{dono_id}/Profissionais/{doc_id}", dados))
+                if len(pendentes) >= LOTE_IMPORTACAO:
+                    await _gravar()
+
+        await _gravar()
+        return relatorio
+
+    except Exception as e:
+        logger.error(f"❌ Erro ao importar planilha: {e}", exc_info=True)
+        relatorio["status"] = "erro"
+        relatorio["erros"].append((None, str(e)))
+        return relatorio
+
+    finally:
+        await asyncio.to_thread(leitor.fechar)
+        if relatorio["importados"]:
+            # uma recarga do catálogo no fim (as invalidações por escrita só descartam)
+            invalidar_catalogo(dono_id)
+            await obter_catalogo(dono_id)
+        logger.info(
+            f"[IMPORTACAO_PROFISSIONAIS] dono={dono_id} status={relatorio['status']} "
+            f"linhas={relatorio['linhas']} importados={relatorio['importados']} "
+            f"duplicados={relatorio['duplicados']} erros={len(relatorio['erros'])} lotes={relatorio['lotes']}"
+        )
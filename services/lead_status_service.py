@@ -29,7 +29,7 @@ Campos:
 
 from datetime import datetime, timedelta, timezone
 from typing import Optional, Dict, Any
-from services.firestore_client import get_db
+from services.firebase_service_async import ler_documento, gravar_documento
 import asyncio
 import unicodedata
 
@@ -85,18 +85,15 @@ async def atualizar_lead_status(
         return False
 
     try:
-        db = get_db()
         path = f"Clientes/{tenant_id}/Clientes/{cliente_actor_id}"
         now = datetime.now(timezone.utc).isoformat()
 
         # Carregar estado anterior para auditoria
-        doc = db.collection("Clientes").document(tenant_id).collection("Clientes").document(
-            cliente_actor_id
-        ).get()
+        dados = await ler_documento(path)
 
         status_anterior = None
-        if doc.exists:
-            status_anterior = doc.to_dict().get("lead_status")
+        if dados is not None:
+            status_anterior = dados.get("lead_status")
 
         # Preparar dados de atualização
         atualizacao = {
@@ -111,9 +108,7 @@ async def atualizar_lead_status(
             atualizacao["total_agendamentos"] = 0
 
         # Salvar atualização
-        db.collection("Clientes").document(tenant_id).collection("Clientes").document(
-            cliente_actor_id
-        ).set(atualizacao, merge=True)
+        await gravar_documento(path, atualizacao, merge=True)
 
         # Registrar auditoria
         await registrar_auditoria_transicao(
@@ -209,7 +204,6 @@ async def registrar_auditoria_transicao(
         True se sucesso
     """
     try:
-        db = get_db()
         now = datetime.now(timezone.utc).isoformat()
 
         evento_auditoria = {
@@ -222,9 +216,9 @@ async def registrar_auditoria_transicao(
             "_tenant_id_guard": tenant_id
         }
 
-        db.collection("Clientes").document(tenant_id).collection(
-            "AuditoriaLeadStatus"
-        ).document(f"{cliente_actor_id}_{now}").set(evento_auditoria)
+        await gravar_documento(
+            f"Clientes/{tenant_id}/AuditoriaLeadStatus/{cliente_actor_id}_{now}", evento_auditoria
+        )
 
         return True
     except Exception as e:
@@ -249,19 +243,16 @@ async def registrar_agendamento(
         True se sucesso
     """
     try:
-        db = get_db()
+        path = f"Clientes/{tenant_id}/Clientes/{cliente_actor_id}"
         now = datetime.now(timezone.utc).isoformat()
 
         # Carregar documento atual
-        doc = db.collection("Clientes").document(tenant_id).collection(
-            "Clientes"
-        ).document(cliente_actor_id).get()
+        dados = await ler_documento(path)
 
-        if not doc.exists:
+        if dados is None:
             print(f"[ERRO] registrar_agendamento: cliente nao encontrado")
             return False
 
-        dados = doc.to_dict()
         total_agendamentos = dados.get("total_agendamentos", 0) or 0
 
         # Atualizar
@@ -271,9 +262,7 @@ async def registrar_agendamento(
             "ultimo_agendamento_em": now
         }
 
-        db.collection("Clientes").document(tenant_id).collection(
-            "Clientes"
-        ).document(cliente_actor_id).set(atualizacao, merge=True)
+        await gravar_documento(path, atualizacao, merge=True)
 
         print(f"[MEC-F1-01] Agendamento registrado: {cliente_actor_id} (total: {total_agendamentos + 1})")
         return True
@@ -300,7 +289,6 @@ async def registrar_atendimento(
         True se sucesso
     """
     try:
-        db = get_db()
         now = datetime.now(timezone.utc).isoformat()
 
         atualizacao = {
@@ -310,9 +298,7 @@ async def registrar_atendimento(
             "ultima_interacao": now
         }
 
-        db.collection("Clientes").document(tenant_id).collection(
-            "Clientes"
-        ).document(cliente_actor_id).set(atualizacao, merge=True)
+        await gravar_documento(f"Clientes/{tenant_id}/Clientes/{cliente_actor_id}", atualizacao, merge=True)
 
         # Auditoria
         await registrar_auditoria_transicao(
@@ -346,16 +332,12 @@ async def carregar_lead_status(
         lead_status ou None se não encontrado
     """
     try:
-        db = get_db()
-
-        doc = db.collection("Clientes").document(tenant_id).collection(
-            "Clientes"
-        ).document(cliente_actor_id).get()
+        dados = await ler_documento(f"Clientes/{tenant_id}/Clientes/{cliente_actor_id}")
 
-        if not doc.exists:
+        if dados is None:
             return None
 
-        return doc.to_dict().get("lead_status")
+        return dados.get("lead_status")
 
     except Exception as e:
         print(f"[ERRO] carregar_lead_status: {str(e)}")
@@ -22,7 +22,9 @@ from services.firebase_service_async import (
     salvar_dado_em_path,
     buscar_dado_em_path,
     buscar_subcolecao,
+    consultar_subcolecao,
     atualizar_dado_em_path,
+    atualizar_em_lote,
     deletar_dado_em_path,
 )
 
@@ -30,6 +32,61 @@ logger = logging.getLogger(__name__)
 FUSO_BR = timezone("America/Sao_Paulo")
 
 
+# =========================================================
+# ÍNDICE DE BUSCA (campos de topo gravados no documento)
+# =========================================================
+# A busca por vaga é uma query:
+#     status == "ativo" AND chave_espera == "data|profissional|servico"
+#     ORDER BY criado_em
+# [AVISO] exige o índice composto em ListaEspera:
+#     status ASC, chave_espera ASC, criado_em ASC
+#
+# Entradas criadas antes desses campos não aparecem na query: a primeira
+# busca de cada tenant roda reindexar_lista_espera (garantir_indice_lista_espera)
+# e grava um marcador, para as próximas (e os outros processos) não varrerem.
+
+VERSAO_INDICE_ESPERA = 1
+_tenants_indexados: set = set()
+
+
+def path_marcador_indice_espera(tenant_id: str) -> str:
+    return f"Clientes/{tenant_id}/Configuracao/lista_espera"
+
+def _normalizar(texto: str) -> str:
+    return " ".join(str(texto or "").strip().lower().split())
+
+
+def chave_lista_espera(data: str, profissional: str, servico: str) -> str:
+    """Chave composta data|profissional|servico (profissional/serviço normalizados)."""
+    return f"{data}|{_normalizar(profissional)}|{_normalizar(servico)}"
+
+
+def _hora_para_minutos(hora: str) -> Optional[int]:
+    try:
+        hh, mm = map(int, str(hora).split(":")[:2])
+        return hh * 60 + mm
+    except (TypeError, ValueError):
+        return None
+
+
+def campos_indice_espera(doc: Dict[str, Any]) -> Dict[str, Any]:
+    """Campos de topo usados pela query (chave, intervalo desejado em minutos, criado_em)."""
+    servico_des = doc.get("servico_desejado") or {}
+    inicio = _hora_para_minutos(servico_des.get("hora_desejada"))
+    duracao = int(servico_des.get("duracao_minutos") or 0)
+
+    return {
+        "chave_espera": chave_lista_espera(
+            servico_des.get("data_desejada", ""),
+            servico_des.get("profissional_preferido", ""),
+            servico_des.get("servico", ""),
+        ),
+        "inicio_minutos": inicio,
+        "fim_minutos": inicio + duracao if inicio is not None else None,
+        "criado_em": (doc.get("auditoria") or {}).get("criado_em", ""),
+    }
+
+
 # =========================================================
 # CRIAR ENTRADA EM LISTA DE ESPERA
 # =========================================================
@@ -101,6 +158,7 @@ async def criar_lista_espera(
             },
             "confirmacao_pendente": False,
         }
+        documento.update(campos_indice_espera(documento))
 
         path = f"Clientes/{tenant_id}/ListaEspera/{waitlist_id}"
         await salvar_dado_em_path(path, documento)
@@ -130,75 +188,119 @@ async def buscar_proxima_lista_espera_compativel(
     duracao_minutos: int,
 ) -> Optional[Dict[str, Any]]:
     """
-    [F8-C] Buscar primeira entrada em ListaEspera que seja compatível com vaga aberta.
+    [F8-C] Buscar primeira entrada em ListaEspera que caiba na vaga aberta.
 
+    A vaga é o intervalo [hora_desejada, hora_desejada + duracao_minutos).
     Critérios:
     - status = "ativo"
-    - servico_desejado.servico = servico
-    - servico_desejado.profissional_preferido = profissional_preferido
-    - servico_desejado.data_desejada = data_desejada
-    - servico_desejado.hora_desejada = hora_desejada
-    - servico_desejado.duracao_minutos <= duracao_minutos (permite mais tempo, não menos)
-    - Ordenar por criado_em ASC (FIFO)
+    - mesma data, profissional e serviço (chave_espera)
+    - o horário desejado pela entrada cabe inteiro na vaga (não precisa
+      começar no mesmo minuto)
+    - Ordenar por criado_em ASC (FIFO), no servidor
+
+    Só o "balde" data|profissional|serviço é lido, não a ListaEspera inteira.
 
     Returns:
         Primeiro documento encontrado ou None
     """
     try:
-        lista_espera = await buscar_subcolecao(f"Clientes/{tenant_id}/ListaEspera") or {}
+        vaga_inicio = _hora_para_minutos(hora_desejada)
+        if vaga_inicio is None:
+            return None
+        vaga_fim = vaga_inicio + int(duracao_minutos or 0)
 
-        candidatos = []
+        await garantir_indice_lista_espera(tenant_id)
 
-        for waitlist_id, doc in lista_espera.items():
-            if not isinstance(doc, dict):
-                continue
+        candidatos = await consultar_subcolecao(
+            f"Clientes/{tenant_id}/ListaEspera",
+            filtros=[
+                ("status", "==", "ativo"),
+                ("chave_espera", "==", chave_lista_espera(data_desejada, profissional_preferido, servico)),
+            ],
+            ordenar_por="criado_em",
+        ) or {}
 
-            # Filtrar por status
-            if doc.get("status") != "ativo":
+        for waitlist_id, doc in candidatos.items():
+            if not isinstance(doc, dict):
                 continue
 
-            # Filtrar por compatibilidade
-            servico_des = doc.get("servico_desejado") or {}
-
-            if (
-                servico_des.get("servico") != servico
-                or servico_des.get("profissional_preferido") != profissional_preferido
-                or servico_des.get("data_desejada") != data_desejada
-                or servico_des.get("hora_desejada") != hora_desejada
-            ):
+            inicio, fim = doc.get("inicio_minutos"), doc.get("fim_minutos")
+            if inicio is None or fim is None:
                 continue
 
-            # Duração: waitlist pode ter duração <= disponível (flexibilidade)
-            duracao_waitlist = servico_des.get("duracao_minutos", 0)
-            if duracao_waitlist > duracao_minutos:
-                logger.warning(
-                    f"[WAITLIST_REJEITADA] waitlist requer {duracao_waitlist}min "
-                    f"mas vaga tem {duracao_minutos}min"
+            # Duração/horário: a entrada precisa caber na vaga (pode sobrar tempo)
+            if inicio < vaga_inicio or fim > vaga_fim:
+                logger.info(
+                    f"[WAITLIST_REJEITADA] waitlist_id={waitlist_id} quer "
+                    f"{inicio}-{fim}min mas vaga é {vaga_inicio}-{vaga_fim}min"
                 )
                 continue
 
-            # Adicionar à lista de candidatos
-            auditoria = doc.get("auditoria") or {}
-            criado_em_str = auditoria.get("criado_em", "")
-            candidatos.append((criado_em_str, waitlist_id, doc))
+            logger.info(
+                f"[WAITLIST_ENCONTRADA] servico={servico} | prof={profissional_preferido} | "
+                f"data={data_desejada} vaga={hora_desejada}+{duracao_minutos}min | "
+                f"hora_desejada={(doc.get('servico_desejado') or {}).get('hora_desejada')}"
+            )
+            return doc
 
-        if not candidatos:
-            return None
+        return None
 
-        # Ordenar por criado_em (FIFO) e retornar primeiro
-        candidatos.sort(key=lambda x: x[0])
-        _, _, doc = candidatos[0]
+    except Exception as e:
+        logger.error(f"❌ buscar_proxima_lista_espera_compativel: {e}", exc_info=True)
+        return None
 
-        logger.info(
-            f"[WAITLIST_ENCONTRADA] servico={servico} | prof={profissional_preferido} | "
-            f"data={data_desejada} {hora_desejada}"
-        )
 
-        return doc
+async def reindexar_lista_espera(tenant_id: str) -> int:
+    """
+    Grava os campos de índice (chave_espera, inicio/fim_minutos, criado_em)
+    nas entradas ativas criadas antes deles existirem. Operação de manutenção:
+    lê a ListaEspera do tenant uma vez.
+
+    Returns:
+        Quantidade de documentos atualizados
+    """
+    lista_espera = await buscar_subcolecao(f"Clientes/{tenant_id}/ListaEspera") or {}
+
+    atualizacoes = []
+    for waitlist_id, doc in lista_espera.items():
+        if not isinstance(doc, dict) or doc.get("status") != "ativo":
+            continue
+        campos = campos_indice_espera(doc)
+        if any(doc.get(k) != v for k, v in campos.items()):
+            atualizacoes.append((f"Clientes/{tenant_id}/ListaEspera/{waitlist_id}", campos))
+
+    if not atualizacoes:
+        return 0
 
+    atualizados = await atualizar_em_lote(atualizacoes)
+    logger.info(f"[WAITLIST_REINDEXADA] tenant={tenant_id} docs={atualizados}/{len(atualizacoes)}")
+    if atualizados < len(atualizacoes):
+        raise RuntimeError(f"reindexação parcial: {atualizados}/{len(atualizacoes)} documentos")
+    return atualizados
+
+
+async def garantir_indice_lista_espera(tenant_id: str) -> None:
+    """
+    Backfill preguiçoso dos campos de índice: na primeira busca do tenant,
+    se o marcador não tem a versão atual, reindexa e grava o marcador.
+    Falha não bloqueia a busca; tenta de novo na próxima.
+    """
+    tenant_id = str(tenant_id)
+    if tenant_id in _tenants_indexados:
+        return
+
+    try:
+        path = path_marcador_indice_espera(tenant_id)
+        marcador = await buscar_dado_em_path(path) or {}
+        if (marcador.get("versao_indice") or 0) < VERSAO_INDICE_ESPERA:
+            await reindexar_lista_espera(tenant_id)
+            await salvar_dado_em_path(path, {
+                "versao_indice": VERSAO_INDICE_ESPERA,
+                "reindexado_em": datetime.now(FUSO_BR).isoformat(),
+            })
+        _tenants_indexados.add(tenant_id)
     except Exception as e:
-        logger.error(f"❌ buscar_proxima_lista_espera_compativel: {e}", exc_info=True)
-        return None
+        logger.warning(f"[WAITLIST_REINDEX_FALHOU] tenant={tenant_id}: {e}")
 
 
 # =========================================================
@@ -0,0 +1,363 @@
+# services/llm_gateway.py
+"""
+Gateway único das chamadas ao LLM (chat.completions).
+
+Toda chamada do gpt_service passa por aqui em vez de usar o AsyncOpenAI
+direto, com:
+
+- prazo por chamada (LLM_PRAZO_SEGUNDOS): vale para fila de espera,
+  tentativas e backoff somados — uma chamada lenta não segura o chat;
+- concorrência limitada: global (LLM_CONCORRENCIA_GLOBAL) e por tenant
+  (LLM_CONCORRENCIA_TENANT), para um tenant não ocupar todas as vagas;
+- retry com backoff exponencial + jitter em 429/5xx/timeout/rede
+  (Retry-After do provedor é respeitado); 4xx definitivos não repetem;
+- circuit breaker: LLM_CIRCUITO_FALHAS falhas seguidas abrem o circuito por
+  LLM_CIRCUITO_ABERTO_SEGUNDOS; aberto, a chamada falha na hora com
+  CircuitoAberto e o chamador cai no fallback determinístico dele; depois
+  uma chamada de teste decide se fecha de novo;
+- histogramas de latência e tokens (metricas_llm(), exibidas no /custosapi),
+  com a latência separada por uso do cache de prompt do provedor.
+
+Uso:
+
+    resposta = await chamar_llm(messages, model="gpt-4o", temperature=0.4,
+                                tenant_id=dono_id, origem="processar_com_gpt_com_acao")
+
+Devolve o objeto de resposta do SDK (choices/usage), então o parse e o
+registrar_custo_gpt dos chamadores não mudam. Falhas levantam LLMIndisponivel.
+LLM_BASE_URL aponta o cliente para outro servidor compatível com a API da
+OpenAI (ex.: servidor falso local nos testes).
+"""
+
+import asyncio
+import os
+import random
+import time
+
+LLM_PRAZO_SEGUNDOS = float(os.getenv("LLM_PRAZO_SEGUNDOS", "25"))
+LLM_CONCORRENCIA_GLOBAL = int(os.getenv("LLM_CONCORRENCIA_GLOBAL", "16"))
+LLM_CONCORRENCIA_TENANT = int(os.getenv("LLM_CONCORRENCIA_TENANT", "2"))
+LLM_MAX_TENTATIVAS = int(os.getenv("LLM_MAX_TENTATIVAS", "3"))
+LLM_BACKOFF_BASE_SEGUNDOS = float(os.getenv("LLM_BACKOFF_BASE_SEGUNDOS", "0.5"))
+LLM_CIRCUITO_FALHAS = int(os.getenv("LLM_CIRCUITO_FALHAS", "5"))
+LLM_CIRCUITO_ABERTO_SEGUNDOS = float(os.getenv("LLM_CIRCUITO_ABERTO_SEGUNDOS", "30"))
+
+LIMITES_LATENCIA_MS = (250, 500, 1000, 2000, 4000, 8000, 16000, 32000)
+LIMITES_TOKENS = (250, 500, 1000, 2000, 4000, 8000, 16000)
+
+
+class LLMIndisponivel(Exception):
+    """A chamada não produziu resposta (prazo, erro do provedor ou circuito aberto)."""
+
+
+class CircuitoAberto(LLMIndisponivel):
+    """Circuito aberto: a chamada nem foi feita."""
+
+
+# =========================================================
+# Métricas
+# =========================================================
+class Histograma:
+    """Contagem por faixa (<= limite) + total, soma e máximo."""
+
+    def __init__(self, limites: tuple):
+        self.limites = tuple(limites)
+        self.contagens = [0] * (len(self.limites) + 1)
+        self.total = 0
+        self.soma = 0.0
+        self.maximo = 0.0
+
+    def observar(self, valor: float) -> None:
+        indice = next((i for i, limite in enumerate(self.limites) if valor <= limite), len(self.limites))
+        self.contagens[indice] += 1
+        self.total += 1
+        self.soma += valor
+        self.maximo = max(self.maximo, valor)
+
+    def percentil(self, p: float) -> float | None:
+        """Limite superior da faixa que contém o percentil p (0-1)."""
+        if not self.total:
+            return None
+        alvo = p * self.total
+        acumulado = 0
+        for i, contagem in enumerate(self.contagens):
+            acumulado += contagem
+            if acumulado >= alvo:
+                return float(self.limites[i]) if i < len(self.limites) else self.maximo
+        return self.maximo
+
+    def como_dict(self) -> dict:
+        faixas = [f"<={limite}" for limite in self.limites] + [f">{self.limites[-1]}"]
+        return {
+            "faixas": dict(zip(faixas, self.contagens)),
+            "total": self.total,
+            "media": round(self.soma / self.total, 1) if self.total else 0.0,
+            "p50": self.percentil(0.5),
+            "p95": self.percentil(0.95),
+            "max": round(self.maximo, 1),
+        }
+
+
+# =========================================================
+# Circuit breaker
+# =========================================================
+class CircuitBreaker:
+    """
+    fechado → (N falhas seguidas) → aberto → (após T segundos) → meio_aberto
+    meio_aberto deixa passar UMA chamada de teste: sucesso fecha, falha reabre.
+    """
+
+    def __init__(self, limite_falhas: int = LLM_CIRCUITO_FALHAS, segundos_aberto: float = LLM_CIRCUITO_ABERTO_SEGUNDOS):
+        self.limite_falhas = max(1, int(limite_falhas))
+        self.segundos_aberto = segundos_aberto
+        self.estado = "fechado"
+        self.falhas_seguidas = 0
+        self._aberto_ate = 0.0
+        self._teste_em_andamento = False
+
+    def permitir(self) -> bool:
+        if self.estado == "fechado":
+            return True
+        if self.estado == "aberto" and time.monotonic() >= self._aberto_ate:
+            self.estado = "meio_aberto"
+        if self.estado == "meio_aberto" and not self._teste_em_andamento:
+            self._teste_em_andamento = True
+            return True
+        return False
+
+    def registrar_sucesso(self) -> None:
+        self.estado = "fechado"
+        self.falhas_seguidas = 0
+        self._teste_em_andamento = False
+
+    def registrar_falha(self) -> None:
+        self.falhas_seguidas += 1
+        if self.estado == "meio_aberto" or self.falhas_seguidas >= self.limite_falhas:
+            if self.estado != "aberto":
+                print(f"🔌 [LLM_GATEWAY] circuito aberto por {self.segundos_aberto:.0f}s ({self.falhas_seguidas} falhas seguidas)", flush=True)
+            self.estado = "aberto"
+            self._aberto_ate = time.monotonic() + self.segundos_aberto
+        self._teste_em_andamento = False
+
+    def liberar_teste(self) -> None:
+        """Chamada de teste terminou sem veredito (ex.: erro 4xx do pedido)."""
+        self._teste_em_andamento = False
+
+
+# =========================================================
+# Classificação de erros
+# =========================================================
+def _status_http(e: Exception) -> int | None:
+    status = getattr(e, "status_code", None)
+    if status is None:
+        status = getattr(getattr(e, "response", None), "status_code", None)
+    return status if isinstance(status, int) else None
+
+
+def erro_repetivel(e: Exception) -> bool:
+    """429, 5xx, timeout e falha de conexão valem retry; o resto é definitivo."""
+    if isinstance(e, (asyncio.TimeoutError, ConnectionError)):
+        return True
+    status = _status_http(e)
+    if status is not None:
+        return status == 429 or status >= 500
+    # APIConnectionError/APITimeoutError do SDK não têm status
+    return type(e).__name__ in ("APIConnectionError", "APITimeoutError")
+
+
+def _retry_after(e: Exception) -> float | None:
+    cabecalhos = getattr(getattr(e, "response", None), "headers", None) or {}
+    try:
+        valor = cabecalhos.get("retry-after")
+        return float(valor) if valor is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+# =========================================================
+# Gateway
+# =========================================================
+class GatewayLLM:
+    def __init__(
+        self,
+        client=None,
+        prazo_segundos: float = LLM_PRAZO_SEGUNDOS,
+        concorrencia_global: int = LLM_CONCORRENCIA_GLOBAL,
+        concorrencia_tenant: int = LLM_CONCORRENCIA_TENANT,
+        max_tentativas: int = LLM_MAX_TENTATIVAS,
+        backoff_base: float = LLM_BACKOFF_BASE_SEGUNDOS,
+        circuito: CircuitBreaker | None = None,
+    ):
+        self._client = client
+        self.prazo_segundos = prazo_segundos
+        self.concorrencia_tenant = max(1, int(concorrencia_tenant))
+        self.max_tentativas = max(1, int(max_tentativas))
+        self.backoff_base = backoff_base
+        self.circuito = circuito or CircuitBreaker()
+        self._semaforo_global = asyncio.Semaphore(max(1, int(concorrencia_global)))
+        self._semaforos_tenant: dict = {}
+        self._contadores = {
+            "chamadas": 0, "sucessos": 0, "falhas": 0, "retries": 0,
+            "timeouts": 0, "rejeitadas_circuito": 0,
+            "tokens_entrada": 0, "tokens_cache": 0,
+        }
+        self.latencia_ms = Histograma(LIMITES_LATENCIA_MS)
+        # sucessos separados por uso do cache de prompt do provedor (economia de latência)
+        self.latencia_ms_com_cache = Histograma(LIMITES_LATENCIA_MS)
+        self.latencia_ms_sem_cache = Histograma(LIMITES_LATENCIA_MS)
+        self.tokens = Histograma(LIMITES_TOKENS)
+
+    @property
+    def client(self):
+        if self._client is None:
+            from services.gpt_client import client
+
+            self._client = client
+        return self._client
+
+    def _semaforo_tenant(self, tenant_id) -> asyncio.Semaphore:
+        chave = str(tenant_id)
+        semaforo = self._semaforos_tenant.get(chave)
+        if semaforo is None:
+            if len(self._semaforos_tenant) > 10000:
+                # descarta os ociosos (ninguém esperando nem usando)
+                self._semaforos_tenant = {
+                    c: s for c, s in self._semaforos_tenant.items() if s._value < self.concorrencia_tenant
+                }
+            semaforo = self._semaforos_tenant[chave] = asyncio.Semaphore(self.concorrencia_tenant)
+        return semaforo
+
+    def _espera_retry(self, tentativa: int, e: Exception) -> float:
+        pedido = _retry_after(e)
+        if pedido is not None:
+            return pedido
+        # backoff exponencial com jitter total (0 .. base * 2^n)
+        return random.uniform(0, self.backoff_base * (2 ** (tentativa - 1)))
+
+    async def _com_vagas(self, tenant_id, prazo_final: float, chamada):
+        async def _global():
+            async with self._semaforo_global:
+                return await chamada()
+
+        async def _tenant():
+            # vaga do tenant primeiro: quem espera a própria vaga não ocupa a global
+            async with self._semaforo_tenant(tenant_id):
+                return await _global()
+
+        executar = _tenant if tenant_id else _global
+        restante = prazo_final - time.monotonic()
+        if restante <= 0:
+            raise asyncio.TimeoutError()
+        return await asyncio.wait_for(executar(), timeout=restante)
+
+    async def chamar(
+        self,
+        messages: list,
+        model: str = "gpt-4o",
+        tenant_id: str | None = None,
+        origem: str = "",
+        prazo_segundos: float | None = None,
+        **parametros,
+    ):
+        """chat.completions.create com prazo, limites, retry e circuito (ver docstring do módulo)."""
+        self._contadores["chamadas"] += 1
+        if not self.circuito.permitir():
+            self._contadores["rejeitadas_circuito"] += 1
+            raise CircuitoAberto(f"circuito aberto ({origem or model})")
+
+        inicio = time.monotonic()
+        prazo_final = inicio + (prazo_segundos or self.prazo_segundos)
+        ultimo_erro = None
+        # permitir() em meio_aberto entrega a chamada de teste a esta chamada
+        sonda = self.circuito.estado == "meio_aberto"
+
+        try:
+            for tentativa in range(1, self.max_tentativas + 1):
+                try:
+                    resposta = await self._com_vagas(
+                        tenant_id,
+                        prazo_final,
+                        lambda: self.client.chat.completions.create(model=model, messages=messages, **parametros),
+                    )
+                except Exception as e:
+                    ultimo_erro = e
+                    if isinstance(e, asyncio.TimeoutError):
+                        self._contadores["timeouts"] += 1
+                    if not erro_repetivel(e):
+                        # pedido inválido: não é culpa do provedor, não conta no circuito
+                        self.circuito.liberar_teste()
+                        break
+                    self.circuito.registrar_falha()
+                    if self.circuito.estado == "aberto":
+                        break
+
+                    espera = self._espera_retry(tentativa, e)
+                    if tentativa == self.max_tentativas or time.monotonic() + espera >= prazo_final:
+                        break
+                    self._contadores["retries"] += 1
+                    print(
+                        f"🔁 [LLM_GATEWAY] retry {tentativa}/{self.max_tentativas - 1} origem={origem} "
+                        f"erro={type(e).__name__} status={_status_http(e)} espera={espera:.2f}s",
+                        flush=True,
+                    )
+                    await asyncio.sleep(espera)
+                    continue
+
+                self.circuito.registrar_sucesso()
+                self._contadores["sucessos"] += 1
+                self._registrar_uso(resposta, (time.monotonic() - inicio) * 1000)
+                return resposta
+        except BaseException:
+            # cancelada (CancelledError do chamador/prazo externo) sem veredito:
+            # libera a chamada de teste, senão o circuito fica meio_aberto barrando tudo
+            if sonda:
+                self.circuito.liberar_teste()
+            raise
+
+        self._contadores["falhas"] += 1
+        self.latencia_ms.observar((time.monotonic() - inicio) * 1000)
+        print(
+            f"❌ [LLM_GATEWAY] falhou origem={origem} tenant={tenant_id} "
+            f"erro={type(ultimo_erro).__name__}: {ultimo_erro}",
+            flush=True,
+        )
+        raise LLMIndisponivel(f"{type(ultimo_erro).__name__}: {ultimo_erro}") from ultimo_erro
+
+    def _registrar_uso(self, resposta, latencia_ms: float) -> None:
+        from utils.custos_gpt import tokens_em_cache
+
+        self.latencia_ms.observar(latencia_ms)
+        usage = getattr(resposta, "usage", None)
+        total_tokens = getattr(usage, "total_tokens", None)
+        if isinstance(total_tokens, (int, float)):
+            self.tokens.observar(total_tokens)
+        prompt_tokens = getattr(usage, "prompt_tokens", None)
+        if isinstance(prompt_tokens, (int, float)):
+            self._contadores["tokens_entrada"] += int(prompt_tokens)
+        cache = tokens_em_cache(usage)
+        self._contadores["tokens_cache"] += cache
+        (self.latencia_ms_com_cache if cache else self.latencia_ms_sem_cache).observar(latencia_ms)
+
+    def metricas(self) -> dict:
+        entrada = self._contadores["tokens_entrada"]
+        return {
+            **self._contadores,
+            "taxa_cache_prompt": round(self._contadores["tokens_cache"] / entrada, 3) if entrada else 0.0,
+            "circuito": self.circuito.estado,
+            "latencia_ms": self.latencia_ms.como_dict(),
+            "latencia_ms_com_cache": self.latencia_ms_com_cache.como_dict(),
+            "latencia_ms_sem_cache": self.latencia_ms_sem_cache.como_dict(),
+            "tokens": self.tokens.como_dict(),
+        }
+
+
+# instância do processo (usa services.gpt_client.client)
+gateway_llm = GatewayLLM()
+
+
+async def chamar_llm(messages: list, model: str = "gpt-4o", tenant_id: str | None = None, origem: str = "", **parametros):
+    return await gateway_llm.chamar(messages, model=model, tenant_id=tenant_id, origem=origem, **parametros)
+
+
+def metricas_llm() -> dict:
+    return gateway_llm.metricas()
@@ -1,7 +1,8 @@
 import difflib
 import unidecode
 import re
-from services.firebase_service_async import buscar_subcolecao, obter_id_dono
+from services.firebase_service_async import obter_id_dono
+from services.catalogo_service import obter_catalogo
 
 async def encontrar_servico_mais_proximo(texto_usuario: str, user_id: str) -> str | None:
     # Normaliza o texto do usuário removendo acentos e pontuação
@@ -15,21 +16,9 @@ async def encontrar_servico_mais_proximo(texto_usuario: str, user_id: str) -> st
     except Exception:
         dono_id = user_id
 
-    profissionais = await buscar_subcolecao(f"Clientes/{dono_id}/Profissionais") or {}
-
-    # Extrai e normaliza todos os serviços possíveis
-    todos_servicos = set()
-    for dados in profissionais.values():
-        servs = dados.get("servicos", [])
-        for s in servs:
-            if isinstance(s, str):
-                s_norm = unidecode.unidecode(
-                    re.sub(r"[^\w\s]", " ", s.lower())
-                ).strip()
-                s_norm = re.sub(r"\s+", " ", s_norm)
-                todos_servicos.add(s_norm)
-
-    candidatos = list(todos_servicos)
+    # Serviços já normalizados (sem acento/pontuação) pelo catálogo do tenant
+    catalogo = await obter_catalogo(dono_id)
+    candidatos = list(catalogo.servicos_busca)
 
     # 1) verifica se algum serviço aparece como substring direta
     for candidato in candidatos:
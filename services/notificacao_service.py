@@ -50,6 +50,8 @@ async def criar_notificacao_agendada(
             # metadados úteis para debug/auditoria
             "destinatario": destino,
             "origem_user": user_id,
+            # dono do path (o scheduler lê por collection group)
+            "tenant_id": destino,
         }
 
         id_notificacao = str(uuid.uuid4())
@@ -0,0 +1,373 @@
+"""
+Índice materializado de ocupação da agenda (por profissional, por dia).
+
+Evita que as checagens de conflito leiam a subcoleção inteira de Eventos
+do tenant só para testar UM profissional em UMA data.
+
+Documento:
+    Clientes/{dono_id}/Ocupacao/{data}_{profissional_normalizado}
+
+    {
+        "data": "2026-06-20",
+        "profissional": "bruna",
+        "intervalos": {
+            "<event_id>": {
+                "hora_inicio": "14:00",
+                "hora_fim": "15:00",
+                "cliente_id": "123",
+                "status": "confirmado"
+            }
+        },
+        "completo": True,
+        "atualizado_em": "..."
+    }
+
+Os intervalos ficam num mapa indexado por event_id para que inclusão e
+remoção sejam escritas merge "cegas" (sem read-modify-write). A leitura
+devolve a lista já ordenada por início.
+
+"completo" só é gravado pela reconstrução a partir de Eventos. Um documento
+criado apenas por registrar_ocupacao (dia nunca indexado) é tratado como
+incompleto e reconstruído na primeira leitura. A reconstrução grava numa
+transação por documento e preserva intervalos de eventos que não estavam
+na leitura de Eventos (reservas concorrentes).
+
+Mantido por:
+    - criar_evento_com_lock -> na MESMA transação que grava evento e locks
+    - salvar_evento         -> registrar_ocupacao (caso idempotente)
+    - cancelar_evento       -> remover_ocupacao
+    - deletar_evento        -> remover_ocupacao
+"""
+
+import asyncio
+import logging
+from datetime import datetime
+from typing import Optional
+
+from unidecode import unidecode
+from google.cloud import firestore
+from google.cloud.firestore_v1.async_transaction import async_transactional
+
+from services.firebase_service_async import (
+    client,
+    buscar_dado_em_path,
+    buscar_eventos_filtrados,
+    atualizar_dado_em_path,
+    get_ref_from_path,
+    notificar_escrita,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def normalizar_profissional(profissional: str) -> str:
+    """Nome do profissional no formato usado em comparações e chaves."""
+    return unidecode(str(profissional or "").strip().lower())
+
+
+def gerar_ocupacao_id(data: str, profissional: str) -> str:
+    """ID determinístico do documento de ocupação: {data}_{prof}."""
+    prof_norm = normalizar_profissional(profissional).replace(" ", "_").replace("/", "_")
+    return f"{data}_{prof_norm}"
+
+
+def ocupacao_path(dono_id: str, data: str, profissional: str) -> str:
+    """Path do documento de ocupação do profissional no dia."""
+    return f"Clientes/{dono_id}/Ocupacao/{gerar_ocupacao_id(data, profissional)}"
+
+
+def chave_intervalo(event_id: str) -> str:
+    """Chave do intervalo no mapa ("." é separador de field path no Firestore)."""
+    return str(event_id).replace(".", "_")
+
+
+def montar_intervalo(evento: dict) -> Optional[dict]:
+    """
+    Converte um evento no item de intervalo do índice.
+    Retorna None se o evento não ocupa agenda.
+    """
+    from services.event_service_async import _parse_event_interval
+
+    if not isinstance(evento, dict):
+        return None
+
+    status = str(evento.get("status") or "").strip().lower()
+    if status in ["cancelado", "cancelada", "removido", "removida", "excluido", "excluído"]:
+        return None
+
+    if not evento.get("profissional"):
+        return None
+
+    ini, fim = _parse_event_interval(evento)
+    if not ini or not fim:
+        return None
+
+    return {
+        "hora_inicio": ini.strftime("%H:%M"),
+        "hora_fim": fim.strftime("%H:%M"),
+        "cliente_id": str(evento.get("cliente_id") or ""),
+        "status": status,
+    }
+
+
+def _data_do_evento(evento: dict) -> Optional[str]:
+    from services.event_service_async import _parse_event_interval
+
+    if evento.get("data"):
+        return str(evento["data"])
+    ini, _ = _parse_event_interval(evento)
+    return ini.strftime("%Y-%m-%d") if ini else None
+
+
+def ordenar_intervalos(intervalos: dict, excluir_event_id: str | None = None) -> list:
+    """
+    Mapa {event_id: intervalo} -> lista ordenada por hora_inicio.
+    Cada item ganha a chave "event_id".
+    """
+    excluir = chave_intervalo(excluir_event_id) if excluir_event_id else None
+    saida = []
+    for eid, item in (intervalos or {}).items():
+        if not isinstance(item, dict):
+            continue
+        if excluir and eid == excluir:
+            continue
+        if not item.get("hora_inicio") or not item.get("hora_fim"):
+            continue
+        saida.append({**item, "event_id": eid})
+    saida.sort(key=lambda i: (i["hora_inicio"], i["hora_fim"]))
+    return saida
+
+
+# =========================================================
+# ESCRITA (chamada pelos serviços de evento)
+# =========================================================
+
+async def registrar_ocupacao(dono_id: str, event_id: str, evento: dict) -> bool:
+    """Inclui/atualiza o intervalo do evento no documento do dia."""
+    try:
+        item = montar_intervalo(evento)
+        data = _data_do_evento(evento or {})
+        if not item or not data:
+            return False
+
+        path = ocupacao_path(dono_id, data, evento.get("profissional"))
+        return await atualizar_dado_em_path(path, {
+            "data": data,
+            "profissional": normalizar_profissional(evento.get("profissional")),
+            "intervalos": {chave_intervalo(event_id): item},
+            "atualizado_em": datetime.now().isoformat(),
+        })
+    except Exception as e:
+        logger.warning(f"[OCUPACAO] registrar falhou event_id={event_id}: {e}")
+        return False
+
+
+async def remover_ocupacao(dono_id: str, event_id: str, evento: dict) -> bool:
+    """Remove o intervalo do evento do documento do dia (cancelamento/exclusão)."""
+    try:
+        data = _data_do_evento(evento or {})
+        if not data or not (evento or {}).get("profissional"):
+            return False
+
+        path = ocupacao_path(dono_id, data, evento.get("profissional"))
+        return await atualizar_dado_em_path(path, {
+            "intervalos": {chave_intervalo(event_id): firestore.DELETE_FIELD},
+            "atualizado_em": datetime.now().isoformat(),
+        })
+    except Exception as e:
+        logger.warning(f"[OCUPACAO] remover falhou event_id={event_id}: {e}")
+        return False
+
+
+# =========================================================
+# RECONSTRUÇÃO (dia nunca indexado)
+# =========================================================
+
+@async_transactional
+async def _gravar_reconstrucao(
+    transaction,
+    path: str,
+    data: str,
+    prof: str,
+    intervalos: dict,
+    lidos: set,
+    agora: str,
+) -> dict:
+    """
+    Grava o documento reconstruído de um profissional sem perder escritas
+    feitas depois da leitura de Eventos:
+
+    - documento já "completo" (outra reconstrução venceu): fica como está;
+    - intervalos de eventos que não vieram na leitura (reserva concorrente
+      via registrar_ocupacao / criar_evento_com_lock) são mantidos;
+    - para os eventos lidos, vale o estado lido (cancelado sai do mapa).
+
+    Returns:
+        mapa de intervalos que ficou no documento
+    """
+    ref = get_ref_from_path(path)
+    atual = None
+    # client.get_all(transaction=...): transaction.get_all do SDK 2.20 levanta TypeError
+    async for snap in client.get_all([ref], transaction=transaction):
+        atual = snap.to_dict() if snap.exists else None
+    atual = atual or {}
+
+    if atual.get("completo"):
+        return atual.get("intervalos") or {}
+
+    finais = {
+        eid: item for eid, item in (atual.get("intervalos") or {}).items()
+        if eid not in lidos and isinstance(item, dict)
+    }
+    finais.update(intervalos)
+
+    transaction.set(ref, {
+        "data": data,
+        "profissional": prof,
+        "intervalos": finais,
+        "completo": True,
+        "atualizado_em": agora,
+    })
+    return finais
+
+
+async def reconstruir_ocupacao_do_dia(
+    dono_id: str,
+    data: str,
+    profissionais: list | None = None,
+) -> dict:
+    """
+    Reconstrói os documentos de ocupação de uma data a partir de Eventos.
+
+    Grava um documento "completo" para cada profissional com evento no dia
+    e também para os profissionais pedidos (mesmo sem eventos), para que a
+    próxima leitura não precise varrer Eventos de novo. Cada documento é
+    gravado em transação (_gravar_reconstrucao), mesclado com o que já está
+    nele.
+
+    Returns:
+        {prof_normalizado: {event_id: intervalo}}
+    """
+    eventos = await buscar_eventos_filtrados(dono_id, data_inicio=data, data_fim=data) or {}
+
+    por_prof: dict = {normalizar_profissional(p): {} for p in (profissionais or []) if p}
+    lidos = {chave_intervalo(eid) for eid in eventos}
+
+    for eid, ev in eventos.items():
+        if not isinstance(ev, dict):
+            continue
+        if _data_do_evento(ev) != data:
+            continue
+        item = montar_intervalo(ev)
+        if not item:
+            continue
+        prof = normalizar_profissional(ev.get("profissional"))
+        por_prof.setdefault(prof, {})[chave_intervalo(eid)] = item
+
+    agora = datetime.now().isoformat()
+    for prof, intervalos in por_prof.items():
+        try:
+            path = ocupacao_path(dono_id, data, prof)
+            por_prof[prof] = await _gravar_reconstrucao(
+                client.transaction(), path, data, prof, intervalos, lidos, agora
+            )
+            notificar_escrita(path)
+        except Exception as e:
+            logger.warning(f"[OCUPACAO] falha ao gravar reconstrução data={data} prof={prof}: {e}")
+
+    print(
+        f"[OCUPACAO_REBUILD] dono={dono_id} data={data} "
+        f"eventos_lidos={len(eventos)} profissionais={len(por_prof)}",
+        flush=True
+    )
+    return por_prof
+
+
+# =========================================================
+# LEITURA (checagens de conflito)
+# =========================================================
+
+async def buscar_intervalos_ocupados(
+    dono_id: str,
+    data: str,
+    profissional: str,
+    excluir_event_id: str | None = None,
+) -> list:
+    """
+    Intervalos ocupados de UM profissional em UMA data, ordenados.
+
+    Lê apenas Clientes/{dono}/Ocupacao/{data}_{prof}. Se o documento não
+    existir (ou não estiver completo), reconstrói o dia a partir de Eventos.
+
+    Returns:
+        [{"event_id", "hora_inicio", "hora_fim", "cliente_id", "status"}, ...]
+    """
+    prof_norm = normalizar_profissional(profissional)
+    if not prof_norm or not data:
+        return []
+
+    doc = await buscar_dado_em_path(ocupacao_path(dono_id, data, prof_norm))
+
+    if doc and doc.get("completo"):
+        intervalos = doc.get("intervalos") or {}
+    else:
+        por_prof = await reconstruir_ocupacao_do_dia(dono_id, data, [prof_norm])
+        intervalos = por_prof.get(prof_norm) or {}
+
+    return ordenar_intervalos(intervalos, excluir_event_id)
+
+
+async def buscar_intervalos_ocupados_varios(
+    dono_id: str,
+    data: str,
+    profissionais: list,
+    excluir_event_id: str | None = None,
+) -> dict:
+    """
+    Mesmo que buscar_intervalos_ocupados, para vários profissionais.
+    Faz uma leitura por profissional (em paralelo) e no máximo UMA
+    reconstrução do dia.
+
+    Returns:
+        {prof_normalizado: [intervalos ordenados]}
+    """
+    profs = []
+    for p in profissionais or []:
+        pn = normalizar_profissional(p)
+        if pn and pn not in profs:
+            profs.append(pn)
+
+    if not profs or not data:
+        return {}
+
+    docs = await asyncio.gather(*[
+        buscar_dado_em_path(ocupacao_path(dono_id, data, p)) for p in profs
+    ])
+
+    resultado = {}
+    faltando = []
+    for prof, doc in zip(profs, docs):
+        if doc and doc.get("completo"):
+            resultado[prof] = ordenar_intervalos(doc.get("intervalos") or {}, excluir_event_id)
+        else:
+            faltando.append(prof)
+
+    if faltando:
+        por_prof = await reconstruir_ocupacao_do_dia(dono_id, data, faltando)
+        for prof in faltando:
+            resultado[prof] = ordenar_intervalos(por_prof.get(prof) or {}, excluir_event_id)
+
+    return resultado
+
+
+def intervalos_para_datetimes(data: str, intervalos: list) -> list:
+    """Lista de intervalos do índice -> [(datetime_inicio, datetime_fim)]."""
+    saida = []
+    for item in intervalos or []:
+        try:
+            ini = datetime.strptime(f"{data} {item['hora_inicio']}", "%Y-%m-%d %H:%M")
+            fim = datetime.strptime(f"{data} {item['hora_fim']}", "%Y-%m-%d %H:%M")
+            saida.append((ini, fim))
+        except (KeyError, ValueError):
+            continue
+    return saida
@@ -1,6 +1,7 @@
 # services/profissional_service.py
 
 from services.firebase_service_async import buscar_subcolecao, obter_id_dono
+from services.catalogo_service import buscar_profissionais_tenant
 from datetime import datetime, timedelta
 from services.event_service_async import evento_deve_entrar_na_agenda
 import difflib
@@ -14,7 +15,7 @@ async def buscar_profissionais_por_servico(servicos: list[str], user_id: str) ->
     Resolve o dono primeiro, para suportar clientes falando com o bot.
     """
     dono_id = await obter_id_dono(user_id)
-    profissionais = await buscar_subcolecao(f"Clientes/{dono_id}/Profissionais") or {}
+    profissionais = await buscar_profissionais_tenant(dono_id)
 
     print(f"\n📥 Serviços solicitados: {servicos}")
     print(f"👥 Profissionais cadastrados: {list(profissionais.keys())}")
@@ -50,7 +51,7 @@ async def buscar_profissionais_disponiveis_no_horario(
     """
     dono_id = await obter_id_dono(user_id)
 
-    profissionais = await buscar_subcolecao(f"Clientes/{dono_id}/Profissionais") or {}
+    profissionais = await buscar_profissionais_tenant(dono_id)
     eventos = await buscar_subcolecao(f"Clientes/{dono_id}/Eventos") or {}
 
     data_str = data.strftime("%Y-%m-%d")
@@ -111,7 +112,7 @@ async def obter_profissional_para_evento(user_id: str, descricao_evento: str) ->
     Retorna o nome se houver apenas um compatível.
     """
     dono_id = await obter_id_dono(user_id)
-    profissionais = await buscar_subcolecao(f"Clientes/{dono_id}/Profissionais") or {}
+    profissionais = await buscar_profissionais_tenant(dono_id)
     descricao_lower = descricao_evento.lower()
 
     compativeis = []
@@ -155,7 +156,7 @@ def gerar_mensagem_profissionais_disponiveis(
 async def listar_servicos_cadastrados(user_id: str) -> list[str]:
     """Retorna a lista de todos os serviços oferecidos pelas profissionais."""
     dono_id = await obter_id_dono(user_id)
-    profissionais = await buscar_subcolecao(f"Clientes/{dono_id}/Profissionais") or {}
+    profissionais = await buscar_profissionais_tenant(dono_id)
 
     servicos = set()
     for dados in profissionais.values():
@@ -169,7 +170,7 @@ async def listar_servicos_cadastrados(user_id: str) -> list[str]:
 async def obter_precos_servico(user_id: str, servico: str, profissional: str | None = None):
     """Retorna o preço do ``servico`` para cada profissional ou para um profissional específico."""
     dono_id = await obter_id_dono(user_id)
-    profissionais = await buscar_subcolecao(f"Clientes/{dono_id}/Profissionais") or {}
+    profissionais = await buscar_profissionais_tenant(dono_id)
     servico_lower = servico.lower()
 
     def _buscar_preco(dados: dict) -> float | str | None:
@@ -215,7 +216,7 @@ async def encontrar_servico_mais_proximo(texto_usuario: str, user_id: str = None
     if user_id:
         try:
             dono_id = await obter_id_dono(user_id)
-            profissionais = await buscar_subcolecao(f"Clientes/{dono_id}/Profissionais") or {}
+            profissionais = await buscar_profissionais_tenant(dono_id)
             for p in profissionais.values():
                 for s in p.get("servicos", []):
                     servicos_disponiveis.add(unidecode.unidecode(s.lower().strip()))
@@ -241,7 +242,7 @@ async def encontrar_servico_mais_proximo(texto_usuario: str, user_id: str = None
 
 async def consultar_todos_precos(user_id: str) -> str:
     dono_id = await obter_id_dono(user_id)
-    profissionais = await buscar_subcolecao(f"Clientes/{dono_id}/Profissionais") or {}
+    profissionais = await buscar_profissionais_tenant(dono_id)
     resposta = "📋 *Lista completa de preços:*\n"
 
     for dados in profissionais.values():
@@ -11,10 +11,7 @@ from services.firebase_service_async import (
     buscar_subcolecao,
     salvar_dado_em_path,
 )
-from services.event_service_async import (
-    buscar_eventos_por_intervalo,
-    verificar_conflito_e_sugestoes_profissional,
-)
+from services.disponibilidade_engine import DisponibilidadeEngine
 from utils.gpt_utils import estimar_duracao
 
 logger = logging.getLogger(__name__)
@@ -64,39 +61,9 @@ def _normalizar_servico(descricao: str) -> str:
     # (você pode adaptar para mapear com seus serviços cadastrados)
     return d
 
-async def _tem_conflito_profissional(
-    user_id: str,
-    data_alvo_str: str,      # "YYYY-MM-DD"
-    hora_inicio_str: str,    # "HH:MM"
-    duracao_min: int,
-    profissional: Optional[str],
-    servico: Optional[str],
-) -> bool:
-    """
-    Usa seu verificador oficial p/ checar conflito do profissional.
-    Se não houver profissional, considera que não há conflito específico de profissional.
-    """
-    if not profissional:
-        return False  # sem profissional específico, não bloqueia por aqui
+def _minutos(t: time) -> int:
+    return t.hour * 60 + t.minute
 
-    try:
-        info = await verificar_conflito_e_sugestoes_profissional(
-            user_id=user_id,
-            data=data_alvo_str,
-            hora_inicio=hora_inicio_str,
-            duracao_min=duracao_min,
-            profissional=profissional,
-            servico=servico or ""
-        )
-        return bool(info.get("conflito"))
-    except Exception as e:
-        logger.error(f"[recorrencia] erro ao checar conflito do profissional: {e}")
-        # conservador: considera conflito em caso de erro
-        return True
-
-# ------------------------------------------------------------
-# Núcleo: gerar 3 horários realmente livres
-# ------------------------------------------------------------
 
 async def _gerar_3_horarios_livres(
     user_id: str,
@@ -112,6 +79,9 @@ async def _gerar_3_horarios_livres(
     Estratégia:
       - Tenta horários base: 10:00, 14:00, 16:00
       - Se não achar, varre 09:00→18:00 em passos de 30 min
+
+    O dia é lido uma vez (DisponibilidadeEngine); os candidatos são testados
+    em memória contra os intervalos livres.
     """
     # 1) duração do serviço (fallback 60)
     if duracao_min is None:
@@ -120,62 +90,30 @@ async def _gerar_3_horarios_livres(
         except Exception:
             duracao_min = 60
 
-    # 2) eventos do dia para checar conflito geral (independente de profissional)
-    eventos_dia = await buscar_eventos_por_intervalo(user_id, dia_especifico=data_sugerida) or []
-    ocupados: List[Tuple[datetime, datetime]] = []
-    for ev in eventos_dia:
-        try:
-            ini = _parse_dt(ev["data"], ev["hora_inicio"])
-            fim = _parse_dt(ev["data"], ev["hora_fim"])
-            if ini and fim and fim > ini:
-                ocupados.append((ini, fim))
-        except Exception:
-            continue
-
-    def _livre_global(dt_ini: datetime) -> bool:
-        dt_fim = dt_ini + timedelta(minutes=duracao_min)
-        for i, f in ocupados:
-            if not (dt_fim <= i or dt_ini >= f):
-                return False
-        return True
-
-    def _fmt(dt: datetime) -> Tuple[str, str]:
-        return (dt.strftime("%Y-%m-%d"), dt.strftime("%H:%M"))
-
-    livres: List[str] = []
-
-    # 3) checa candidatos padrão primeiro
-    for t in _HORARIOS_PADRAO:
-        dt_ini = datetime.combine(data_sugerida, t)
-        if not _livre_global(dt_ini):
-            continue
-        data_str, hora_str = _fmt(dt_ini)
-        conflito_prof = await _tem_conflito_profissional(
-            user_id, data_str, hora_str, duracao_min, profissional, servico_chave
-        )
-        if not conflito_prof:
-            livres.append(hora_str)
-        if len(livres) == 3:
-            return livres
-
-    # 4) fallback: varredura 09:00→18:00 de 30 em 30 min
-    start_scan = datetime.combine(data_sugerida, _JANELA_BUSCA_INICIO)
-    end_scan = datetime.combine(data_sugerida, _JANELA_BUSCA_FIM)
-    cursor = start_scan
-    seen = set(livres)
-
-    while cursor <= end_scan and len(livres) < 3:
-        h = cursor.strftime("%H:%M")
-        if h not in seen:
-            if _livre_global(cursor):
-                data_str, hora_str = _fmt(cursor)
-                conflito_prof = await _tem_conflito_profissional(
-                    user_id, data_str, hora_str, duracao_min, profissional, servico_chave
-                )
-                if not conflito_prof:
-                    livres.append(hora_str)
-            seen.add(h)
-        cursor += timedelta(minutes=_PASSO_MINUTOS)
+    # 2) ocupação do dia: a agenda geral já contém a do profissional
+    engine = await DisponibilidadeEngine.carregar(
+        user_id, data_sugerida, [profissional] if profissional else [], expediente=False
+    )
+
+    # 3) candidatos padrão primeiro
+    livres: List[str] = [
+        t.strftime("%H:%M") for t in _HORARIOS_PADRAO
+        if engine.cabe(None, t.strftime("%H:%M"), duracao_min)
+    ][:3]
+
+    # 4) fallback: varredura 09:00→18:00 (início) de 30 em 30 min
+    if len(livres) < 3:
+        inicio_scan = _minutos(_JANELA_BUSCA_INICIO)
+        fim_scan = _minutos(_JANELA_BUSCA_FIM) + duracao_min
+        varredura = engine.primeiros_slots(
+            None, duracao_min, grade=_PASSO_MINUTOS, n=3 + len(livres),
+            janela=(inicio_scan, fim_scan), ancora=inicio_scan,
+        )[None]
+        for hora in varredura:
+            if len(livres) == 3:
+                break
+            if hora not in livres:
+                livres.append(hora)
 
     return livres[:3]
 
@@ -338,6 +276,7 @@ async def checar_e_propor_recorrencias(user_id: str) -> int:
                 "minutos_antes": 0,
                 "destinatario": str(cliente_id),
                 "origem_user": str(user_id),
+                "tenant_id": str(cliente_id),
                 "tipo": "proposta_recorrencia",
             }
             from uuid import uuid4
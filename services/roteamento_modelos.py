@@ -0,0 +1,137 @@
+# services/roteamento_modelos.py
+"""
+Tabela de roteamento de modelos por ponto de chamada do LLM.
+
+Classificação (interpretar_linguagem_operacional_gpt) e redação curta
+(gerar_resposta_p1 / gerar_resposta_humana_agendamento) não precisam do
+modelo grande; ele fica para processar_com_gpt_com_acao:
+
+    modelo = await modelo_para("resposta_p1")          # tenant da mensagem atual
+    modelo = await modelo_para("gpt_com_acao", dono_id)
+
+- padrão por rota em ROTAS_MODELO (env LLM_MODELO_<ROTA>);
+- override por tenant no campo "modelos_llm" de Clientes/{dono}/configuracao/dados,
+  ex.: {"resposta_p1": "gpt-4o"}; modelos fora de MODELOS_CONHECIDOS são ignorados;
+- o tenant vem do parâmetro ou do escopo aberto pelo roteador_principal
+  (escopo_tenant_llm / definir_tenant_llm), sem passar dono_id por cada chamada P1;
+- overrides lidos uma vez por TTL (CacheLRUTTL) e invalidados em toda escrita
+  no documento pelos helpers de firebase_service_async.
+
+tools/avaliar_roteamento_modelos.py compara configurações de roteamento
+(acurácia, latência e custo) sobre os cenários dos runners de stress.
+"""
+
+import os
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from services.firebase_service_async import registrar_ouvinte_escrita
+from utils.cache_ttl import CacheLRUTTL
+from utils.custos_gpt import PRECOS
+
+MODELO_GRANDE = "gpt-4o"
+MODELO_LEVE = "gpt-4o-mini"
+
+ROTAS_MODELO = {
+    "interpretacao_operacional": os.getenv("LLM_MODELO_INTERPRETACAO_OPERACIONAL", MODELO_LEVE),
+    "resposta_p1": os.getenv("LLM_MODELO_RESPOSTA_P1", MODELO_LEVE),
+    "resposta_humana_agendamento": os.getenv("LLM_MODELO_RESPOSTA_HUMANA_AGENDAMENTO", MODELO_LEVE),
+    "gpt_com_acao": os.getenv("LLM_MODELO_GPT_COM_ACAO", MODELO_GRANDE),
+}
+
+# só modelos com preço conhecido (o custo registrado não cai no fallback)
+MODELOS_CONHECIDOS = frozenset(PRECOS)
+
+CAMPO_TENANT = "modelos_llm"
+
+cache_rotas_tenant = CacheLRUTTL("rotas_modelo_tenant", max_itens=2000, ttl_segundos=600, ttl_negativo_segundos=60)
+
+_TENANT_LLM: ContextVar = ContextVar("tenant_llm", default=None)
+
+
+def path_config_tenant(dono_id: str) -> str:
+    return f"Clientes/{dono_id}/configuracao/dados"
+
+
+# =========================================================
+# Tenant da mensagem atual
+# =========================================================
+def tenant_llm_atual() -> str | None:
+    return _TENANT_LLM.get()
+
+
+def definir_tenant_llm(dono_id: str | None) -> None:
+    """Tenant usado pelas chamadas ao LLM daqui em diante (dentro do escopo)."""
+    _TENANT_LLM.set(str(dono_id) if dono_id else None)
+
+
+@contextmanager
+def escopo_tenant_llm(dono_id: str | None = None):
+    """Isola o tenant da mensagem; ao sair volta o valor anterior."""
+    token = _TENANT_LLM.set(str(dono_id) if dono_id else None)
+    try:
+        yield
+    finally:
+        _TENANT_LLM.reset(token)
+
+
+# =========================================================
+# Overrides por tenant
+# =========================================================
+def _rotas_validas(rotas) -> dict:
+    if not isinstance(rotas, dict):
+        return {}
+    validas = {}
+    for rota, modelo in rotas.items():
+        if rota not in ROTAS_MODELO:
+            continue
+        if modelo not in MODELOS_CONHECIDOS:
+            print(f"⚠️ [ROTEAMENTO_LLM] modelo desconhecido ignorado rota={rota} modelo={modelo!r}", flush=True)
+            continue
+        validas[rota] = modelo
+    return validas
+
+
+async def rotas_do_tenant(dono_id: str) -> dict:
+    """Overrides válidos do tenant ({rota: modelo}; {} sem configuração)."""
+    dono_id = str(dono_id)
+
+    async def _carregar():
+        from services.firebase_service_async import buscar_dado_em_path
+
+        doc = await buscar_dado_em_path(path_config_tenant(dono_id)) or {}
+        return _rotas_validas(doc.get(CAMPO_TENANT)) or None
+
+    return await cache_rotas_tenant.obter(dono_id, _carregar) or {}
+
+
+async def salvar_rotas_tenant(dono_id: str, rotas: dict) -> dict:
+    """Grava os overrides válidos do tenant (merge por rota) e devolve o que foi gravado."""
+    from services.firebase_service_async import atualizar_dado_em_path
+
+    validas = _rotas_validas(rotas)
+    if validas:
+        await atualizar_dado_em_path(path_config_tenant(dono_id), {CAMPO_TENANT: validas})
+    return validas
+
+
+async def modelo_para(rota: str, tenant_id: str | None = None) -> str:
+    """Modelo da rota para o tenant (parâmetro ou escopo atual); cai no padrão em erro."""
+    padrao = ROTAS_MODELO.get(rota, MODELO_GRANDE)
+    tenant_id = tenant_id or tenant_llm_atual()
+    if not tenant_id:
+        return padrao
+    try:
+        return (await rotas_do_tenant(tenant_id)).get(rota, padrao)
+    except Exception as e:
+        print(f"⚠️ [ROTEAMENTO_LLM] overrides indisponíveis tenant={tenant_id}: {e}", flush=True)
+        return padrao
+
+
+def _ao_escrever(path: str) -> None:
+    partes = str(path).strip("/").split("/")
+    if len(partes) == 4 and partes[0] == "Clientes" and partes[2:] == ["configuracao", "dados"]:
+        cache_rotas_tenant.invalidar(partes[1])
+
+
+registrar_ouvinte_escrita(_ao_escrever)
@@ -0,0 +1,141 @@
+# servidor_webhook.py
+"""
+Modo webhook nativo assíncrono (aiohttp), no mesmo loop do bot.
+
+Diferente do modo Flask (thread + future.result(timeout=60) por update):
+- POST /webhook valida o JSON, enfileira no DespachanteUpdates e responde
+  200 na hora — o Telegram não espera o GPT/Firestore;
+- os updates são processados com concorrência limitada, em ordem por chat;
+- GET /metricas expõe fila/latência (p50/p95/p99) do despachante.
+
+Ativado em main.py com WEBHOOK_MODO=aiohttp.
+"""
+
+import asyncio
+import logging
+import os
+
+from telegram import Update
+
+from utils.custos_gpt import aguardar_custos_pendentes
+from utils.despachante_updates import DespachanteUpdates
+from utils.leituras_update import leituras_do_update, origem_do_update
+from utils.monitor_loop import ativar_se_configurado, monitor_ativo
+
+logger = logging.getLogger(__name__)
+
+WEBHOOK_MAX_CONCORRENCIA = int(os.getenv("WEBHOOK_MAX_CONCORRENCIA", "16"))
+WEBHOOK_MAX_FILA = int(os.getenv("WEBHOOK_MAX_FILA", "5000"))
+
+
+def criar_app_webhook(application, despachante: DespachanteUpdates, cron_token: str | None = None, processar_notificacoes=None):
+    from aiohttp import web
+
+    async def webhook(request):
+        try:
+            dados = await request.json()
+            update = Update.de_json(dados, application.bot)
+        except Exception as e:
+            logger.warning(f"⚠️ Webhook com payload inválido: {e}")
+            return web.json_response({"ok": False}, status=400)
+
+        if not despachante.enfileirar(update):
+            # fila cheia: 503 faz o Telegram reenviar depois
+            logger.error("🔥 Fila de updates cheia; devolvendo 503")
+            return web.json_response({"ok": False, "error": "fila_cheia"}, status=503)
+
+        return web.json_response({"ok": True})
+
+    async def health_check(request):
+        return web.Response(text="🤖 Bot Online!")
+
+    async def metricas(request):
+        dados = despachante.metricas()
+        monitor = monitor_ativo()
+        if monitor is not None:
+            dados["loop"] = monitor.relatorio()
+        return web.json_response(dados)
+
+    async def cron_ping(request):
+        token = request.query.get("token") or request.headers.get("X-CRON-TOKEN")
+        if not cron_token or token != cron_token:
+            return web.json_response({"ok": False, "error": "unauthorized"}, status=401)
+
+        if processar_notificacoes is None:
+            logger.info("⚠️ /cron/ping chamado, mas não há processar_notificacoes_agendadas para rodar.")
+            return web.json_response({"ok": True, "message": "cron ping ok (sem processamento direto)"})
+
+        try:
+            await asyncio.wait_for(processar_notificacoes(), timeout=30)
+            return web.json_response({"ok": True, "message": "notificacoes processadas"})
+        except Exception as e:
+            logger.error(f"❌ Erro ao executar cron/ping: {e}", exc_info=True)
+            return web.json_response({"ok": False, "error": str(e)}, status=500)
+
+    app = web.Application()
+    app.router.add_post("/webhook", webhook)
+    app.router.add_get("/", health_check)
+    app.router.add_get("/metricas", metricas)
+    app.router.add_route("*", "/cron/ping", cron_ping)
+    return app
+
+
+async def executar_servidor(
+    application,
+    porta: int,
+    webhook_url: str | None = None,
+    cron_token: str | None = None,
+    processar_notificacoes=None,
+    ao_iniciar=(),
+    max_concorrencia: int = WEBHOOK_MAX_CONCORRENCIA,
+    max_fila: int = WEBHOOK_MAX_FILA,
+    parar: asyncio.Event | None = None,
+):
+    """
+    Sobe bot + servidor HTTP no loop atual e roda até `parar` ser sinalizado.
+
+    ao_iniciar: callables síncronos executados já dentro do loop (ex.: schedulers
+    que capturam o event loop ao iniciar).
+    """
+    from aiohttp import web
+
+    async def processar(update):
+        # leituras idênticas do Firestore dentro do update acontecem uma vez
+        async with leituras_do_update(origem_do_update(update)):
+            await application.process_update(update)
+
+    despachante = DespachanteUpdates(processar, max_concorrencia=max_concorrencia, max_fila=max_fila)
+    parar = parar or asyncio.Event()
+    ativar_se_configurado()
+
+    await application.initialize()
+    if webhook_url:
+        try:
+            await application.bot.delete_webhook()
+            await application.bot.set_webhook(webhook_url)
+            logger.info(f"✅ Webhook configurado com sucesso: {webhook_url}")
+        except Exception as e:
+            logger.error(f"❌ Erro ao configurar webhook: {e}", exc_info=True)
+    await application.start()
+    await despachante.iniciar()
+
+    for funcao in ao_iniciar:
+        funcao()
+
+    runner = web.AppRunner(criar_app_webhook(application, despachante, cron_token, processar_notificacoes))
+    await runner.setup()
+    site = web.TCPSite(runner, "0.0.0.0", porta)
+    await site.start()
+    logger.info(f"🤖 Webhook aiohttp ouvindo na porta {porta} ({max_concorrencia} workers)")
+
+    try:
+        await parar.wait()
+    finally:
+        await runner.cleanup()
+        await despachante.parar(drenar=True)
+        await aguardar_custos_pendentes()
+        await application.stop()
+        await application.shutdown()
+        logger.info(f"🛑 Servidor webhook encerrado: {despachante.metricas()}")
+
+    return despachante
@@ -0,0 +1,184 @@
+"""
+Firestore falso no nível da API GAPIC (batch_get_documents, commit,
+begin_transaction, rollback, run_query), para rodar o SDK de verdade
+(AsyncClient, AsyncTransaction, async_transactional, batch) sem rede.
+
+    api = FirestoreApiFalso(latencia_ms=5)
+    client = cliente_falso(api)              # AsyncClient real, canal trocado
+    api.docs["Clientes/d1/Ocupacao/x"] = {...}
+
+- conta RPCs por método (api.rpcs) e pode simular latência por RPC;
+- transação otimista: commit falha com Aborted se um documento lido na
+  transação mudou depois da leitura (o async_transactional reexecuta);
+- run_query: coleção direta com filtros de campo simples (==, <, <=, >, >=, in)
+  combinados por AND; projeção ignorada (devolve o documento inteiro).
+"""
+
+import asyncio
+import datetime
+from collections import Counter
+
+from google.api_core import exceptions
+from google.auth.credentials import AnonymousCredentials
+from google.cloud.firestore_v1 import AsyncClient, _helpers
+from google.cloud.firestore_v1.field_path import FieldPath
+from google.cloud.firestore_v1.types import document, firestore, write
+
+PROJETO = "teste"
+PREFIXO = f"projects/{PROJETO}/databases/(default)/documents/"
+
+_OPERADORES = {
+    "EQUAL": lambda a, b: a == b,
+    "LESS_THAN": lambda a, b: a is not None and a < b,
+    "LESS_THAN_OR_EQUAL": lambda a, b: a is not None and a <= b,
+    "GREATER_THAN": lambda a, b: a is not None and a > b,
+    "GREATER_THAN_OR_EQUAL": lambda a, b: a is not None and a >= b,
+    "IN": lambda a, b: a in b,
+}
+
+
+def _campo(request, nome):
+    return request[nome] if isinstance(request, dict) else getattr(request, nome)
+
+
+def _agora():
+    return datetime.datetime.now(datetime.timezone.utc)
+
+
+async def _iterar(itens):
+    for item in itens:
+        yield item
+
+
+class FirestoreApiFalso:
+
+    def __init__(self, latencia_ms: float = 0.0):
+        self.latencia = latencia_ms / 1000
+        self.docs: dict = {}          # path relativo -> dict
+        self._versoes: Counter = Counter()
+        self._lidos_tx: dict = {}     # transaction id -> {path: versão lida}
+        self._proxima_tx = 0
+        self.rpcs: Counter = Counter()
+        self.abortadas = 0
+
+    async def _rpc(self, nome):
+        self.rpcs[nome] += 1
+        if self.latencia:
+            await asyncio.sleep(self.latencia)
+
+    # -----------------------------------------------------
+    # leitura
+    # -----------------------------------------------------
+    def _documento(self, path):
+        dados = self.docs.get(path)
+        if dados is None:
+            return None
+        return document.Document(
+            name=PREFIXO + path,
+            fields=_helpers.encode_dict(dados),
+            create_time=_agora(),
+            update_time=_agora(),
+        )
+
+    async def batch_get_documents(self, request, metadata=None, **kwargs):
+        await self._rpc("batch_get_documents")
+        tx = _campo(request, "transaction") if isinstance(request, dict) and "transaction" in request else None
+        respostas = []
+        for nome in _campo(request, "documents"):
+            path = nome[len(PREFIXO):]
+            if tx:
+                self._lidos_tx.setdefault(tx, {})[path] = self._versoes[path]
+            doc = self._documento(path)
+            if doc is None:
+                respostas.append(firestore.BatchGetDocumentsResponse(missing=nome, read_time=_agora()))
+            else:
+                respostas.append(firestore.BatchGetDocumentsResponse(found=doc, read_time=_agora()))
+        return _iterar(respostas)
+
+    def _filtro_ok(self, filtro, dados) -> bool:
+        if "composite_filter" in filtro:
+            return all(self._filtro_ok(f, dados) for f in filtro.composite_filter.filters)
+        campo = filtro.field_filter
+        atual = dados
+        for parte in FieldPath.from_api_repr(campo.field.field_path).parts:
+            atual = atual.get(parte) if isinstance(atual, dict) else None
+        valor = _helpers.decode_value(campo.value, None)
+        return _OPERADORES[campo.op.name](atual, valor)
+
+    async def run_query(self, request, metadata=None, **kwargs):
+        await self._rpc("run_query")
+        pai = _campo(request, "parent")
+        consulta = _campo(request, "structured_query")
+        colecao = consulta.from_[0].collection_id
+        base = (pai[len(PREFIXO):] + "/" if pai.startswith(PREFIXO) else "") + colecao + "/"
+        respostas = []
+        for path in sorted(self.docs):
+            if not path.startswith(base) or "/" in path[len(base):]:
+                continue
+            if "where" in consulta and not self._filtro_ok(consulta.where, self.docs[path]):
+                continue
+            respostas.append(firestore.RunQueryResponse(document=self._documento(path), read_time=_agora()))
+            if consulta.limit and len(respostas) >= consulta.limit:
+                break
+        if not respostas:
+            respostas.append(firestore.RunQueryResponse(read_time=_agora()))
+        return _iterar(respostas)
+
+    # -----------------------------------------------------
+    # escrita / transação
+    # -----------------------------------------------------
+    async def begin_transaction(self, request, metadata=None, **kwargs):
+        await self._rpc("begin_transaction")
+        self._proxima_tx += 1
+        return firestore.BeginTransactionResponse(transaction=f"tx{self._proxima_tx}".encode())
+
+    async def rollback(self, request, metadata=None, **kwargs):
+        await self._rpc("rollback")
+        self._lidos_tx.pop(_campo(request, "transaction"), None)
+
+    def _aplicar(self, w: write.Write):
+        if w.delete:
+            path = w.delete[len(PREFIXO):]
+            self.docs.pop(path, None)
+            self._versoes[path] += 1
+            return
+        path = w.update.name[len(PREFIXO):]
+        novos = _helpers.decode_dict(w.update.fields, None)
+        if "update_mask" in w:
+            atual = self.docs.setdefault(path, {})
+            for campo in w.update_mask.field_paths:
+                partes = FieldPath.from_api_repr(campo).parts
+                origem, destino = novos, atual
+                for parte in partes[:-1]:
+                    origem = (origem or {}).get(parte)
+                    destino = destino.setdefault(parte, {})
+                if isinstance(origem, dict) and partes[-1] in origem:
+                    destino[partes[-1]] = origem[partes[-1]]
+                else:
+                    destino.pop(partes[-1], None)   # DELETE_FIELD
+        else:
+            self.docs[path] = novos
+        self._versoes[path] += 1
+
+    async def commit(self, request, metadata=None, **kwargs):
+        await self._rpc("commit")
+        tx = request.get("transaction") if isinstance(request, dict) else None
+        if tx:
+            lidos = self._lidos_tx.pop(tx, {})
+            if any(self._versoes[path] != versao for path, versao in lidos.items()):
+                self.abortadas += 1
+                raise exceptions.Aborted("contention")
+        writes = list(_campo(request, "writes"))
+        for w in writes:
+            self._aplicar(w)
+        return firestore.CommitResponse(
+            write_results=[write.WriteResult(update_time=_agora()) for _ in writes],
+            commit_time=_agora(),
+        )
+
+
+def cliente_falso(api: FirestoreApiFalso) -> AsyncClient:
+    """AsyncClient real cujas RPCs vão para `api`."""
+    client = AsyncClient(project=PROJETO, credentials=AnonymousCredentials())
+    client._firestore_api_internal = api
+    return client
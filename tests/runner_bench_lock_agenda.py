@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+#!/usr/bin/env python3
+"""
+BENCH — criar_evento_com_lock: versão lock a lock (antes) x transação em lote (atual)
+
+Roda o código de verdade dos dois lados contra o Firestore falso de
+tests/firestore_falso.py (SDK real — AsyncClient, AsyncTransaction,
+async_transactional — com as RPCs GAPIC atendidas em memória):
+
+    - antes: services/agenda_lock_service.py na revisão REV_LEGADO (git show),
+             com os helpers atuais de firebase_service_async;
+    - atual: services.agenda_lock_service.criar_evento_com_lock.
+
+Cada RPC (batch_get_documents, run_query, begin_transaction, commit,
+rollback) é contada e espera `latencia_ms`. O tenant começa com
+`historico` eventos em Eventos (o caminho antigo varre a subcoleção);
+as reservas ocupam horários livres em dias seguidos, então o
+caminho atual reconstrói o índice de ocupação na primeira de cada dia —
+esse custo entra no p95.
+
+Uso:
+    FIREBASE_CREDENTIALS=... python tests/runner_bench_lock_agenda.py [latencia_ms] [n_agendamentos] [historico]
+"""
+
+import asyncio
+import contextlib
+import io
+import os
+import statistics
+import subprocess
+import sys
+import time
+import types
+from collections import Counter
+from datetime import date, timedelta
+from pathlib import Path
+from unittest.mock import patch
+
+RAIZ = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(RAIZ))
+
+from tests.firestore_falso import FirestoreApiFalso, cliente_falso
+
+# último commit antes da reserva transacional
+REV_LEGADO = os.getenv("BENCH_LOCK_REV_LEGADO", "1ce5762^")
+DONO = "dono_bench"
+DIA_INICIAL = date(2026, 6, 1)
+
+
+def carregar_legado():
+    """Módulo agenda_lock_service da revisão REV_LEGADO (sem tocar no working tree)."""
+    fonte = subprocess.run(
+        ["git", "show", f"{REV_LEGADO}:services/agenda_lock_service.py"],
+        cwd=RAIZ, capture_output=True, text=True, check=True,
+    ).stdout
+    modulo = types.ModuleType("agenda_lock_service_legado")
+    modulo.__file__ = f"<{REV_LEGADO}:services/agenda_lock_service.py>"
+    exec(compile(fonte, modulo.__file__, "exec"), modulo.__dict__)
+    return modulo
+
+
+def popular_historico(api: FirestoreApiFalso, historico: int):
+    for i in range(historico):
+        dia = (DIA_INICIAL - timedelta(days=1 + i // 10)).isoformat()
+        api.docs[f"Clientes/{DONO}/Eventos/hist_{i}"] = {
+            "profissional": "Bruna", "data": dia, "hora_inicio": f"{9 + i % 10:02d}:00",
+            "hora_fim": f"{9 + i % 10:02d}:30", "status": "confirmado", "confirmado": True, "cliente_id": f"c{i}",
+        }
+
+
+def evento_da_reserva(i: int, duracao_min: int) -> dict:
+    # horários encostados, sem sobreposição: das 9h às 17h, depois o dia seguinte
+    passo = -(-duracao_min // 60) * 60
+    por_dia = (8 * 60) // passo
+    dia = (DIA_INICIAL + timedelta(days=i // por_dia)).isoformat()
+    inicio = 9 * 60 + (i % por_dia) * passo
+    fim = inicio + duracao_min
+    return {
+        "confirmado": True, "profissional": "Bruna", "data": dia, "cliente_id": f"cli_{i}",
+        "hora_inicio": f"{inicio // 60:02d}:{inicio % 60:02d}", "hora_fim": f"{fim // 60:02d}:{fim % 60:02d}",
+        "servico": "corte",
+    }
+
+
+async def medir(nome: str, criar, latencia_ms: float, n: int, duracao_min: int, historico: int):
+    from services import agenda_lock_service, firebase_service_async, ocupacao_service
+
+    api = FirestoreApiFalso(latencia_ms)
+    popular_historico(api, historico)
+    client = cliente_falso(api)
+    firebase_service_async._tenants_eventos_indexados.clear()
+
+    tempos, falhas = [], 0
+    with patch.object(firebase_service_async, "client", client), \
+         patch.object(agenda_lock_service, "client", client), \
+         patch.object(ocupacao_service, "client", client), \
+         contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+        for i in range(n):
+            t0 = time.perf_counter()
+            r = await criar(DONO, evento_da_reserva(i, duracao_min), f"bench_{i}")
+            tempos.append((time.perf_counter() - t0) * 1000)
+            falhas += not r.get("ok")
+
+    rpcs = sum(api.rpcs.values())
+    p95 = statistics.quantiles(tempos, n=20)[-1] if len(tempos) > 1 else tempos[0]
+    detalhe = ", ".join(f"{k}={v / n:.1f}" for k, v in sorted(api.rpcs.items()))
+    print(
+        f"{nome:<6} duracao={duracao_min:>3}min rpcs/agendamento={rpcs / n:6.1f} "
+        f"p50={statistics.median(tempos):7.1f}ms p95={p95:7.1f}ms falhas={falhas}  [{detalhe}]"
+    )
+    return {"rpcs": rpcs / n, "p95": p95, "falhas": falhas, "por_metodo": Counter(api.rpcs)}
+
+
+async def main():
+    latencia_ms = float(sys.argv[1]) if len(sys.argv) > 1 else 20
+    n = int(sys.argv[2]) if len(sys.argv) > 2 else 24
+    historico = int(sys.argv[3]) if len(sys.argv) > 3 else 200
+
+    from services import agenda_lock_service
+
+    legado = carregar_legado()
+    print(f"[BENCH_LOCK] latência por RPC={latencia_ms}ms n={n} historico={historico} legado={REV_LEGADO}")
+    for duracao in (30, 60, 120):
+        await medir("antes", legado.criar_evento_com_lock, latencia_ms, n, duracao, historico)
+        await medir("atual", agenda_lock_service.criar_evento_com_lock, latencia_ms, n, duracao, historico)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,111 @@
+"""
+Janelas e disponibilidade de vários dias (agenda_service + DisponibilidadeEngine).
+
+Objetivo: validar que a busca da próxima data aberta lê a configuração da
+agenda uma vez (não uma por dia), que as janelas do intervalo seguem as
+regras de salão/profissional/exceções de obter_janela_funcionamento e que a
+disponibilidade do intervalo traz os horários livres de cada dia com uma
+única query de eventos.
+"""
+
+import pytest
+from unittest.mock import AsyncMock, patch
+
+from services import agenda_service
+
+CFG_SALAO = {
+    # segunda=0 ... sábado=5 abertos; domingo fechado
+    "agenda_padrao": {str(d): {"aberto": True, "inicio": "09:00", "fim": "18:00"} for d in range(6)},
+    "excecoes_data": {"2026-10-21": {"aberto": False, "motivo": "feriado"}},
+}
+PROFISSIONAIS = {
+    "Bruna": {"nome": "Bruna",
+              "agenda_funcionamento": {"agenda_padrao": {"3": {"aberto": True, "inicio": "12:00", "fim": "20:00"}}}},
+    "Carla": {"nome": "Carla"},
+}
+EXCECOES = {
+    "Carla": {"2026-10-23": {"tipo": "bloqueado", "ativo": True},
+              "2026-10-24": {"aberto": True, "inicio": "10:00", "fim": "13:00"}},
+}
+
+
+@pytest.fixture
+def firestore_agenda():
+    from services import firebase_service_async as fsa
+    from services import catalogo_service, config_agenda_service
+
+    config_agenda_service.cache_config_agenda.limpar()
+    config_agenda_service.cache_excecoes_prof.limpar()
+
+    async def dado(path):
+        return CFG_SALAO if path.endswith("configuracao/agenda_funcionamento") else {}
+
+    async def subcolecao(path):
+        if path.endswith("/Profissionais"):
+            return PROFISSIONAIS
+        return EXCECOES.get(path.split("/")[3], {}) if path.endswith("/AgendaExcecoes") else {}
+
+    catalogo = catalogo_service.CatalogoTenant("dono1", PROFISSIONAIS)
+    with patch.object(fsa, "buscar_dado_em_path", side_effect=dado) as mock_dado, \
+         patch.object(fsa, "buscar_subcolecao", side_effect=subcolecao) as mock_sub, \
+         patch.object(catalogo_service, "obter_catalogo", AsyncMock(return_value=catalogo)):
+        yield mock_dado, mock_sub
+
+
+@pytest.mark.asyncio
+class TestAgendaIntervalo:
+
+    async def test_proxima_data_le_config_uma_vez(self, firestore_agenda):
+        mock_dado, mock_sub = firestore_agenda
+
+        # Bruna só atende quinta (weekday 3): de segunda 19 → quinta 22
+        assert await agenda_service.proxima_data_permitida("dono1", "2026-10-19", "Bruna") == "2026-10-22"
+        # salão: terça 20 aberta; quarta 21 é feriado
+        assert await agenda_service.proxima_data_permitida("dono1", "2026-10-20") == "2026-10-22"
+        assert await agenda_service.proxima_data_permitida("dono1", "2026-10-19", "Bruna", limite_dias=2) is None
+
+        assert mock_dado.await_count == 1            # config do salão: uma leitura (depois cache)
+        assert mock_sub.await_count == 1             # exceções da Bruna: idem
+
+    async def test_janelas_do_intervalo(self, firestore_agenda):
+        datas = agenda_service.datas_do_intervalo("2026-10-19", "2026-10-25")
+        assert len(datas) == 7
+
+        def resumo(janelas):
+            return {d: (j["inicio"], j["fim"]) if j["aberto"] else j["origem"] for d, j in janelas.items()}
+
+        carla = await agenda_service.obter_janelas_intervalo("dono1", "2026-10-21", "2026-10-25", "carla")
+        assert resumo(carla) == {
+            "2026-10-21": "excecao_salao",
+            "2026-10-22": ("09:00", "18:00"),
+            "2026-10-23": "excecao_profissional",      # bloqueado
+            "2026-10-24": ("10:00", "13:00"),          # janela especial
+            "2026-10-25": "agenda_padrao_salao",       # domingo
+        }
+        bruna = await agenda_service.obter_janelas_intervalo("dono1", "2026-10-20", dias=3, profissional="Bruna")
+        assert resumo(bruna)["2026-10-22"] == ("12:00", "18:00")
+        assert resumo(bruna)["2026-10-20"] == "agenda_padrao_profissional"
+
+        # a API de um dia dá o mesmo resultado
+        for data in datas:
+            assert await agenda_service.obter_janela_funcionamento("dono1", data, "carla") == \
+                (await agenda_service.obter_janelas_intervalo("dono1", data, profissional="carla"))[data]
+        assert (await agenda_service.obter_janela_funcionamento("dono1", "2026-10-22", "Zé"))["origem"] == \
+            "profissional_nao_encontrado"
+
+    async def test_disponibilidade_do_intervalo_com_slots(self, firestore_agenda):
+        from services import firebase_service_async as fsa
+
+        eventos = {
+            "e1": {"data": "2026-10-22", "hora_inicio": "12:00", "hora_fim": "13:30", "profissional": "Bruna"},
+            "e2": {"data": "2026-10-29", "hora_inicio": "12:00", "hora_fim": "12:30", "profissional": "Bruna"},
+        }
+        with patch.object(fsa, "buscar_eventos_filtrados", AsyncMock(return_value=eventos)) as mock_eventos:
+            dispo = await agenda_service.obter_disponibilidade_intervalo(
+                "dono1", "2026-10-19", "2026-10-31", "Bruna", duracao_min=60, grade_minutos=30, max_slots=2
+            )
+
+        mock_eventos.assert_awaited_once_with("dono1", data_inicio="2026-10-19", data_fim="2026-10-31")
+        abertos = {data: j["slots"] for data, j in dispo.items() if j["aberto"]}
+        assert abertos == {"2026-10-22": ["13:30", "14:00"], "2026-10-29": ["12:30", "13:00"]}
+        assert dispo["2026-10-21"]["slots"] == []
@@ -0,0 +1,255 @@
+"""
+Reserva de slot numa única transação (criar_evento_com_lock).
+
+Objetivo: validar a decisão tomada sobre o que foi lido em lote dentro da
+transação (locks + evento + ocupação) e que criar_evento_com_lock monta
+um lock por bucket de 10 minutos, sem ler/gravar lock a lock. A limpeza
+de locks vencidos fica fora da reserva (varredura por expira_em), e que a
+checagem de conflito sem data assume conflito. A reserva também roda de
+ponta a ponta pelo SDK real (AsyncTransaction + async_transactional) sobre
+o Firestore falso de tests/firestore_falso.py: grava evento, locks e
+índice num commit e, com reservas concorrentes no mesmo horário, só uma passa.
+"""
+
+import asyncio
+import pytest
+from datetime import datetime, timedelta
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from tests.firestore_falso import FirestoreApiFalso, cliente_falso
+
+
+AGORA = datetime.now().isoformat()
+ANTIGO = (datetime.now() - timedelta(hours=30)).isoformat()
+
+OCUPACAO = {
+    "completo": True,
+    "intervalos": {
+        "ev_manha": {"hora_inicio": "09:00", "hora_fim": "10:00", "cliente_id": "c1", "status": "confirmado"},
+    },
+}
+
+
+def _avaliar(locks=None, evento=None, ocupacao=OCUPACAO, inicio="10:00", fim="10:30", **kw):
+    from services.agenda_lock_service import avaliar_reserva
+
+    return avaliar_reserva(
+        locks=locks or {},
+        evento_existente=evento,
+        ocupacao=ocupacao,
+        event_id="ev_novo",
+        profissional="Bruna",
+        hora_inicio=inicio,
+        hora_fim=fim,
+        **kw,
+    )
+
+
+def test_slot_livre():
+    assert _avaliar(locks={"bruna_20260620_100000": None}) == {
+        "ok": True, "duplicado": False, "motivo": "Evento criado com sucesso"
+    }
+
+
+def test_evento_existente_e_idempotente():
+    r = _avaliar(evento={"hora_inicio": "10:00"})
+    assert r["ok"] and r["duplicado"]
+
+
+def test_lock_de_evento_ativo_bloqueia():
+    lock = {"timestamp_lock": AGORA, "evento_id": "ev_manha"}
+    r = _avaliar(locks={"bruna_20260620_090000": lock}, inicio="09:00", fim="09:30")
+    assert r["tipo_erro"] == "lock_existente"
+
+
+def test_lock_ativo_sem_evento_e_orfao():
+    r = _avaliar(locks={"bruna_20260620_100000": {"timestamp_lock": AGORA}})
+    assert r["tipo_erro"] == "lock_orfo_ativo"
+
+
+def test_lock_expirado_ou_de_evento_cancelado_nao_bloqueia():
+    locks = {
+        "bruna_20260620_100000": {"timestamp_lock": ANTIGO},
+        "bruna_20260620_101000": {"timestamp_lock": AGORA, "evento_id": "ev_cancelado"},
+    }
+    assert _avaliar(locks=locks)["ok"] is True
+
+
+def test_lock_de_evento_fora_do_indice_bloqueia_se_indice_incompleto():
+    lock = {"timestamp_lock": AGORA, "evento_id": "ev_cancelado"}
+    r = _avaliar(locks={"bruna_20260620_100000": lock}, ocupacao=None)
+    assert r["tipo_erro"] == "lock_existente"
+
+
+def test_sobreposicao_no_indice_e_conflito():
+    r = _avaliar(inicio="09:30", fim="10:30")
+    assert r["tipo_erro"] == "conflito"
+
+    r = _avaliar(inicio="09:30", fim="10:30", excluir_evento_id="ev_manha")
+    assert r["ok"] is True
+
+
+@pytest.mark.asyncio
+class TestCriarEventoComLock:
+
+    async def test_uma_transacao_com_um_lock_por_bucket(self):
+        from services import agenda_lock_service
+
+        evento = {
+            "confirmado": True,
+            "profissional": "Bruna",
+            "data": "2026-06-20",
+            "hora_inicio": "14:00",
+            "hora_fim": "14:30",
+        }
+        decisao = {"ok": True, "duplicado": False, "motivo": "Evento criado com sucesso"}
+
+        with patch.object(agenda_lock_service, "buscar_intervalos_ocupados", AsyncMock(return_value=[])), \
+             patch.object(agenda_lock_service, "deletar_por_query", AsyncMock()) as mock_limpeza, \
+             patch.object(agenda_lock_service, "client", MagicMock()), \
+             patch.object(agenda_lock_service, "_reservar_em_transacao", AsyncMock(return_value=decisao)) as mock_tx:
+            r = await agenda_lock_service.criar_evento_com_lock("dono_1", evento, "ev_1")
+
+        assert r == {"ok": True, "evento_id": "ev_1", "motivo": "Evento criado com sucesso"}
+        mock_tx.assert_awaited_once()
+        mock_limpeza.assert_not_awaited()
+
+        _, dono, evento_final, event_id, lock_paths, lock_base, _ = mock_tx.call_args.args
+        assert (dono, event_id) == ("dono_1", "ev_1")
+        assert list(lock_paths) == ["bruna_20260620_140000", "bruna_20260620_141000", "bruna_20260620_142000"]
+        assert lock_base["status"] == "confirmado" and lock_base["evento_id"] == "ev_1"
+        assert evento_final["criado_em"]
+
+    async def test_sem_data_nao_abre_transacao(self):
+        from services import agenda_lock_service
+
+        evento = {"confirmado": True, "profissional": "Bruna", "hora_inicio": "14:00", "hora_fim": "14:30"}
+
+        with patch.object(agenda_lock_service, "_reservar_em_transacao", AsyncMock()) as mock_tx:
+            r = await agenda_lock_service.criar_evento_com_lock("dono_1", evento, "ev_1")
+
+        assert r["tipo_erro"] == "validacao"
+        mock_tx.assert_not_awaited()
+
+    async def test_conflito_sem_data_falha_fechado(self):
+        from services import agenda_lock_service
+
+        with patch.object(agenda_lock_service, "buscar_intervalos_ocupados", AsyncMock(return_value=[])) as mock_ocupacao:
+            assert await agenda_lock_service.tem_conflito_real("dono_1", "Bruna", "14:00", "14:30") is True
+            assert await agenda_lock_service.tem_conflito_real("dono_1", "Bruna", "14:00", "14:30", data="2026-06-20") is False
+
+        mock_ocupacao.assert_awaited_once()
+
+
+@pytest.fixture
+def firestore_falso():
+    from services import agenda_lock_service, firebase_service_async, ocupacao_service
+
+    api = FirestoreApiFalso()
+    client = cliente_falso(api)
+    # dia já indexado: a reserva não passa pela reconstrução
+    api.docs["Clientes/dono_1/Ocupacao/2026-06-20_bruna"] = {**OCUPACAO, "data": "2026-06-20", "profissional": "bruna"}
+    with patch.object(firebase_service_async, "client", client), \
+         patch.object(agenda_lock_service, "client", client), \
+         patch.object(ocupacao_service, "client", client):
+        yield api
+
+
+def _evento(inicio="14:00", fim="14:30", **extra):
+    return {"confirmado": True, "profissional": "Bruna", "data": "2026-06-20",
+            "hora_inicio": inicio, "hora_fim": fim, "cliente_id": "c9", **extra}
+
+
+@pytest.mark.asyncio
+class TestReservaNoSdkReal:
+
+    async def test_reserva_grava_evento_locks_e_indice_num_commit(self, firestore_falso):
+        from services import agenda_lock_service
+
+        api = firestore_falso
+        r = await agenda_lock_service.criar_evento_com_lock("dono_1", _evento(), "ev_1")
+
+        assert r == {"ok": True, "evento_id": "ev_1", "motivo": "Evento criado com sucesso"}
+        assert api.rpcs == {"batch_get_documents": 2, "begin_transaction": 1, "commit": 1}
+        assert api.docs["Clientes/dono_1/Eventos/ev_1"]["hora_fim"] == "14:30"
+        locks = sorted(p for p in api.docs if "/AgendaLocks/" in p)
+        assert [p.rsplit("_", 1)[1] for p in locks] == ["140000", "141000", "142000"]
+        intervalos = api.docs["Clientes/dono_1/Ocupacao/2026-06-20_bruna"]["intervalos"]
+        assert sorted(intervalos) == ["ev_1", "ev_manha"]
+
+        # mesmo event_id: idempotente; outro evento no mesmo horário: conflito
+        assert (await agenda_lock_service.criar_evento_com_lock("dono_1", _evento(), "ev_1"))["duplicado"] is True
+        conflito = await agenda_lock_service.criar_evento_com_lock("dono_1", _evento("14:10", "14:40"), "ev_2")
+        assert conflito["ok"] is False and conflito["tipo_erro"] != "erro"
+        assert "Clientes/dono_1/Eventos/ev_2" not in api.docs
+
+    async def test_reservas_concorrentes_no_mesmo_horario(self, firestore_falso):
+        from services import agenda_lock_service
+
+        api = firestore_falso
+        api.latencia = 0.005
+        resultados = await asyncio.gather(*[
+            agenda_lock_service.criar_evento_com_lock("dono_1", _evento(cliente_id=f"c{i}"), f"ev_{i}")
+            for i in range(4)
+        ])
+
+        assert sum(r["ok"] for r in resultados) == 1
+        assert not any(r.get("tipo_erro") == "erro" for r in resultados)
+        assert len([p for p in api.docs if "/Eventos/" in p]) == 1
+        assert api.abortadas >= 1   # as perdedoras foram reexecutadas e viram o lock
+
+
+@pytest.mark.asyncio
+class TestLimpezaDeLocks:
+
+    async def test_varredura_usa_range_em_expira_em(self):
+        from services import agenda_lock_service
+
+        agora = datetime(2026, 6, 20, 12, 0)
+
+        with patch.object(agenda_lock_service, "deletar_por_query", AsyncMock(return_value=7)) as mock_del:
+            assert await agenda_lock_service.limpar_locks_expirados(agora=agora) == 7
+            await agenda_lock_service.limpar_locks_expirados("dono_1", agora=agora)
+
+        filtros = [("expira_em", "<", "2026-06-20T12:00:00")]
+        assert mock_del.call_args_list[0].args == ("AgendaLocks", filtros)
+        assert mock_del.call_args_list[0].kwargs == {"grupo": True}
+        assert mock_del.call_args_list[1].args == ("Clientes/dono_1/AgendaLocks", filtros)
+
+    async def test_deletar_por_query_pagina_em_lotes(self):
+        from services import firebase_service_async as fsa
+
+        docs = [MagicMock(reference=MagicMock(path=f"Clientes/dono_1/AgendaLocks/lock_{i}")) for i in range(5)]
+        paginas = [docs[:2], docs[2:4], docs[4:]]
+
+        def stream():
+            pagina = paginas.pop(0)
+
+            async def gen():
+                for d in pagina:
+                    yield d
+            return gen()
+
+        query = MagicMock()
+        query.where.return_value = query
+        query.select.return_value = query
+        query.limit.return_value = query
+        query.stream.side_effect = stream
+
+        batch = MagicMock()
+        batch.commit = AsyncMock()
+        fake_client = MagicMock()
+        fake_client.collection_group.return_value = query
+        fake_client.batch.return_value = batch
+
+        with patch.object(fsa, "client", fake_client), \
+             patch.object(fsa, "notificar_escrita") as mock_notificar:
+            removidos = await fsa.deletar_por_query(
+                "AgendaLocks", [("expira_em", "<", "2026-06-20")], grupo=True, lote=2
+            )
+
+        assert removidos == 5
+        # cada documento removido descarta leituras coalescidas do update
+        assert [c.args[0] for c in mock_notificar.call_args_list] == [d.reference.path for d in docs]
+        assert batch.delete.call_count == 5
+        assert batch.commit.await_count == 3
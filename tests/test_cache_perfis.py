@@ -0,0 +1,107 @@
+"""
+Cache LRU + TTL de perfis (Clientes/{id}, Clientes/{tenant}/Atores/{actor}).
+
+Objetivo: validar que obter_id_dono/buscar_dado_em_path de perfil leem o
+Firestore uma vez, que escritas pelos helpers invalidam a chave e que o
+cache respeita limite de itens e validade.
+"""
+
+import asyncio
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+
+def _doc(dados):
+    doc = MagicMock()
+    doc.exists = dados is not None
+    doc.to_dict.return_value = dict(dados) if dados is not None else None
+    return doc
+
+
+@pytest.fixture
+def fsa():
+    from services import firebase_service_async
+
+    firebase_service_async.cache_perfis.limpar()
+    yield firebase_service_async
+    firebase_service_async.cache_perfis.limpar()
+
+
+@pytest.mark.asyncio
+class TestCachePerfis:
+
+    async def test_obter_id_dono_le_uma_vez(self, fsa):
+        ref = MagicMock()
+        ref.get = AsyncMock(return_value=_doc({"id_negocio": "dono_1", "tipo_usuario": "cliente"}))
+
+        with patch.object(fsa, "get_ref_from_path", MagicMock(return_value=ref)):
+            assert await fsa.obter_id_dono("cli_1") == "dono_1"
+            assert await fsa.obter_id_dono("cli_1") == "dono_1"
+            perfil = await fsa.buscar_dado_em_path("Clientes/cli_1")
+
+        assert ref.get.await_count == 1
+        assert perfil["tipo_usuario"] == "cliente"
+
+        perfil["tipo_usuario"] = "alterado_pelo_chamador"
+        assert (await fsa.buscar_cliente("cli_1"))["tipo_usuario"] == "cliente"
+
+    async def test_escrita_pelo_helper_invalida(self, fsa):
+        ref = MagicMock()
+        ref.get = AsyncMock(side_effect=[_doc({"tipo_usuario": "cliente"}), _doc({"tipo_usuario": "dono"})])
+        ref.set = AsyncMock()
+
+        with patch.object(fsa, "get_ref_from_path", MagicMock(return_value=ref)):
+            assert (await fsa.buscar_dado_em_path("Clientes/u1"))["tipo_usuario"] == "cliente"
+            await fsa.atualizar_dado_em_path("Clientes/u1", {"tipo_usuario": "dono"})
+            assert (await fsa.buscar_dado_em_path("Clientes/u1"))["tipo_usuario"] == "dono"
+
+        assert fsa.cache_perfis.metricas()["invalidacoes"] >= 1
+
+    async def test_subdocumentos_nao_passam_pelo_cache(self, fsa):
+        assert fsa.eh_path_perfil("Clientes/u1")
+        assert fsa.eh_path_perfil("Clientes/t1/Atores/whatsapp:119")
+        assert not fsa.eh_path_perfil("Clientes/t1/Sessoes/u1")
+        assert not fsa.eh_path_perfil("Clientes/t1/Eventos")
+
+    async def test_cargas_concorrentes_compartilham_leitura(self):
+        from utils.cache_ttl import CacheLRUTTL
+
+        cache = CacheLRUTTL("teste")
+        chamadas = 0
+
+        async def carregar():
+            nonlocal chamadas
+            chamadas += 1
+            await asyncio.sleep(0.01)
+            return {"ok": True}
+
+        resultados = await asyncio.gather(*[cache.obter("k", carregar) for _ in range(5)])
+
+        assert chamadas == 1
+        assert all(r == {"ok": True} for r in resultados)
+        assert cache.metricas()["misses"] == 1
+
+
+def test_lru_despeja_o_menos_usado_e_ttl_expira():
+    from utils import cache_ttl
+
+    relogio = [1000.0]
+    cache = cache_ttl.CacheLRUTTL("teste", max_itens=2, ttl_segundos=10, ttl_negativo_segundos=1)
+
+    with patch.object(cache_ttl.time, "monotonic", lambda: relogio[0]):
+        cache._gravar("a", 1)
+        cache._gravar("b", 2)
+        assert cache._ler("a") == 1      # "a" passa a ser o mais recente
+        cache._gravar("c", 3)            # despeja "b"
+        assert cache._ler("b") is cache_ttl._AUSENTE
+
+        cache._gravar("nao_existe", None)
+        relogio[0] += 2
+        assert cache._ler("nao_existe") is cache_ttl._AUSENTE
+        assert cache._ler("c") == 3
+
+        relogio[0] += 10
+        assert cache._ler("c") is cache_ttl._AUSENTE
+
+    m = cache.metricas()
+    assert (m["despejados"], m["expirados"]) == (2, 2)
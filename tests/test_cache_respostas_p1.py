@@ -0,0 +1,182 @@
+"""
+Cache de respostas P1 (services/cache_respostas_p1 + gpt_service).
+
+Objetivo: validar que a mesma decisão (tipo + slots, ignorando rastreio
+como "origem") é redigida pelo GPT uma vez e reaproveitada, que a chave
+guarda algumas variantes, que o estilo do tenant (lido da configuração do
+tenant da mensagem) e o modelo roteado separam as chaves, que cache
+frio com GPT lento cai no template determinístico e aquece a chave em
+background, e que as métricas contam hits e tokens economizados.
+"""
+
+import asyncio
+import json
+import os
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-teste")  # gpt_client instancia o cliente no import
+
+import pytest
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, patch
+
+from services import cache_respostas_p1 as crp
+from services import gpt_service
+from services import roteamento_modelos as rm
+from services.gpt_client import client
+
+DECISAO = {
+    "tipo": "confirmar_agendamento",
+    "servico": "escova",
+    "profissional": "Carla",
+    "data_hora": "2026-10-20T14:00",
+    "data_hora_legivel": "terça, 20/10 às 14:00",
+    "origem": "slot_horario_aguardando_horario",
+}
+
+
+def _resposta_gpt(texto, tokens=180, atraso=0.0):
+    async def criar(**kwargs):
+        if atraso:
+            await asyncio.sleep(atraso)
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content=json.dumps({"resposta": texto})))],
+            usage=SimpleNamespace(total_tokens=tokens),
+        )
+    return criar
+
+
+@pytest.fixture(autouse=True)
+def cache_limpo():
+    crp.cache_respostas_p1.limpar()
+    crp.zerar_metricas_cache_respostas()
+    yield
+    crp.cache_respostas_p1.limpar()
+
+
+@pytest.mark.asyncio
+class TestCacheRespostasP1:
+
+    async def test_mesma_decisao_reaproveita_redacao(self):
+        gpt = AsyncMock(side_effect=_resposta_gpt("Posso confirmar escova com a Carla na terça às 14h?"))
+        with patch.object(client.chat.completions, "create", gpt), \
+             patch.object(crp, "PROB_NOVA_VARIANTE", 0.0):
+            primeira = await gpt_service.gerar_resposta_p1(DECISAO)
+            outra_origem = await gpt_service.gerar_resposta_p1({**DECISAO, "origem": "slot_profissional", "servico": " escova "})
+            outro_horario = await gpt_service.gerar_resposta_p1({**DECISAO, "data_hora_legivel": "quarta às 9h"})
+
+        assert primeira == outra_origem == "Posso confirmar escova com a Carla na terça às 14h?"
+        assert outro_horario
+        assert gpt.await_count == 2
+
+        m = crp.metricas_cache_respostas()
+        assert (m["hits"], m["misses"], m["tokens_economizados"]) == (1, 2, 180)
+        assert m["taxa_hit"] == pytest.approx(0.333, abs=0.001)
+
+    async def test_variantes_por_chave_e_estilo(self):
+        textos = iter(["Posso confirmar?", "Confirmo pra você?", "Fechamos assim?", "Nunca usada"])
+
+        async def criar(**kwargs):
+            return await _resposta_gpt(next(textos))(**kwargs)
+
+        gpt = AsyncMock(side_effect=criar)
+
+        with patch.object(client.chat.completions, "create", gpt), \
+             patch.object(crp, "PROB_NOVA_VARIANTE", 1.0):
+            vistas = set()
+            for _ in range(6):
+                vistas.add(await gpt_service.gerar_resposta_humana_agendamento(
+                    {**DECISAO, "tipo": "confirmacao_profissional_escolhido"}
+                ))
+                await crp.aguardar_tarefas_pendentes()
+
+        chave = crp.chave_resposta(
+            "humana_agendamento", {**DECISAO, "tipo": "confirmacao_profissional_escolhido"}, modelo=rm.MODELO_LEVE
+        )
+        variantes = crp.cache_respostas_p1._itens[chave][1]
+        assert [v["texto"] for v in variantes] == ["Posso confirmar?", "Confirmo pra você?", "Fechamos assim?"]
+        assert gpt.await_count == crp.VARIANTES_POR_CHAVE
+        assert vistas <= {"Posso confirmar?", "Confirmo pra você?", "Fechamos assim?"}
+
+        assert crp.chave_resposta("p1", DECISAO, "formal") != crp.chave_resposta("p1", DECISAO, "casual")
+        assert crp.chave_resposta("p1", DECISAO, None) == crp.chave_resposta("p1", {**DECISAO, "origem": "x"}, "")
+        assert crp.chave_resposta("p1", DECISAO, modelo="gpt-4o") != crp.chave_resposta("p1", DECISAO, modelo="gpt-4o-mini")
+
+    async def test_cache_frio_e_gpt_lento_usa_template(self):
+        gpt = AsyncMock(side_effect=_resposta_gpt("Redação do GPT", atraso=0.2))
+        with patch.object(client.chat.completions, "create", gpt), \
+             patch.object(crp, "ORCAMENTO_MS", 20), \
+             patch.object(crp, "PROB_NOVA_VARIANTE", 0.0):
+            texto = await gpt_service.gerar_resposta_p1(DECISAO)
+            assert texto == "Posso confirmar escova com Carla terça, 20/10 às 14:00? 😊"
+
+            await crp.aguardar_tarefas_pendentes()
+            assert await gpt_service.gerar_resposta_p1(DECISAO) == "Redação do GPT"
+
+        assert gpt.await_count == 1
+        assert crp.metricas_cache_respostas()["fallbacks"] == 1
+
+    async def test_erro_do_gpt_nao_vai_para_o_cache(self):
+        gpt = AsyncMock(side_effect=RuntimeError("timeout"))
+        with patch.object(client.chat.completions, "create", gpt):
+            assert await gpt_service.gerar_resposta_p1({"tipo": "pedir_horario", "servico": "corte"}) == "Qual horário fica melhor pra você?"
+            assert await gpt_service.gerar_resposta_p1({"tipo": "pedir_horario", "servico": "corte"}) == "Qual horário fica melhor pra você?"
+        assert gpt.await_count == 2
+        assert crp.metricas_cache_respostas()["fallbacks"] == 2
+        assert await gpt_service.gerar_resposta_p1({"tipo": "tipo_desconhecido"}) == ""
+
+    async def test_persistencia_opcional_no_firestore(self):
+        from services import firebase_service_async as fsa
+
+        chave = crp.chave_resposta("p1", DECISAO, modelo=rm.MODELO_LEVE)
+        doc = {"variantes": [{"texto": "Posso deixar confirmado?", "tokens": 150}]}
+        gpt = AsyncMock()
+        with patch.object(crp, "PERSISTIR_FIRESTORE", True), \
+             patch.object(crp, "PROB_NOVA_VARIANTE", 0.0), \
+             patch.object(fsa, "buscar_dado_em_path", AsyncMock(return_value=doc)) as mock_ler, \
+             patch.object(client.chat.completions, "create", gpt):
+            assert await gpt_service.gerar_resposta_p1(DECISAO) == "Posso deixar confirmado?"
+
+        mock_ler.assert_awaited_once_with(f"CacheRespostasP1/{chave}")
+        gpt.assert_not_awaited()
+
+    async def test_estilo_e_modelo_do_tenant_da_mensagem(self):
+        from services import firebase_service_async as fsa
+
+        docs = {
+            "Clientes/dono_formal/configuracao/dados": {"estilo": "Formal", "modelos_llm": {"resposta_p1": "gpt-4o"}},
+            "Clientes/dono_casual/configuracao/dados": {"estilo": "casual"},
+        }
+        gpt = AsyncMock(side_effect=_resposta_gpt("Posso confirmar?"))
+        rm.cache_rotas_tenant.limpar()
+        crp.cache_estilo_tenant.limpar()
+        with patch.object(client.chat.completions, "create", gpt), \
+             patch.object(crp, "PROB_NOVA_VARIANTE", 0.0), \
+             patch.object(fsa, "buscar_dado_em_path", AsyncMock(side_effect=lambda p: docs.get(p))) as mock_ler:
+            for dono in ("dono_formal", "dono_casual", "dono_formal"):
+                with rm.escopo_tenant_llm(dono):
+                    await gpt_service.gerar_resposta_p1(DECISAO)
+
+        rm.cache_rotas_tenant.limpar()
+        crp.cache_estilo_tenant.limpar()
+        (formal, casual) = gpt.await_args_list
+        assert formal.kwargs["model"] == "gpt-4o" and casual.kwargs["model"] == rm.MODELO_LEVE
+        assert "formal" in formal.kwargs["messages"][1]["content"]
+        assert "casual" in casual.kwargs["messages"][1]["content"]
+        assert mock_ler.await_count == 4   # por tenant: uma leitura do estilo e uma das rotas, depois cache
+        assert crp.chave_resposta("p1", DECISAO, "formal", "gpt-4o") in crp.cache_respostas_p1._itens
+
+    async def test_estilo_do_tenant_invalidado_na_escrita(self):
+        from services import firebase_service_async as fsa
+
+        doc = {"estilo": "formal"}
+        crp.cache_estilo_tenant.limpar()
+        with patch.object(fsa, "buscar_dado_em_path", AsyncMock(side_effect=lambda p: dict(doc))) as mock_ler:
+            assert await crp.estilo_do_tenant("dono_1") == "formal"
+            doc["estilo"] = "Casual"
+            assert await crp.estilo_do_tenant("dono_1") == "formal"   # cache
+            fsa.notificar_escrita("Clientes/dono_1/configuracao/dados")
+            assert await crp.estilo_do_tenant("dono_1") == "casual"
+            assert await crp.estilo_do_tenant() is None               # sem tenant no escopo
+
+        crp.cache_estilo_tenant.limpar()
+        assert mock_ler.await_count == 2
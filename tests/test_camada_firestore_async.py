@@ -0,0 +1,92 @@
+"""
+Camada única de acesso ao Firestore (AsyncClient) + detecção de bloqueio do loop.
+
+Objetivo: validar que governança/identidade usam as primitivas assíncronas
+de firebase_service_async (sem cliente síncrono dentro de coroutine) e que o
+monitor de loop aponta a linha que bloqueou e o uso de API síncrona no loop.
+"""
+
+import asyncio
+import time
+import pytest
+from unittest.mock import AsyncMock, patch
+
+from utils import monitor_loop
+
+
+@pytest.mark.asyncio
+class TestMigracaoCamadaAsync:
+
+    async def test_governanca_le_pelo_async_e_valida_tenant(self):
+        from services import governanca_service
+
+        doc = {"responder_automaticamente": False, "_tenant_id_guard": "t1"}
+        with patch.object(governanca_service, "ler_documento", AsyncMock(return_value=doc)) as mock_ler:
+            assert await governanca_service.carregar_governanca("whatsapp:1", "t1") == doc
+            # guarda de tenant divergente → vazio
+            assert await governanca_service.carregar_governanca("whatsapp:1", "t2") == {}
+
+        mock_ler.assert_any_await("Clientes/t1/Governanca/whatsapp:1")
+
+    async def test_auditoria_grava_e_consulta_decrescente(self):
+        from services import governanca_service
+
+        with patch.object(governanca_service, "gravar_documento", AsyncMock()) as mock_gravar:
+            ok = await governanca_service.registrar_auditoria("whatsapp:1", "t1", "modo_dono", "normal", "admin")
+        assert ok
+        path, documento = mock_gravar.await_args.args
+        assert path.startswith("Clientes/t1/AuditoriaGovernanca/audit_gov_")
+        assert documento["_tenant_id_guard"] == "t1"
+
+        with patch.object(governanca_service, "consultar", AsyncMock(return_value={"a": {"x": 1}})) as mock_consultar:
+            assert await governanca_service.obter_auditoria_ator("whatsapp:1", "t1", limit=5) == [{"x": 1}]
+        assert mock_consultar.await_args.kwargs["ordenar_por"] == "-timestamp"
+        assert mock_consultar.await_args.kwargs["limite"] == 5
+
+    async def test_identidade_escreve_e_consulta_pelo_async(self):
+        from services import identidade_service
+
+        with patch.object(identidade_service, "gravar_documento", AsyncMock()) as mock_gravar:
+            ator = await identidade_service.criar_ator_profissional("t1", "email", "Bruna@X.com", "Bruna", "email:dono@x.com")
+        assert mock_gravar.await_args.args[0] == "Clientes/t1/Atores/email:bruna@x.com"
+        assert ator["tipo_usuario"] == "profissional"
+
+        with patch.object(identidade_service, "consultar", AsyncMock(return_value={"email:d": {}})) as mock_consultar:
+            assert await identidade_service.tenant_tem_dono("t1") is True
+        assert ("tipo_usuario", "==", "dono") in mock_consultar.await_args.kwargs["filtros"]
+
+
+@pytest.mark.asyncio
+class TestMonitorBloqueio:
+
+    async def test_aponta_linha_que_bloqueou_o_loop(self):
+        monitor = monitor_loop.MonitorBloqueio(limiar_ms=40).iniciar(asyncio.get_running_loop())
+        try:
+            await asyncio.sleep(0.05)
+            time.sleep(0.25)  # chamada bloqueante dentro da coroutine
+            await asyncio.sleep(0.05)
+        finally:
+            monitor.parar()
+
+        rel = monitor.relatorio()
+        assert rel["bloqueios"] >= 1
+        origem = rel["origens"][0]["origem"]
+        assert origem.startswith("tests/test_camada_firestore_async.py")
+        assert "test_aponta_linha_que_bloqueou_o_loop" in origem
+        assert rel["maior_ms"] >= 200
+
+    async def test_api_sincrona_so_e_reportada_dentro_do_loop(self):
+        def get_db_sincrono():
+            monitor_loop.avisar_se_no_loop("firestore_client.get_db")
+
+        monitor = monitor_loop.MonitorBloqueio(limiar_ms=1000).iniciar(asyncio.get_running_loop())
+        try:
+            with patch.object(monitor_loop, "_monitor", monitor):
+                get_db_sincrono()
+                await asyncio.to_thread(get_db_sincrono)
+        finally:
+            monitor.parar()
+
+        chamadas = monitor.relatorio()["chamadas_sincronas"]
+        assert sum(chamadas.values()) == 1
+        assert "test_camada_firestore_async.py" in next(iter(chamadas))
@@ -0,0 +1,83 @@
+"""
+Catálogo de profissionais/serviços por tenant (CatalogoTenant).
+
+Objetivo: validar os índices (nome normalizado, serviço -> profissionais,
+durações), que várias consultas na mesma janela leem a subcoleção uma vez e
+que escritas em Clientes/{tenant}/Profissionais pelos helpers invalidam o
+catálogo do tenant.
+"""
+
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+
+PROFISSIONAIS = {
+    "Bruna": {"nome": "Bruna", "servicos": ["Escova", "Hidratação"], "duracoes": {"escova": 40}},
+    "Carla": {"nome": "Carla ", "servicos": ["escova", "Coloração"]},
+    "sem_nome": {"servicos": ["corte"]},
+}
+
+
+@pytest.fixture
+def catalogo_service():
+    from services import catalogo_service
+
+    catalogo_service.cache_catalogos.limpar()
+    yield catalogo_service
+    catalogo_service.cache_catalogos.limpar()
+
+
+@pytest.mark.asyncio
+class TestCatalogoTenant:
+
+    async def test_indices(self, catalogo_service):
+        catalogo = catalogo_service.CatalogoTenant("dono_1", PROFISSIONAIS)
+
+        assert catalogo.nomes == ["Bruna", "Carla"]
+        assert catalogo.quem_faz("ESCOVA") == ["Bruna", "Carla"]
+        assert catalogo.quem_faz("hidratacao") == ["Bruna"]
+        assert catalogo.atende("carla", "coloracao")
+        assert not catalogo.atende("carla", "hidratação")
+        assert not catalogo.atende("corte", "corte")
+        assert catalogo.duracao("Escova", "bruna") == 40
+        assert catalogo.duracao("escova", "Carla") is None
+        assert catalogo.servicos_busca == ["escova", "hidratacao", "coloracao"]
+
+    async def test_uma_leitura_por_tenant(self, catalogo_service):
+        with patch.object(catalogo_service, "buscar_subcolecao", AsyncMock(return_value=PROFISSIONAIS)) as mock_sub:
+            c1 = await catalogo_service.obter_catalogo("dono_1")
+            c2 = await catalogo_service.obter_catalogo("dono_1")
+            profs = await catalogo_service.buscar_profissionais_tenant("dono_1")
+
+        mock_sub.assert_awaited_once_with("Clientes/dono_1/Profissionais")
+        assert c1 is c2
+        profs["Bruna"]["servicos"].append("alterado_pelo_chamador")
+        assert c1.servicos_de("Bruna") == ["Escova", "Hidratação"]
+
+    async def test_escrita_em_profissional_invalida(self, catalogo_service):
+        from services import firebase_service_async
+
+        atualizado = {**PROFISSIONAIS, "Dani": {"nome": "Dani", "servicos": ["escova"]}}
+        ref = MagicMock()
+        ref.set = AsyncMock()
+
+        with patch.object(catalogo_service, "buscar_subcolecao", AsyncMock(side_effect=[PROFISSIONAIS, atualizado])) as mock_sub, \
+             patch.object(firebase_service_async, "get_ref_from_path", MagicMock(return_value=ref)):
+            antes = await catalogo_service.obter_catalogo("dono_1")
+            assert antes.quem_faz("escova") == ["Bruna", "Carla"]
+
+            await firebase_service_async.salvar_dado_em_path("Clientes/dono_1/Profissionais/Dani", atualizado["Dani"])
+            await firebase_service_async.salvar_dado_em_path("Clientes/dono_2/Profissionais/Eva", {"nome": "Eva"})
+            catalogo = await catalogo_service.obter_catalogo("dono_1")
+
+        assert mock_sub.await_count == 2
+        assert catalogo.quem_faz("escova") == ["Bruna", "Carla", "Dani"]
+        assert catalogo is not antes and antes.quem_faz("escova") == ["Bruna", "Carla"]
+
+    async def test_tenant_sem_profissionais_nao_fica_em_cache_longo(self, catalogo_service):
+        with patch.object(catalogo_service, "buscar_subcolecao", AsyncMock(return_value={})):
+            catalogo = await catalogo_service.obter_catalogo("dono_vazio")
+
+        assert len(catalogo) == 0
+        assert catalogo.quem_faz("escova") == []
+        assert catalogo.como_dict() == {}
@@ -0,0 +1,162 @@
+"""
+Configuração de agenda por tenant (services/config_agenda_service).
+
+Objetivo: validar que a agenda_funcionamento vira um ConfigAgenda imutável
+com tabelas por dia da semana, que várias validações de horário leem o
+documento uma vez só e que a cache é invalidada pelas escritas da própria
+agenda (bloqueios/janelas especiais), pelo hook de escrita e pelo snapshot
+listener opcional.
+"""
+
+import asyncio
+import copy
+import threading
+
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from services import agenda_service, config_agenda_service as cas
+from services.config_agenda_service import ConfigAgenda
+
+CFG = {
+    "agenda_padrao": {
+        "1": {"aberto": True, "inicio": "09:00", "fim": "18:00"},     # terça
+        "5": {"aberto": True, "inicio": "08:00", "fim": "12:00"},     # sábado
+        "6": {"aberto": False},
+    },
+    "excecoes_data": {"2026-10-27": {"aberto": False, "motivo": "feriado"}},
+}
+
+
+@pytest.fixture
+def firestore_config():
+    from services import firebase_service_async as fsa
+    from services import catalogo_service
+
+    cas.cache_config_agenda.limpar()
+    cas.cache_excecoes_prof.limpar()
+    estado = {"cfg": copy.deepcopy(CFG), "excecoes": {}}
+
+    async def dado(path):
+        return estado["cfg"] if path.endswith("configuracao/agenda_funcionamento") else {}
+
+    async def subcolecao(path):
+        return estado["excecoes"] if path.endswith("/AgendaExcecoes") else {}
+
+    catalogo = catalogo_service.CatalogoTenant("dono1", {"Bruna": {"nome": "Bruna"}})
+    with patch.object(fsa, "buscar_dado_em_path", side_effect=dado) as mock_dado, \
+         patch.object(fsa, "buscar_subcolecao", side_effect=subcolecao) as mock_sub, \
+         patch.object(catalogo_service, "obter_catalogo", AsyncMock(return_value=catalogo)):
+        yield estado, mock_dado, mock_sub
+
+
+class TestConfigAgenda:
+
+    def test_tabelas_por_dia_da_semana_e_excecoes(self):
+        config = ConfigAgenda("dono1", CFG)
+
+        assert config.janela_minutos("2026-10-20") == (540, 1080)         # terça
+        assert config.janela_minutos("2026-10-24") == (480, 720)          # sábado
+        assert config.janela_minutos("2026-10-25") is None                # domingo fechado
+        assert config.janela_minutos("2026-10-22") is None                # quinta sem regra
+        assert config.janela_minutos("2026-10-27") is None                # feriado
+
+        assert config.regra_na_data("2026-10-27")["origem"] == "excecao_salao"
+        assert config.regra_na_data("2026-10-22") == {
+            "aberto": False, "inicio": None, "fim": None, "origem": "agenda_padrao_salao",
+        }
+        assert config.regra_padrao(1)["inicio"] == "09:00"
+        assert config.tem_excecao("2026-10-27") and not config.tem_excecao("2026-10-20")
+        assert config.como_dict() == CFG
+
+    def test_imutavel(self):
+        config = ConfigAgenda("dono1", CFG)
+
+        with pytest.raises(AttributeError):
+            config.dono_id = "outro"
+        with pytest.raises(TypeError):
+            config._padrao["1"] = {}
+
+        # cópias devolvidas não alteram o objeto
+        config.regra_na_data("2026-10-20")["fim"] = "23:00"
+        config.como_dict()["agenda_padrao"]["1"]["fim"] = "23:00"
+        assert config.janela_minutos("2026-10-20") == (540, 1080)
+        assert config.regra_padrao("1")["fim"] == "18:00"
+
+
+@pytest.mark.asyncio
+class TestCacheConfigAgenda:
+
+    async def test_validacoes_leem_a_config_uma_vez(self, firestore_config):
+        _, mock_dado, mock_sub = firestore_config
+
+        for hora in ("09:00", "10:00", "17:30", "18:00"):
+            await agenda_service.validar_horario_funcionamento("dono1", "2026-10-20", hora, 30)
+        for _ in range(3):
+            await agenda_service.obter_janela_funcionamento("dono1", "2026-10-20", "Bruna")
+
+        assert mock_dado.await_count == 1
+        assert mock_sub.await_count == 1      # exceções da Bruna
+
+    async def test_bloqueio_do_salao_invalida(self, firestore_config):
+        estado, mock_dado, _ = firestore_config
+        assert (await agenda_service.obter_janela_funcionamento("dono1", "2026-10-20"))["aberto"]
+
+        async def atualizar(path, dados):
+            estado["cfg"] = {**estado["cfg"], **dados}
+
+        with patch("services.firebase_service_async.atualizar_dado_em_path", side_effect=atualizar):
+            assert await agenda_service.bloquear_datas_agenda_salao("dono1", ["2026-10-20"])
+
+        janela = await agenda_service.obter_janela_funcionamento("dono1", "2026-10-20")
+        assert not janela["aberto"] and janela["origem"] == "excecao_salao"
+        assert mock_dado.await_count == 3    # carga, leitura do bloqueio, recarga
+
+    async def test_hook_de_escrita_invalida_config_e_excecoes(self, firestore_config):
+        from services.firebase_service_async import notificar_escrita
+
+        estado, mock_dado, mock_sub = firestore_config
+        await agenda_service.obter_janela_funcionamento("dono1", "2026-10-20", "Bruna")
+
+        estado["excecoes"] = {"2026-10-20": {"tipo": "bloqueado", "ativo": True}}
+        notificar_escrita("Clientes/dono1/Profissionais/Bruna/AgendaExcecoes/2026-10-20")
+        janela = await agenda_service.obter_janela_funcionamento("dono1", "2026-10-20", "Bruna")
+        assert janela["origem"] == "excecao_profissional"
+        assert mock_sub.await_count == 2 and mock_dado.await_count == 1
+
+        estado["cfg"] = {"agenda_padrao": {"1": {"aberto": True, "inicio": "10:00", "fim": "16:00"}}}
+        notificar_escrita("Clientes/dono1/configuracao/agenda_funcionamento")
+        assert (await cas.obter_config_agenda_tenant("dono1")).janela_minutos("2026-10-20") == (600, 960)
+        assert mock_dado.await_count == 2
+
+        # escrita em outro tenant não mexe na cache deste
+        notificar_escrita("Clientes/dono2/configuracao/agenda_funcionamento")
+        await cas.obter_config_agenda_tenant("dono1")
+        assert mock_dado.await_count == 2
+
+    async def test_snapshot_listener_agenda_invalidacao_no_loop(self, firestore_config):
+        _, mock_dado, _ = firestore_config
+        callbacks = []
+        documento = MagicMock()
+        documento.on_snapshot.side_effect = lambda cb: callbacks.append(cb) or MagicMock()
+        db = MagicMock()
+        db.document.return_value = documento
+
+        cas.parar_ouvintes_config_agenda()
+        with patch("services.firestore_client.get_db", return_value=db):
+            assert await cas.iniciar_ouvinte_config_agenda("dono1")
+            assert await cas.iniciar_ouvinte_config_agenda("dono1")   # idempotente
+        db.document.assert_called_once_with("Clientes/dono1/configuracao/agenda_funcionamento")
+
+        antes = await cas.obter_config_agenda_tenant("dono1")
+
+        # o Firestore chama o callback na thread dele
+        thread = threading.Thread(target=callbacks[0], args=([], [], None))
+        thread.start()
+        thread.join()
+        await asyncio.sleep(0)
+
+        assert "dono1" not in cas.cache_config_agenda._itens
+        assert await cas.obter_config_agenda_tenant("dono1") is not antes
+        assert mock_dado.await_count == 2
+        cas.parar_ouvintes_config_agenda()
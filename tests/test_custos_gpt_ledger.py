@@ -0,0 +1,165 @@
+"""
+Ledger agregado de custos GPT (utils/custos_gpt).
+
+Objetivo: validar que registrar_custo_gpt responde sem esperar o Firestore,
+grava contadores Increment (total e por dia) numa shard do usuário, que o
+resumo soma shards por usuário/tenant/modelo/dia lendo só os agregados (e
+informa a janela realmente somada), que os argumentos do /custosapi não
+confundem tenant_id com contagem de dias e que o backfill ignora detalhes
+já contados.
+"""
+
+import asyncio
+import pytest
+from datetime import date
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, patch
+
+from google.cloud.firestore import Increment
+
+from utils import custos_gpt
+
+
+def _resposta(entrada=1000, saida=500):
+    return SimpleNamespace(usage=SimpleNamespace(prompt_tokens=entrada, completion_tokens=saida))
+
+
+@pytest.fixture
+def fsa():
+    from services import firebase_service_async
+    return firebase_service_async
+
+
+@pytest.mark.asyncio
+class TestLedgerCustos:
+
+    async def test_registro_nao_espera_gravacao(self, fsa):
+        liberar = asyncio.Event()
+        lotes = []
+
+        async def lote_lento(atualizacoes):
+            await liberar.wait()
+            lotes.append(atualizacoes)
+            return len(atualizacoes)
+
+        with patch.object(fsa, "atualizar_em_lote", side_effect=lote_lento), \
+             patch.object(fsa, "adicionar_documento", AsyncMock()) as mock_add, \
+             patch.object(custos_gpt.random, "randrange", return_value=2):
+            log = await custos_gpt.registrar_custo_gpt(_resposta(), "gpt-4o", "u1", tenant_id="t1")
+            assert log["custo_usd"] == pytest.approx(0.0125)
+            assert not lotes  # resposta já voltou; gravação pendente
+
+            liberar.set()
+            await custos_gpt.aguardar_custos_pendentes()
+
+        (total_path, total), (dia_path, dia) = lotes[0]
+        assert total_path == "CustosGPT/totais/PorUsuario/u1__2"
+        assert dia_path == f"CustosGPT/{log['data'][:10]}/PorUsuario/u1__2"
+        assert isinstance(total["custo_usd"], Increment) and isinstance(total["reqs"], Increment)
+        assert isinstance(dia["modelos"]["gpt-4o"]["reqs"], Increment)
+        assert (total["tenant_id"], dia["dia"]) == ("t1", log["data"][:10])
+        assert mock_add.await_args.args[1]["agregado"] is True
+
+    async def test_resumo_soma_shards_tenants_e_modelos(self, fsa):
+        docs = {
+            "u1__0": {"user_id": "u1", "tenant_id": "t1", "custo_usd": 1.0, "reqs": 2,
+                      "modelos": {"gpt-4o": {"custo_usd": 1.0, "reqs": 2}}},
+            "u1__3": {"user_id": "u1", "tenant_id": "t1", "custo_usd": 0.5, "reqs": 1,
+                      "modelos": {"gpt-4o-mini": {"custo_usd": 0.5, "reqs": 1}}},
+            "u2__1": {"user_id": "u2", "tenant_id": "t2", "custo_usd": 0.25, "reqs": 1,
+                      "modelos": {"gpt-4o": {"custo_usd": 0.25, "reqs": 1}}},
+        }
+        with patch.object(fsa, "consultar", AsyncMock(return_value=docs)) as mock_consultar:
+            resumo = await custos_gpt.resumo_custos()
+
+        mock_consultar.assert_awaited_once_with("CustosGPT/totais/PorUsuario", filtros=None)
+        assert resumo["total_usd"] == pytest.approx(1.75) and resumo["reqs"] == 4
+        assert resumo["por_usuario"]["u1"] == {"custo_usd": 1.5, "reqs": 3}
+        assert resumo["por_tenant"]["t2"] == {"custo_usd": 0.25, "reqs": 1}
+        assert resumo["por_modelo"]["gpt-4o"] == {"custo_usd": 1.25, "reqs": 3}
+
+    async def test_resumo_por_intervalo_le_um_agregado_por_dia(self, fsa):
+        async def consultar(path, filtros=None):
+            dia = path.split("/")[1]
+            return {"u1__0": {"user_id": "u1", "tenant_id": "t1", "custo_usd": 0.1, "reqs": 1, "dia": dia}}
+
+        with patch.object(fsa, "consultar", side_effect=consultar) as mock_consultar:
+            resumo = await custos_gpt.resumo_custos("2026-10-01", "2026-10-03", tenant_id="t1")
+
+        assert mock_consultar.await_count == 3
+        assert mock_consultar.await_args.kwargs["filtros"] == [("tenant_id", "==", "t1")]
+        assert sorted(resumo["por_dia"]) == ["2026-10-01", "2026-10-02", "2026-10-03"]
+        assert resumo["reqs"] == 3
+        assert (resumo["data_inicio"], resumo["data_fim"], resumo["truncado"]) == ("2026-10-01", "2026-10-03", False)
+
+    async def test_intervalo_longo_informa_janela_cortada(self, fsa):
+        with patch.object(fsa, "consultar", AsyncMock(return_value={})) as mock_consultar:
+            resumo = await custos_gpt.resumo_custos("2026-01-01", "2026-12-31")
+
+        assert mock_consultar.await_count == custos_gpt.MAX_DIAS_RESUMO
+        assert (resumo["data_inicio"], resumo["data_fim"], resumo["truncado"]) == ("2026-01-01", "2026-04-03", True)
+
+    async def test_args_do_comando_custosapi(self):
+        hoje = date(2026, 10, 18)
+        interpretar = custos_gpt.interpretar_args_custos
+
+        assert interpretar([], hoje) == (None, None, None)
+        assert interpretar(["7", "t1"], hoje) == ("2026-10-12", "2026-10-18", "t1")
+        assert interpretar(["0"], hoje) == ("2026-10-18", "2026-10-18", None)
+        # id do Telegram não vira contagem de dias (antes: OverflowError no timedelta)
+        assert interpretar(["123456789012"], hoje) == (None, None, "123456789012")
+        assert interpretar(["123456789012", "x"], hoje) == (None, None, "123456789012")
+        assert interpretar(["2026-10-01", "2026-10-15", "t1"], hoje) == ("2026-10-01", "2026-10-15", "t1")
+        with pytest.raises(ValueError):
+            interpretar(["2026-10-01", "2026-13-01"], hoje)
+
+    async def test_custosapi_escapa_ids_no_markdown(self):
+        pytest.importorskip("openpyxl")  # handlers.bot importa o exportador de agenda
+        import re
+        from handlers import bot
+
+        resumo = {
+            "total_usd": 0.5, "reqs": 3, "tokens_input": 0, "tokens_cache": 0, "economia_cache_usd": 0.0,
+            "por_usuario": {"sem_usuario": {"reqs": 3, "custo_usd": 0.5}},
+            "por_tenant": {"sem_tenant": {"reqs": 3, "custo_usd": 0.5}},
+            "por_modelo": {"gpt-4o_mini": {"reqs": 3, "custo_usd": 0.5}},
+            "por_dia": {}, "data_inicio": None, "data_fim": None, "truncado": False,
+        }
+        llm = {
+            "chamadas": 1, "sucessos": 1, "retries": 0, "timeouts": 0, "rejeitadas_circuito": 0,
+            "circuito": "meio_aberto", "latencia_ms": {"p50": 10, "p95": 20},
+            "latencia_ms_com_cache": {"total": 0}, "latencia_ms_sem_cache": {"total": 1},
+        }
+        update = SimpleNamespace(message=SimpleNamespace(
+            from_user=SimpleNamespace(id=bot.OWNER_ID), reply_text=AsyncMock(),
+        ))
+        context = SimpleNamespace(args=["dono_salao"])
+
+        with patch.object(custos_gpt, "resumo_custos", AsyncMock(return_value=resumo)), \
+             patch("services.llm_gateway.metricas_llm", return_value=llm):
+            await bot.custos_api_handler(update, context)
+
+        texto = update.message.reply_text.await_args.args[0]
+        assert update.message.reply_text.await_args.kwargs["parse_mode"] == "Markdown"
+        for valor in ("sem\\_usuario", "sem\\_tenant", "gpt-4o\\_mini", "meio\\_aberto", "tenant dono\\_salao"):
+            assert valor in texto
+        # fora de `código`, todo `_` está escapado (senão o Telegram recusa a mensagem)
+        assert not re.search(r"(?<!\\)_", re.sub(r"`[^`]*`", "", texto))
+
+    async def test_backfill_ignora_detalhe_ja_agregado(self, fsa):
+        detalhes = {
+            "a": {"user_id": "u1", "modelo": "gpt-4o", "custo_usd": 0.2, "tokens_input": 10, "tokens_output": 5,
+                  "data": "2026-09-01T10:00:00"},
+            "b": {"user_id": "u1", "modelo": "gpt-4o", "custo_usd": 9.9, "tokens_input": 10, "tokens_output": 5,
+                  "data": "2026-10-01T10:00:00", "agregado": True},
+        }
+        with patch.object(fsa, "consultar", AsyncMock(return_value=detalhes)), \
+             patch.object(fsa, "obter_id_dono", AsyncMock(return_value="t1")), \
+             patch.object(fsa, "atualizar_em_lote", AsyncMock(return_value=2)) as mock_lote:
+            await custos_gpt.reconstruir_agregados_custos()
+
+        atualizacoes = dict(mock_lote.await_args.args[0])
+        total = atualizacoes["CustosGPT/totais/PorUsuario/u1__hist"]
+        assert (total["custo_usd"], total["reqs"], total["tenant_id"]) == (0.2, 1, "t1")
+        assert "CustosGPT/2026-09-01/PorUsuario/u1__hist" in atualizacoes
+        assert "CustosGPT/2026-10-01/PorUsuario/u1__hist" not in atualizacoes
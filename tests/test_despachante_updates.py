@@ -0,0 +1,107 @@
+"""
+Despachante de updates do webhook (utils/despachante_updates).
+
+Objetivo: validar que updates do mesmo chat são processados em ordem e um
+por vez, que chats diferentes rodam em paralelo até o limite de workers,
+que fila cheia é recusada sem bloquear e que as métricas/percentis batem.
+"""
+
+import asyncio
+import pytest
+from types import SimpleNamespace
+
+from utils.despachante_updates import DespachanteUpdates, chave_do_update, percentis
+
+
+def _update(chat_id, n):
+    return SimpleNamespace(update_id=n, effective_chat=SimpleNamespace(id=chat_id), effective_user=None)
+
+
+@pytest.mark.asyncio
+class TestDespachanteUpdates:
+
+    async def test_ordem_por_chat_e_paralelismo_entre_chats(self):
+        processados = {}
+        ativos_por_chat = {}
+        ativos = 0
+        pico = 0
+        pico_por_chat = 0
+
+        async def processar(update):
+            nonlocal ativos, pico, pico_por_chat
+            chat = update.effective_chat.id
+            ativos += 1
+            ativos_por_chat[chat] = ativos_por_chat.get(chat, 0) + 1
+            pico = max(pico, ativos)
+            pico_por_chat = max(pico_por_chat, ativos_por_chat[chat])
+            await asyncio.sleep(0.005)
+            processados.setdefault(chat, []).append(update.update_id)
+            ativos_por_chat[chat] -= 1
+            ativos -= 1
+
+        despachante = DespachanteUpdates(processar, max_concorrencia=4)
+        await despachante.iniciar()
+        for n in range(40):
+            assert despachante.enfileirar(_update(n % 8, n))
+        await despachante.parar(drenar=True, timeout=5)
+
+        for chat, ids in processados.items():
+            assert ids == sorted(ids)
+            assert len(ids) == 5
+        assert pico_por_chat == 1
+        assert pico == 4
+
+    async def test_fila_cheia_recusa_sem_bloquear(self):
+        liberar = asyncio.Event()
+
+        async def processar(update):
+            await liberar.wait()
+
+        despachante = DespachanteUpdates(processar, max_concorrencia=1, max_fila=2)
+        await despachante.iniciar()
+        assert despachante.enfileirar(_update(1, 1))
+        assert despachante.enfileirar(_update(2, 2))
+        assert not despachante.enfileirar(_update(3, 3))
+
+        liberar.set()
+        await despachante.parar(drenar=True, timeout=5)
+
+        m = despachante.metricas()
+        assert (m["recebidos"], m["processados"], m["rejeitados"], m["em_fila"]) == (2, 2, 1, 0)
+        assert m["chats_pendentes"] == 0
+
+    async def test_erro_no_handler_nao_trava_o_chat(self):
+        vistos = []
+
+        async def processar(update):
+            vistos.append(update.update_id)
+            if update.update_id == 1:
+                raise RuntimeError("falhou")
+
+        despachante = DespachanteUpdates(processar, max_concorrencia=2)
+        await despachante.iniciar()
+        for n in (1, 2, 3):
+            despachante.enfileirar(_update(42, n))
+        await despachante.parar(drenar=True, timeout=5)
+
+        assert vistos == [1, 2, 3]
+        m = despachante.metricas()
+        assert (m["processados"], m["erros"]) == (2, 1)
+
+    async def test_enfileirar_sem_iniciar_falha(self):
+        with pytest.raises(RuntimeError):
+            DespachanteUpdates(asyncio.sleep).enfileirar(_update(1, 1))
+
+
+class TestAuxiliares:
+
+    def test_chave_do_update(self):
+        assert chave_do_update(_update(5, 1)) == "chat:5"
+        sem_chat = SimpleNamespace(update_id=9, effective_chat=None, effective_user=SimpleNamespace(id=7))
+        assert chave_do_update(sem_chat) == "user:7"
+        assert chave_do_update(SimpleNamespace(update_id=9)) == "update:9"
+
+    def test_percentis_nearest_rank(self):
+        valores = [i / 1000 for i in range(1, 101)]  # 1..100 ms
+        assert percentis(valores) == {"p50": 50.0, "p95": 95.0, "p99": 99.0}
+        assert percentis([]) == {"p50": 0.0, "p95": 0.0, "p99": 0.0}
@@ -0,0 +1,133 @@
+"""
+Motor de disponibilidade do dia (services/disponibilidade_engine).
+
+Objetivo: validar a subtração de intervalos ordenados e a busca dos primeiros
+N horários na grade, que o motor lê o dia UMA vez (eventos + expediente +
+exceções) e responde vários profissionais em memória, e que a recorrência
+deixou de consultar o Firestore por horário candidato.
+"""
+
+import pytest
+from datetime import date, time
+from unittest.mock import AsyncMock, patch
+
+from services import disponibilidade_engine as de
+from services.disponibilidade_engine import DisponibilidadeEngine
+
+DATA = "2026-10-20"  # terça-feira (weekday 1)
+
+CFG_SALAO = {
+    "agenda_padrao": {"1": {"aberto": True, "inicio": "09:00", "fim": "18:00"}},
+    "excecoes_data": {},
+}
+PROFISSIONAIS = {
+    "Bruna": {"nome": "Bruna", "servicos": ["corte"]},
+    "Carla": {"nome": "Carla", "servicos": ["corte"],
+              "agenda_funcionamento": {"agenda_padrao": {"1": {"aberto": True, "inicio": "13:00", "fim": "20:00"}}}},
+    "Dani": {"nome": "Dani", "servicos": ["corte"]},
+}
+EVENTOS = {
+    "e1": {"data": DATA, "hora_inicio": "09:00", "hora_fim": "10:00", "profissional": "Bruna"},
+    "e2": {"data": DATA, "hora_inicio": "09:30", "hora_fim": "11:00", "profissional": "bruna"},
+    "e3": {"data": DATA, "hora_inicio": "14:00", "hora_fim": "15:00", "profissional": "Carla"},
+    "e4": {"data": DATA, "hora_inicio": "16:00", "hora_fim": "17:00", "profissional": "Carla", "status": "cancelado"},
+    "e5": {"data": DATA, "hora_inicio": "12:00", "hora_fim": "12:30"},  # sem profissional
+}
+
+
+@pytest.fixture
+def firestore_dia():
+    from services import firebase_service_async as fsa
+    from services import catalogo_service, config_agenda_service
+
+    config_agenda_service.cache_config_agenda.limpar()
+    config_agenda_service.cache_excecoes_prof.limpar()
+
+    async def dado(path):
+        return CFG_SALAO if path.endswith("configuracao/agenda_funcionamento") else {}
+
+    async def subcolecao(path):
+        if path.endswith("Dani/AgendaExcecoes"):
+            return {DATA: {"tipo": "bloqueado", "ativo": True}}
+        return {}
+
+    catalogo = catalogo_service.CatalogoTenant("dono1", PROFISSIONAIS)
+    with patch.object(fsa, "buscar_eventos_filtrados", AsyncMock(return_value=EVENTOS)) as eventos, \
+         patch.object(fsa, "buscar_dado_em_path", side_effect=dado), \
+         patch.object(fsa, "buscar_subcolecao", side_effect=subcolecao) as sub, \
+         patch.object(catalogo_service, "obter_catalogo", AsyncMock(return_value=catalogo)):
+        yield eventos, sub
+
+
+class TestAritmeticaIntervalos:
+
+    def test_subtracao_mescla_e_recorta(self):
+        livres = de.subtrair_intervalos([(540, 1080)], [(600, 660), (540, 570), (630, 700), (1050, 1200)])
+        assert livres == [(570, 600), (700, 1050)]
+        assert de.subtrair_intervalos([(540, 600)], []) == [(540, 600)]
+        assert de.subtrair_intervalos([(540, 600)], [(500, 700)]) == []
+
+    def test_slots_respeitam_grade_duracao_e_limites(self):
+        livres = [(545, 600), (700, 800)]
+        assert de.slots_em_livres(livres, 30, grade=15, n=3) == [555, 570, 705]
+        assert de.slots_em_livres(livres, 30, grade=10, n=5, a_partir_de=720, ancora=700) == [720, 730, 740, 750, 760]
+        assert de.slots_em_livres(livres, 30, grade=15, n=5, ate=570) == [555]
+        assert de.slots_em_livres(livres, 120, grade=10, n=3) == []
+
+
+@pytest.mark.asyncio
+class TestDisponibilidadeEngine:
+
+    async def test_uma_leitura_do_dia_para_varios_profissionais(self, firestore_dia):
+        eventos, sub = firestore_dia
+        engine = await DisponibilidadeEngine.carregar("dono1", DATA, ["Bruna", "Carla", "Dani", "Zé"])
+
+        eventos.assert_awaited_once_with("dono1", data_inicio=DATA, data_fim=DATA)
+        # uma leitura de exceções por profissional existente
+        assert sub.await_count == 3
+
+        assert engine.janela("Carla") == (13 * 60, 18 * 60)   # interseção salão x profissional
+        assert engine.janela("Dani") is None                   # exceção "bloqueado"
+        assert engine.janela("Zé") is None                     # não cadastrado
+
+        # e1/e2 mesclados; evento sem profissional bloqueia também
+        assert engine.livres("Bruna") == [(660, 720), (750, 1080)]
+
+        slots = engine.primeiros_slots(["Bruna", "Carla", "Dani"], 60, grade=30, n=3)
+        assert slots == {
+            "Bruna": ["11:00", "12:30", "13:00"],
+            "Carla": ["13:00", "15:00", "15:30"],   # cancelado não ocupa
+            "Dani": [],
+        }
+        assert engine.cabe("Carla", "16:00", 60) and not engine.cabe("Carla", "14:30", 60)
+
+    async def test_excluir_evento_e_bloquear_intervalo(self, firestore_dia):
+        engine = await DisponibilidadeEngine.carregar("dono1", DATA, ["Carla"], excluir_event_id="e3")
+        assert engine.cabe("Carla", "14:00", 60)
+
+        engine.bloquear(14 * 60, 15 * 60, "Carla")
+        assert not engine.cabe("Carla", "14:00", 60)
+
+    async def test_recorrencia_sem_leitura_por_candidato(self, firestore_dia):
+        from services import recorrencia_service
+
+        eventos, _ = firestore_dia
+        horarios = await recorrencia_service._gerar_3_horarios_livres(
+            "dono1", date(2026, 10, 20), profissional="Carla", duracao_min=60
+        )
+
+        # agenda geral: 10:00 (Bruna) e 14:00 (Carla) ocupados → 16:00 e varredura 09:00→18:00
+        assert horarios == ["16:00", "11:00", "12:30"]
+        assert eventos.await_count == 1
+
+    async def test_janela_livre_do_encaixe_inalterada(self):
+        from services.encaixe_service import FUSO_BR, _janela_livre
+        from datetime import datetime
+
+        dia = date(2026, 10, 20)
+        ocupados = [
+            (FUSO_BR.localize(datetime(2026, 10, 20, 9, 0)), FUSO_BR.localize(datetime(2026, 10, 20, 10, 10))),
+        ]
+        opcoes = _janela_livre(ocupados, dia, 30, inicio_dia=time(9, 0), fim_dia=time(18, 0))
+        assert [o[0].strftime("%H:%M") for o in opcoes] == ["10:15", "10:30", "10:45"]
+        assert opcoes[0][1].strftime("%H:%M") == "10:45"
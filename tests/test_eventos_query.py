@@ -0,0 +1,120 @@
+"""
+Leitura de Eventos por query (where/range em data) em vez de varredura.
+
+Objetivo: validar que buscar_eventos_filtrados monta os filtros certos,
+que buscar_eventos_por_intervalo pede só a janela de datas ao Firestore e
+que eventos antigos sem o campo data ganham o campo (derivado de
+hora_inicio) na primeira busca do tenant, uma vez só.
+"""
+
+import pytest
+from datetime import date
+from unittest.mock import AsyncMock, patch
+
+
+@pytest.fixture(autouse=True)
+def tenant_ja_indexado():
+    from services import firebase_service_async as fsa
+
+    with patch.object(fsa, "_tenants_eventos_indexados", {"dono_1"}):
+        yield
+
+
+@pytest.mark.asyncio
+class TestEventosQuery:
+
+    async def test_um_dia_vira_igualdade(self):
+        from services import firebase_service_async as fsa
+
+        with patch.object(fsa, "consultar_subcolecao", AsyncMock(return_value={})) as mock_q:
+            await fsa.buscar_eventos_filtrados("dono_1", data_inicio="2026-06-20", data_fim="2026-06-20")
+
+        path = mock_q.call_args.args[0]
+        assert path == "Clientes/dono_1/Eventos"
+        assert mock_q.call_args.kwargs["filtros"] == [("data", "==", "2026-06-20")]
+
+    async def test_janela_status_e_projecao(self):
+        from services import firebase_service_async as fsa
+
+        with patch.object(fsa, "consultar_subcolecao", AsyncMock(return_value={})) as mock_q:
+            await fsa.buscar_eventos_filtrados(
+                "dono_1",
+                data_inicio="2026-06-20",
+                data_fim="2026-06-26",
+                profissional="Bruna",
+                status=["confirmado", "confirmada"],
+                campos=["hora_inicio", "hora_fim"],
+            )
+
+        kwargs = mock_q.call_args.kwargs
+        assert kwargs["filtros"] == [
+            ("data", ">=", "2026-06-20"),
+            ("data", "<=", "2026-06-26"),
+            ("profissional", "==", "Bruna"),
+            ("status", "in", ["confirmado", "confirmada"]),
+        ]
+        assert kwargs["campos"] == ["hora_inicio", "hora_fim"]
+
+    async def test_intervalo_consulta_somente_a_janela(self):
+        from services import event_service_async
+
+        eventos = {
+            "ev_1": {"profissional": "Bruna", "data": "2026-06-20", "hora_inicio": "10:00", "hora_fim": "11:00"},
+            "ev_cancelado": {"profissional": "Bruna", "data": "2026-06-20", "hora_inicio": "12:00", "status": "cancelado"},
+        }
+
+        with patch.object(event_service_async, "buscar_dado_em_path", AsyncMock(return_value={"tipo_usuario": "dono"})), \
+             patch.object(event_service_async, "buscar_subcolecao", AsyncMock()) as mock_sub, \
+             patch.object(event_service_async, "buscar_eventos_filtrados", AsyncMock(return_value=eventos)) as mock_q:
+            resultado = await event_service_async.buscar_eventos_por_intervalo(
+                "dono_1", dia_especifico=date(2026, 6, 20)
+            )
+
+        mock_sub.assert_not_awaited()
+        mock_q.assert_awaited_once_with("dono_1", data_inicio="2026-06-20", data_fim="2026-06-20")
+        assert [e["event_id"] for e in resultado] == ["ev_1"]
+
+    async def test_evento_sem_data_entra_na_janela_apos_backfill(self):
+        from services import firebase_service_async as fsa
+
+        eventos = {
+            "ev_antigo": {"profissional": "Bruna", "hora_inicio": "2026-06-20T10:00:00"},
+            "ev_br": {"profissional": "Bruna", "data": "20/06/2026", "hora_inicio": "11:00"},
+            "ev_novo": {"profissional": "Bruna", "data": "2026-06-20", "hora_inicio": "12:00"},
+            "ev_sem_dia": {"profissional": "Bruna", "hora_inicio": "13:00"},
+        }
+        marcadores = {}
+
+        async def consultar(path, filtros=None, campos=None, **kwargs):
+            assert filtros[0][0] == "data"
+            return {k: v for k, v in eventos.items() if v.get("data") == "2026-06-20"}
+
+        async def lote(atualizacoes):
+            for path, campos in atualizacoes:
+                eventos[path.rsplit("/", 1)[1]].update(campos)
+            return len(atualizacoes)
+
+        async def salvar(path, dados):
+            marcadores[path] = dados
+            return True
+
+        with patch.object(fsa, "_tenants_eventos_indexados", set()), \
+             patch.object(fsa, "consultar_subcolecao", side_effect=consultar), \
+             patch.object(fsa, "buscar_subcolecao", AsyncMock(side_effect=lambda p: dict(eventos))) as mock_varredura, \
+             patch.object(fsa, "atualizar_em_lote", side_effect=lote) as mock_lote, \
+             patch.object(fsa, "buscar_dado_em_path", AsyncMock(side_effect=lambda p: marcadores.get(p))), \
+             patch.object(fsa, "salvar_dado_em_path", side_effect=salvar):
+            resultado = await fsa.buscar_eventos_filtrados("dono_1", data_inicio="2026-06-20", data_fim="2026-06-20")
+            await fsa.buscar_eventos_filtrados("dono_1", data_inicio="2026-06-20", data_fim="2026-06-20")
+
+            assert set(resultado) == {"ev_antigo", "ev_br", "ev_novo"}
+            assert mock_varredura.await_count == 1
+            assert sorted(p for p, _ in mock_lote.call_args.args[0]) == [
+                "Clientes/dono_1/Eventos/ev_antigo", "Clientes/dono_1/Eventos/ev_br",
+            ]
+
+            # outro processo (memória vazia) confia no marcador gravado
+            fsa._tenants_eventos_indexados.clear()
+            await fsa.buscar_eventos_filtrados("dono_1", data_inicio="2026-06-20")
+            assert mock_varredura.await_count == 1
+            assert marcadores[fsa.path_marcador_indice_eventos("dono_1")]["versao_indice"] == fsa.VERSAO_INDICE_EVENTOS
@@ -0,0 +1,65 @@
+"""
+Fila de envio com limite de taxa, retry e gravação de status em lote.
+
+Objetivo: validar que mensagens do mesmo chat respeitam o intervalo por
+chat, que 429 (RetryAfter) é repetido após a espera pedida, que erros
+definitivos não são repetidos e que os status saem num único lote.
+"""
+
+import time
+import pytest
+from unittest.mock import AsyncMock, patch
+
+from telegram.error import BadRequest, RetryAfter
+
+from services import fila_envio_service as fe
+
+
+@pytest.mark.asyncio
+class TestFilaEnvio:
+
+    async def test_intervalo_por_chat_e_status_em_lote(self):
+        horarios = {}
+
+        async def send_message(chat_id, text, **kwargs):
+            horarios.setdefault(chat_id, []).append(time.monotonic())
+
+        bot = AsyncMock()
+        bot.send_message.side_effect = send_message
+        controle = fe.ControleTaxa(msgs_por_segundo=1000, intervalo_chat=0.05)
+
+        with patch.object(fe, "atualizar_em_lote", AsyncMock(return_value=4)) as mock_lote:
+            async with fe.FilaEnvio(bot, workers=4, controle=controle) as fila:
+                for i in range(3):
+                    fila.enviar("telegram", 1, f"m{i}", ao_enviar=(f"N/{i}", {"status": "enviado"}))
+                fila.enviar("telegram", 2, "outro chat", ao_enviar=("N/x", {"status": "enviado"}))
+
+        assert len(horarios[1]) == 3
+        assert all(b - a >= 0.04 for a, b in zip(horarios[1], horarios[1][1:]))
+        mock_lote.assert_awaited_once()
+        assert len(mock_lote.call_args.args[0]) == 4
+        assert fila.metricas["enviadas"] == 4
+
+    async def test_retry_after_repete_e_erro_definitivo_nao(self):
+        bot = AsyncMock()
+        bot.send_message.side_effect = [RetryAfter(0), None, BadRequest("chat not found")]
+        controle = fe.ControleTaxa(msgs_por_segundo=1000, intervalo_chat=0)
+
+        with patch.object(fe, "atualizar_em_lote", AsyncMock(return_value=2)) as mock_lote:
+            async with fe.FilaEnvio(bot, workers=1, controle=controle) as fila:
+                fila.enviar("telegram", 1, "ok", ao_enviar=("N/1", {"status": "enviado"}))
+                fila.enviar("telegram", 2, "falha", ao_falhar=("N/2", {"status": "erro"}))
+
+        assert bot.send_message.await_count == 3
+        assert (fila.metricas["enviadas"], fila.metricas["falhas"], fila.metricas["retries"]) == (1, 1, 1)
+        escritas = dict(mock_lote.call_args.args[0])
+        assert escritas["N/1"] == {"status": "enviado"}
+        assert escritas["N/2"]["erro"] == "chat not found"
+
+    async def test_controle_global_espaca_chats_diferentes(self):
+        controle = fe.ControleTaxa(msgs_por_segundo=10, intervalo_chat=0)
+
+        esperas = [controle.reservar(chat) for chat in range(5)]
+
+        assert esperas[0] == pytest.approx(0, abs=0.01)
+        assert esperas[4] == pytest.approx(0.4, abs=0.02)
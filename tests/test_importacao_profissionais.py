@@ -0,0 +1,111 @@
+"""
+Importação de profissionais por planilha (services/importacao_profissionais_service).
+
+Objetivo: validar que a planilha é lida em streaming, que linhas inválidas e
+nomes repetidos (normalizados) viram erros por linha, que a gravação sai em
+lotes de até 500 documentos com progresso a cada lote e que o catálogo do
+tenant é recarregado uma vez só, no fim.
+"""
+
+import csv
+
+import pytest
+from unittest.mock import AsyncMock, patch
+
+from services import catalogo_service
+from services import importacao_profissionais_service as ips
+
+
+def _csv(tmp_path, linhas, delimitador=";"):
+    caminho = tmp_path / "profissionais.csv"
+    with open(caminho, "w", newline="", encoding="utf-8") as f:
+        csv.writer(f, delimiter=delimitador).writerows(linhas)
+    return str(caminho)
+
+
+@pytest.fixture
+def firestore_import():
+    existentes = catalogo_service.CatalogoTenant("dono1", {"Júlia": {"nome": "Júlia", "servicos": ["manicure"]}})
+    with patch.object(ips, "atualizar_em_lote", AsyncMock(side_effect=lambda itens, lote: len(itens))) as mock_lote, \
+         patch.object(ips, "obter_catalogo", AsyncMock(return_value=existentes)) as mock_catalogo, \
+         patch.object(ips, "invalidar_catalogo") as mock_invalidar:
+        yield mock_lote, mock_catalogo, mock_invalidar
+
+
+@pytest.mark.asyncio
+class TestImportacaoProfissionais:
+
+    async def test_valida_deduplica_e_grava_em_lotes(self, tmp_path, firestore_import):
+        mock_lote, mock_catalogo, mock_invalidar = firestore_import
+        linhas = [["Nome do profissional", "Serviços", "Preços"]]
+        linhas += [[f"Prof {i}", "corte, escova", "50, 70"] for i in range(1, 1101)]
+        linhas += [
+            ["", "corte", ""],                 # linha 1102: sem nome
+            ["PROF 1", "corte", ""],           # 1103: repetido (normalizado)
+            ["Ana", "", ""],                   # 1104: sem serviço
+            ["julia", "manicure, pedicure", "abc"],   # 1105: já cadastrada; preço inválido
+            ["", "", ""],                      # vazia: ignorada
+        ]
+        progresso = []
+
+        async def ao_progresso(relatorio):
+            progresso.append(relatorio["importados"])
+
+        relatorio = await ips.importar_profissionais(_csv(tmp_path, linhas), "dono1", ao_progresso=ao_progresso)
+
+        assert relatorio["status"] == "ok"
+        assert (relatorio["linhas"], relatorio["importados"], relatorio["duplicados"]) == (1104, 1101, 1)
+        assert [len(c.args[0]) for c in mock_lote.await_args_list] == [500, 500, 101]
+        assert all(c.kwargs["lote"] == ips.LOTE_IMPORTACAO for c in mock_lote.await_args_list)
+        assert progresso == [500, 1000, 1101]
+        assert relatorio["erros"] == [
+            (1102, "nome vazio"),
+            (1103, "PROF 1: repetido na planilha"),
+            (1104, "Ana: nenhum serviço informado"),
+        ]
+        assert relatorio["avisos"] == [(1105, "julia: preços ignorados (abc)")]
+
+        gravados = dict(mock_lote.await_args_list[-1].args[0])
+        assert gravados["Clientes/dono1/Profissionais/Júlia"] == {"nome": "julia", "servicos": ["manicure", "pedicure"]}
+        primeiro = mock_lote.await_args_list[0].args[0][0]
+        assert primeiro == ("Clientes/dono1/Profissionais/Prof 1",
+                            {"nome": "Prof 1", "servicos": ["corte", "escova"], "precos": {"corte": 50.0, "escova": 70.0}})
+
+        # catálogo: leitura inicial (nomes existentes) + uma recarga no fim
+        mock_invalidar.assert_called_once_with("dono1")
+        assert mock_catalogo.await_count == 2
+
+    async def test_cabecalho_invalido_nao_grava(self, tmp_path, firestore_import):
+        mock_lote, _, mock_invalidar = firestore_import
+        relatorio = await ips.importar_profissionais(
+            _csv(tmp_path, [["Telefone", "Email"], ["1", "a@b"]], delimitador=","), "dono1"
+        )
+
+        assert relatorio["status"] == "cabecalho_invalido"
+        mock_lote.assert_not_awaited()
+        mock_invalidar.assert_not_called()
+
+    async def test_xlsx_em_modo_read_only(self, tmp_path, firestore_import):
+        openpyxl = pytest.importorskip("openpyxl")
+        mock_lote, _, _ = firestore_import
+
+        wb = openpyxl.Workbook()
+        wb.active.append(["Profissional", "Especialidades"])
+        wb.active.append(["Bruna", "corte"])
+        caminho = str(tmp_path / "profissionais.xlsx")
+        wb.save(caminho)
+
+        relatorio = await ips.importar_profissionais(caminho, "dono1")
+        assert relatorio["importados"] == 1
+        assert mock_lote.await_args.args[0] == [("Clientes/dono1/Profissionais/Bruna", {"nome": "Bruna", "servicos": ["corte"]})]
+
+    async def test_relatorio_no_chat(self):
+        from handlers.importacao_handler import MAX_ERROS_NO_CHAT, formatar_relatorio_importacao
+
+        relatorio = {"status": "ok", "linhas": 40, "importados": 10, "duplicados": 0, "lotes": 1,
+                     "erros": [(i, "nome vazio") for i in range(2, 32)], "avisos": []}
+        texto = formatar_relatorio_importacao(relatorio)
+
+        assert texto.startswith("✅ 10 profissional(is) importado(s) de 40 linha(s).")
+        assert "• linha 2: nome vazio" in texto
+        assert f"... e mais {30 - MAX_ERROS_NO_CHAT}" in texto
@@ -0,0 +1,150 @@
+"""
+Leituras coalescidas por update (utils/leituras_update + firebase_service_async).
+
+Objetivo: validar que, dentro de um update, leituras idênticas de documento e
+de query vão ao Firestore uma única vez (inclusive concorrentes), que escrita
+no path descarta o que foi lido (inclusive a reserva transacional de slot),
+que erro não fica guardado e que o relatório por path conta leituras reais e
+coalescidas.
+"""
+
+import asyncio
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from utils.leituras_update import leituras_do_update
+
+
+def _snapshot(dados):
+    snap = MagicMock()
+    snap.exists = dados is not None
+    snap.to_dict.side_effect = lambda: dict(dados) if dados is not None else None
+    return snap
+
+
+class _RefFalsa:
+    """Documento/query falsos: conta get() e stream()."""
+
+    def __init__(self, dados=None, docs=None):
+        self.get = AsyncMock(return_value=_snapshot(dados))
+        self.set = AsyncMock()
+        self.docs = docs or {}
+        self.streams = 0
+
+    def where(self, *a, **k):
+        return self
+
+    select = order_by = limit = where
+
+    async def stream(self):
+        self.streams += 1
+        await asyncio.sleep(0.01)
+        for doc_id, dados in self.docs.items():
+            doc = MagicMock()
+            doc.id = doc_id
+            doc.to_dict.return_value = dict(dados)
+            yield doc
+
+
+@pytest.fixture
+def fsa():
+    from services import firebase_service_async
+    return firebase_service_async
+
+
+@pytest.mark.asyncio
+class TestLeiturasUpdate:
+
+    async def test_documento_lido_uma_vez_e_copias_independentes(self, fsa):
+        ref = _RefFalsa(dados={"responder_automaticamente": True})
+        path = "Clientes/t1/Governanca/whatsapp:1"
+
+        with patch.object(fsa, "get_ref_from_path", return_value=ref):
+            async with leituras_do_update("teste") as leituras:
+                a = await fsa.ler_documento(path)
+                a["responder_automaticamente"] = False
+                b = await fsa.buscar_dado_em_path(path)
+
+        assert ref.get.await_count == 1
+        assert b == {"responder_automaticamente": True}
+        rel = leituras.relatorio()
+        assert rel["por_path"][path] == {"leituras": 1, "docs": 1, "coalescidas": 1}
+
+    async def test_queries_identicas_concorrentes_uma_leitura(self, fsa):
+        ref = _RefFalsa(docs={"p1": {"nome": "Bruna"}, "p2": {"nome": "Carla"}})
+        path = "Clientes/t1/Atores"
+        filtros = [("tipo_usuario", "==", "profissional")]
+
+        with patch.object(fsa, "get_ref_from_path", return_value=ref):
+            async with leituras_do_update("teste") as leituras:
+                r1, r2, r3 = await asyncio.gather(
+                    fsa.consultar(path, filtros=filtros),
+                    fsa.consultar(path, filtros=filtros),
+                    fsa.consultar_subcolecao(path, filtros=filtros),
+                )
+                # filtro diferente = outra leitura
+                await fsa.consultar(path, filtros=[("ativo", "==", True)])
+
+        assert r1 == r2 == r3 and len(r1) == 2
+        assert ref.streams == 2
+        rel = leituras.relatorio()
+        assert (rel["leituras_firestore"], rel["docs_lidos"], rel["coalescidas"]) == (2, 4, 2)
+
+    async def test_escrita_descarta_leitura_do_path_e_da_colecao(self, fsa):
+        doc = _RefFalsa(dados={"lead_status": "novo"})
+        colecao = _RefFalsa(docs={"whatsapp:1": {"lead_status": "novo"}})
+        path_doc = "Clientes/t1/Clientes/whatsapp:1"
+
+        def ref_de(path):
+            return doc if path == path_doc else colecao
+
+        with patch.object(fsa, "get_ref_from_path", side_effect=ref_de):
+            async with leituras_do_update("teste"):
+                await fsa.ler_documento(path_doc)
+                await fsa.buscar_subcolecao("Clientes/t1/Clientes")
+                await fsa.gravar_documento(path_doc, {"lead_status": "interessado"}, merge=True)
+                await fsa.ler_documento(path_doc)
+                await fsa.buscar_subcolecao("Clientes/t1/Clientes")
+
+        assert doc.get.await_count == 2
+        assert colecao.streams == 2
+
+    async def test_fora_do_update_e_erro_nao_coalescem(self, fsa):
+        ref = _RefFalsa(dados={"x": 1})
+        path = "Clientes/t1/Configuracao/negocio"
+
+        with patch.object(fsa, "get_ref_from_path", return_value=ref):
+            await fsa.ler_documento(path)
+            await fsa.ler_documento(path)
+            assert ref.get.await_count == 2
+
+            ref.get.side_effect = [RuntimeError("timeout"), _snapshot({"x": 2})]
+            async with leituras_do_update("teste"):
+                with pytest.raises(RuntimeError):
+                    await fsa.ler_documento(path)
+                assert await fsa.ler_documento(path) == {"x": 2}
+
+    async def test_reserva_transacional_descarta_ocupacao_lida(self, fsa):
+        from services import agenda_lock_service
+
+        data = "2026-06-20"
+        ocupacao = _RefFalsa(dados={"completo": True, "intervalos": {}})
+        evento = {"confirmado": True, "profissional": "Bruna", "data": data, "hora_inicio": "14:00", "hora_fim": "14:30"}
+
+        async def reservar(*args):
+            # o commit da transação grava o intervalo no índice do dia
+            novo = {"completo": True, "intervalos": {"ev_1": {"hora_inicio": "14:00", "hora_fim": "14:30"}}}
+            ocupacao.get.return_value = _snapshot(novo)
+            return {"ok": True, "duplicado": False, "motivo": "Evento criado com sucesso"}
+
+        with patch.object(fsa, "get_ref_from_path", return_value=ocupacao), \
+             patch.object(agenda_lock_service, "client", MagicMock()), \
+             patch.object(agenda_lock_service, "_reservar_em_transacao", side_effect=reservar):
+            async with leituras_do_update("teste"):
+                antes = await agenda_lock_service.buscar_intervalos_ocupados("dono_1", data, "Bruna")
+                r = await agenda_lock_service.criar_evento_com_lock("dono_1", dict(evento), "ev_1")
+                depois = await agenda_lock_service.buscar_intervalos_ocupados("dono_1", data, "Bruna")
+
+        assert r["ok"] is True
+        assert antes == [] and [i["event_id"] for i in depois] == ["ev_1"]
+        assert ocupacao.get.await_count == 2   # pré-checagem da reserva coalescida; releitura após o commit
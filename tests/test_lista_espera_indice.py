@@ -0,0 +1,160 @@
+"""
+Lista de espera indexada (services/lista_espera_service).
+
+Objetivo: validar que a busca de vaga é uma query por status + chave
+data|profissional|serviço ordenada por criado_em no servidor (sem ler a
+ListaEspera inteira), que qualquer pedido que caiba na vaga liberada é
+aceito (não só o mesmo horário de início), que o cancelamento oferece ao
+cliente o horário que ele pediu e que entradas antigas (sem os campos de
+índice) são reindexadas uma vez por tenant na primeira busca.
+"""
+
+import pytest
+from unittest.mock import AsyncMock, patch
+
+from services import lista_espera_service as les
+
+TENANT = "dono1"
+DATA = "2026-10-20"
+
+
+class ListaEsperaFalsa:
+    """Subcoleção em memória que aplica filtros de igualdade e order_by."""
+
+    def __init__(self):
+        self.docs = {}
+        self.consultas = []
+
+    async def salvar(self, path, dados):
+        self.docs[path.rsplit("/", 1)[1]] = dados
+        return True
+
+    async def consultar(self, path, filtros=None, campos=None, ordenar_por=None, limite=None):
+        self.consultas.append((path, filtros, ordenar_por))
+        docs = {
+            i: d for i, d in self.docs.items()
+            if all(op == "==" and d.get(campo) == valor for campo, op, valor in filtros or [])
+        }
+        if ordenar_por:
+            docs = dict(sorted(docs.items(), key=lambda item: item[1].get(ordenar_por) or ""))
+        return docs
+
+
+@pytest.fixture
+def lista_espera():
+    fake = ListaEsperaFalsa()
+    # tenant já reindexado: a busca em regime não varre a ListaEspera
+    with patch.object(les, "salvar_dado_em_path", side_effect=fake.salvar), \
+         patch.object(les, "consultar_subcolecao", side_effect=fake.consultar), \
+         patch.object(les, "_tenants_indexados", {TENANT}), \
+         patch.object(les, "buscar_subcolecao", AsyncMock(side_effect=AssertionError("varredura"))):
+        yield fake
+
+
+async def _criar(cliente, hora, duracao, profissional="Bruna", servico="corte"):
+    resultado = await les.criar_lista_espera(
+        TENANT, f"whatsapp:{cliente}", cliente, cliente.title(), servico, profissional, DATA, hora, duracao, "ev0"
+    )
+    return resultado["waitlist_id"]
+
+
+@pytest.mark.asyncio
+class TestListaEsperaIndexada:
+
+    async def test_documento_grava_campos_de_indice(self, lista_espera):
+        wid = await _criar("ana", "14:30", 45, profissional=" Bruna ", servico="Corte")
+        doc = lista_espera.docs[wid]
+
+        assert doc["chave_espera"] == "2026-10-20|bruna|corte"
+        assert (doc["inicio_minutos"], doc["fim_minutos"]) == (870, 915)
+        assert doc["criado_em"] == doc["auditoria"]["criado_em"]
+
+    async def test_busca_por_query_e_encaixe_por_sobreposicao(self, lista_espera):
+        longo = await _criar("ana", "14:30", 60)           # passa do fim da vaga
+        cabe = await _criar("bia", "14:20", 30)            # começa depois, cabe inteiro
+        await _criar("caio", "14:00", 30, profissional="Carla")
+        await _criar("duda", "13:30", 30)                  # começa antes da vaga
+
+        doc = await les.buscar_proxima_lista_espera_compativel(TENANT, "corte", "Bruna", DATA, "14:00", 60)
+
+        assert doc["waitlist_id"] == cabe
+        path, filtros, ordenar_por = lista_espera.consultas[-1]
+        assert path == f"Clientes/{TENANT}/ListaEspera"
+        assert filtros == [("status", "==", "ativo"), ("chave_espera", "==", "2026-10-20|bruna|corte")]
+        assert ordenar_por == "criado_em"
+
+        # vaga maior: o mais antigo que cabe vence (FIFO)
+        doc = await les.buscar_proxima_lista_espera_compativel(TENANT, "corte", "bruna", DATA, "14:00", 120)
+        assert doc["waitlist_id"] == longo
+
+        lista_espera.docs[longo]["status"] = "notificado"
+        lista_espera.docs[cabe]["status"] = "cancelado"
+        assert await les.buscar_proxima_lista_espera_compativel(TENANT, "corte", "Bruna", DATA, "14:00", 120) is None
+
+    async def test_cancelamento_oferece_o_horario_pedido(self, lista_espera):
+        from services import event_service_async
+
+        wid = await _criar("bia", "14:20", 30)
+        evento = {"servico": "corte", "profissional": "Bruna", "data": DATA, "hora_inicio": "14:00", "hora_fim": "15:00"}
+
+        with patch.object(les, "marcar_como_notificado", AsyncMock(return_value=True)) as mock_notif, \
+             patch("utils.contexto_temporario.salvar_contexto_temporario_v2", AsyncMock()) as mock_ctx:
+            assert await event_service_async.processar_cancelamento_e_notificar_espera(TENANT, evento)
+
+        mock_notif.assert_awaited_once_with(TENANT, wid)
+        assert mock_ctx.call_args.args[:2] == (TENANT, "bia")
+        contexto = mock_ctx.call_args.args[2]
+        assert contexto["encaixe_pendente"]["hora_inicio"] == "14:20"
+        assert contexto["encaixe_pendente"]["duracao_minutos"] == 30
+
+    async def test_reindexar_entradas_antigas(self):
+        antigas = {
+            "w1": {"status": "ativo", "auditoria": {"criado_em": "2026-10-18T10:00:00"},
+                   "servico_desejado": {"servico": "corte", "profissional_preferido": "Bruna",
+                                        "data_desejada": DATA, "hora_desejada": "09:00", "duracao_minutos": 30}},
+            "w2": {"status": "convertido", "servico_desejado": {}},
+        }
+        with patch.object(les, "buscar_subcolecao", AsyncMock(return_value=antigas)), \
+             patch.object(les, "atualizar_em_lote", AsyncMock(return_value=1)) as mock_lote:
+            assert await les.reindexar_lista_espera(TENANT) == 1
+
+        (path, campos), = mock_lote.call_args.args[0]
+        assert path == f"Clientes/{TENANT}/ListaEspera/w1"
+        assert campos == {"chave_espera": "2026-10-20|bruna|corte", "inicio_minutos": 540,
+                          "fim_minutos": 570, "criado_em": "2026-10-18T10:00:00"}
+
+    async def test_primeira_busca_reindexa_entradas_antigas_uma_vez(self):
+        fake = ListaEsperaFalsa()
+        fake.docs["w_antiga"] = {
+            "waitlist_id": "w_antiga", "status": "ativo", "auditoria": {"criado_em": "2026-10-18T10:00:00"},
+            "servico_desejado": {"servico": "corte", "profissional_preferido": "Bruna",
+                                 "data_desejada": DATA, "hora_desejada": "14:00", "duracao_minutos": 30},
+        }
+        marcadores = {}
+
+        async def lote(atualizacoes):
+            for path, campos in atualizacoes:
+                fake.docs[path.rsplit("/", 1)[1]].update(campos)
+            return len(atualizacoes)
+
+        async def salvar(path, dados):
+            marcadores[path] = dados
+            return True
+
+        with patch.object(les, "consultar_subcolecao", side_effect=fake.consultar), \
+             patch.object(les, "_tenants_indexados", set()), \
+             patch.object(les, "buscar_dado_em_path", AsyncMock(side_effect=lambda p: marcadores.get(p))), \
+             patch.object(les, "salvar_dado_em_path", side_effect=salvar), \
+             patch.object(les, "buscar_subcolecao", AsyncMock(side_effect=lambda p: dict(fake.docs))) as mock_varredura, \
+             patch.object(les, "atualizar_em_lote", side_effect=lote):
+            doc = await les.buscar_proxima_lista_espera_compativel(TENANT, "corte", "Bruna", DATA, "14:00", 60)
+            await les.buscar_proxima_lista_espera_compativel(TENANT, "corte", "Bruna", DATA, "14:00", 60)
+
+            assert doc["waitlist_id"] == "w_antiga"
+            assert mock_varredura.await_count == 1
+            assert marcadores[les.path_marcador_indice_espera(TENANT)]["versao_indice"] == les.VERSAO_INDICE_ESPERA
+
+            # outro processo (memória vazia) confia no marcador gravado
+            les._tenants_indexados.clear()
+            await les.buscar_proxima_lista_espera_compativel(TENANT, "corte", "Bruna", DATA, "14:00", 60)
+            assert mock_varredura.await_count == 1
@@ -0,0 +1,208 @@
+"""
+Gateway de LLM (services/llm_gateway) contra um servidor falso local
+compatível com a API da OpenAI (POST /v1/chat/completions via aiohttp).
+
+Objetivo: validar, pelo cliente real do SDK, que 429/5xx são repetidos com
+backoff e 4xx não, que o prazo da chamada corta upstream lento, que os
+semáforos global e por tenant limitam a concorrência, que o circuito abre
+depois de falhas seguidas (e o chamador cai no fallback sem chamar o
+provedor) e fecha após a chamada de teste (liberada também quando o
+chamador cancela), e que latência e tokens entram nos histogramas.
+"""
+
+import asyncio
+import os
+import time
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-teste")  # gpt_client instancia o cliente no import
+
+import pytest
+import pytest_asyncio
+from aiohttp import web
+from openai import AsyncOpenAI
+from unittest.mock import patch
+
+from services import llm_gateway as gw
+
+
+class ServidorOpenAIFalso:
+    """Responde /v1/chat/completions conforme um roteiro de (status, atraso)."""
+
+    def __init__(self):
+        self.roteiro = []
+        self.padrao = (200, 0.0)
+        self.recebidas = 0
+        self.em_andamento = 0
+        self.pico = 0
+        self.por_usuario_pico = {}
+        self._por_usuario = {}
+
+    async def completions(self, request):
+        corpo = await request.json()
+        usuario = corpo["messages"][-1]["content"]
+        self.recebidas += 1
+        self.em_andamento += 1
+        self._por_usuario[usuario] = self._por_usuario.get(usuario, 0) + 1
+        self.pico = max(self.pico, self.em_andamento)
+        self.por_usuario_pico[usuario] = max(self.por_usuario_pico.get(usuario, 0), self._por_usuario[usuario])
+        try:
+            status, atraso = self.roteiro.pop(0) if self.roteiro else self.padrao
+            if atraso:
+                await asyncio.sleep(atraso)
+            if status != 200:
+                return web.json_response(
+                    {"error": {"message": f"erro {status}", "type": "teste"}},
+                    status=status,
+                    headers={"retry-after": "0"} if status == 429 else None,
+                )
+            return web.json_response({
+                "id": "chatcmpl-teste",
+                "object": "chat.completion",
+                "created": 0,
+                "model": corpo["model"],
+                "choices": [{
+                    "index": 0,
+                    "finish_reason": "stop",
+                    "message": {"role": "assistant", "content": '{"resposta": "ok"}'},
+                }],
+                "usage": {"prompt_tokens": 300, "completion_tokens": 20, "total_tokens": 320},
+            })
+        finally:
+            self.em_andamento -= 1
+            self._por_usuario[usuario] -= 1
+
+
+@pytest_asyncio.fixture
+async def servidor():
+    fake = ServidorOpenAIFalso()
+    app = web.Application()
+    app.router.add_post("/v1/chat/completions", fake.completions)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    porta = site._server.sockets[0].getsockname()[1]
+    fake.client = AsyncOpenAI(api_key="sk-teste", base_url=f"http://127.0.0.1:{porta}/v1", max_retries=0)
+    yield fake
+    await fake.client.close()
+    await runner.cleanup()
+
+
+def _gateway(servidor, **kwargs):
+    parametros = {"prazo_segundos": 5, "backoff_base": 0.01, "max_tentativas": 3}
+    parametros.update(kwargs)
+    return gw.GatewayLLM(client=servidor.client, **parametros)
+
+
+def _msgs(texto="oi"):
+    return [{"role": "user", "content": texto}]
+
+
+@pytest.mark.asyncio
+class TestGatewayLLM:
+
+    async def test_retry_em_429_e_5xx_mas_nao_em_4xx(self, servidor):
+        gateway = _gateway(servidor)
+        servidor.roteiro = [(429, 0), (503, 0)]
+        resposta = await gateway.chamar(_msgs(), origem="teste")
+
+        assert resposta.choices[0].message.content == '{"resposta": "ok"}'
+        assert servidor.recebidas == 3
+        assert gateway.metricas()["retries"] == 2
+
+        servidor.roteiro = [(400, 0)]
+        with pytest.raises(gw.LLMIndisponivel):
+            await gateway.chamar(_msgs())
+        assert servidor.recebidas == 4
+        assert gateway.circuito.falhas_seguidas == 0   # pedido inválido não conta no circuito
+
+    async def test_prazo_corta_upstream_lento(self, servidor):
+        gateway = _gateway(servidor, prazo_segundos=0.2)
+        servidor.padrao = (200, 1.0)
+
+        inicio = time.monotonic()
+        with pytest.raises(gw.LLMIndisponivel):
+            await gateway.chamar(_msgs())
+        assert time.monotonic() - inicio < 0.6
+        assert gateway.metricas()["timeouts"] == 1
+
+    async def test_concorrencia_global_e_por_tenant(self, servidor):
+        gateway = _gateway(servidor, concorrencia_global=3, concorrencia_tenant=1)
+        servidor.padrao = (200, 0.05)
+
+        chamadas = [gateway.chamar(_msgs("t1"), tenant_id="t1") for _ in range(3)]
+        chamadas += [gateway.chamar(_msgs(f"livre{i}")) for i in range(5)]
+        await asyncio.gather(*chamadas)
+
+        assert servidor.recebidas == 8
+        assert servidor.pico <= 3
+        assert servidor.por_usuario_pico["t1"] == 1
+
+    async def test_circuito_abre_barra_e_fecha(self, servidor):
+        circuito = gw.CircuitBreaker(limite_falhas=2, segundos_aberto=0.2)
+        gateway = _gateway(servidor, max_tentativas=1, circuito=circuito)
+        servidor.padrao = (500, 0)
+
+        for _ in range(2):
+            with pytest.raises(gw.LLMIndisponivel):
+                await gateway.chamar(_msgs())
+        assert circuito.estado == "aberto"
+
+        with pytest.raises(gw.CircuitoAberto):
+            await gateway.chamar(_msgs())
+        assert servidor.recebidas == 2
+
+        # depois do tempo aberto, uma chamada de teste passa e fecha o circuito
+        await asyncio.sleep(0.25)
+        servidor.padrao = (200, 0)
+        await gateway.chamar(_msgs())
+        assert circuito.estado == "fechado"
+
+        m = gateway.metricas()
+        assert (m["chamadas"], m["sucessos"], m["falhas"], m["rejeitadas_circuito"]) == (4, 1, 2, 1)
+        assert m["tokens"]["total"] == 1 and m["tokens"]["faixas"]["<=500"] == 1
+        assert m["latencia_ms"]["total"] == 3
+
+    async def test_cancelamento_da_chamada_de_teste_libera_o_circuito(self, servidor):
+        circuito = gw.CircuitBreaker(limite_falhas=1, segundos_aberto=0.05)
+        circuito.registrar_falha()
+        gateway = _gateway(servidor, circuito=circuito)
+        await asyncio.sleep(0.06)
+
+        servidor.padrao = (200, 1.0)
+        teste = asyncio.create_task(gateway.chamar(_msgs()))
+        await asyncio.sleep(0.1)
+        assert circuito.estado == "meio_aberto" and circuito._teste_em_andamento
+        teste.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await teste
+
+        # sem veredito: a próxima chamada vira o teste (antes: CircuitoAberto para sempre)
+        assert not circuito._teste_em_andamento
+        servidor.padrao = (200, 0)
+        await gateway.chamar(_msgs())
+        assert circuito.estado == "fechado"
+
+    async def test_circuito_aberto_cai_no_template_do_p1(self, servidor):
+        from services import cache_respostas_p1 as crp, gpt_service
+
+        crp.cache_respostas_p1.limpar()
+        circuito = gw.CircuitBreaker(limite_falhas=1, segundos_aberto=60)
+        circuito.registrar_falha()
+        gateway = _gateway(servidor, circuito=circuito)
+
+        with patch.object(gw, "gateway_llm", gateway):
+            texto = await gpt_service.gerar_resposta_p1({"tipo": "pedir_horario"})
+
+        assert texto == "Qual horário fica melhor pra você?"
+        assert servidor.recebidas == 0
+
+
+def test_histograma_percentis():
+    h = gw.Histograma((100, 200, 400))
+    for valor in (50, 60, 150, 350, 900):
+        h.observar(valor)
+
+    d = h.como_dict()
+    assert d["faixas"] == {"<=100": 2, "<=200": 1, "<=400": 1, ">400": 1}
+    assert (d["p50"], d["p95"], d["max"]) == (200.0, 900, 900)
@@ -0,0 +1,107 @@
+"""
+Disparo de notificações vencidas por collection group.
+
+Objetivo: validar que o ciclo do scheduler não lista Clientes, processa só o
+que a query de vencidas devolve (por path do documento), respeita a regra de
+tenant dono, tira da fila de vencidas as notificações em estado terminal
+(data_hora inválida, enviada sem avisado) e registra métricas do ciclo.
+"""
+
+import pytest
+from datetime import datetime, timedelta
+from unittest.mock import AsyncMock, patch
+
+from services import fila_envio_service
+
+
+@pytest.mark.asyncio
+class TestDisparoNotificacoes:
+
+    async def test_processa_apenas_vencidas_por_path(self):
+        from scheduler import notificacoes_scheduler as ns
+
+        agora = datetime.now(ns.FUSO_BR).replace(tzinfo=None)
+        vencidas = {
+            "Clientes/dono_1/NotificacoesAgendadas/n1": {
+                "avisado": False, "canal": "telegram", "destinatario_user_id": "111",
+                "mensagem": "lembrete", "data_hora": (agora - timedelta(minutes=1)).isoformat(),
+            },
+            "Clientes/dono_1/NotificacoesAgendadas/n2": {
+                "avisado": False, "descricao": "corte", "data_hora": (agora - timedelta(minutes=40)).isoformat(),
+            },
+            "Clientes/cli_9/NotificacoesAgendadas/n3": {
+                "avisado": False, "mensagem": "x", "data_hora": (agora - timedelta(minutes=2)).isoformat(),
+            },
+        }
+        perfis = {"Clientes/dono_1": {"tipo_usuario": "dono"}, "Clientes/cli_9": {"tipo_usuario": "cliente"}}
+
+        bot = AsyncMock()
+        with patch.object(ns, "_get_bot", AsyncMock(return_value=bot)), \
+             patch.object(ns, "buscar_subcolecao", AsyncMock()) as mock_sub, \
+             patch.object(ns, "buscar_notificacoes_vencidas", AsyncMock(return_value=vencidas)) as mock_query, \
+             patch.object(ns, "buscar_dado_em_path", AsyncMock(side_effect=lambda p: perfis.get(p))), \
+             patch.object(ns, "atualizar_dado_em_path", AsyncMock(return_value=True)) as mock_update, \
+             patch.object(fila_envio_service, "atualizar_em_lote", AsyncMock(return_value=1)) as mock_lote:
+            await ns.processar_notificacoes_agendadas()
+
+        mock_sub.assert_not_awaited()
+        mock_query.assert_awaited_once()
+        assert mock_query.call_args.kwargs["limite"] == ns.MAX_NOTIFICACOES_POR_CICLO
+
+        bot.send_message.assert_awaited_once_with(chat_id=111, text="lembrete")
+        atualizados = {c.args[0]: c.args[1] for c in mock_update.call_args_list}
+        assert atualizados["Clientes/dono_1/NotificacoesAgendadas/n2"]["status"] == "expirada"
+        assert "Clientes/cli_9/NotificacoesAgendadas/n3" not in atualizados
+
+        # status do envio vai em lote, não em update por mensagem
+        (path, dados), = mock_lote.call_args.args[0]
+        assert path == "Clientes/dono_1/NotificacoesAgendadas/n1"
+        assert dados["status"] == "enviado"
+
+        m = ns.ultimo_ciclo_notificacoes
+        assert (m["lidas"], m["enfileirada"], m["enviadas"], m["expirada"], m["pulada"]) == (3, 1, 1, 1, 1)
+        assert m["duracao_ms"] >= 0
+
+    async def test_confirmar_reserva_usa_tenant_do_path(self):
+        from scheduler import notificacoes_scheduler as ns
+
+        agora = datetime.now(ns.FUSO_BR).replace(tzinfo=None)
+        vencidas = {
+            "Clientes/dono_1/NotificacoesAgendadas/n1": {
+                "avisado": False, "descricao": "CONFIRMAR_RESERVA::ev_1", "data_hora": agora.isoformat(),
+            },
+        }
+        perfis = {"Clientes/dono_1": {"tipo_usuario": "dono"}, "Clientes/dono_1/Eventos/ev_1": {"status": "reservado"}}
+
+        bot = AsyncMock()
+        with patch.object(ns, "_get_bot", AsyncMock(return_value=bot)), \
+             patch.object(ns, "buscar_notificacoes_vencidas", AsyncMock(return_value=vencidas)), \
+             patch.object(ns, "buscar_dado_em_path", AsyncMock(side_effect=lambda p: perfis.get(p))), \
+             patch.object(ns, "atualizar_dado_em_path", AsyncMock(return_value=True)) as mock_update:
+            await ns.processar_notificacoes_agendadas()
+
+        bot.send_message.assert_not_awaited()
+        atualizados = {c.args[0]: c.args[1] for c in mock_update.call_args_list}
+        assert atualizados["Clientes/dono_1/Eventos/ev_1"]["status"] == "confirmado"
+        assert atualizados["Clientes/dono_1/NotificacoesAgendadas/n1"]["tipo_processamento"] == "confirmacao_reserva"
+        assert ns.ultimo_ciclo_notificacoes["confirmacao"] == 1
+
+    async def test_terminais_saem_da_query_de_vencidas(self):
+        from scheduler import notificacoes_scheduler as ns
+
+        vencidas = {
+            "Clientes/dono_1/NotificacoesAgendadas/n1": {"avisado": False, "mensagem": "x", "data_hora": "amanhã cedo"},
+            "Clientes/dono_1/NotificacoesAgendadas/n2": {"avisado": False, "status": "enviado", "data_hora": "2026-06-20T10:00:00"},
+        }
+
+        with patch.object(ns, "_get_bot", AsyncMock(return_value=AsyncMock())), \
+             patch.object(ns, "buscar_notificacoes_vencidas", AsyncMock(return_value=vencidas)), \
+             patch.object(ns, "buscar_dado_em_path", AsyncMock(return_value={"tipo_usuario": "dono"})), \
+             patch.object(ns, "atualizar_dado_em_path", AsyncMock(return_value=True)) as mock_update:
+            await ns.processar_notificacoes_agendadas()
+
+        atualizados = {c.args[0]: c.args[1] for c in mock_update.call_args_list}
+        invalida = atualizados["Clientes/dono_1/NotificacoesAgendadas/n1"]
+        assert (invalida["status"], invalida["avisado"]) == ("erro", True)
+        assert atualizados["Clientes/dono_1/NotificacoesAgendadas/n2"]["avisado"] is True
+        assert (ns.ultimo_ciclo_notificacoes["erro"], ns.ultimo_ciclo_notificacoes["pulada"]) == (1, 1)
@@ -0,0 +1,168 @@
+"""
+Índice de ocupação — Clientes/{dono}/Ocupacao/{data}_{profissional}
+
+Objetivo: validar que as checagens de conflito leem apenas o documento
+do profissional no dia (e não a subcoleção inteira de Eventos), que o
+índice é mantido por salvar/cancelar/deletar e que a reconstrução grava em
+transação sem apagar intervalos gravados por reservas concorrentes.
+"""
+
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from google.cloud import firestore
+
+from tests.firestore_falso import FirestoreApiFalso, cliente_falso
+
+
+DATA = "2026-06-20"
+
+DOC_BRUNA = {
+    "data": DATA,
+    "profissional": "bruna",
+    "completo": True,
+    "intervalos": {
+        "ev_tarde": {"hora_inicio": "15:00", "hora_fim": "16:00", "cliente_id": "c2", "status": "confirmado"},
+        "ev_manha": {"hora_inicio": "09:00", "hora_fim": "10:00", "cliente_id": "c1", "status": "confirmado"},
+    },
+}
+
+
+@pytest.fixture
+def firestore_falso():
+    """SDK real (AsyncTransaction + async_transactional) sobre o Firestore falso."""
+    from services import firebase_service_async, ocupacao_service
+
+    api = FirestoreApiFalso()
+    client = cliente_falso(api)
+    with patch.object(firebase_service_async, "client", client), \
+         patch.object(ocupacao_service, "client", client):
+        yield api
+
+
+def test_gerar_ocupacao_id_normaliza_profissional():
+    from services.ocupacao_service import gerar_ocupacao_id
+
+    assert gerar_ocupacao_id(DATA, "  Bruna ") == f"{DATA}_bruna"
+    assert gerar_ocupacao_id(DATA, "Ana Júlia") == f"{DATA}_ana_julia"
+
+
+def test_ordenar_intervalos_ordena_e_exclui_evento():
+    from services.ocupacao_service import ordenar_intervalos
+
+    itens = ordenar_intervalos(DOC_BRUNA["intervalos"])
+    assert [i["event_id"] for i in itens] == ["ev_manha", "ev_tarde"]
+
+    itens = ordenar_intervalos(DOC_BRUNA["intervalos"], excluir_event_id="ev_manha")
+    assert [i["event_id"] for i in itens] == ["ev_tarde"]
+
+
+@pytest.mark.asyncio
+class TestOcupacaoIndex:
+
+    async def test_leitura_usa_somente_documento_do_dia(self):
+        from services import ocupacao_service
+
+        with patch.object(ocupacao_service, "buscar_dado_em_path", AsyncMock(return_value=DOC_BRUNA)) as mock_doc, \
+             patch.object(ocupacao_service, "buscar_eventos_filtrados", AsyncMock()) as mock_sub:
+            itens = await ocupacao_service.buscar_intervalos_ocupados("dono_1", DATA, "Bruna")
+
+        mock_doc.assert_awaited_once_with(f"Clientes/dono_1/Ocupacao/{DATA}_bruna")
+        mock_sub.assert_not_awaited()
+        assert [i["hora_inicio"] for i in itens] == ["09:00", "15:00"]
+
+    async def test_documento_ausente_reconstroi_do_dia(self, firestore_falso):
+        from services import ocupacao_service
+
+        eventos = {
+            "ev_1": {"profissional": "Bruna", "data": DATA, "hora_inicio": "11:00", "hora_fim": "12:00", "status": "confirmado"},
+            "ev_cancelado": {"profissional": "Bruna", "data": DATA, "hora_inicio": "13:00", "hora_fim": "14:00", "status": "cancelado"},
+            "ev_carla": {"profissional": "Carla", "data": DATA, "hora_inicio": "11:00", "hora_fim": "12:00"},
+        }
+        api = firestore_falso
+
+        with patch.object(ocupacao_service, "buscar_eventos_filtrados", AsyncMock(return_value=eventos)) as mock_query:
+            itens = await ocupacao_service.buscar_intervalos_ocupados("dono_1", DATA, "Bruna")
+            # documento completo gravado: a próxima leitura não reconstrói
+            await ocupacao_service.buscar_intervalos_ocupados("dono_1", DATA, "Bruna")
+
+        mock_query.assert_awaited_once_with("dono_1", data_inicio=DATA, data_fim=DATA)
+        assert [i["event_id"] for i in itens] == ["ev_1"]
+
+        assert set(api.docs) == {
+            f"Clientes/dono_1/Ocupacao/{DATA}_bruna",
+            f"Clientes/dono_1/Ocupacao/{DATA}_carla",
+        }
+        assert all(doc["completo"] is True for doc in api.docs.values())
+        assert api.rpcs["begin_transaction"] == api.rpcs["commit"] == 2
+
+    async def test_reconstrucao_preserva_reserva_concorrente(self, firestore_falso):
+        from services import ocupacao_service
+
+        eventos = {
+            "ev_1": {"profissional": "Bruna", "data": DATA, "hora_inicio": "11:00", "hora_fim": "12:00"},
+            "ev_cancelado": {"profissional": "Bruna", "data": DATA, "hora_inicio": "13:00", "hora_fim": "14:00", "status": "cancelado"},
+        }
+        path_bruna = f"Clientes/dono_1/Ocupacao/{DATA}_bruna"
+        path_carla = f"Clientes/dono_1/Ocupacao/{DATA}_carla"
+        api = firestore_falso
+        # gravado por reservas depois da leitura de Eventos (documento ainda incompleto)
+        api.docs[path_bruna] = {"intervalos": {
+            "ev_concorrente": {"hora_inicio": "15:00", "hora_fim": "16:00", "status": "confirmado"},
+            "ev_cancelado": {"hora_inicio": "13:00", "hora_fim": "14:00", "status": "confirmado"},
+        }}
+        # outra reconstrução já terminou: não é sobrescrita
+        carla = {"completo": True, "intervalos": {"ev_carla": {"hora_inicio": "08:00", "hora_fim": "09:00"}}}
+        api.docs[path_carla] = carla
+
+        with patch.object(ocupacao_service, "buscar_eventos_filtrados", AsyncMock(return_value=eventos)):
+            por_prof = await ocupacao_service.reconstruir_ocupacao_do_dia("dono_1", DATA, ["Bruna", "Carla"])
+
+        assert sorted(api.docs[path_bruna]["intervalos"]) == ["ev_1", "ev_concorrente"]
+        assert api.docs[path_bruna]["completo"] is True
+        assert api.docs[path_carla] is carla
+        assert api.rpcs["commit"] == 2   # o da Carla vai vazio: o documento não é reescrito
+        assert sorted(por_prof["bruna"]) == ["ev_1", "ev_concorrente"]
+        assert list(por_prof["carla"]) == ["ev_carla"]
+
+    async def test_registrar_e_remover_sao_merge_por_event_id(self):
+        from services import ocupacao_service
+
+        evento = {"profissional": "Bruna", "data": DATA, "hora_inicio": "09:00", "hora_fim": "10:00", "cliente_id": "c1"}
+
+        with patch.object(ocupacao_service, "atualizar_dado_em_path", AsyncMock(return_value=True)) as mock_merge:
+            await ocupacao_service.registrar_ocupacao("dono_1", "ev_1", evento)
+            await ocupacao_service.remover_ocupacao("dono_1", "ev_1", evento)
+
+        (path_reg, payload_reg), (path_rem, payload_rem) = [c.args for c in mock_merge.call_args_list]
+        assert path_reg == path_rem == f"Clientes/dono_1/Ocupacao/{DATA}_bruna"
+        assert payload_reg["intervalos"]["ev_1"]["hora_fim"] == "10:00"
+        assert "completo" not in payload_reg
+        assert payload_rem["intervalos"]["ev_1"] is firestore.DELETE_FIELD
+
+    async def test_verificar_conflito_nao_varre_eventos(self):
+        from services import event_service_async, ocupacao_service
+
+        with patch.object(event_service_async, "buscar_dado_em_path", AsyncMock(return_value={"tipo_usuario": "dono"})), \
+             patch.object(event_service_async, "buscar_subcolecao", AsyncMock()) as mock_sub_evt, \
+             patch.object(ocupacao_service, "buscar_eventos_filtrados", AsyncMock()) as mock_sub_idx, \
+             patch.object(ocupacao_service, "buscar_dado_em_path", AsyncMock(return_value=DOC_BRUNA)):
+            conflitos = await event_service_async.verificar_conflito(
+                user_id="dono_1",
+                data=DATA,
+                hora_inicio="09:30",
+                duracao_min=60,
+                profissional="Bruna",
+            )
+            livres = await event_service_async.verificar_conflito(
+                user_id="dono_1",
+                data=DATA,
+                hora_inicio="10:00",
+                duracao_min=60,
+                profissional="Bruna",
+            )
+
+        mock_sub_evt.assert_not_awaited()
+        mock_sub_idx.assert_not_awaited()
+        assert len(conflitos) == 1
+        assert livres == []
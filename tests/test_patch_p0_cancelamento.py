@@ -42,7 +42,7 @@ class TestPatchP0Cancelamento:
         }
 
         # Mock: buscar eventos
-        with patch("services.event_service_async.buscar_subcolecao") as mock_buscar:
+        with patch("services.event_service_async.buscar_eventos_filtrados") as mock_buscar:
             mock_buscar.return_value = {
                 "ev_001": evento_mock
             }
@@ -93,7 +93,7 @@ class TestPatchP0Cancelamento:
             },
         }
 
-        with patch("services.event_service_async.buscar_subcolecao") as mock_buscar:
+        with patch("services.event_service_async.buscar_eventos_filtrados") as mock_buscar:
             mock_buscar.return_value = eventos_mock
 
             from services.event_service_async import cancelar_evento_por_texto
@@ -128,7 +128,7 @@ class TestPatchP0Cancelamento:
         user_id = "user_123"
         dono_id = "dono_456"
 
-        with patch("services.event_service_async.buscar_subcolecao") as mock_buscar:
+        with patch("services.event_service_async.buscar_eventos_filtrados") as mock_buscar:
             mock_buscar.return_value = {}  # Sem eventos
 
             from services.event_service_async import cancelar_evento_por_texto
@@ -0,0 +1,80 @@
+"""
+Pipeline de voz assíncrono (utils/audio_utils).
+
+Objetivo: validar que vários áudios simultâneos não passam do limite de
+concorrência, que o reconhecimento roda fora do loop e que as métricas de
+fila refletem o que ficou esperando.
+"""
+
+import asyncio
+import threading
+import pytest
+from unittest.mock import AsyncMock, patch
+
+
+@pytest.fixture
+def audio_utils():
+    from utils import audio_utils
+
+    audio_utils._semaforo_voz = None
+    for chave in audio_utils._metricas_voz:
+        audio_utils._metricas_voz[chave] = 0
+    yield audio_utils
+    audio_utils._semaforo_voz = None
+
+
+@pytest.mark.asyncio
+class TestPipelineVoz:
+
+    async def test_limite_de_concorrencia_e_metricas(self, audio_utils):
+        ativos = 0
+        pico = 0
+
+        async def converter(dados):
+            nonlocal ativos, pico
+            ativos += 1
+            pico = max(pico, ativos)
+            await asyncio.sleep(0.02)
+            ativos -= 1
+            return b"\x00\x00" * 160
+
+        thread_loop = threading.get_ident()
+        threads_reconhecimento = set()
+
+        def reconhecer(pcm):
+            threads_reconhecimento.add(threading.get_ident())
+            return "quero marcar corte"
+
+        with patch.object(audio_utils, "VOZ_MAX_CONCORRENTES", 2), \
+             patch.object(audio_utils, "converter_audio_para_pcm", side_effect=converter), \
+             patch.object(audio_utils, "_reconhecer_pcm", side_effect=reconhecer):
+            resultados = await asyncio.gather(*[audio_utils.transcrever_audio_async(b"ogg") for _ in range(5)])
+
+        assert resultados == [(True, "quero marcar corte")] * 5
+        assert pico == 2
+        assert thread_loop not in threads_reconhecimento
+
+        m = audio_utils.metricas_voz()
+        assert (m["processados"], m["em_fila"], m["em_processamento"]) == (5, 0, 0)
+        assert m["max_fila"] == 3  # 2 entram direto, 3 esperam
+
+    async def test_falha_de_conversao_nao_chama_reconhecimento(self, audio_utils):
+        with patch.object(audio_utils, "converter_audio_para_pcm", AsyncMock(return_value=None)), \
+             patch.object(audio_utils, "_reconhecer_pcm") as mock_rec:
+            assert await audio_utils.transcrever_audio_async(b"corrompido") == (False, None)
+
+        mock_rec.assert_not_called()
+        assert audio_utils.metricas_voz()["falhas"] == 1
+
+    async def test_conversao_usa_pipe_sem_arquivo(self, audio_utils):
+        processo = AsyncMock()
+        processo.communicate.return_value = (b"pcm", b"")
+        processo.returncode = 0
+
+        with patch.object(audio_utils.asyncio, "create_subprocess_exec", AsyncMock(return_value=processo)) as mock_exec:
+            assert await audio_utils.converter_audio_para_pcm(bytearray(b"ogg")) == b"pcm"
+
+        comando = mock_exec.call_args.args
+        assert comando[0] == "ffmpeg"
+        assert "pipe:0" in comando and "pipe:1" in comando
+        processo.communicate.assert_awaited_once_with(input=b"ogg")
@@ -0,0 +1,134 @@
+"""
+Projeção de contexto dos prompts (utils/projecao_contexto).
+
+Objetivo: validar que cada ponto de chamada leva só os campos da sua
+whitelist (aninhados inclusive), que histórico guarda as mensagens mais
+recentes, que o orçamento de tokens corta listas e depois campos pouco
+prioritários sem tocar nos obrigatórios, que nenhum campo das decisões
+P1/humana montadas pelo router fica fora do perfil, que o prompt da
+interpretação não carrega mais rastreio/auditoria da sessão e que
+PROMPT_PROJECAO=0 volta ao json inteiro.
+"""
+
+import ast
+import json
+import os
+from pathlib import Path
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-teste")  # gpt_client instancia o cliente no import
+
+import pytest
+from unittest.mock import patch
+
+from utils import projecao_contexto as pc
+
+SESSAO = {
+    "estado_fluxo": "aguardando_escolha_horario",
+    "servico": "escova",
+    "profissional_escolhido": "Bruna",
+    "data_hora": "2026-06-05T10:00:00",
+    "horarios_sugeridos": ["10:40", "11:20", "", None],
+    "historico_texto": [f"mensagem {i}" for i in range(20)],
+    "draft_agendamento": {"servico": "escova", "profissional": "Bruna", "modo_prechecagem": True, "auditoria": {"x": 1}},
+    "usuario": {"user_id": "u1", "id_negocio": "dono1"},
+    "profissionais": [{"nome": "Carla", "servicos": ["corte"]}],
+    "auditoria": {"criado_em": "2026-06-01"},
+    "dados_anteriores": {"servico": "corte"},
+}
+
+
+ROUTER = Path(__file__).resolve().parent.parent / "router" / "principal_router.py"
+CAMPOS_RASTREIO = {"origem"}   # só rastreio do router; não vai ao modelo
+
+
+def _payloads_do_router(funcao: str) -> list[dict]:
+    """Dicts literais passados a `funcao` no router (valores não literais viram texto curto)."""
+    payloads = []
+    for no in ast.walk(ast.parse(ROUTER.read_text(encoding="utf-8"))):
+        if isinstance(no, ast.Call) and getattr(no.func, "id", None) == funcao and no.args and isinstance(no.args[0], ast.Dict):
+            payloads.append({
+                k.value: v.value if isinstance(v, ast.Constant) and v.value not in (None, "") else "valor"
+                for k, v in zip(no.args[0].keys, no.args[0].values) if isinstance(k, ast.Constant)
+            })
+    return payloads
+
+
+@pytest.fixture(autouse=True)
+def sem_tiktoken():
+    # contagem determinística (chars/4) independente do ambiente
+    with patch.object(pc, "_codificador", return_value=None):
+        yield
+
+
+class TestProjecaoContexto:
+
+    def test_whitelist_aninhada_e_historico_recente(self):
+        projetado = pc.projetar_contexto(SESSAO, "interpretacao_operacional", orcamento_tokens=10_000)
+
+        assert set(projetado) == {
+            "estado_fluxo", "servico", "profissional_escolhido", "data_hora",
+            "horarios_sugeridos", "draft_agendamento", "historico_texto",
+        }
+        assert projetado["draft_agendamento"] == {"servico": "escova", "profissional": "Bruna"}
+        assert projetado["horarios_sugeridos"] == ["10:40", "11:20"]
+        assert projetado["historico_texto"] == [f"mensagem {i}" for i in range(14, 20)]
+
+    def test_orcamento_corta_listas_depois_campos_e_preserva_obrigatorios(self):
+        sessao = {**SESSAO, "ultima_opcao_profissionais": [f"Profissional {i}" for i in range(6)]}
+        projetado = pc.projetar_contexto(sessao, "interpretacao_operacional", orcamento_tokens=60)
+
+        assert pc.contar_tokens(json.dumps(projetado, ensure_ascii=False)) <= 60
+        for campo in ("estado_fluxo", "servico", "profissional_escolhido", "data_hora"):
+            assert projetado[campo] == SESSAO[campo]
+        assert "historico_texto" not in projetado          # menor prioridade sai primeiro
+
+        minimo = pc.projetar_contexto(sessao, "interpretacao_operacional", orcamento_tokens=1)
+        assert set(minimo) == {"estado_fluxo", "servico", "profissional_escolhido", "data_hora"}
+
+    def test_textos_longos_e_decisao_p1(self):
+        decisao = {"tipo": "pedir_profissional", "servico": "x" * 500, "origem": "slot", "profissionais_permitidos": []}
+        projetado = pc.projetar_contexto(decisao, "resposta_p1")
+
+        assert projetado == {"tipo": "pedir_profissional", "servico": "x" * 199 + "…"}
+
+    @pytest.mark.parametrize("funcao, perfil", [
+        ("gerar_resposta_p1", "resposta_p1"),
+        ("gerar_resposta_humana_agendamento", "resposta_humana_agendamento"),
+    ])
+    def test_payloads_do_router_nao_perdem_campos(self, funcao, perfil):
+        payloads = _payloads_do_router(funcao)
+        assert payloads
+
+        for payload in payloads:
+            projetado = pc.projetar_contexto(payload, perfil)
+            perdidos = set(payload) - CAMPOS_RASTREIO - set(projetado)
+            assert not perdidos, f"{payload.get('tipo')}: {perdidos}"
+
+        aptos = {"tipo": "listar_profissionais_aptos", "servico": "corte", "profissionais_aptos": ["Bruna", "Gloria"]}
+        assert pc.projetar_contexto(aptos, "resposta_p1") == aptos
+
+    def test_prompt_da_interpretacao_e_chave_de_desligar(self):
+        from services import gpt_service
+
+        def _texto(mensagens):
+            return "\n".join(m["content"] for m in mensagens)
+
+        prompt = _texto(gpt_service._prompt_interpretacao_operacional("pode ser com a Carla", SESSAO))
+        assert "auditoria" not in prompt and "id_negocio" not in prompt and "mensagem 0" not in prompt
+        assert '"estado_fluxo": "aguardando_escolha_horario"' in prompt
+
+        with patch.object(pc, "PROJECAO_ATIVA", False):
+            completo = _texto(gpt_service._prompt_interpretacao_operacional("pode ser com a Carla", SESSAO))
+        assert json.dumps(SESSAO, ensure_ascii=False) in completo
+        assert pc.contar_tokens(prompt) < pc.contar_tokens(completo)
+
+    def test_amostra_e_contagem_de_mensagens(self):
+        eventos = [{"descricao": f"Evento {i}", "hora_inicio": "10:00", "link": "https://x" * 20} for i in range(30)]
+        amostra = pc.amostra_em_orcamento(eventos, ["hora_inicio", "descricao"], orcamento_tokens=20)
+
+        assert amostra[0] == "10:00 | Evento 0"
+        assert 1 < len(amostra) < 12 and all("https" not in a for a in amostra)
+
+        messages = [{"role": "system", "content": "a" * 40}, {"role": "user", "content": "oi"}]
+        assert pc.contar_tokens_mensagens(messages) == 3 + (3 + 10) + (3 + 1)
+        assert pc.nome_tokenizador() == "estimativa:chars/4"
@@ -0,0 +1,116 @@
+"""
+Layout dos prompts com prefixo estável (cache de prompt do provedor).
+
+Objetivo: validar que a mensagem de sistema de cada ponto de chamada é a
+mesma byte a byte entre contextos diferentes (nada da chamada vai nela),
+que a parte variável vem por último, que o estilo entra logo depois do
+prefixo e que tokens servidos do cache são cobrados pelo preço de cache e
+entram nas métricas do gateway.
+"""
+
+import os
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-teste")  # gpt_client instancia o cliente no import
+
+import pytest
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, patch
+
+from services import gpt_service
+from services import llm_gateway as gw
+from utils import custos_gpt
+
+CTX_A = {"estado_fluxo": "aguardando_horario", "servico": "escova", "profissional_escolhido": "Bruna"}
+CTX_B = {"estado_fluxo": "aguardando_profissional", "servico": "corte", "data_hora": "2026-06-05T10:00:00"}
+
+
+def _usage(entrada=1000, saida=500, cache=None):
+    detalhes = SimpleNamespace(cached_tokens=cache) if cache is not None else None
+    return SimpleNamespace(
+        prompt_tokens=entrada, completion_tokens=saida, total_tokens=entrada + saida, prompt_tokens_details=detalhes
+    )
+
+
+def _resposta_gpt(texto="Fechado!", cache=None):
+    return SimpleNamespace(
+        choices=[SimpleNamespace(message=SimpleNamespace(content=f'{{"resposta": "{texto}"}}'))],
+        usage=_usage(cache=cache),
+    )
+
+
+class TestPrefixoEstavel:
+
+    def test_interpretacao_operacional(self):
+        a = gpt_service._prompt_interpretacao_operacional("pode ser com a Carla", CTX_A)
+        b = gpt_service._prompt_interpretacao_operacional("quero amanhã", CTX_B)
+
+        assert a[0] == b[0] and a[0]["role"] == "system"
+        assert "Carla" not in a[0]["content"] and "escova" not in a[0]["content"]
+        assert "pode ser com a Carla" in a[-1]["content"] and "escova" in a[-1]["content"]
+
+    def test_redacao_p1_e_humana(self):
+        p1_a = gpt_service._prompt_resposta_p1({"tipo": "confirmar_agendamento", "servico": "escova"})
+        p1_b = gpt_service._prompt_resposta_p1({"tipo": "pedir_horario", "servico": "corte"})
+        assert p1_a[0] == p1_b[0] and "escova" in p1_a[-1]["content"]
+
+        hum_a = gpt_service._prompt_resposta_humana_agendamento({"tipo": "conflito_agenda", "servico": "escova"})
+        hum_b = gpt_service._prompt_resposta_humana_agendamento({"tipo": "conflito_agenda", "servico": "corte"})
+        assert hum_a[0] == hum_b[0] and "escova" not in hum_a[0]["content"]
+        assert gpt_service._prompt_resposta_humana_agendamento({"tipo": "inexistente"}) == []
+
+    def test_gpt_com_acao(self):
+        from prompts.manual_secretaria import INSTRUCAO_SECRETARIA
+        from utils.gpt_utils import montar_prompt_com_contexto, prefixo_sistema
+
+        a = montar_prompt_com_contexto(
+            INSTRUCAO_SECRETARIA, {"usuario": {"nome": "Ana"}, "profissionais": [{"nome": "Zuleica"}]}, CTX_A, "oi"
+        )
+        b = montar_prompt_com_contexto(INSTRUCAO_SECRETARIA, {"eventos": [{"descricao": "Reunião de orçamento"}]}, CTX_B, "tchau")
+
+        assert a[0] == b[0] == {"role": "system", "content": prefixo_sistema(INSTRUCAO_SECRETARIA)}
+        assert "Zuleica" not in a[0]["content"] and "Reunião de orçamento" not in b[0]["content"]
+        assert a[-1]["content"] == "oi"
+
+
+@pytest.mark.asyncio
+class TestEstiloECache:
+
+    async def test_estilo_logo_depois_do_prefixo(self):
+        mensagens = gpt_service._prompt_resposta_p1({"tipo": "pedir_horario"})
+        with patch.object(gpt_service, "chamar_llm", AsyncMock(return_value=_resposta_gpt())) as mock_llm:
+            resposta, tokens = await gpt_service._redigir_resposta(mensagens, 0.4, "formal", "teste")
+
+        enviadas = mock_llm.await_args.args[0]
+        assert (resposta, tokens) == ("Fechado!", 1500)
+        assert enviadas[0] == mensagens[0]
+        assert enviadas[1]["role"] == "system" and "formal" in enviadas[1]["content"]
+        assert enviadas[2:] == mensagens[1:]
+        assert len(mensagens) == 2   # a lista original não é alterada
+
+    async def test_custo_com_tokens_em_cache(self):
+        resposta = SimpleNamespace(usage=_usage(cache=800))
+        log = await custos_gpt.registrar_custo_gpt(resposta, "gpt-4o", "u1", persistir=False)
+
+        # 200 * 0.005 + 800 * 0.0025 + 500 * 0.015 (por mil)
+        assert log["custo_usd"] == pytest.approx(0.0105)
+        assert log["economia_cache_usd"] == pytest.approx(0.002)
+        assert log["tokens_cache"] == 800
+
+        sem_detalhes = await custos_gpt.registrar_custo_gpt(
+            SimpleNamespace(usage=SimpleNamespace(prompt_tokens=1000, completion_tokens=500)), "gpt-4o", "u1", persistir=False
+        )
+        assert (sem_detalhes["tokens_cache"], sem_detalhes["custo_usd"]) == (0, pytest.approx(0.0125))
+        assert custos_gpt.tokens_em_cache(SimpleNamespace(prompt_tokens_details={"cached_tokens": 64})) == 64
+
+    async def test_gateway_separa_latencia_com_e_sem_cache(self):
+        create = AsyncMock(side_effect=[_resposta_gpt(cache=0), _resposta_gpt(cache=768)])
+        client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+        gateway = gw.GatewayLLM(client=client, prazo_segundos=5)
+
+        for _ in range(2):
+            await gateway.chamar([{"role": "user", "content": "oi"}], origem="teste")
+
+        m = gateway.metricas()
+        assert (m["tokens_entrada"], m["tokens_cache"]) == (2000, 768)
+        assert m["taxa_cache_prompt"] == pytest.approx(0.384)
+        assert m["latencia_ms_com_cache"]["total"] == 1 and m["latencia_ms_sem_cache"]["total"] == 1
@@ -0,0 +1,110 @@
+"""
+Resumo diário consolidado (scheduler/daily_summary).
+
+Objetivo: validar que o job das 08:00 lista só os tenants dono por query,
+lê por tenant apenas o dia (eventos/tarefas/follow-ups filtrados), nunca a
+coleção global Tarefas, respeita o limite de concorrência e registra
+duração e leituras da execução.
+"""
+
+import asyncio
+
+import pytest
+from unittest.mock import AsyncMock, patch
+
+from scheduler import daily_summary as ds
+
+HOJE = "2026-10-20"
+
+TENANTS = {
+    "111": {"nome": "Ana", "tipo_usuario": "dono"},
+    "222": {"nome": "Beto", "tipo_usuario": "dono"},
+    "333": {"tipo_usuario": "dono"},
+}
+
+
+def _firestore_falso(consultas: list, ativos: dict):
+    from utils.leituras_update import registrar_leitura_firestore
+
+    async def executar_query(path, filtros, campos, ordenar_por, limite):
+        consultas.append((path, filtros, campos))
+        ativos["agora"] += 1
+        ativos["pico"] = max(ativos["pico"], ativos["agora"])
+        await asyncio.sleep(0.01)
+        ativos["agora"] -= 1
+
+        if path == "Clientes":
+            resultado = TENANTS
+        elif path == "Clientes/111/Eventos":
+            resultado = {
+                "e2": {"hora_inicio": "15:00", "descricao": "Coloração"},
+                "e1": {"hora_inicio": "09:00", "descricao": "Corte"},
+                "e3": {"hora_inicio": "10:00", "descricao": "Escova", "status": "cancelado"},
+            }
+        elif path == "Clientes/111/Tarefas":
+            resultado = {"t1": {"descricao": "Comprar shampoo"}}
+        elif path == "Clientes/111/FollowUps":
+            resultado = {"f1": {"nome_cliente": "Lia"}, "f2": {"nome_cliente": "Rui", "data": "2026-10-30"}}
+        elif path == "Clientes/333/Eventos":
+            raise RuntimeError("timeout")
+        else:
+            resultado = {}
+        registrar_leitura_firestore(path, len(resultado))
+        return dict(resultado)
+
+    return executar_query
+
+
+@pytest.mark.asyncio
+class TestResumoDiario:
+
+    async def test_queries_filtradas_por_tenant_e_metricas(self):
+        from services import fila_envio_service, firebase_service_async as fsa
+
+        consultas, ativos = [], {"agora": 0, "pico": 0}
+        bot = AsyncMock()
+        with patch.object(fsa, "_executar_query", side_effect=_firestore_falso(consultas, ativos)), \
+             patch.object(fsa, "buscar_dados", AsyncMock()) as mock_global, \
+             patch.object(fsa, "_tenants_eventos_indexados", {"111", "222", "333"}), \
+             patch.object(fila_envio_service, "atualizar_em_lote", AsyncMock(return_value=0)), \
+             patch.object(ds, "datetime") as mock_dt, \
+             patch.object(ds, "CONCORRENCIA_RESUMO", 2):
+            mock_dt.now.return_value.date.return_value.isoformat.return_value = HOJE
+            metricas = await ds.executar_resumo_diario(bot)
+
+        mock_global.assert_not_awaited()
+        filtros_por_path = {path: (filtros, campos) for path, filtros, campos in consultas}
+        assert filtros_por_path["Clientes"] == ([("tipo_usuario", "==", "dono")], ["nome", "tipo_usuario"])
+        assert filtros_por_path["Clientes/111/Eventos"][0] == [("data", "==", HOJE)]
+        assert filtros_por_path["Clientes/222/FollowUps"][0] == [("status", "==", "pendente")]
+        assert filtros_por_path["Clientes/222/Tarefas"][1] == ["descricao"]
+        assert len(consultas) == 1 + 3 * 3
+
+        # 3 queries por tenant em paralelo, no máximo 2 tenants por vez
+        assert ativos["pico"] <= 2 * 3
+
+        textos = {c.kwargs["chat_id"]: c.kwargs["text"] for c in bot.send_message.await_args_list}
+        assert set(textos) == {111, 222, 333}
+        ana = textos[111]
+        assert "Ana" in ana and ana.index("09:00 — Corte") < ana.index("15:00 — Coloração")
+        assert "Escova" not in ana
+        assert "Comprar shampoo" in ana
+        assert "Lia às 08:00" in ana and "Rui" not in ana
+        assert "Nenhum evento agendado" in textos[222]
+        assert "Empreendedor" in textos[333]                  # query de eventos falhou: resumo sai sem eventos
+
+        assert (metricas["tenants"], metricas["enfileirados"], metricas["erros"], metricas["enviados"]) == (3, 3, 0, 3)
+        assert metricas["leituras_firestore"] == len(consultas) - 1   # a query que falhou não conta
+        assert metricas["docs_lidos"] == 3 + 3 + 1 + 2
+        assert metricas["duracao_ms"] >= 0
+        assert ds.ultimo_resumo_diario == metricas
+
+    async def test_job_do_scheduler_usa_o_pipeline(self):
+        from scheduler import notificacoes_scheduler as ns
+
+        bot = AsyncMock()
+        with patch.object(ns, "_get_bot", AsyncMock(return_value=bot)), \
+             patch.object(ns, "executar_resumo_diario", AsyncMock(return_value={})) as mock_resumo:
+            await ns.enviar_resumo_diario()
+
+        mock_resumo.assert_awaited_once_with(bot)
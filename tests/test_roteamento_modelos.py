@@ -0,0 +1,129 @@
+"""
+Roteamento de modelos por ponto de chamada (services/roteamento_modelos)
+e avaliação offline das configurações (tools/avaliar_roteamento_modelos).
+
+Objetivo: validar que classificação e redação P1 vão para o modelo leve e
+processar_com_gpt_com_acao fica no grande, que o override do tenant (lido
+uma vez e invalidado na escrita do documento) vale só dentro do escopo da
+mensagem e ignora modelos desconhecidos, e que a avaliação compara cada
+configuração com a referência (acurácia, delta e custo).
+"""
+
+import json
+import os
+import sys
+from pathlib import Path
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-teste")  # gpt_client instancia o cliente no import
+
+import pytest
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, patch
+
+from services import cache_respostas_p1 as crp
+from services import gpt_service
+from services import roteamento_modelos as rm
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "tools"))
+
+
+@pytest.fixture(autouse=True)
+def caches_limpos():
+    rm.cache_rotas_tenant.limpar()
+    crp.cache_respostas_p1.limpar()
+    yield
+    rm.cache_rotas_tenant.limpar()
+
+
+@pytest.fixture
+def fsa():
+    from services import firebase_service_async
+    return firebase_service_async
+
+
+def _resposta(conteudo: dict, entrada=400, saida=40):
+    return SimpleNamespace(
+        choices=[SimpleNamespace(message=SimpleNamespace(content=json.dumps(conteudo)))],
+        usage=SimpleNamespace(prompt_tokens=entrada, completion_tokens=saida, total_tokens=entrada + saida),
+    )
+
+
+@pytest.mark.asyncio
+class TestRoteamentoModelos:
+
+    async def test_padrao_por_rota(self):
+        assert await rm.modelo_para("interpretacao_operacional") == rm.MODELO_LEVE
+        assert await rm.modelo_para("resposta_p1") == rm.MODELO_LEVE
+        assert await rm.modelo_para("gpt_com_acao") == rm.MODELO_GRANDE
+        assert await rm.modelo_para("rota_inexistente") == rm.MODELO_GRANDE
+
+    async def test_override_do_tenant_no_escopo(self, fsa):
+        doc = {"modelos_llm": {"resposta_p1": "gpt-4o", "interpretacao_operacional": "modelo-inventado"}}
+        with patch.object(fsa, "buscar_dado_em_path", AsyncMock(return_value=doc)) as mock_ler:
+            with rm.escopo_tenant_llm("dono1"):
+                assert await rm.modelo_para("resposta_p1") == "gpt-4o"
+                assert await rm.modelo_para("interpretacao_operacional") == rm.MODELO_LEVE
+            assert rm.tenant_llm_atual() is None
+            assert await rm.modelo_para("resposta_p1") == rm.MODELO_LEVE
+            assert mock_ler.await_count == 1
+
+            # escrita no documento de configuração descarta o override em cache
+            doc["modelos_llm"] = {"resposta_p1": "gpt-4.1-nano"}
+            fsa.notificar_escrita("Clientes/dono1/configuracao/dados")
+            assert await rm.modelo_para("resposta_p1", "dono1") == "gpt-4.1-nano"
+            assert mock_ler.await_args.args[0] == "Clientes/dono1/configuracao/dados"
+
+    async def test_salvar_rotas_valida(self, fsa):
+        with patch.object(fsa, "atualizar_dado_em_path", AsyncMock(return_value=True)) as mock_salvar:
+            gravadas = await rm.salvar_rotas_tenant("dono1", {"resposta_p1": "gpt-4o", "gpt_com_acao": "xpto", "outra": "gpt-4o"})
+
+        assert gravadas == {"resposta_p1": "gpt-4o"}
+        mock_salvar.assert_awaited_once_with("Clientes/dono1/configuracao/dados", {"modelos_llm": gravadas})
+
+    async def test_gpt_service_usa_modelo_da_rota_e_tenant(self, fsa):
+        chamar = AsyncMock(side_effect=[
+            _resposta({"intencao": "confirmacao", "tipo_ajuste": None}),
+            _resposta({"resposta": "Qual horário fica melhor?"}),
+        ])
+        doc = {"modelos_llm": {"resposta_p1": "gpt-4.1-mini"}}
+        with patch.object(gpt_service, "chamar_llm", chamar), \
+             patch.object(fsa, "buscar_dado_em_path", AsyncMock(return_value=doc)):
+            with rm.escopo_tenant_llm("dono1"):
+                await gpt_service.interpretar_linguagem_operacional_gpt("sim", {"estado_fluxo": "agendando"})
+                await gpt_service.gerar_resposta_p1({"tipo": "pedir_horario"})
+
+        (interpretacao, p1) = chamar.await_args_list
+        assert (interpretacao.kwargs["model"], interpretacao.kwargs["tenant_id"]) == (rm.MODELO_LEVE, "dono1")
+        assert (p1.kwargs["model"], p1.kwargs["tenant_id"]) == ("gpt-4.1-mini", "dono1")
+
+
+@pytest.mark.asyncio
+class TestAvaliacaoRoteamento:
+
+    async def test_delta_de_acuracia_e_custo_por_configuracao(self):
+        import avaliar_roteamento_modelos as av
+
+        casos = av.carregar_casos()
+        assert casos and all(c["mensagem"] and "estado_fluxo" in c["ctx"] for c in casos)
+
+        async def chamar(messages, model, **parametros):
+            if parametros["origem"] == "interpretar_linguagem_operacional_gpt":
+                # o modelo leve erra a troca de profissional
+                errou = model == rm.MODELO_LEVE and "Carla" in messages[-1]["content"].split("Contexto atual")[0]
+                return _resposta({"intencao": "consulta" if errou else "ajuste_incremental", "tipo_ajuste": None})
+            return _resposta({"resposta": "Perfeito, a Bruna te atende amanhã."})
+
+        amostra = [
+            {"cenario": "t", "mensagem": "às 9", "ctx": casos[0]["ctx"]},
+            {"cenario": "t", "mensagem": "troca para Carla", "ctx": casos[0]["ctx"]},
+        ]
+        configs = av.configuracoes([])
+        with patch.object(gpt_service, "chamar_llm", chamar):
+            resultados = await av.avaliar(amostra, configs, concorrencia=2)
+        linhas = {(l["config"], l["rota"]): l for l in av.resumir(resultados)}
+
+        ref, leve = linhas[("referencia", "interpretacao_operacional")], linhas[("padrao", "interpretacao_operacional")]
+        assert (ref["acuracia"], ref["delta"], ref["modelos"]) == (1.0, 0.0, ["gpt-4o"])
+        assert (leve["acuracia"], leve["delta"], leve["modelos"]) == (0.5, -0.5, [rm.MODELO_LEVE])
+        assert leve["custo_usd"] < ref["custo_usd"]
+        assert linhas[("padrao", "resposta_p1")]["casos"] == 1
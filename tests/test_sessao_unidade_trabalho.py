@@ -0,0 +1,89 @@
+"""
+Unidade de trabalho da sessão V2 (write-behind por mensagem).
+
+Objetivo: validar que, dentro de unidade_de_sessao(), a sessão
+Clientes/{tenant}/Sessoes/{actor} é lida uma vez e gravada uma vez, com
+payload merge equivalente aos salvamentos/limpezas feitos em sequência.
+"""
+
+import pytest
+from unittest.mock import AsyncMock, patch
+
+from google.cloud import firestore
+
+
+PATH = "Clientes/dono_1/Sessoes/cli_1"
+
+
+@pytest.mark.asyncio
+class TestUnidadeSessao:
+
+    async def test_uma_leitura_e_uma_escrita_por_mensagem(self):
+        from utils import contexto_temporario as ct
+
+        persistido = {"estado_fluxo": "idle", "draft_agendamento": {"servico": "corte"}}
+
+        with patch.object(ct, "buscar_dado_em_path", AsyncMock(return_value=persistido)) as mock_get, \
+             patch.object(ct, "atualizar_dado_em_path", AsyncMock(return_value=True)) as mock_set:
+            async with ct.unidade_de_sessao() as unidade:
+                ctx = await ct.carregar_contexto_temporario_v2("dono_1", "cli_1")
+                ctx["estado_fluxo"] = "aguardando_data"
+                await ct.salvar_contexto_temporario_v2("dono_1", "cli_1", ctx)
+                await ct.salvar_contexto_temporario_v2("dono_1", "cli_1", {"draft_agendamento": {"hora": "10:00"}})
+
+                ctx = await ct.carregar_contexto_temporario_v2("dono_1", "cli_1")
+                assert ctx["draft_agendamento"] == {"servico": "corte", "hora": "10:00"}
+                mock_set.assert_not_awaited()
+
+        mock_get.assert_awaited_once_with(PATH)
+        mock_set.assert_awaited_once()
+        path, payload = mock_set.call_args.args
+        assert path == PATH
+        assert payload["estado_fluxo"] == "aguardando_data"
+        assert payload["draft_agendamento"] == {"servico": "corte", "hora": "10:00"}
+        assert payload["_tenant_id_guard"] == "dono_1"
+        assert (unidade.leituras, unidade.escritas) == (1, 1)
+
+    async def test_delete_field_e_mapa_regravado_substitui_persistido(self):
+        from utils import contexto_temporario as ct
+
+        persistido = {"estado_fluxo": "x", "draft_agendamento": {"servico": "corte", "hora": "09:00"}}
+
+        with patch.object(ct, "buscar_dado_em_path", AsyncMock(return_value=persistido)), \
+             patch.object(ct, "atualizar_dado_em_path", AsyncMock(return_value=True)) as mock_set:
+            async with ct.unidade_de_sessao():
+                await ct.limpar_contexto_agendamento_v2("dono_1", "cli_1")
+                await ct.salvar_contexto_temporario_v2("dono_1", "cli_1", {"draft_agendamento": {"servico": "barba"}})
+
+                ctx = await ct.carregar_contexto_temporario_v2("dono_1", "cli_1")
+                assert ctx["draft_agendamento"] == {"servico": "barba"}
+                assert "cancelamento_pendente" not in ctx
+
+        mock_set.assert_awaited_once()
+        payload = mock_set.call_args.args[1]
+        assert payload["estado_fluxo"] == "idle"
+        assert payload["cancelamento_pendente"] is firestore.DELETE_FIELD
+        assert payload["draft_agendamento"] == {"servico": "barba", "hora": firestore.DELETE_FIELD}
+
+    async def test_grava_mesmo_com_excecao(self):
+        from utils import contexto_temporario as ct
+
+        with patch.object(ct, "buscar_dado_em_path", AsyncMock(return_value={})), \
+             patch.object(ct, "atualizar_dado_em_path", AsyncMock(return_value=True)) as mock_set:
+            with pytest.raises(RuntimeError):
+                async with ct.unidade_de_sessao():
+                    await ct.salvar_contexto_temporario_v2("dono_1", "cli_1", {"estado_fluxo": "idle"})
+                    raise RuntimeError("falha no meio da mensagem")
+
+        mock_set.assert_awaited_once()
+        assert ct.unidade_sessao_atual() is None
+
+    async def test_fora_da_unidade_salva_sem_ler(self):
+        from utils import contexto_temporario as ct
+
+        with patch.object(ct, "buscar_dado_em_path", AsyncMock()) as mock_get, \
+             patch.object(ct, "atualizar_dado_em_path", AsyncMock(return_value=True)) as mock_set:
+            await ct.salvar_contexto_temporario_v2("dono_1", "cli_1", {"estado_fluxo": "idle"})
+
+        mock_get.assert_not_awaited()
+        assert mock_set.call_args.args[1]["estado_fluxo"] == "idle"
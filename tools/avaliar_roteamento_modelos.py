@@ -0,0 +1,281 @@
+"""
+Avaliação offline do roteamento de modelos - NeoEve
+Objetivo: Comparar configurações de roteamento (services/roteamento_modelos)
+nas chamadas de classificação e redação, repetindo as mensagens e os
+contextos dos runners de stress (tests/runner_stress_*) contra o LLM.
+
+Uso:
+    python tools/avaliar_roteamento_modelos.py
+    python tools/avaliar_roteamento_modelos.py --config nano=gpt-4.1-nano --max-casos 40
+    python tools/avaliar_roteamento_modelos.py --config misto=interpretacao_operacional:gpt-4o-mini,resposta_p1:gpt-4o
+    python tools/avaliar_roteamento_modelos.py --json resultado.json
+
+Configurações: "referencia" (tudo em gpt-4o, como era), "padrao" (ROTAS_MODELO
+atual) e as de --config (nome=modelo troca todas as rotas leves; nome=rota:modelo,...
+troca só as rotas listadas).
+
+Por rota:
+- interpretacao_operacional: acurácia = concordância de (intencao, tipo_ajuste)
+  com a referência, mensagem a mensagem, mais a taxa de JSON válido;
+- resposta_p1 / resposta_humana_agendamento: acurácia = respostas válidas
+  (não vazias, até 3 frases, citando o profissional/serviço da decisão);
+- delta = acurácia da configuração menos a da referência;
+- latência p50/p95 por chamada e custo pelos preços de utils/custos_gpt.
+
+processar_com_gpt_com_acao não entra: executa ações e fica no modelo grande
+em todas as configurações. As chamadas vão para o provedor de verdade
+(OPENAI_API_KEY; LLM_BASE_URL para outro servidor compatível), passando pelo
+gateway; nada é gravado no Firestore.
+"""
+
+import argparse
+import ast
+import asyncio
+import json
+import os
+import re
+import sys
+import time
+from contextvars import ContextVar
+from pathlib import Path
+from unittest.mock import patch
+
+RAIZ = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(RAIZ))
+sys.path.insert(0, str(RAIZ / "tools"))
+
+import benchmark_contexto_prompt as bench  # noqa: E402  (leitura de cenários por AST)
+
+PADRAO_RUNNERS = "tests/runner_stress_*.py"
+ROTAS_AVALIADAS = ("interpretacao_operacional", "resposta_p1", "resposta_humana_agendamento")
+CONTEXTO_VAZIO = {"estado_fluxo": "idle"}
+
+_REGISTRO: ContextVar = ContextVar("registro_chamadas", default=None)
+
+
+# =========================================================
+# Casos
+# =========================================================
+def _mensagens_do_no(no) -> list[str]:
+    """Textos de cliente num nó do AST (casos, listas de mensagens, chamadas ao router)."""
+    textos = []
+    if isinstance(no, ast.Dict):
+        for k, v in zip(no.keys, no.values):
+            chave = k.value if isinstance(k, ast.Constant) else None
+            if chave == "mensagem" and isinstance(v, ast.Constant) and isinstance(v.value, str):
+                textos.append(v.value)
+            elif chave == "mensagens" and isinstance(v, (ast.List, ast.Tuple)):
+                textos += [e.value for e in v.elts if isinstance(e, ast.Constant) and isinstance(e.value, str)]
+    elif isinstance(no, ast.Assign) and any(isinstance(t, ast.Name) and t.id == "mensagens" for t in no.targets):
+        # mensagens = [("texto", "descrição"), ...]
+        if isinstance(no.value, (ast.List, ast.Tuple)):
+            for e in no.value.elts:
+                primeiro = e.elts[0] if isinstance(e, ast.Tuple) and e.elts else e
+                if isinstance(primeiro, ast.Constant) and isinstance(primeiro.value, str):
+                    textos.append(primeiro.value)
+    elif isinstance(no, ast.Call) and getattr(no.func, "attr", getattr(no.func, "id", None)) == "roteador_principal":
+        argumentos = list(no.args[1:2]) + [k.value for k in no.keywords if k.arg == "mensagem"]
+        textos += [a.value for a in argumentos if isinstance(a, ast.Constant) and isinstance(a.value, str)]
+    return textos
+
+
+def carregar_casos(padrao: str = PADRAO_RUNNERS) -> list[dict]:
+    """[{cenario, mensagem, ctx}] — cada mensagem com o primeiro contexto do próprio runner."""
+    casos, vistos = [], set()
+    for arquivo in sorted(RAIZ.glob(padrao)):
+        try:
+            arvore = ast.parse(arquivo.read_text(encoding="utf-8"))
+        except (SyntaxError, UnicodeDecodeError):
+            continue
+
+        contexto = CONTEXTO_VAZIO
+        for no in ast.walk(arvore):
+            if isinstance(no, ast.Dict):
+                chaves = {k.value for k in no.keys if isinstance(k, ast.Constant)}
+                if "estado_fluxo" in chaves and len(chaves) >= 4:
+                    contexto = bench._literal(no)
+                    break
+
+        for no in ast.walk(arvore):
+            for texto in _mensagens_do_no(no):
+                texto = texto.strip()
+                if not texto or (arquivo.stem, texto) in vistos:
+                    continue
+                vistos.add((arquivo.stem, texto))
+                casos.append({"cenario": arquivo.stem, "mensagem": texto, "ctx": contexto})
+    return casos
+
+
+# =========================================================
+# Configurações
+# =========================================================
+def configuracoes(extras: list[str]) -> dict:
+    from services.roteamento_modelos import MODELO_GRANDE, ROTAS_MODELO
+
+    configs = {
+        "referencia": {rota: MODELO_GRANDE for rota in ROTAS_MODELO},
+        "padrao": dict(ROTAS_MODELO),
+    }
+    for extra in extras:
+        nome, _, spec = extra.partition("=")
+        rotas = dict(ROTAS_MODELO)
+        if ":" in spec:
+            for par in spec.split(","):
+                rota, _, modelo = par.partition(":")
+                rotas[rota.strip()] = modelo.strip()
+        else:
+            rotas.update({rota: spec.strip() for rota in ROTAS_AVALIADAS})
+        configs[nome.strip()] = rotas
+    return configs
+
+
+# =========================================================
+# Execução
+# =========================================================
+async def _chamar_registrando(chamar_llm, messages, model, **parametros):
+    inicio = time.monotonic()
+    resposta = await chamar_llm(messages, model=model, **parametros)
+    registro = _REGISTRO.get()
+    if registro is not None:
+        registro.append({"modelo": model, "usage": resposta.usage, "ms": (time.monotonic() - inicio) * 1000})
+    return resposta
+
+
+def _resposta_valida(texto: str, decisao: dict) -> bool:
+    if not texto:
+        return False
+    frases = [f for f in re.split(r"(?<=[.!?])\s+", texto.strip()) if f]
+    if len(frases) > 3:
+        return False
+    citar = [decisao.get(c) for c in ("profissional", "profissional_original") if decisao.get(c)]
+    return all(str(c).lower() in texto.lower() for c in citar[:1])
+
+
+async def _executar_caso(rota: str, caso: dict, semaforo: asyncio.Semaphore) -> dict:
+    from services import gpt_service
+
+    _REGISTRO.set([])
+    async with semaforo:
+        try:
+            if rota == "interpretacao_operacional":
+                saida = await gpt_service.interpretar_linguagem_operacional_gpt(caso["mensagem"], caso["ctx"])
+                resultado = {"saida": (saida.get("intencao"), saida.get("tipo_ajuste")),
+                             "ok": saida.get("motivo") != "erro_gpt_interpretacao"}
+            else:
+                p1, humana = bench._decisoes(caso["ctx"])
+                decisao = p1 if rota == "resposta_p1" else humana
+                montar = gpt_service._prompt_resposta_p1 if rota == "resposta_p1" else gpt_service._prompt_resposta_humana_agendamento
+                texto, _ = await gpt_service._redigir_resposta(montar(decisao), 0.5, None, f"avaliacao_{rota}", rota=rota)
+                resultado = {"saida": texto, "ok": _resposta_valida(texto, decisao)}
+        except Exception as e:
+            resultado = {"saida": None, "ok": False, "erro": str(e)}
+    resultado["chamadas"] = _REGISTRO.get()
+    return resultado
+
+
+async def avaliar(casos: list[dict], configs: dict, concorrencia: int = 4) -> dict:
+    """{config: {rota: [resultado por caso]}} — casos de redação: um por contexto distinto."""
+    from services import gpt_service, roteamento_modelos
+
+    contextos = list({json.dumps(c["ctx"], sort_keys=True, default=str): c for c in casos}.values())
+    por_rota = {"interpretacao_operacional": casos, "resposta_p1": contextos, "resposta_humana_agendamento": contextos}
+
+    original = gpt_service.chamar_llm
+
+    async def chamar(messages, model, **parametros):
+        return await _chamar_registrando(original, messages, model, **parametros)
+
+    resultados = {}
+    semaforo = asyncio.Semaphore(concorrencia)
+    with patch.object(gpt_service, "chamar_llm", chamar):
+        for nome, rotas in configs.items():
+            with patch.dict(roteamento_modelos.ROTAS_MODELO, rotas):
+                resultados[nome] = {
+                    rota: await asyncio.gather(*(_executar_caso(rota, caso, semaforo) for caso in por_rota[rota]))
+                    for rota in ROTAS_AVALIADAS
+                }
+    return resultados
+
+
+# =========================================================
+# Relatório
+# =========================================================
+def _percentil(valores: list, p: float) -> float:
+    if not valores:
+        return 0.0
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(p * len(ordenados)))]
+
+
+def resumir(resultados: dict, referencia: str = "referencia") -> list[dict]:
+    from utils.custos_gpt import calcular_custo
+
+    linhas = []
+    base = resultados.get(referencia, {})
+    for nome, por_rota in resultados.items():
+        for rota, itens in por_rota.items():
+            n = len(itens) or 1
+            if rota == "interpretacao_operacional":
+                ref = base.get(rota, itens)
+                acuracia = sum(a["ok"] and a["saida"] == r["saida"] for a, r in zip(itens, ref)) / n
+                acuracia_ref = sum(r["ok"] for r in ref) / n
+            else:
+                acuracia = sum(a["ok"] for a in itens) / n
+                acuracia_ref = sum(r["ok"] for r in base.get(rota, itens)) / n
+            chamadas = [c for item in itens for c in item["chamadas"]]
+            latencias = [c["ms"] for c in chamadas]
+            linhas.append({
+                "config": nome,
+                "rota": rota,
+                "modelos": sorted({c["modelo"] for c in chamadas}),
+                "casos": len(itens),
+                "acuracia": round(acuracia, 3),
+                "delta": round(acuracia - acuracia_ref, 3),
+                "validas": round(sum(a["ok"] for a in itens) / n, 3),
+                "p50_ms": round(_percentil(latencias, 0.5)),
+                "p95_ms": round(_percentil(latencias, 0.95)),
+                "custo_usd": round(sum(calcular_custo(c["usage"], c["modelo"])[0] for c in chamadas), 6),
+            })
+    return linhas
+
+
+def imprimir(linhas: list[dict]) -> None:
+    print(f"\n{'config':<14}{'rota':<30}{'modelo':<16}{'casos':>6}{'acurácia':>10}{'delta':>8}"
+          f"{'válidas':>9}{'p50 ms':>8}{'p95 ms':>8}{'custo US$':>11}")
+    for l in linhas:
+        print(f"{l['config']:<14}{l['rota']:<30}{','.join(l['modelos']) or '-':<16}{l['casos']:>6}"
+              f"{l['acuracia']:>10.1%}{l['delta']:>+8.1%}{l['validas']:>9.1%}"
+              f"{l['p50_ms']:>8}{l['p95_ms']:>8}{l['custo_usd']:>11.4f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--config", action="append", default=[], help="nome=modelo ou nome=rota:modelo,...")
+    parser.add_argument("--max-casos", type=int, default=0, help="limita as mensagens (0 = todas)")
+    parser.add_argument("--concorrencia", type=int, default=4)
+    parser.add_argument("--json", help="grava as linhas do relatório neste arquivo")
+    args = parser.parse_args()
+
+    if not os.getenv("OPENAI_API_KEY"):
+        print("OPENAI_API_KEY não definida (a avaliação chama o provedor).")
+        return
+
+    casos = carregar_casos()
+    if args.max_casos:
+        casos = casos[: args.max_casos]
+    if not casos:
+        print("Nenhum caso encontrado nos runners de stress.")
+        return
+
+    configs = configuracoes(args.config)
+    print(f"{len(casos)} mensagens de {len({c['cenario'] for c in casos})} runners; configurações: {', '.join(configs)}")
+    linhas = resumir(asyncio.run(avaliar(casos, configs, args.concorrencia)))
+    imprimir(linhas)
+
+    if args.json:
+        Path(args.json).write_text(json.dumps(linhas, ensure_ascii=False, indent=2), encoding="utf-8")
+        print(f"\nRelatório gravado em {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+"""
+Benchmark de tokens dos prompts - NeoEve
+Objetivo: Medir os tokens de entrada dos prompts do GPT antes/depois da
+projeção de contexto (utils/projecao_contexto) sobre os contextos de sessão
+dos cenários já existentes em tests/ (runners de dry run e de stress).
+
+Uso:
+    python tools/benchmark_contexto_prompt.py
+    python tools/benchmark_contexto_prompt.py --detalhe
+
+Os contextos são lidos dos arquivos de cenário por AST (dicts literais com
+"estado_fluxo"); nada é executado nem enviado ao GPT. "Antes" monta os
+prompts com PROMPT_PROJECAO desligado (json do contexto inteiro, como era);
+"depois" com a projeção. A contagem usa tiktoken quando instalado e a
+estimativa chars/4 caso contrário (indicado no cabeçalho).
+"""
+
+import argparse
+import ast
+import os
+import sys
+from pathlib import Path
+from unittest.mock import patch
+
+RAIZ = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(RAIZ))
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")  # gpt_client instancia o cliente no import
+
+PADROES_CENARIOS = ("tests/runner_dry_run_cenario_*.py", "tests/runner_stress_*.py", "tests/runner_audit_*.py")
+
+
+# =========================================================
+# Cenários
+# =========================================================
+def _literal(no):
+    """Avalia um literal do AST; o que não é literal vira "<expressão>"."""
+    if isinstance(no, ast.Constant):
+        return no.value
+    if isinstance(no, ast.Dict):
+        return {
+            _literal(k): _literal(v)
+            for k, v in zip(no.keys, no.values) if k is not None
+        }
+    if isinstance(no, (ast.List, ast.Tuple, ast.Set)):
+        return [_literal(e) for e in no.elts]
+    return f"<{ast.unparse(no)}>"
+
+
+def carregar_contextos() -> list[tuple[str, dict]]:
+    contextos, vistos = [], set()
+    for padrao in PADROES_CENARIOS:
+        for arquivo in sorted(RAIZ.glob(padrao)):
+            try:
+                arvore = ast.parse(arquivo.read_text(encoding="utf-8"))
+            except (SyntaxError, UnicodeDecodeError):
+                continue
+            for no in ast.walk(arvore):
+                if not isinstance(no, ast.Dict):
+                    continue
+                chaves = {k.value for k in no.keys if isinstance(k, ast.Constant)}
+                if "estado_fluxo" not in chaves or len(chaves) < 4:
+                    continue
+                ctx = _literal(no)
+                assinatura = repr(sorted(ctx.items(), key=lambda i: str(i[0])))
+                if assinatura in vistos:
+                    continue
+                vistos.add(assinatura)
+                contextos.append((f"{arquivo.stem}:{no.lineno}", ctx))
+    return contextos
+
+
+# =========================================================
+# Prompts por ponto de chamada
+# =========================================================
+def _decisoes(ctx: dict) -> tuple[dict, dict]:
+    """Decisões P1/humana como o principal_router monta a partir da sessão."""
+    def _dict(valor):
+        return valor if isinstance(valor, dict) else {}
+
+    draft = _dict(ctx.get("draft_agendamento"))
+    servico = ctx.get("servico") or draft.get("servico")
+    data_hora = ctx.get("data_hora") or draft.get("data_hora")
+    p1 = {
+        "tipo": "confirmar_agendamento",
+        "servico": servico,
+        "profissional": ctx.get("profissional_escolhido"),
+        "data_hora": data_hora,
+        "data_hora_legivel": data_hora,
+        "duracao": _dict(ctx.get("dados_confirmacao_agendamento")).get("duracao"),
+        "origem": "slot_horario_aguardando_horario",
+    }
+    humana = {
+        "tipo": "conflito_agenda",
+        "mensagem_cliente": (list(ctx.get("historico_texto") or []) or [""])[-1],
+        "estado_fluxo": ctx.get("estado_fluxo"),
+        "profissional_original": ctx.get("profissional_escolhido"),
+        "servico": ctx.get("servico"),
+        "data_hora_original": ctx.get("data_hora"),
+        "horarios_disponiveis_mesmo_profissional": ctx.get("horarios_sugeridos") or [],
+        "profissionais_alternativos": ctx.get("alternativa_profissional") or [],
+        "ultima_opcao_profissionais": ctx.get("ultima_opcao_profissionais") or [],
+        "regra": "O cliente não escolheu uma opção válida ainda. Conduza para escolher uma das opções disponíveis.",
+    }
+    return p1, humana
+
+
+def medir(ctx: dict) -> dict:
+    from prompts.manual_secretaria import INSTRUCAO_SECRETARIA
+    from services import gpt_service
+    from utils.gpt_utils import montar_prompt_com_contexto
+    from utils.projecao_contexto import contar_tokens, contar_tokens_mensagens, json_contexto
+
+    p1, humana = _decisoes(ctx)
+    contexto_acao = {
+        "usuario": ctx.get("usuario") if isinstance(ctx.get("usuario"), dict) else {},
+        "profissionais": ctx.get("profissionais") if isinstance(ctx.get("profissionais"), list) else [],
+        "eventos": [ctx.get(c) for c in ("dados_confirmacao_agendamento", "draft_agendamento") if isinstance(ctx.get(c), dict)],
+    }
+    return {
+        "interpretacao_operacional": contar_tokens_mensagens(gpt_service._prompt_interpretacao_operacional("pode ser com a Carla", ctx)),
+        "resposta_p1": contar_tokens_mensagens(gpt_service._prompt_resposta_p1(p1)),
+        "resposta_humana_agendamento": contar_tokens_mensagens(gpt_service._prompt_resposta_humana_agendamento(humana)),
+        "gpt_com_acao": contar_tokens_mensagens(
+            montar_prompt_com_contexto(INSTRUCAO_SECRETARIA, contexto_acao, ctx, "pode ser com a Carla")
+        ),
+        # só o bloco de contexto embutido (o resto do prompt é texto fixo)
+        "  contexto interpretação": contar_tokens(json_contexto(ctx, "interpretacao_operacional")),
+        "  contexto p1": contar_tokens(json_contexto(p1, "resposta_p1")),
+        "  contexto humana": contar_tokens(json_contexto(humana, "resposta_humana_agendamento")),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--detalhe", action="store_true", help="mostra cada cenário")
+    args = parser.parse_args()
+
+    from utils import projecao_contexto
+    from utils.projecao_contexto import nome_tokenizador
+
+    contextos = carregar_contextos()
+    if not contextos:
+        print("Nenhum contexto de cenário encontrado.")
+        return
+
+    totais: dict = {}
+    for nome, ctx in contextos:
+        with patch.object(projecao_contexto, "PROJECAO_ATIVA", False):
+            antes = medir(ctx)
+        with patch.object(projecao_contexto, "PROJECAO_ATIVA", True):
+            depois = medir(ctx)
+        for ponto in antes:
+            item = totais.setdefault(ponto, [0, 0])
+            item[0] += antes[ponto]
+            item[1] += depois[ponto]
+        if args.detalhe:
+            print(f"{nome:<55} " + " ".join(f"{p.strip()[:12]}={antes[p]}→{depois[p]}" for p in antes))
+
+    print(f"\nTokens de entrada por prompt — {len(contextos)} contextos de cenário ({nome_tokenizador()})")
+    print(f"{'ponto de chamada':<30}{'antes (média)':>15}{'depois (média)':>16}{'redução':>10}")
+    for ponto, (antes, depois) in totais.items():
+        n = len(contextos)
+        reducao = 1 - depois / antes if antes else 0.0
+        print(f"{ponto:<30}{antes / n:>15.0f}{depois / n:>16.0f}{reducao:>10.0%}")
+
+
+if __name__ == "__main__":
+    main()
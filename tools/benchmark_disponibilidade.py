@@ -0,0 +1,220 @@
+"""
+Micro-benchmark do motor de disponibilidade - NeoEve
+Objetivo: Comparar a busca de horários livres candidato a candidato (como
+era em buscar_horario_ajuste_no_dia / _gerar_3_horarios_livres) com o
+DisponibilidadeEngine (um carregamento do dia + aritmética de intervalos).
+
+Uso:
+    python tools/benchmark_disponibilidade.py
+    python tools/benchmark_disponibilidade.py --profissionais 8 --eventos 10 --latencia-ms 20
+    python tools/benchmark_disponibilidade.py --iteracoes-cpu 20000
+
+Nada toca o Firestore: as leituras passam por um Firestore falso em memória
+que conta cada leitura e dorme --latencia-ms (RTT típico de uma leitura).
+Os dois lados usam as MESMAS funções de produção para expediente/conflito;
+só muda a estratégia de busca.
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import sys
+import time
+import timeit
+from datetime import datetime, timedelta
+from pathlib import Path
+from unittest.mock import patch
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+DATA = "2026-10-20"  # terça-feira
+DONO = "dono_benchmark"
+
+
+# =========================================================
+# Firestore falso (conta leituras, simula latência)
+# =========================================================
+class FirestoreFalso:
+    def __init__(self, profissionais: int, eventos_por_prof: int, latencia_ms: float):
+        self.latencia = latencia_ms / 1000
+        self.leituras = 0
+        self.nomes = [f"Prof{i}" for i in range(profissionais)]
+        self.cfg_salao = {"agenda_padrao": {"1": {"aberto": True, "inicio": "08:00", "fim": "20:00"}}}
+        self.profissionais = {n: {"nome": n, "servicos": ["corte"]} for n in self.nomes}
+        self.eventos = {}
+        for p, nome in enumerate(self.nomes):
+            # dia cheio com buracos curtos: 40 min ocupados a cada hora
+            for e in range(eventos_por_prof):
+                ini = datetime.fromisoformat(f"{DATA}T08:00") + timedelta(minutes=60 * e + 20 * (p % 3))
+                self.eventos[f"{nome}_{e}"] = {
+                    "data": DATA, "profissional": nome,
+                    "hora_inicio": ini.strftime("%H:%M"),
+                    "hora_fim": (ini + timedelta(minutes=40)).strftime("%H:%M"),
+                }
+
+    async def _ler(self):
+        self.leituras += 1
+        await asyncio.sleep(self.latencia)
+
+    async def dado(self, path, *a, **k):
+        await self._ler()
+        if path.endswith("configuracao/agenda_funcionamento"):
+            return self.cfg_salao
+        if "/Ocupacao/" in path:
+            prof = path.rsplit("/", 1)[1].split("_", 1)[1]
+            return {"completo": True, "intervalos": {
+                eid: {"hora_inicio": ev["hora_inicio"], "hora_fim": ev["hora_fim"]}
+                for eid, ev in self.eventos.items() if ev["profissional"].lower() == prof
+            }}
+        return {"tipo_usuario": "dono"} if path == f"Clientes/{DONO}" else {}
+
+    async def subcolecao(self, path, *a, **k):
+        await self._ler()
+        return dict(self.profissionais) if path.endswith("/Profissionais") else {}
+
+    async def eventos_filtrados(self, dono_id, *a, **k):
+        await self._ler()
+        return dict(self.eventos)
+
+    async def id_dono(self, user_id):
+        return user_id
+
+    @contextlib.contextmanager
+    def instalado(self):
+        from services import (
+            catalogo_service, config_agenda_service, event_service_async, firebase_service_async as fsa,
+            ocupacao_service,
+        )
+
+        alvos = [
+            (fsa, "buscar_dado_em_path", self.dado),
+            (fsa, "buscar_subcolecao", self.subcolecao),
+            (fsa, "buscar_eventos_filtrados", self.eventos_filtrados),
+            (fsa, "obter_id_dono", self.id_dono),
+            (event_service_async, "buscar_dado_em_path", self.dado),
+            (event_service_async, "obter_id_dono", self.id_dono),
+            (ocupacao_service, "buscar_dado_em_path", self.dado),
+            (catalogo_service, "buscar_subcolecao", self.subcolecao),
+        ]
+        with contextlib.ExitStack() as pilha:
+            for modulo, nome, func in alvos:
+                pilha.enter_context(patch.object(modulo, nome, func))
+            catalogo_service.invalidar_catalogo(DONO)
+            config_agenda_service.cache_config_agenda.limpar()
+            config_agenda_service.cache_excecoes_prof.limpar()
+            yield self
+
+
+# =========================================================
+# Estratégia anterior (candidato a candidato)
+# =========================================================
+# Grade de 20 min: verificar_conflito_e_sugestoes_profissional arredonda a hora
+# para baixo em múltiplos de 20; assim os dois lados testam os mesmos horários.
+GRADE = 20
+
+
+async def ajuste_candidato_a_candidato(profissional, hora_ref, duracao, grade=GRADE):
+    """buscar_horario_ajuste_no_dia como era: expediente + conflito por candidato."""
+    from services.agenda_service import obter_janela_funcionamento, validar_horario_funcionamento
+    from services.event_service_async import verificar_conflito_e_sugestoes_profissional
+
+    janela = await obter_janela_funcionamento(DONO, DATA, profissional)
+    if not janela.get("aberto"):
+        return None
+    h, m = map(int, hora_ref.split(":"))
+    fh, fm = map(int, janela["fim"].split(":"))
+    for minuto in range(h * 60 + m + grade, fh * 60 + fm - duracao + 1, grade):
+        hora = f"{minuto // 60:02d}:{minuto % 60:02d}"
+        permitido = await validar_horario_funcionamento(DONO, DATA, hora, duracao, profissional)
+        if not permitido.get("permitido"):
+            continue
+        conflito = await verificar_conflito_e_sugestoes_profissional(DONO, DATA, hora, duracao, profissional, "corte")
+        if not conflito.get("conflito"):
+            return hora
+    return None
+
+
+async def ajuste_com_engine(profissionais, hora_ref, duracao, grade=GRADE):
+    from services.disponibilidade_engine import DisponibilidadeEngine, hora_para_minutos
+
+    engine = await DisponibilidadeEngine.carregar(DONO, DATA, profissionais, sem_profissional_bloqueia=False)
+    ref = hora_para_minutos(hora_ref)
+    slots = engine.primeiros_slots(profissionais, duracao, grade, n=1, a_partir_de=ref + grade, ancora=ref)
+    return {p: (h[0] if h else None) for p, h in slots.items()}
+
+
+async def medir(fs: FirestoreFalso, coro_factory) -> tuple:
+    with fs.instalado(), contextlib.redirect_stdout(io.StringIO()):
+        fs.leituras = 0
+        inicio = time.perf_counter()
+        resultado = await coro_factory()
+        return resultado, fs.leituras, (time.perf_counter() - inicio) * 1000
+
+
+# =========================================================
+# CPU puro: varredura linear x subtração de intervalos
+# =========================================================
+def varredura_linear(ocupados, duracao, inicio=540, fim=1080, passo=15, n=3):
+    """_janela_livre como era: testa cada passo contra todos os ocupados."""
+    opcoes = []
+    cursor = inicio
+    while cursor + duracao <= fim and len(opcoes) < n:
+        if not any(not (cursor + duracao <= i or cursor >= f) for i, f in ocupados):
+            opcoes.append(cursor)
+        cursor += passo
+    return opcoes
+
+
+def por_intervalos(ocupados, duracao, inicio=540, fim=1080, passo=15, n=3):
+    from services.disponibilidade_engine import slots_em_livres, subtrair_intervalos
+
+    return slots_em_livres(subtrair_intervalos([(inicio, fim)], ocupados), duracao, passo, n, ancora=inicio)
+
+
+# =========================================================
+async def executar(args):
+    fs = FirestoreFalso(args.profissionais, args.eventos, args.latencia_ms)
+    alvo = fs.nomes[0]
+
+    print(f"📏 Cenário: {args.profissionais} profissionais × {args.eventos} eventos, "
+          f"latência {args.latencia_ms} ms/leitura, duração {args.duracao} min\n")
+
+    antes, leit_a, ms_a = await medir(fs, lambda: ajuste_candidato_a_candidato(alvo, "08:00", args.duracao))
+    depois, leit_d, ms_d = await medir(fs, lambda: ajuste_com_engine([alvo], "08:00", args.duracao))
+    assert antes == depois[alvo], (antes, depois)
+    print(f"1 profissional  | candidato a candidato: {leit_a:4d} leituras {ms_a:8.1f} ms → {antes}")
+    print(f"                | DisponibilidadeEngine: {leit_d:4d} leituras {ms_d:8.1f} ms → {depois[alvo]}")
+
+    async def todos_antes():
+        return {p: await ajuste_candidato_a_candidato(p, "08:00", args.duracao) for p in fs.nomes}
+
+    antes, leit_a, ms_a = await medir(fs, todos_antes)
+    depois, leit_d, ms_d = await medir(fs, lambda: ajuste_com_engine(fs.nomes, "08:00", args.duracao))
+    assert antes == depois, (antes, depois)
+    print(f"{len(fs.nomes)} profissionais | candidato a candidato: {leit_a:4d} leituras {ms_a:8.1f} ms")
+    print(f"                | DisponibilidadeEngine: {leit_d:4d} leituras {ms_d:8.1f} ms\n")
+
+    from services.disponibilidade_engine import hora_para_minutos
+
+    ocupados = sorted(
+        (hora_para_minutos(ev["hora_inicio"]), hora_para_minutos(ev["hora_fim"])) for ev in fs.eventos.values()
+    )
+    assert varredura_linear(ocupados, 30) == por_intervalos(ocupados, 30)
+    for nome, func in (("varredura linear", varredura_linear), ("subtração de intervalos", por_intervalos)):
+        seg = timeit.timeit(lambda: func(ocupados, 30), number=args.iteracoes_cpu)
+        print(f"CPU ({len(ocupados)} ocupados) | {nome:24s}: {seg / args.iteracoes_cpu * 1e6:8.1f} µs/busca")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Micro-benchmark do DisponibilidadeEngine")
+    parser.add_argument("--profissionais", type=int, default=6)
+    parser.add_argument("--eventos", type=int, default=10, help="eventos por profissional no dia")
+    parser.add_argument("--latencia-ms", type=float, default=10.0)
+    parser.add_argument("--duracao", type=int, default=40)
+    parser.add_argument("--iteracoes-cpu", type=int, default=5000)
+    asyncio.run(executar(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
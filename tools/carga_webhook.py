@@ -0,0 +1,231 @@
+"""
+Teste de carga do webhook aiohttp (servidor_webhook.py) - NeoEve
+Objetivo: Reenviar payloads gravados do Telegram contra o webhook local,
+com uma Bot API falsa no lugar do Telegram, e medir vazão e p50/p95/p99.
+
+Uso:
+    python tools/carga_webhook.py                                  # amostra, handler de eco
+    python tools/carga_webhook.py --payloads updates.jsonl --repeticoes 50 --chats 200
+    python tools/carga_webhook.py --latencia-handler-ms 300 --concorrencia 32
+    python tools/carga_webhook.py --real                           # handlers do bot (Firestore/OpenAI reais!)
+
+Cada linha do JSONL é um update do Telegram (como chega no POST /webhook).
+update_id é reescrito para ficar único; com --chats os chat/user ids são
+redistribuídos para simular N conversas simultâneas.
+"""
+
+import argparse
+import asyncio
+import copy
+import json
+import os
+import socket
+import sys
+import time
+from itertools import count
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from utils.despachante_updates import percentis  # noqa: E402
+
+AMOSTRA = Path(__file__).with_name("carga_webhook_amostra.jsonl")
+TOKEN_FALSO = "123456:CARGA"
+
+
+def porta_livre() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def carregar_payloads(caminho: Path) -> list[dict]:
+    with open(caminho, encoding="utf-8") as f:
+        return [json.loads(linha) for linha in f if linha.strip()]
+
+
+def gerar_updates(payloads: list[dict], repeticoes: int, chats: int | None) -> list[dict]:
+    """Replica os payloads; ids únicos e (opcional) espalhados em `chats` conversas."""
+    ids = count(1)
+    updates = []
+    for r in range(repeticoes):
+        for i, base in enumerate(payloads):
+            upd = copy.deepcopy(base)
+            upd["update_id"] = next(ids)
+            if chats:
+                chat_id = 10_000 + (r * len(payloads) + i) % chats
+                msg = upd.get("message") or upd.get("edited_message") or {}
+                if "chat" in msg:
+                    msg["chat"]["id"] = chat_id
+                if "from" in msg:
+                    msg["from"]["id"] = chat_id
+                cb = upd.get("callback_query")
+                if cb:
+                    cb["from"]["id"] = chat_id
+                    if "message" in cb and "chat" in cb["message"]:
+                        cb["message"]["chat"]["id"] = chat_id
+            updates.append(upd)
+    return updates
+
+
+# ---------------------------------------------------------------------
+# Bot API falsa: responde qualquer /bot<token>/<método> com ok
+# ---------------------------------------------------------------------
+async def subir_api_falsa(porta: int, latencia_ms: float, chamadas: dict):
+    from aiohttp import web
+
+    ids_msg = count(1)
+
+    async def metodo(request):
+        nome = request.match_info["metodo"]
+        chamadas[nome] = chamadas.get(nome, 0) + 1
+        if request.content_type == "application/json":
+            dados = await request.json()
+        else:
+            dados = dict(await request.post())
+        if latencia_ms:
+            await asyncio.sleep(latencia_ms / 1000)
+
+        if nome == "getMe":
+            resultado = {"id": 1, "is_bot": True, "first_name": "Carga", "username": "carga_bot"}
+        elif nome in ("sendMessage", "editMessageText"):
+            resultado = {
+                "message_id": next(ids_msg),
+                "date": int(time.time()),
+                "chat": {"id": int(dados.get("chat_id", 0) or 0), "type": "private"},
+                "text": dados.get("text", ""),
+            }
+        else:
+            resultado = True
+        return web.json_response({"ok": True, "result": resultado})
+
+    app = web.Application()
+    app.router.add_post("/bot{token}/{metodo}", metodo)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", porta).start()
+    return runner
+
+
+def montar_application(porta_api: int, real: bool, latencia_handler_ms: float):
+    from telegram.ext import Application, MessageHandler, CallbackQueryHandler, filters
+
+    application = (
+        Application.builder()
+        .token(TOKEN_FALSO)
+        .base_url(f"http://127.0.0.1:{porta_api}/bot")
+        .updater(None)
+        .build()
+    )
+
+    if real:
+        from handlers import register_handlers
+        register_handlers(application)
+        return application
+
+    async def eco(update, context):
+        # simula GPT/Firestore sem segurar o loop
+        await asyncio.sleep(latencia_handler_ms / 1000)
+        await context.bot.send_message(update.effective_chat.id, "ok")
+
+    application.add_handler(MessageHandler(filters.ALL, eco))
+    application.add_handler(CallbackQueryHandler(eco))
+    return application
+
+
+# ---------------------------------------------------------------------
+async def executar(args) -> dict:
+    import aiohttp
+    from servidor_webhook import executar_servidor
+
+    updates = gerar_updates(carregar_payloads(Path(args.payloads)), args.repeticoes, args.chats)
+    porta_api, porta_webhook = porta_livre(), porta_livre()
+    chamadas_api: dict = {}
+
+    runner_api = await subir_api_falsa(porta_api, args.latencia_api_ms, chamadas_api)
+    application = montar_application(porta_api, args.real, args.latencia_handler_ms)
+
+    parar = asyncio.Event()
+    servidor = asyncio.create_task(executar_servidor(
+        application,
+        porta=porta_webhook,
+        max_concorrencia=args.concorrencia,
+        max_fila=args.max_fila,
+        parar=parar,
+    ))
+
+    url = f"http://127.0.0.1:{porta_webhook}"
+    acks: list[float] = []
+    status: dict = {}
+
+    async with aiohttp.ClientSession() as sessao:
+        for _ in range(200):  # espera o servidor subir
+            try:
+                async with sessao.get(url + "/"):
+                    break
+            except aiohttp.ClientError:
+                await asyncio.sleep(0.05)
+
+        limite = asyncio.Semaphore(args.clientes)
+
+        async def enviar(update):
+            async with limite:
+                inicio = time.perf_counter()
+                async with sessao.post(url + "/webhook", json=update) as resp:
+                    await resp.read()
+                acks.append(time.perf_counter() - inicio)
+                status[resp.status] = status.get(resp.status, 0) + 1
+
+        inicio = time.perf_counter()
+        await asyncio.gather(*(enviar(u) for u in updates))
+        fim_envio = time.perf_counter()
+
+        aceitos = status.get(200, 0)
+        while True:
+            async with sessao.get(url + "/metricas") as resp:
+                metricas = await resp.json()
+            if metricas["processados"] + metricas["erros"] >= aceitos:
+                break
+            await asyncio.sleep(0.02)
+        fim = time.perf_counter()
+
+    parar.set()
+    await servidor
+    await runner_api.cleanup()
+
+    return {
+        "updates": len(updates),
+        "status_http": status,
+        "envio_s": round(fim_envio - inicio, 3),
+        "total_s": round(fim - inicio, 3),
+        "vazao_ack_por_s": round(len(updates) / max(fim_envio - inicio, 1e-9), 1),
+        "vazao_processados_por_s": round(metricas["processados"] / max(fim - inicio, 1e-9), 1),
+        "ack_ms": percentis(acks),
+        "fim_a_fim_ms": {k: metricas[k] for k in ("p50", "p95", "p99")},
+        "despachante": {k: v for k, v in metricas.items() if k not in ("p50", "p95", "p99")},
+        "chamadas_api": chamadas_api,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Teste de carga do webhook aiohttp")
+    parser.add_argument("--payloads", default=str(AMOSTRA), help="JSONL com updates gravados")
+    parser.add_argument("--repeticoes", type=int, default=20)
+    parser.add_argument("--chats", type=int, default=None, help="redistribui os updates em N chats")
+    parser.add_argument("--clientes", type=int, default=50, help="POSTs simultâneos no webhook")
+    parser.add_argument("--concorrencia", type=int, default=16, help="workers do despachante")
+    parser.add_argument("--max-fila", type=int, default=5000)
+    parser.add_argument("--latencia-handler-ms", type=float, default=50)
+    parser.add_argument("--latencia-api-ms", type=float, default=5)
+    parser.add_argument("--real", action="store_true", help="usa os handlers do bot em vez do eco")
+    args = parser.parse_args()
+
+    if args.real:
+        os.environ.setdefault("TOKEN", TOKEN_FALSO)
+
+    resultado = asyncio.run(executar(args))
+    print(json.dumps(resultado, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
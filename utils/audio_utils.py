@@ -1,11 +1,145 @@
 # utils/audio_utils.py
+import asyncio
 import subprocess
-import speech_recognition as sr
 import logging
 import os  # ✅ Adicionado para manipulação de arquivos
+import time
+from concurrent.futures import ThreadPoolExecutor
 
 logger = logging.getLogger(__name__)
 
+# =========================================================
+# 🎤 Pipeline de voz assíncrono (sem arquivos temporários)
+# ogg (bytes) → ffmpeg via pipe → PCM 16 kHz mono → reconhecimento em executor
+# =========================================================
+VOZ_MAX_CONCORRENTES = int(os.getenv("VOZ_MAX_CONCORRENTES", "4"))
+VOZ_TIMEOUT_FFMPEG_SEGUNDOS = 60
+TAXA_AMOSTRAGEM = 16000
+BYTES_POR_AMOSTRA = 2  # pcm_s16le
+
+_executor_voz = ThreadPoolExecutor(max_workers=VOZ_MAX_CONCORRENTES, thread_name_prefix="voz")
+_semaforo_voz: asyncio.Semaphore | None = None
+
+_metricas_voz = {
+    "em_fila": 0,
+    "em_processamento": 0,
+    "max_fila": 0,
+    "processados": 0,
+    "falhas": 0,
+    "tempo_total_ms": 0.0,
+}
+
+
+def metricas_voz() -> dict:
+    """Profundidade da fila e tempos do pipeline de voz (debug/monitoramento)."""
+    m = dict(_metricas_voz)
+    m["tempo_medio_ms"] = round(m["tempo_total_ms"] / m["processados"], 1) if m["processados"] else 0.0
+    return m
+
+
+def _semaforo() -> asyncio.Semaphore:
+    global _semaforo_voz
+    if _semaforo_voz is None:
+        _semaforo_voz = asyncio.Semaphore(VOZ_MAX_CONCORRENTES)
+    return _semaforo_voz
+
+
+async def converter_audio_para_pcm(dados_audio: bytes) -> bytes | None:
+    """Converte o áudio (ogg/opus do Telegram) para PCM 16 kHz mono via pipe do ffmpeg."""
+    comando = [
+        "ffmpeg", "-hide_banner", "-loglevel", "error",
+        "-i", "pipe:0",
+        "-f", "s16le",
+        "-acodec", "pcm_s16le",
+        "-ar", str(TAXA_AMOSTRAGEM),
+        "-ac", "1",
+        "pipe:1",
+    ]
+    try:
+        processo = await asyncio.create_subprocess_exec(
+            *comando,
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+        )
+        try:
+            saida, erro = await asyncio.wait_for(
+                processo.communicate(input=bytes(dados_audio)),
+                timeout=VOZ_TIMEOUT_FFMPEG_SEGUNDOS,
+            )
+        except asyncio.TimeoutError:
+            processo.kill()
+            await processo.wait()
+            logger.error("❌ ffmpeg excedeu o tempo limite")
+            return None
+
+        if processo.returncode != 0 or not saida:
+            logger.error(f"❌ ffmpeg erro: {erro.decode(errors='ignore')}")
+            return None
+
+        logger.info(f"✅ Áudio convertido em memória: {len(saida)} bytes PCM")
+        return saida
+
+    except Exception as e:
+        logger.error(f"❌ Erro inesperado ao converter áudio: {e}")
+        return None
+
+
+def _reconhecer_pcm(pcm: bytes) -> str | None:
+    """Reconhecimento (bloqueante, rede) — roda no executor de voz."""
+    import speech_recognition as sr
+
+    recognizer = sr.Recognizer()
+    audio = sr.AudioData(pcm, TAXA_AMOSTRAGEM, BYTES_POR_AMOSTRA)
+    try:
+        texto = recognizer.recognize_google(audio, language="pt-BR")
+        logger.info(f"✅ Transcrição: {texto}")
+        return texto
+    except sr.UnknownValueError:
+        logger.warning("🤷‍♂️ Áudio não foi entendido.")
+        return None
+    except sr.RequestError as e:
+        logger.error(f"❌ Erro ao acessar Google Speech-to-Text: {e}")
+        return None
+
+
+async def transcrever_audio_async(dados_audio: bytes) -> tuple[bool, str | None]:
+    """
+    Converte e transcreve um áudio sem bloquear o loop.
+
+    Retorna (convertido, texto): convertido=False quando o ffmpeg falhou;
+    texto=None quando o áudio não foi entendido.
+    """
+    _metricas_voz["em_fila"] += 1
+    _metricas_voz["max_fila"] = max(_metricas_voz["max_fila"], _metricas_voz["em_fila"])
+    inicio = time.perf_counter()
+    aguardando = True
+    try:
+        async with _semaforo():
+            aguardando = False
+            _metricas_voz["em_fila"] -= 1
+            _metricas_voz["em_processamento"] += 1
+            try:
+                pcm = await converter_audio_para_pcm(dados_audio)
+                if pcm is None:
+                    _metricas_voz["falhas"] += 1
+                    return False, None
+
+                loop = asyncio.get_running_loop()
+                texto = await loop.run_in_executor(_executor_voz, _reconhecer_pcm, pcm)
+                _metricas_voz["processados"] += 1
+                _metricas_voz["tempo_total_ms"] += (time.perf_counter() - inicio) * 1000
+                return True, texto
+            finally:
+                _metricas_voz["em_processamento"] -= 1
+    finally:
+        if aguardando:  # cancelado ainda na fila
+            _metricas_voz["em_fila"] -= 1
+
+
+# =========================================================
+# Versões síncronas com arquivo (legado — não usar no loop do bot)
+# =========================================================
 def converter_audio_para_wav(entrada_path, saida_path):
     try:
         # ✅ Remove o arquivo de saída se já existir
@@ -40,6 +174,8 @@ def converter_audio_para_wav(entrada_path, saida_path):
         return False
 
 def transcrever_audio(wav_path):
+    import speech_recognition as sr
+
     recognizer = sr.Recognizer()
     with sr.AudioFile(wav_path) as source:
         audio = recognizer.record(source)
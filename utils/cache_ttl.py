@@ -0,0 +1,122 @@
+"""
+Cache em memória (por processo) com limite de itens (LRU) e validade (TTL).
+
+Uso típico: documentos lidos muitas vezes por mensagem e raramente
+alterados (perfil do usuário, ator, tenant).
+
+    cache = CacheLRUTTL("perfis", max_itens=5000, ttl_segundos=300)
+    dados = await cache.obter(chave, lambda: carregar_do_firestore(chave))
+    cache.invalidar(chave)   # após qualquer escrita no documento
+
+- Leituras concorrentes da mesma chave compartilham UMA carga (single-flight).
+- Exceções do carregador não são guardadas.
+- None também é guardado (documento inexistente), com TTL próprio e curto.
+"""
+
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Optional
+
+_AUSENTE = object()
+
+
+class CacheLRUTTL:
+    def __init__(
+        self,
+        nome: str,
+        max_itens: int = 1000,
+        ttl_segundos: float = 300,
+        ttl_negativo_segundos: Optional[float] = None,
+    ):
+        self.nome = nome
+        self.max_itens = max_itens
+        self.ttl = ttl_segundos
+        self.ttl_negativo = ttl_segundos if ttl_negativo_segundos is None else ttl_negativo_segundos
+        self._itens: "OrderedDict[str, tuple]" = OrderedDict()  # chave -> (expira_em, valor)
+        self._cargas: dict = {}                                  # chave -> Future em andamento
+        self._invalidadas_em_carga: set = set()
+        self.hits = 0
+        self.misses = 0
+        self.expirados = 0
+        self.despejados = 0
+        self.invalidacoes = 0
+
+    # ------------------------------------------------------------------
+    def _ler(self, chave: str):
+        item = self._itens.get(chave)
+        if item is None:
+            return _AUSENTE
+        expira_em, valor = item
+        if expira_em <= time.monotonic():
+            del self._itens[chave]
+            self.expirados += 1
+            return _AUSENTE
+        self._itens.move_to_end(chave)
+        return valor
+
+    def _gravar(self, chave: str, valor: Any):
+        ttl = self.ttl if valor is not None else self.ttl_negativo
+        self._itens[chave] = (time.monotonic() + ttl, valor)
+        self._itens.move_to_end(chave)
+        while len(self._itens) > self.max_itens:
+            self._itens.popitem(last=False)
+            self.despejados += 1
+
+    # ------------------------------------------------------------------
+    async def obter(self, chave: str, carregar: Callable[[], Awaitable[Any]]) -> Any:
+        """Valor da chave; chama `carregar()` só em miss/expiração."""
+        valor = self._ler(chave)
+        if valor is not _AUSENTE:
+            self.hits += 1
+            return valor
+
+        em_andamento = self._cargas.get(chave)
+        if em_andamento is not None:
+            self.hits += 1
+            return await asyncio.shield(em_andamento)
+
+        self.misses += 1
+        futuro = asyncio.get_running_loop().create_future()
+        self._cargas[chave] = futuro
+        try:
+            valor = await carregar()
+        except asyncio.CancelledError:
+            futuro.cancel()
+            raise
+        except Exception as e:
+            futuro.set_exception(e)
+            futuro.exception()  # evita "exception was never retrieved"
+            raise
+        else:
+            # invalidado durante a carga: entrega o valor, mas não guarda
+            if chave not in self._invalidadas_em_carga:
+                self._gravar(chave, valor)
+            futuro.set_result(valor)
+            return valor
+        finally:
+            self._cargas.pop(chave, None)
+            self._invalidadas_em_carga.discard(chave)
+
+    def invalidar(self, chave: str) -> None:
+        self.invalidacoes += 1
+        self._itens.pop(chave, None)
+        if chave in self._cargas:
+            self._invalidadas_em_carga.add(chave)
+
+    def limpar(self) -> None:
+        for chave in [*self._itens, *self._cargas]:
+            self.invalidar(chave)
+
+    def metricas(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "cache": self.nome,
+            "itens": len(self._itens),
+            "hits": self.hits,
+            "misses": self.misses,
+            "taxa_hit": round(self.hits / total, 3) if total else 0.0,
+            "expirados": self.expirados,
+            "despejados": self.despejados,
+            "invalidacoes": self.invalidacoes,
+        }
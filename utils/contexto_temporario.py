@@ -1,5 +1,7 @@
 from services.firebase_service_async import atualizar_dado_em_path, buscar_dado_em_path
 from google.cloud import firestore
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
 import traceback
 
 # ============================================================================
@@ -14,6 +16,150 @@ import traceback
 #   carregar_contexto_temporario(user_id) — USAR SOMENTE PARA COMPATIBILIDADE
 # ============================================================================
 
+# ========== UNIDADE DE TRABALHO POR MENSAGEM (WRITE-BEHIND) ==========
+#
+# Dentro de `async with unidade_de_sessao():` (aberta por roteador_principal),
+# carregar/salvar/limpar sessão V2 operam em memória:
+#   - cada Clientes/{tenant}/Sessoes/{actor} é lido no máximo UMA vez
+#   - os campos alterados (inclusive DELETE_FIELD) são acumulados
+#   - ao sair (normal, return antecipado ou exceção) há UM merge por sessão
+# Fora da unidade o comportamento é o de sempre (escrita imediata).
+
+_UNIDADE_SESSAO: ContextVar = ContextVar("unidade_sessao", default=None)
+_AUSENTE = object()
+
+
+def _eh_mapa(valor) -> bool:
+    return isinstance(valor, dict) and bool(valor)
+
+
+def _copiar(valor):
+    """Cópia de dict/list preservando sentinelas do Firestore (DELETE_FIELD)."""
+    if isinstance(valor, dict):
+        return {k: _copiar(v) for k, v in valor.items()}
+    if isinstance(valor, list):
+        return [_copiar(v) for v in valor]
+    return valor
+
+
+def _aplicar_merge(destino: dict, campos: dict):
+    """Aplica campos em memória com a mesma semântica de set(merge=True)."""
+    for chave, valor in campos.items():
+        if valor is firestore.DELETE_FIELD:
+            destino.pop(chave, None)
+        elif _eh_mapa(valor):
+            if not isinstance(destino.get(chave), dict):
+                destino[chave] = {}
+            _aplicar_merge(destino[chave], valor)
+        else:
+            destino[chave] = _copiar(valor)
+
+
+def _acumular_sujos(sujos: dict, campos: dict, persistido):
+    """
+    Acumula campos alterados num único payload merge equivalente a aplicar
+    os salvamentos em sequência.
+
+    Um mapa gravado depois de DELETE_FIELD (ou de um valor escalar) na mesma
+    chave substitui o mapa persistido — as chaves antigas viram DELETE_FIELD.
+    """
+    for chave, valor in campos.items():
+        anterior = sujos.get(chave, _AUSENTE)
+        base = persistido.get(chave) if isinstance(persistido, dict) else None
+
+        if not _eh_mapa(valor):
+            sujos[chave] = _copiar(valor)
+        elif isinstance(anterior, dict):
+            _acumular_sujos(anterior, valor, base)
+        else:
+            novo = {}
+            if anterior is not _AUSENTE and isinstance(base, dict):
+                novo = {k: firestore.DELETE_FIELD for k in base}
+                base = None
+            _acumular_sujos(novo, valor, base)
+            sujos[chave] = novo
+
+
+class UnidadeSessao:
+    """Sessões lidas e alteradas durante o processamento de UMA mensagem."""
+
+    def __init__(self, origem: str = ""):
+        self.origem = origem
+        self.docs = {}        # path -> estado atual em memória
+        self.originais = {}   # path -> estado lido do Firestore
+        self.sujos = {}       # path -> payload merge acumulado
+        self.atores = {}      # path -> (tenant_id, actor_id)
+        self.leituras = 0
+        self.escritas = 0
+        self.salvamentos = 0
+        self.carregamentos = 0
+        self.ativa = True
+
+    def registrar_leitura(self, path: str, dados: dict):
+        self.leituras += 1
+        self.originais[path] = _copiar(dados or {})
+        self.docs[path] = _copiar(dados or {})
+
+    def ler(self, path: str) -> dict:
+        self.carregamentos += 1
+        return _copiar(self.docs[path])
+
+    def alterar(self, path: str, campos: dict, tenant_id: str, actor_id: str):
+        self.salvamentos += 1
+        _acumular_sujos(self.sujos.setdefault(path, {}), campos, self.originais.get(path))
+        _aplicar_merge(self.docs.setdefault(path, {}), campos)
+        self.atores[path] = (tenant_id, actor_id)
+
+    async def descarregar(self):
+        """Grava UM merge por sessão alterada e encerra a unidade."""
+        from datetime import datetime
+
+        self.ativa = False
+        for path, campos in self.sujos.items():
+            tenant_id, actor_id = self.atores[path]
+            payload = dict(campos)
+            payload["_tenant_id_guard"] = tenant_id
+            payload["_actor_id"] = actor_id
+            payload["_updated_at"] = datetime.now().isoformat()
+            payload["_schema_version"] = 2
+            await atualizar_dado_em_path(path, payload)
+            self.escritas += 1
+        self.sujos = {}
+
+        print(
+            f"[SESSION_UOW] origem={self.origem} leituras={self.leituras} escritas={self.escritas} "
+            f"carregamentos={self.carregamentos} salvamentos={self.salvamentos}",
+            flush=True
+        )
+
+
+def unidade_sessao_atual():
+    """Unidade de trabalho ativa neste contexto async (ou None)."""
+    unidade = _UNIDADE_SESSAO.get()
+    return unidade if unidade is not None and unidade.ativa else None
+
+
+@asynccontextmanager
+async def unidade_de_sessao(origem: str = ""):
+    """Abre a unidade de trabalho da mensagem; reentrante (reusa a externa)."""
+    if unidade_sessao_atual() is not None:
+        yield unidade_sessao_atual()
+        return
+
+    unidade = UnidadeSessao(origem)
+    token = _UNIDADE_SESSAO.set(unidade)
+    try:
+        yield unidade
+    finally:
+        _UNIDADE_SESSAO.reset(token)
+        await unidade.descarregar()
+
+
+async def _garantir_carregada(unidade: UnidadeSessao, actor_id: str, tenant_id: str, path: str):
+    if path not in unidade.docs:
+        await carregar_sessao_temporaria(actor_id, tenant_id)
+
+
 # ========== VERSÃO NOVA (RECOMENDADA) — ISOLADO POR TENANT ==========
 
 async def salvar_sessao_temporaria(actor_id: str, contexto: dict, tenant_id: str):
@@ -40,9 +186,15 @@ async def salvar_sessao_temporaria(actor_id: str, contexto: dict, tenant_id: str
 
     path = f"Clientes/{tenant_id}/Sessoes/{actor_id}"
 
-    # 🔥 merge manual defensivo
-    atual = await buscar_dado_em_path(path) or {}
-    atual.update(contexto)
+    # 📦 Unidade de trabalho ativa: só memória, grava no fim da mensagem
+    unidade = unidade_sessao_atual()
+    if unidade is not None:
+        await _garantir_carregada(unidade, actor_id, tenant_id, path)
+        unidade.alterar(path, contexto, tenant_id, actor_id)
+        return True
+
+    # merge=True já preserva os campos não enviados (sem leitura prévia)
+    atual = dict(contexto)
 
     # 🔥 PATCH P0.4: Adicionar metadados de segurança
     atual["_tenant_id_guard"] = tenant_id
@@ -81,8 +233,15 @@ async def carregar_sessao_temporaria(actor_id: str, tenant_id: str):
 
     path_novo = f"Clientes/{tenant_id}/Sessoes/{actor_id}"
 
+    # 📦 Unidade de trabalho ativa: sessão já lida nesta mensagem
+    unidade = unidade_sessao_atual()
+    if unidade is not None and path_novo in unidade.docs:
+        return unidade.ler(path_novo)
+
     # 1️⃣ Tenta novo path primeiro (PATCH P0.3: read-through)
     data_novo = await buscar_dado_em_path(path_novo)
+    if unidade is not None:
+        unidade.registrar_leitura(path_novo, data_novo)
     if data_novo:
         print(f"[DIAG] [LOAD SESSAO v2] path={path_novo} | source=novo | tenant={tenant_id} | actor={actor_id}", flush=True)
         print(f"[SESSION_STORE] read_path={path_novo} | write_path={path_novo} | same_path=True", flush=True)
@@ -121,7 +280,10 @@ async def carregar_sessao_temporaria(actor_id: str, tenant_id: str):
     data_migrada["_schema_version"] = 2
     data_migrada["_migrado_em"] = datetime.now().isoformat()
 
-    await atualizar_dado_em_path(path_novo, data_migrada)
+    if unidade is not None:
+        unidade.alterar(path_novo, data_migrada, tenant_id, actor_id)
+    else:
+        await atualizar_dado_em_path(path_novo, data_migrada)
     print(f"[SESSION_STORE] read_path={path_legado} → migrado para write_path={path_novo} | same_path=False (mas migrado)", flush=True)
 
     return data_migrada
@@ -205,6 +367,12 @@ async def limpar_contexto_agendamento_v2(dono_id: str, cliente_id: str):
     print(f"[PATCH_P0_CLEAR] path={path} | dono={dono_id} | cliente={cliente_id}", flush=True)
     print(f"[PATCH_P0_CLEAR] DELETE_FIELD count: {len([v for v in payload.values() if v is firestore.DELETE_FIELD])}", flush=True)
 
+    unidade = unidade_sessao_atual()
+    if unidade is not None:
+        await _garantir_carregada(unidade, cliente_id, dono_id, path)
+        unidade.alterar(path, payload, dono_id, cliente_id)
+        return True
+
     return await atualizar_dado_em_path(path, payload)
 
 
@@ -1,34 +1,163 @@
-from datetime import datetime
+import asyncio
+import os
+import random
+from datetime import datetime, timedelta
 import math
 
 # 💰 Preços por mil tokens (em dólares)
+# input_cache: tokens de entrada servidos do cache de prompt do provedor
+# (modelos sem a chave não têm desconto)
 PRECOS = {
     "gpt-3.5-turbo": {"input": 0.0005, "output": 0.0015},
     "gpt-4": {"input": 0.03, "output": 0.06},
-    "gpt-4o": {"input": 0.005, "output": 0.015},
+    "gpt-4o": {"input": 0.005, "input_cache": 0.0025, "output": 0.015},
+    "gpt-4o-mini": {"input": 0.00015, "input_cache": 0.000075, "output": 0.0006},
+    "gpt-4.1-mini": {"input": 0.0004, "input_cache": 0.0001, "output": 0.0016},
+    "gpt-4.1-nano": {"input": 0.0001, "input_cache": 0.000025, "output": 0.0004},
     "gpt-4-turbo": {"input": 0.01, "output": 0.03},
 }
 
-async def registrar_custo_gpt(resposta, modelo, user_id, firestore_client=None):
+# =========================================================
+# 📒 Ledger agregado de custos (contadores com Increment)
+#
+#   CustosGPT/totais/PorUsuario/{user_id}__{shard}   → acumulado desde sempre
+#   CustosGPT/{AAAA-MM-DD}/PorUsuario/{user_id}__{shard} → acumulado do dia
+#
+# Cada doc: user_id, tenant_id, custo_usd, reqs, tokens_input, tokens_output,
+# tokens_cache, economia_cache_usd e modelos.{modelo}.{custo_usd, reqs}. Várias shards por usuário evitam o
+# limite de ~1 escrita/s por documento; a leitura soma as shards.
+# /custosapi lê O(usuários × shards) docs em vez da coleção custos_usuarios.
+# =========================================================
+CUSTOS_SHARDS = int(os.getenv("CUSTOS_GPT_SHARDS", "4"))
+CUSTOS_GRAVAR_DETALHE = os.getenv("CUSTOS_GPT_DETALHE", "1").strip().lower() in ("1", "true", "sim")
+MAX_DIAS_RESUMO = 93
+SHARD_HISTORICO = "hist"  # backfill de custos_usuarios (valores absolutos, idempotente)
+
+COLECAO_CUSTOS = "CustosGPT"
+_tarefas_custos: set = set()
+
+
+def path_total_usuario(user_id: str, shard) -> str:
+    return f"{COLECAO_CUSTOS}/totais/PorUsuario/{user_id}__{shard}"
+
+
+def path_dia_usuario(dia: str, user_id: str, shard) -> str:
+    return f"{COLECAO_CUSTOS}/{dia}/PorUsuario/{user_id}__{shard}"
+
+
+def _payload_incremento(log: dict, tenant_id: str, dia: str | None = None) -> dict:
+    from google.cloud.firestore import Increment
+
+    payload = {
+        "user_id": log["user_id"],
+        "tenant_id": tenant_id,
+        "custo_usd": Increment(log["custo_usd"]),
+        "reqs": Increment(1),
+        "tokens_input": Increment(log["tokens_input"]),
+        "tokens_output": Increment(log["tokens_output"]),
+        "tokens_cache": Increment(log.get("tokens_cache", 0)),
+        "economia_cache_usd": Increment(log.get("economia_cache_usd", 0.0)),
+        "modelos": {log["modelo"]: {"custo_usd": Increment(log["custo_usd"]), "reqs": Increment(1)}},
+        "atualizado_em": log["data"],
+    }
+    if dia:
+        payload["dia"] = dia
+    return payload
+
+
+async def _gravar_custo(log: dict, tenant_id: str | None):
+    from services.firebase_service_async import atualizar_em_lote, adicionar_documento, obter_id_dono
+
+    try:
+        tenant_id = tenant_id or await obter_id_dono(str(log["user_id"]))
+        dia = log["data"][:10]
+        shard = random.randrange(CUSTOS_SHARDS)
+        user_id = str(log["user_id"])
+
+        gravados = await atualizar_em_lote([
+            (path_total_usuario(user_id, shard), _payload_incremento(log, tenant_id)),
+            (path_dia_usuario(dia, user_id, shard), _payload_incremento(log, tenant_id, dia)),
+        ])
+        if gravados != 2:
+            print(f"⚠️ Ledger de custos não gravado para {user_id}", flush=True)
+
+        if CUSTOS_GRAVAR_DETALHE:
+            # "agregado": já contado no ledger (o backfill ignora)
+            await adicionar_documento("custos_usuarios", {**log, "tenant_id": tenant_id, "agregado": True})
+    except Exception as e:
+        print("❌ Erro ao gravar ledger de custos GPT:", e, flush=True)
+
+
+def _agendar(coro):
+    """Grava fora do caminho da resposta; guarda referência até terminar."""
+    tarefa = asyncio.get_running_loop().create_task(coro)
+    _tarefas_custos.add(tarefa)
+    tarefa.add_done_callback(_tarefas_custos.discard)
+    return tarefa
+
+
+async def aguardar_custos_pendentes(timeout: float = 10) -> None:
+    """Espera as gravações em andamento (shutdown/testes)."""
+    if _tarefas_custos:
+        await asyncio.wait(list(_tarefas_custos), timeout=timeout)
+
+
+def tokens_em_cache(usage) -> int:
+    """usage.prompt_tokens_details.cached_tokens (0 quando o provedor não informa)."""
+    detalhes = getattr(usage, "prompt_tokens_details", None)
+    if isinstance(detalhes, dict):
+        cached = detalhes.get("cached_tokens")
+    else:
+        cached = getattr(detalhes, "cached_tokens", None)
+    return int(cached) if isinstance(cached, (int, float)) else 0
+
+
+def calcular_custo(usage, modelo) -> tuple:
+    """
+    (custo_usd, economia_cache_usd, tokens_cache) de um usage do chat.completions.
+
+    Tokens de entrada vindos do cache de prompt do provedor são cobrados
+    pelo preço input_cache e a diferença vai para a economia.
+    """
+    tokens_in = usage.prompt_tokens
+    tokens_out = usage.completion_tokens
+    tokens_cache = min(tokens_em_cache(usage), tokens_in)
+    preco = PRECOS.get(modelo, {"input": 0.01, "output": 0.03})  # fallback
+    preco_cache = preco.get("input_cache", preco["input"])
+
+    custo = round(
+        ((tokens_in - tokens_cache) * preco["input"] + tokens_cache * preco_cache + tokens_out * preco["output"]) / 1000,
+        6,
+    )
+    economia = round(tokens_cache * (preco["input"] - preco_cache) / 1000, 6)
+    return custo, economia, tokens_cache
+
+
+async def registrar_custo_gpt(resposta, modelo, user_id, persistir=True, tenant_id=None):
+    """
+    Calcula o custo da chamada (calcular_custo) e devolve o log na hora; se
+    persistir, os contadores agregados (e o detalhe em custos_usuarios) são
+    gravados em background, sem atrasar a resposta ao usuário.
+    """
     try:
         usage = resposta.usage
         tokens_in = usage.prompt_tokens
         tokens_out = usage.completion_tokens
-        preco = PRECOS.get(modelo, {"input": 0.01, "output": 0.03})  # fallback
-
-        custo = round((tokens_in * preco["input"] + tokens_out * preco["output"]) / 1000, 6)
+        custo, economia, tokens_cache = calcular_custo(usage, modelo)
 
         log = {
             "user_id": user_id,
             "modelo": modelo,
             "tokens_input": tokens_in,
             "tokens_output": tokens_out,
+            "tokens_cache": tokens_cache,
             "custo_usd": custo,
+            "economia_cache_usd": economia,
             "data": datetime.now().isoformat()
         }
 
-        if firestore_client:
-            firestore_client.collection("custos_usuarios").add(log)
+        if persistir:
+            _agendar(_gravar_custo(log, tenant_id))
 
         print("📊 Custo registrado:", log)
         return log
@@ -36,3 +165,155 @@ async def registrar_custo_gpt(resposta, modelo, user_id, firestore_client=None):
     except Exception as e:
         print("❌ Erro ao registrar custo GPT:", e)
         return None
+
+
+# =========================================================
+# 📊 Leitura agregada (/custosapi)
+# =========================================================
+def dias_do_intervalo(data_inicio: str, data_fim: str) -> list[str]:
+    inicio = datetime.strptime(data_inicio, "%Y-%m-%d").date()
+    fim = datetime.strptime(data_fim, "%Y-%m-%d").date()
+    if fim < inicio:
+        inicio, fim = fim, inicio
+    qtd = min((fim - inicio).days + 1, MAX_DIAS_RESUMO)
+    return [(inicio + timedelta(days=i)).isoformat() for i in range(qtd)]
+
+
+def interpretar_args_custos(args: list, hoje) -> tuple:
+    """
+    Argumentos do /custosapi → (data_inicio, data_fim, tenant_id).
+
+    [dias] [tenant_id] | [AAAA-MM-DD AAAA-MM-DD] [tenant_id]
+    Número até MAX_DIAS_RESUMO é contagem de dias; acima disso é tenant_id
+    (ids do Telegram), nunca uma janela gigante. ValueError em data inválida.
+    """
+    args = list(args or [])
+    data_inicio = data_fim = None
+    if args and args[0].isdigit() and int(args[0]) <= MAX_DIAS_RESUMO:
+        dias = max(1, int(args.pop(0)))
+        data_inicio = (hoje - timedelta(days=dias - 1)).isoformat()
+        data_fim = hoje.isoformat()
+    elif len(args) >= 2 and "-" in args[0] and "-" in args[1]:
+        data_inicio, data_fim = args.pop(0), args.pop(0)
+        datetime.strptime(data_inicio, "%Y-%m-%d")
+        datetime.strptime(data_fim, "%Y-%m-%d")
+    tenant_id = args[0] if args else None
+    return data_inicio, data_fim, tenant_id
+
+
+def _somar(resumo: dict, doc: dict, dia: str | None = None):
+    custo = float(doc.get("custo_usd", 0.0) or 0.0)
+    reqs = int(doc.get("reqs", 0) or 0)
+    if not reqs and not custo:
+        return
+
+    resumo["total_usd"] += custo
+    resumo["reqs"] += reqs
+    resumo["tokens_input"] += int(doc.get("tokens_input", 0) or 0)
+    resumo["tokens_cache"] += int(doc.get("tokens_cache", 0) or 0)
+    resumo["economia_cache_usd"] += float(doc.get("economia_cache_usd", 0.0) or 0.0)
+
+    chaves = (
+        ("por_usuario", str(doc.get("user_id", "desconhecido"))),
+        ("por_tenant", str(doc.get("tenant_id") or "sem_tenant")),
+    )
+    if dia:
+        chaves += (("por_dia", dia),)
+    for grupo, chave in chaves:
+        item = resumo[grupo].setdefault(chave, {"custo_usd": 0.0, "reqs": 0})
+        item["custo_usd"] += custo
+        item["reqs"] += reqs
+
+    for modelo, valores in (doc.get("modelos") or {}).items():
+        item = resumo["por_modelo"].setdefault(modelo, {"custo_usd": 0.0, "reqs": 0})
+        item["custo_usd"] += float((valores or {}).get("custo_usd", 0.0) or 0.0)
+        item["reqs"] += int((valores or {}).get("reqs", 0) or 0)
+
+
+async def resumo_custos(data_inicio: str | None = None, data_fim: str | None = None, tenant_id: str | None = None) -> dict:
+    """
+    Soma os contadores agregados.
+    Sem datas: acumulado total. Com datas (AAAA-MM-DD, inclusivas): por dia,
+    no máximo MAX_DIAS_RESUMO; "data_inicio"/"data_fim" do resumo trazem a
+    janela realmente somada e "truncado" indica o corte.
+    tenant_id filtra um tenant só.
+    """
+    from services.firebase_service_async import consultar
+
+    filtros = [("tenant_id", "==", tenant_id)] if tenant_id else None
+    resumo = {
+        "total_usd": 0.0, "reqs": 0,
+        "tokens_input": 0, "tokens_cache": 0, "economia_cache_usd": 0.0,
+        "por_usuario": {}, "por_tenant": {}, "por_modelo": {}, "por_dia": {},
+        "docs_lidos": 0,
+        "data_inicio": None, "data_fim": None, "truncado": False,
+    }
+
+    if not data_inicio:
+        docs = await consultar(f"{COLECAO_CUSTOS}/totais/PorUsuario", filtros=filtros)
+        resumo["docs_lidos"] = len(docs)
+        for doc in docs.values():
+            _somar(resumo, doc)
+        return resumo
+
+    dias = dias_do_intervalo(data_inicio, data_fim or data_inicio)
+    fim_pedido = max(data_inicio, data_fim or data_inicio)
+    resumo.update(data_inicio=dias[0], data_fim=dias[-1], truncado=dias[-1] < fim_pedido)
+    por_dia = await asyncio.gather(*[
+        consultar(f"{COLECAO_CUSTOS}/{dia}/PorUsuario", filtros=filtros) for dia in dias
+    ])
+    for dia, docs in zip(dias, por_dia):
+        resumo["docs_lidos"] += len(docs)
+        for doc in docs.values():
+            _somar(resumo, doc, dia)
+    return resumo
+
+
+# =========================================================
+# 🔁 Backfill único a partir de custos_usuarios
+# =========================================================
+async def reconstruir_agregados_custos() -> int:
+    """
+    Recalcula, a partir do detalhe antigo em custos_usuarios (sem "agregado"),
+    a shard "hist" de cada usuário (totais e por dia) com valores ABSOLUTOS —
+    pode rodar de novo sem duplicar.
+    """
+    from services.firebase_service_async import consultar, atualizar_em_lote, obter_id_dono
+
+    detalhes = await consultar("custos_usuarios")
+    totais, por_dia = {}, {}
+    for log in detalhes.values():
+        if log.get("agregado"):
+            continue
+        user_id = str(log.get("user_id", "desconhecido"))
+        dia = str(log.get("data", ""))[:10]
+        modelo = log.get("modelo", "desconhecido")
+        for chave, destino in ((user_id, totais), ((dia, user_id), por_dia)):
+            item = destino.setdefault(chave, {
+                "user_id": user_id, "tenant_id": log.get("tenant_id"),
+                "custo_usd": 0.0, "reqs": 0, "tokens_input": 0, "tokens_output": 0,
+                "tokens_cache": 0, "economia_cache_usd": 0.0, "modelos": {},
+            })
+            item["custo_usd"] += float(log.get("custo_usd", 0.0) or 0.0)
+            item["reqs"] += 1
+            item["tokens_input"] += int(log.get("tokens_input", 0) or 0)
+            item["tokens_output"] += int(log.get("tokens_output", 0) or 0)
+            item["tokens_cache"] += int(log.get("tokens_cache", 0) or 0)
+            item["economia_cache_usd"] += float(log.get("economia_cache_usd", 0.0) or 0.0)
+            m = item["modelos"].setdefault(modelo, {"custo_usd": 0.0, "reqs": 0})
+            m["custo_usd"] += float(log.get("custo_usd", 0.0) or 0.0)
+            m["reqs"] += 1
+
+    tenants = {}
+    for user_id in totais:
+        tenants[user_id] = totais[user_id]["tenant_id"] or await obter_id_dono(user_id)
+
+    atualizacoes = []
+    for user_id, item in totais.items():
+        atualizacoes.append((path_total_usuario(user_id, SHARD_HISTORICO), {**item, "tenant_id": tenants[user_id]}))
+    for (dia, user_id), item in por_dia.items():
+        atualizacoes.append((path_dia_usuario(dia, user_id, SHARD_HISTORICO), {**item, "tenant_id": tenants[user_id], "dia": dia}))
+
+    gravados = await atualizar_em_lote(atualizacoes)
+    print(f"📒 Ledger de custos reconstruído: {len(detalhes)} registros → {gravados} agregados", flush=True)
+    return gravados
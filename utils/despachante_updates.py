@@ -0,0 +1,148 @@
+# utils/despachante_updates.py
+"""
+Fila de updates do Telegram com concorrência limitada e ordem por chat.
+
+O webhook só enfileira e responde 200 na hora; os workers processam:
+- até `max_concorrencia` updates ao mesmo tempo (chats diferentes em paralelo);
+- updates do MESMO chat um por vez, na ordem de chegada;
+- um chat com muitas mensagens não monopoliza worker: após cada update ele
+  volta para o fim da fila de chats prontos.
+
+    despachante = DespachanteUpdates(application.process_update, max_concorrencia=16)
+    await despachante.iniciar()
+    despachante.enfileirar(update)        # False = fila cheia (webhook responde 503)
+    despachante.metricas()
+"""
+
+import asyncio
+import logging
+import time
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+
+def chave_do_update(update) -> str:
+    """Chat do update (ordem é garantida por chave); sem chat, cai no usuário."""
+    chat = getattr(update, "effective_chat", None)
+    if chat is not None and getattr(chat, "id", None) is not None:
+        return f"chat:{chat.id}"
+    usuario = getattr(update, "effective_user", None)
+    if usuario is not None and getattr(usuario, "id", None) is not None:
+        return f"user:{usuario.id}"
+    return f"update:{getattr(update, 'update_id', id(update))}"
+
+
+def percentis(valores, pontos=(50, 95, 99)) -> dict:
+    """Percentis (nearest-rank) em ms de uma lista de segundos."""
+    if not valores:
+        return {f"p{p}": 0.0 for p in pontos}
+    ordenados = sorted(valores)
+    n = len(ordenados)
+    return {
+        f"p{p}": round(ordenados[min(n - 1, max(0, -(-p * n // 100) - 1))] * 1000, 1)
+        for p in pontos
+    }
+
+
+class DespachanteUpdates:
+    def __init__(self, processar, max_concorrencia: int = 16, max_fila: int = 5000, amostras_latencia: int = 2000):
+        self.processar = processar
+        self.max_concorrencia = max(1, int(max_concorrencia))
+        self.max_fila = max(1, int(max_fila))
+
+        self._pendentes: dict = {}              # chave -> deque[(update, recebido_em)]
+        self._prontos: asyncio.Queue | None = None
+        self._workers: list = []
+        self._em_fila = 0
+
+        self.recebidos = 0
+        self.processados = 0
+        self.erros = 0
+        self.rejeitados = 0
+        self.max_fila_observada = 0
+        self._latencias = deque(maxlen=amostras_latencia)   # enfileirado -> processado (s)
+
+    # ------------------------------------------------------------------
+    async def iniciar(self) -> None:
+        if self._workers:
+            return
+        self._prontos = asyncio.Queue()
+        self._workers = [asyncio.create_task(self._worker(i)) for i in range(self.max_concorrencia)]
+        logger.info(f"📬 Despachante de updates iniciado ({self.max_concorrencia} workers)")
+
+    async def parar(self, drenar: bool = True, timeout: float = 30) -> None:
+        if drenar and self._prontos is not None:
+            try:
+                await asyncio.wait_for(self.aguardar_vazio(), timeout=timeout)
+            except asyncio.TimeoutError:
+                logger.warning(f"⚠️ Despachante parado com {self._em_fila} updates pendentes")
+        for w in self._workers:
+            w.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    async def aguardar_vazio(self) -> None:
+        while self._em_fila:
+            await asyncio.sleep(0.01)
+
+    # ------------------------------------------------------------------
+    def enfileirar(self, update) -> bool:
+        """Não bloqueia. Retorna False se a fila estiver cheia."""
+        if self._prontos is None:
+            raise RuntimeError("Despachante não iniciado")
+        if self._em_fila >= self.max_fila:
+            self.rejeitados += 1
+            return False
+
+        chave = chave_do_update(update)
+        item = (update, time.perf_counter())
+        fila_chat = self._pendentes.get(chave)
+        if fila_chat is None:
+            self._pendentes[chave] = deque([item])
+            self._prontos.put_nowait(chave)
+        else:
+            fila_chat.append(item)
+
+        self.recebidos += 1
+        self._em_fila += 1
+        self.max_fila_observada = max(self.max_fila_observada, self._em_fila)
+        return True
+
+    async def _worker(self, numero: int) -> None:
+        while True:
+            chave = await self._prontos.get()
+            try:
+                fila_chat = self._pendentes[chave]
+                update, recebido_em = fila_chat.popleft()
+                try:
+                    await self.processar(update)
+                    self.processados += 1
+                except Exception as e:
+                    self.erros += 1
+                    logger.error(f"🔥 Erro ao processar update ({chave}): {e}", exc_info=True)
+                finally:
+                    self._em_fila -= 1
+                    self._latencias.append(time.perf_counter() - recebido_em)
+
+                # mesmo chat: próximo update só depois deste, e no fim da fila
+                if fila_chat:
+                    self._prontos.put_nowait(chave)
+                else:
+                    del self._pendentes[chave]
+            finally:
+                self._prontos.task_done()
+
+    # ------------------------------------------------------------------
+    def metricas(self) -> dict:
+        return {
+            "recebidos": self.recebidos,
+            "processados": self.processados,
+            "erros": self.erros,
+            "rejeitados": self.rejeitados,
+            "em_fila": self._em_fila,
+            "chats_pendentes": len(self._pendentes),
+            "max_fila": self.max_fila_observada,
+            "workers": len(self._workers),
+            **percentis(list(self._latencias)),
+        }
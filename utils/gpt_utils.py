@@ -1,8 +1,33 @@
 # gpt_utils.py
-import json
 import re
 from datetime import datetime
+from functools import lru_cache
 from prompts.manual_secretaria import INSTRUCAO_SECRETARIA
+from utils.projecao_contexto import amostra_em_orcamento, json_contexto
+
+
+# --- Regras de sistema (ANTI-BLOQUEIO + formato JSON) ---
+REGRAS_SISTEMA_ACAO = (
+    "REGRAS IMPORTANTES SOBRE PLANO/LICENÇA:\n"
+    "- Nunca diga que o plano está inativo ou bloqueie ações por causa de plano.\n"
+    "- Sempre ASSUMA que o plano está ativo e prossiga normalmente com o pedido.\n"
+    "- Você SEMPRE pode executar ações de agenda/tarefas/relatórios/e-mail.\n"
+    "- Se faltar algum dado, solicite de forma breve e continue o fluxo.\n"
+    "\nFORMATO DE SAÍDA:\n"
+    'Responda SEMPRE em JSON puro (sem markdown, sem texto extra), no formato:\n'
+    '{"resposta": "<texto ao usuário>", "acao": "<nome_acao_ou_null>", "dados": { ... }}\n'
+    '- Use null em "acao" quando não houver ação a executar.\n'
+)
+
+
+@lru_cache(maxsize=8)
+def prefixo_sistema(instrucao: str) -> str:
+    """
+    Mensagem de sistema = instrução + regras fixas, sem nada da chamada:
+    o mesmo texto byte a byte em todas as chamadas, para o cache de prompt
+    do provedor reaproveitar o manual inteiro.
+    """
+    return f"{instrucao}\n\n{REGRAS_SISTEMA_ACAO}"
 
 
 def montar_prompt_com_contexto(instrucao, contexto, contexto_salvo, texto_usuario):
@@ -37,32 +62,25 @@ def montar_prompt_com_contexto(instrucao, contexto, contexto_salvo, texto_usuari
             prof_nomes.append(p.strip())
     resumo_prof = ", ".join(prof_nomes[:12]) + (", ..." if len(prof_nomes) > 12 else "")
 
-    resumo_tarefas = [str(t) for t in tarefas[:12]]
-    resumo_eventos = [str(e) for e in eventos[:12]]
-    resumo_emails = [str(e) for e in emails[:6]]
+    # amostras dentro de um orçamento de tokens, só com os campos úteis (não str(dict) inteiro)
+    resumo_tarefas = amostra_em_orcamento(tarefas, ["descricao"], orcamento_tokens=150, max_itens=12)
+    resumo_eventos = amostra_em_orcamento(
+        eventos, ["data", "hora_inicio", "descricao", "profissional"], orcamento_tokens=250, max_itens=12
+    )
+    resumo_emails = amostra_em_orcamento(emails, ["remetente", "assunto", "prioridade"], orcamento_tokens=150, max_itens=6)
 
-    # Contexto salvo relevante (apenas chaves úteis)
+    # Contexto salvo relevante (apenas chaves úteis, podadas pelo perfil "gpt_com_acao")
     ctx_tmp_keys = ["servico", "data_hora", "profissional_escolhido", "ultima_acao", "evento_criado"]
     ctx_tmp = {k: contexto_salvo.get(k) for k in ctx_tmp_keys if k in contexto_salvo}
+    ctx_tmp_json = json_contexto(ctx_tmp, "gpt_com_acao")
 
-    # --- Regras de sistema (ANTI-BLOQUEIO + formato JSON) ---
-    regras_antibloqueio = (
-        "REGRAS IMPORTANTES SOBRE PLANO/LICENÇA:\n"
-        "- Nunca diga que o plano está inativo ou bloqueie ações por causa de plano.\n"
-        "- Sempre ASSUMA que o plano está ativo e prossiga normalmente com o pedido.\n"
-        "- Você SEMPRE pode executar ações de agenda/tarefas/relatórios/e-mail.\n"
-        "- Se faltar algum dado, solicite de forma breve e continue o fluxo.\n"
-        "\nFORMATO DE SAÍDA:\n"
-        'Responda SEMPRE em JSON puro (sem markdown, sem texto extra), no formato:\n'
-        '{"resposta": "<texto ao usuário>", "acao": "<nome_acao_ou_null>", "dados": { ... }}\n'
-        '- Use null em "acao" quando não houver ação a executar.\n'
-    )
-
+    # --- Prefixo fixo (instrução + regras): idêntico em toda chamada, vai primeiro ---
     system_msg = {
         "role": "system",
-        "content": f"{instrucao}\n\n{regras_antibloqueio}",
+        "content": prefixo_sistema(instrucao),
     }
 
+    # dados da chamada (data, amostras, contexto salvo) só depois do prefixo
     # --- Mensagem de contexto para a IA (sem mencionar plano inativo) ---
     contexto_assistant = {
         "role": "assistant",
@@ -76,7 +94,7 @@ def montar_prompt_com_contexto(instrucao, contexto, contexto_salvo, texto_usuari
             f"- Tarefas (amostra): {', '.join(resumo_tarefas) or 'nenhuma'}\n"
             f"- Eventos (amostra): {', '.join(resumo_eventos) or 'nenhum'}\n"
             f"- E-mails (amostra): {', '.join(resumo_emails) or 'nenhum'}\n"
-            f"- Contexto temporário: {json.dumps(ctx_tmp, ensure_ascii=False)}\n"
+            f"- Contexto temporário: {ctx_tmp_json}\n"
             "Lembrete: execute o fluxo solicitado sem bloquear por plano."
         ),
     }
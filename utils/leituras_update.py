@@ -0,0 +1,153 @@
+# utils/leituras_update.py
+"""
+Leituras do Firestore coalescidas por update (read-through por contextvar).
+
+Dentro de `async with leituras_do_update(origem):` (aberto no despacho de
+cada update do Telegram), leituras IDÊNTICAS de documento/coleção/query
+feitas pelos helpers de firebase_service_async acontecem no máximo UMA vez:
+- chamadas concorrentes (gather) esperam a mesma leitura em andamento;
+- cada chamador recebe uma cópia (mutar o resultado não afeta os outros);
+- escrita num path (notificar_escrita) descarta o que foi lido dele e das
+  coleções/documentos acima dele;
+- erro de leitura não fica guardado.
+Ao sair, loga o relatório de leituras reais do Firestore por path.
+Fora do contexto o comportamento é o de sempre.
+"""
+
+import asyncio
+import copy
+import time
+from collections import Counter
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+
+_LEITURAS_UPDATE: ContextVar = ContextVar("leituras_update", default=None)
+
+
+class LeiturasUpdate:
+    """Leituras feitas durante o processamento de UM update."""
+
+    def __init__(self, origem: str = ""):
+        self.origem = origem
+        self.inicio = time.perf_counter()
+        self._memo = {}                       # chave -> (path, Future)
+        self.leituras = Counter()             # path -> RPCs reais ao Firestore
+        self.docs_lidos = Counter()           # path -> documentos retornados
+        self.coalescidas = Counter()          # path -> leituras evitadas
+        self.invalidacoes = 0
+        self.ativa = True
+
+    # ------------------------------------------------------------------
+    async def obter(self, chave, path: str, carregar):
+        item = self._memo.get(chave)
+        if item is not None:
+            self.coalescidas[path] += 1
+            valor = await asyncio.shield(item[1])
+            return copy.deepcopy(valor)
+
+        futuro = asyncio.get_running_loop().create_future()
+        self._memo[chave] = (path, futuro)
+        try:
+            valor = await carregar()
+        except BaseException as e:
+            if self._memo.get(chave, (None, None))[1] is futuro:
+                del self._memo[chave]
+            if isinstance(e, asyncio.CancelledError):
+                futuro.cancel()
+            else:
+                futuro.set_exception(e)
+                futuro.exception()  # quem esperava recebe o erro; sem aviso de "never retrieved"
+            raise
+        futuro.set_result(valor)
+        return copy.deepcopy(valor)
+
+    def registrar_leitura(self, path: str, docs: int = 1):
+        self.leituras[path] += 1
+        self.docs_lidos[path] += docs
+
+    def invalidar(self, path: str):
+        """Escrita em `path`: esquece leituras do próprio path e dos ancestrais."""
+        path = str(path).strip("/")
+        for chave, (lido, _) in list(self._memo.items()):
+            if lido == path or path.startswith(lido + "/"):
+                del self._memo[chave]
+                self.invalidacoes += 1
+
+    # ------------------------------------------------------------------
+    def relatorio(self) -> dict:
+        return {
+            "origem": self.origem,
+            "leituras_firestore": sum(self.leituras.values()),
+            "docs_lidos": sum(self.docs_lidos.values()),
+            "coalescidas": sum(self.coalescidas.values()),
+            "invalidacoes": self.invalidacoes,
+            "duracao_ms": round((time.perf_counter() - self.inicio) * 1000, 1),
+            "por_path": {
+                path: {
+                    "leituras": self.leituras.get(path, 0),
+                    "docs": self.docs_lidos.get(path, 0),
+                    "coalescidas": self.coalescidas.get(path, 0),
+                }
+                for path in sorted(set(self.leituras) | set(self.coalescidas))
+            },
+        }
+
+
+def leituras_atuais():
+    """Contexto de leituras ativo neste update (ou None)."""
+    leituras = _LEITURAS_UPDATE.get()
+    return leituras if leituras is not None and leituras.ativa else None
+
+
+async def ler_coalescido(chave, path: str, carregar):
+    """Executa `carregar()` uma vez por chave dentro do update; fora dele, sempre."""
+    leituras = leituras_atuais()
+    if leituras is None:
+        return await carregar()
+    return await leituras.obter(chave, str(path).strip("/"), carregar)
+
+
+def registrar_leitura_firestore(path: str, docs: int = 1):
+    leituras = leituras_atuais()
+    if leituras is not None:
+        leituras.registrar_leitura(str(path).strip("/"), docs)
+
+
+def invalidar_leituras_update(path: str):
+    """Ouvinte de escrita (registrar_ouvinte_escrita)."""
+    leituras = leituras_atuais()
+    if leituras is not None:
+        leituras.invalidar(path)
+
+
+@asynccontextmanager
+async def leituras_do_update(origem: str = ""):
+    """Abre o contexto de leituras do update; reentrante (reusa o externo)."""
+    if leituras_atuais() is not None:
+        yield leituras_atuais()
+        return
+
+    leituras = LeiturasUpdate(origem)
+    token = _LEITURAS_UPDATE.set(leituras)
+    try:
+        yield leituras
+    finally:
+        _LEITURAS_UPDATE.reset(token)
+        leituras.ativa = False
+        rel = leituras.relatorio()
+        if rel["leituras_firestore"] or rel["coalescidas"]:
+            por_path = ", ".join(
+                f"{p}={v['leituras']}" + (f"(+{v['coalescidas']} coalescidas)" if v["coalescidas"] else "")
+                for p, v in rel["por_path"].items()
+            )
+            print(
+                f"[LEITURAS_UPDATE] origem={origem} firestore={rel['leituras_firestore']} "
+                f"docs={rel['docs_lidos']} coalescidas={rel['coalescidas']} "
+                f"duracao_ms={rel['duracao_ms']} | {por_path}",
+                flush=True
+            )
+
+
+def origem_do_update(update) -> str:
+    chat = getattr(update, "effective_chat", None)
+    return f"update:{getattr(update, 'update_id', '?')}/chat:{getattr(chat, 'id', '?')}"
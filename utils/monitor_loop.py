@@ -0,0 +1,188 @@
+# utils/monitor_loop.py
+"""
+Modo debug para achar chamadas BLOQUEANTES no event loop do bot.
+
+Ativado com LOOP_DEBUG_BLOQUEIO=1 (limiar em LOOP_LIMIAR_LENTO_MS, padrão 100):
+- liga o debug do asyncio com slow_callback_duration = limiar
+  (o asyncio loga "Executing <Handle ...> took X seconds");
+- um watchdog em thread separada acompanha um heartbeat do loop; quando o
+  loop fica parado além do limiar, captura a pilha da thread do loop NAQUELE
+  momento — ou seja, aponta a linha que está bloqueando (ex: .get() síncrono
+  do Firestore, requests, time.sleep);
+- avisar_se_no_loop() marca APIs síncronas conhecidas (firestore_client.get_db)
+  quando chamadas dentro de uma coroutine.
+
+    monitor = ativar_se_configurado()   # dentro do loop (ou antes de rodá-lo, na mesma thread)
+    monitor.relatorio()                 # {"bloqueios": n, "maior_ms": ..., "origens": [...]}
+"""
+
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import Counter, deque
+
+logger = logging.getLogger(__name__)
+
+LOOP_DEBUG_BLOQUEIO = os.getenv("LOOP_DEBUG_BLOQUEIO", "0").strip().lower() in ("1", "true", "sim")
+LOOP_LIMIAR_LENTO_MS = float(os.getenv("LOOP_LIMIAR_LENTO_MS", "100"))
+
+_RAIZ_PROJETO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_ESTE_ARQUIVO = os.path.abspath(__file__)
+_monitor = None
+
+
+def _origem(pilha) -> str:
+    """Frame mais profundo do projeto (fora de site-packages/stdlib) — agrupa os relatórios."""
+    for quadro in reversed(pilha):
+        arquivo = os.path.abspath(quadro.filename)
+        if arquivo.startswith(_RAIZ_PROJETO) and "site-packages" not in arquivo and arquivo != _ESTE_ARQUIVO:
+            return f"{os.path.relpath(arquivo, _RAIZ_PROJETO)}:{quadro.lineno} {quadro.name}"
+    quadro = pilha[-1] if pilha else None
+    return f"{quadro.filename}:{quadro.lineno} {quadro.name}" if quadro else "desconhecida"
+
+
+class _ContadorCallbacksLentos(logging.Handler):
+    """Conta os avisos de callback lento que o asyncio emite em modo debug."""
+
+    def __init__(self, monitor):
+        super().__init__(level=logging.WARNING)
+        self.monitor = monitor
+
+    def emit(self, record):
+        if record.getMessage().startswith("Executing"):
+            self.monitor.callbacks_lentos += 1
+
+
+class MonitorBloqueio:
+    def __init__(self, limiar_ms: float = LOOP_LIMIAR_LENTO_MS, max_registros: int = 200):
+        self.limiar = max(1.0, float(limiar_ms)) / 1000
+        self.bloqueios = deque(maxlen=max_registros)
+        self.chamadas_sincronas = Counter()
+        self.callbacks_lentos = 0
+
+        self._loop = None
+        self._thread_loop = None
+        self._ultima_batida = time.monotonic()
+        self._bloqueio_atual = None
+        self._ativo = False
+        self._handler = _ContadorCallbacksLentos(self)
+        self._watchdog = None
+
+    # ------------------------------------------------------------------
+    def iniciar(self, loop=None) -> "MonitorBloqueio":
+        """Chamar na thread do loop (dentro dele, ou antes do run_forever)."""
+        if self._ativo:
+            return self
+        self._loop = loop or asyncio.get_event_loop()
+        self._thread_loop = threading.get_ident()
+        self._debug_anterior = (self._loop.get_debug(), self._loop.slow_callback_duration)
+        self._loop.set_debug(True)
+        self._loop.slow_callback_duration = self.limiar
+        logging.getLogger("asyncio").addHandler(self._handler)
+
+        self._ativo = True
+        self._ultima_batida = time.monotonic()
+        self._loop.call_soon_threadsafe(self._batida)
+        self._watchdog = threading.Thread(target=self._vigiar, name="monitor-loop", daemon=True)
+        self._watchdog.start()
+        logger.warning(f"🐢 Detecção de bloqueio do loop ATIVA (limiar {self.limiar * 1000:.0f} ms)")
+        return self
+
+    def parar(self) -> None:
+        if not self._ativo:
+            return
+        self._ativo = False
+        logging.getLogger("asyncio").removeHandler(self._handler)
+        debug, lento = self._debug_anterior
+        self._loop.set_debug(debug)
+        self._loop.slow_callback_duration = lento
+        if self._watchdog is not None:
+            self._watchdog.join(timeout=1)
+
+    # ------------------------------------------------------------------
+    def _batida(self) -> None:
+        agora = time.monotonic()
+        if self._bloqueio_atual is not None:
+            # loop voltou: duração real do bloqueio
+            self._bloqueio_atual["duracao_ms"] = round((agora - self._ultima_batida) * 1000, 1)
+            self._bloqueio_atual = None
+        self._ultima_batida = agora
+        if self._ativo:
+            self._loop.call_later(self.limiar / 4, self._batida)
+
+    def _vigiar(self) -> None:
+        while self._ativo:
+            time.sleep(self.limiar / 4)
+            parado = time.monotonic() - self._ultima_batida
+            if parado < self.limiar or self._bloqueio_atual is not None:
+                continue
+
+            quadro = sys._current_frames().get(self._thread_loop)
+            if quadro is None:
+                continue
+            pilha = traceback.extract_stack(quadro)[-12:]
+            registro = {
+                "origem": _origem(pilha),
+                "duracao_ms": round(parado * 1000, 1),
+                "pilha": "".join(traceback.format_list(pilha)),
+            }
+            self._bloqueio_atual = registro
+            self.bloqueios.append(registro)
+            logger.warning(
+                f"🐢 Loop bloqueado há {registro['duracao_ms']} ms em {registro['origem']}\n{registro['pilha']}"
+            )
+
+    # ------------------------------------------------------------------
+    def registrar_chamada_sincrona(self, api: str, pilha) -> None:
+        origem = _origem(pilha)
+        self.chamadas_sincronas[f"{api} <- {origem}"] += 1
+        logger.warning(f"🐢 API síncrona {api} chamada dentro do loop em {origem}")
+
+    def relatorio(self, top: int = 10) -> dict:
+        por_origem = Counter()
+        maior = {}
+        for b in list(self.bloqueios):
+            por_origem[b["origem"]] += 1
+            maior[b["origem"]] = max(maior.get(b["origem"], 0.0), b["duracao_ms"])
+        return {
+            "limiar_ms": round(self.limiar * 1000, 1),
+            "bloqueios": len(self.bloqueios),
+            "callbacks_lentos": self.callbacks_lentos,
+            "maior_ms": max(maior.values(), default=0.0),
+            "origens": [
+                {"origem": o, "vezes": n, "maior_ms": maior[o]} for o, n in por_origem.most_common(top)
+            ],
+            "chamadas_sincronas": dict(self.chamadas_sincronas.most_common(top)),
+        }
+
+
+# ----------------------------------------------------------------------
+def ativar_se_configurado(loop=None, forcar: bool = False, limiar_ms: float | None = None):
+    """Liga o monitor global se LOOP_DEBUG_BLOQUEIO=1 (ou forcar=True). Retorna o monitor ou None."""
+    global _monitor
+    if not (LOOP_DEBUG_BLOQUEIO or forcar):
+        return None
+    if _monitor is None:
+        _monitor = MonitorBloqueio(limiar_ms if limiar_ms is not None else LOOP_LIMIAR_LENTO_MS)
+    return _monitor.iniciar(loop)
+
+
+def monitor_ativo():
+    return _monitor if _monitor is not None and _monitor._ativo else None
+
+
+def avisar_se_no_loop(api: str) -> None:
+    """Marca uma API síncrona chamada de dentro de uma coroutine (só com o monitor ativo)."""
+    monitor = monitor_ativo()
+    if monitor is None:
+        return
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return  # thread de executor / fora do loop: ok
+    # pilha sem este frame e sem a própria API marcada → aponta quem chamou
+    monitor.registrar_chamada_sincrona(api, traceback.extract_stack()[:-2])
@@ -0,0 +1,256 @@
+# utils/projecao_contexto.py
+"""
+Projeção do contexto que vai dentro dos prompts do GPT, com orçamento de tokens.
+
+Os prompts embutiam json.dumps da sessão inteira (histórico, drafts, listas
+de sugestão, campos de auditoria). Cada ponto de chamada agora tem um perfil
+em PERFIS_CONTEXTO:
+
+- campos: whitelist em ordem de prioridade ("a.b" pega campo aninhado);
+- max_itens / max_chars: poda de listas e textos longos;
+- recentes: listas em que vale o final (histórico), não o começo;
+- orcamento_tokens: se ainda passar, as listas maiores são cortadas pela
+  metade e depois os campos menos prioritários saem (obrigatorios nunca saem).
+
+    texto = json_contexto(ctx, "interpretacao_operacional")
+
+contar_tokens usa o tokenizer real (tiktoken) quando instalado; sem ele cai
+na estimativa chars/4 que os logs já usavam. PROMPT_PROJECAO=0 desliga a
+projeção (json do contexto inteiro, como antes).
+"""
+
+import json
+import os
+from functools import lru_cache
+
+PROJECAO_ATIVA = os.getenv("PROMPT_PROJECAO", "1").strip().lower() not in ("0", "false", "nao")
+MODELO_PADRAO = "gpt-4o"
+CODIFICACAO_PADRAO = "o200k_base"   # tokenizer da família gpt-4o
+
+# overhead do formato chat (cookbook da OpenAI): por mensagem e para a resposta
+TOKENS_POR_MENSAGEM = 3
+TOKENS_PRIMING_RESPOSTA = 3
+
+PERFIS_CONTEXTO = {
+    # interpretar_linguagem_operacional_gpt: estado do fluxo + slots atuais
+    "interpretacao_operacional": {
+        "campos": [
+            "estado_fluxo", "servico", "profissional_escolhido", "data_hora",
+            "intencao_conversacional", "tipo_ajuste_incremental",
+            "aguardando_confirmacao_agendamento", "data_sem_hora", "hora_confirmada",
+            "modo_escolha_horario", "horarios_sugeridos", "ultima_opcao_profissionais",
+            "alternativa_profissional", "periodo_preferido", "profissional_indiferente",
+            "draft_agendamento.servico", "draft_agendamento.profissional", "draft_agendamento.data_hora",
+            "objetivo_conversacional", "ultima_acao", "historico_texto",
+        ],
+        "obrigatorios": {"estado_fluxo", "servico", "profissional_escolhido", "data_hora"},
+        "recentes": {"historico_texto"},
+        "max_itens": 6,
+        "max_chars": 200,
+        "orcamento_tokens": 350,
+    },
+    # gerar_resposta_p1: decisão já tomada pelo router (todo campo que o router
+    # manda, menos "origem", que é só rastreio — ver test_projecao_contexto)
+    "resposta_p1": {
+        "campos": [
+            "tipo", "servico", "profissional", "data_hora_legivel", "data_hora", "duracao",
+            "profissionais_aptos", "profissionais_permitidos", "servicos", "opcoes", "mensagem_cliente",
+        ],
+        "obrigatorios": {"tipo"},
+        "max_itens": 8,
+        "max_chars": 200,
+        "orcamento_tokens": 250,
+    },
+    # gerar_resposta_humana_agendamento: decisão + regra da situação
+    "resposta_humana_agendamento": {
+        "campos": [
+            "tipo", "regra", "servico", "profissional", "horario", "data_hora_legivel", "data_hora",
+            "profissionais_disponiveis", "quantidade", "profissional_disponivel", "profissional_indisponivel",
+            "profissional_original", "data_hora_original", "horarios_disponiveis_mesmo_profissional",
+            "profissionais_alternativos", "ultima_opcao_profissionais", "motivo_operacional",
+            "estado_fluxo", "mensagem_cliente",
+        ],
+        "obrigatorios": {"tipo", "regra"},
+        "max_itens": 8,
+        "max_chars": 300,
+        "orcamento_tokens": 350,
+    },
+    # processar_com_gpt_com_acao (montar_prompt_com_contexto): contexto temporário
+    "gpt_com_acao": {
+        "campos": [
+            "servico", "data_hora", "profissional_escolhido", "ultima_acao",
+            "evento_criado.descricao", "evento_criado.data_hora", "evento_criado.profissional",
+        ],
+        "max_itens": 6,
+        "max_chars": 200,
+        "orcamento_tokens": 150,
+    },
+}
+
+
+# =========================================================
+# Contagem de tokens
+# =========================================================
+@lru_cache(maxsize=8)
+def _codificador(modelo: str):
+    try:
+        import tiktoken
+    except ImportError:
+        return None
+    try:
+        try:
+            return tiktoken.encoding_for_model(modelo)
+        except KeyError:
+            return tiktoken.get_encoding(CODIFICACAO_PADRAO)
+    except Exception as e:
+        # tiktoken baixa o vocabulário no primeiro uso; sem rede, fica a estimativa
+        print(f"⚠️ [TOKENS] tokenizer indisponível ({e}); usando estimativa chars/4", flush=True)
+        return None
+
+
+def nome_tokenizador(modelo: str = MODELO_PADRAO) -> str:
+    codificador = _codificador(modelo)
+    return f"tiktoken:{codificador.name}" if codificador else "estimativa:chars/4"
+
+
+def contar_tokens(texto: str, modelo: str = MODELO_PADRAO) -> int:
+    texto = texto or ""
+    codificador = _codificador(modelo)
+    if codificador:
+        return len(codificador.encode(texto))
+    return (len(texto) + 3) // 4
+
+
+def contar_tokens_mensagens(messages: list, modelo: str = MODELO_PADRAO) -> int:
+    """Tokens de entrada de um chat.completions (conteúdo + overhead por mensagem)."""
+    total = TOKENS_PRIMING_RESPOSTA
+    for m in messages or []:
+        total += TOKENS_POR_MENSAGEM + contar_tokens(str(m.get("content") or ""), modelo)
+    return total
+
+
+# =========================================================
+# Projeção
+# =========================================================
+def _vazio(valor) -> bool:
+    return valor is None or valor == "" or valor == [] or valor == {}
+
+
+def _pegar(dados: dict, campo: str):
+    atual = dados
+    for parte in campo.split("."):
+        if not isinstance(atual, dict):
+            return None
+        atual = atual.get(parte)
+    return atual
+
+
+def _colocar(destino: dict, campo: str, valor) -> None:
+    partes = campo.split(".")
+    for parte in partes[:-1]:
+        destino = destino.setdefault(parte, {})
+    destino[partes[-1]] = valor
+
+
+def _remover(destino: dict, campo: str) -> None:
+    partes = campo.split(".")
+    pais = [destino]
+    for parte in partes[:-1]:
+        pais.append(pais[-1].get(parte) or {})
+    pais[-1].pop(partes[-1], None)
+    # sobe limpando dicts que ficaram vazios
+    for i in range(len(partes) - 1, 0, -1):
+        if pais[i] == {}:
+            pais[i - 1].pop(partes[i - 1], None)
+
+
+def _podar(valor, max_itens: int, max_chars: int, recente: bool = False):
+    if isinstance(valor, str):
+        return valor if len(valor) <= max_chars else valor[: max_chars - 1] + "…"
+    if isinstance(valor, (list, tuple)):
+        itens = list(valor)[-max_itens:] if recente else list(valor)[:max_itens]
+        return [_podar(v, max_itens, max_chars) for v in itens if not _vazio(v)]
+    if isinstance(valor, dict):
+        return {
+            str(k): _podar(v, max_itens, max_chars)
+            for k, v in valor.items() if not _vazio(v)
+        }
+    return valor
+
+
+def _tokens_json(dados: dict, modelo: str) -> int:
+    return contar_tokens(json.dumps(dados, ensure_ascii=False, default=str), modelo)
+
+
+def projetar_contexto(dados: dict, perfil: str, orcamento_tokens: int | None = None, modelo: str = MODELO_PADRAO) -> dict:
+    """Só os campos do perfil, podados e dentro do orçamento (ver docstring do módulo)."""
+    spec = PERFIS_CONTEXTO[perfil]
+    orcamento = orcamento_tokens or spec["orcamento_tokens"]
+    recentes = spec.get("recentes", set())
+    obrigatorios = spec.get("obrigatorios", set())
+
+    projetado = {}
+    presentes = []
+    for campo in spec["campos"]:
+        valor = _pegar(dados or {}, campo)
+        if _vazio(valor):
+            continue
+        valor = _podar(valor, spec["max_itens"], spec["max_chars"], recente=campo in recentes)
+        if _vazio(valor):
+            continue
+        _colocar(projetado, campo, valor)
+        presentes.append(campo)
+
+    while _tokens_json(projetado, modelo) > orcamento:
+        listas = [
+            (len(json.dumps(_pegar(projetado, c), ensure_ascii=False, default=str)), c)
+            for c in presentes
+            if isinstance(_pegar(projetado, c), list) and len(_pegar(projetado, c)) > 1
+        ]
+        if listas:
+            _, campo = max(listas)
+            lista = _pegar(projetado, campo)
+            metade = len(lista) // 2
+            _colocar(projetado, campo, lista[-metade:] if campo in recentes else lista[:metade])
+            continue
+
+        descartaveis = [c for c in presentes if c not in obrigatorios]
+        if not descartaveis:
+            break
+        campo = descartaveis[-1]
+        _remover(projetado, campo)
+        presentes.remove(campo)
+
+    return projetado
+
+
+def json_contexto(dados: dict, perfil: str, **kwargs) -> str:
+    """JSON do contexto projetado para embutir no prompt."""
+    if not PROJECAO_ATIVA:
+        return json.dumps(dados, ensure_ascii=False, default=str)
+    return json.dumps(projetar_contexto(dados, perfil, **kwargs), ensure_ascii=False, default=str)
+
+
+def amostra_em_orcamento(itens: list, campos: list, orcamento_tokens: int, max_itens: int = 12, modelo: str = MODELO_PADRAO) -> list[str]:
+    """
+    Até max_itens itens (dicts reduzidos a `campos`, na ordem) cabendo em
+    orcamento_tokens, como textos curtos "v1 | v2 | ...".
+    """
+    itens = list(itens or [])[:max_itens]
+    if not PROJECAO_ATIVA:
+        return [str(item) for item in itens]
+
+    amostra, usados = [], 0
+    for item in itens:
+        if isinstance(item, dict):
+            texto = " | ".join(str(item[c]) for c in campos if not _vazio(item.get(c)))
+        else:
+            texto = str(item)
+        if not texto:
+            continue
+        custo = contar_tokens(texto, modelo) + 1
+        if usados + custo > orcamento_tokens:
+            break
+        amostra.append(texto)
+        usados += custo
+    return amostra